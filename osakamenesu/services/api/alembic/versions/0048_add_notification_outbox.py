@@ -0,0 +1,90 @@
+"""add notification outbox
+
+Revision ID: 0048_add_notification_outbox
+Revises: 430e5bc46d8a
+Create Date: 2026-10-18 12:00:00.000000
+
+Transactional outbox for GuestReservation notifications, drained by
+scripts/notifications_worker.py with SELECT ... FOR UPDATE SKIP LOCKED.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0048_add_notification_outbox"
+down_revision = "430e5bc46d8a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("reservation_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("event", sa.String(length=32), nullable=False),
+        sa.Column("channel", sa.String(length=16), nullable=False),
+        sa.Column(
+            "payload",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+            server_default=sa.text("'{}'::jsonb"),
+        ),
+        sa.Column(
+            "status",
+            sa.String(length=16),
+            nullable=False,
+            server_default="pending",
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+        sa.Column("locked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["reservation_id"], ["guest_reservations.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_notification_outbox_reservation_id",
+        "notification_outbox",
+        ["reservation_id"],
+    )
+    op.create_index(
+        "ix_notification_outbox_status_next_attempt",
+        "notification_outbox",
+        ["status", "next_attempt_at"],
+    )
+    op.create_index(
+        "ix_notification_outbox_channel_status",
+        "notification_outbox",
+        ["channel", "status"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_notification_outbox_channel_status", table_name="notification_outbox"
+    )
+    op.drop_index(
+        "ix_notification_outbox_status_next_attempt", table_name="notification_outbox"
+    )
+    op.drop_index(
+        "ix_notification_outbox_reservation_id", table_name="notification_outbox"
+    )
+    op.drop_table("notification_outbox")
@@ -0,0 +1,42 @@
+"""store admin change logs as snapshots and diffs
+
+Revision ID: 0049_admin_change_log_diffs
+Revises: 0048_add_notification_outbox
+Create Date: 2026-10-18 13:00:00.000000
+
+Existing rows keep their full before/after payloads and are marked ``full``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0049_admin_change_log_diffs"
+down_revision = "0048_add_notification_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "admin_change_logs",
+        sa.Column(
+            "format", sa.String(length=16), nullable=False, server_default="full"
+        ),
+    )
+    op.add_column(
+        "admin_change_logs",
+        sa.Column("patch_json", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+    op.create_index(
+        "ix_admin_change_logs_target_ts",
+        "admin_change_logs",
+        ["target_type", "target_id", "ts"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_admin_change_logs_target_ts", table_name="admin_change_logs")
+    op.drop_column("admin_change_logs", "patch_json")
+    op.drop_column("admin_change_logs", "format")
@@ -0,0 +1,97 @@
+"""add guest reservation search columns
+
+Revision ID: 0050_reservation_search_index
+Revises: 0049_admin_change_log_diffs
+Create Date: 2026-10-18 14:00:00.000000
+
+Dashboard reservation search used ``ILIKE '%q%'`` over four columns, which no
+index can serve.  ``search_text`` holds the folded customer fields (trigram
+GIN index) and ``customer_phone_digits`` the bare phone digits (btree with
+``text_pattern_ops`` for prefix lookups).  The backfill mirrors
+``app.utils.text.fold_search_text`` / ``phone_digits``; new writes are kept in
+sync by the GuestReservation mapper events.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0050_reservation_search_index"
+down_revision = "0049_admin_change_log_diffs"
+branch_labels = None
+depends_on = None
+
+KATAKANA = "ァアィイゥウェエォオカガキギクグケゲコゴサザシジスズセゼソゾタダチヂッツヅテデトドナニヌネノハバパヒビピフブプヘベペホボポマミムメモャヤュユョヨラリルレロヮワヰヱヲンヴヵヶ"
+HIRAGANA = "ぁあぃいぅうぇえぉおかがきぎくぐけげこごさざしじすずせぜそぞただちぢっつづてでとどなにぬねのはばぱひびぴふぶぷへべぺほぼぽまみむめもゃやゅゆょよらりるれろゎわゐゑをんゔゕゖ"
+
+
+def _fold(expr: str) -> str:
+    return (
+        f"regexp_replace(translate(lower(normalize({expr}, NFKC)), "
+        f"'{KATAKANA}', '{HIRAGANA}'), '\\s+', '', 'g')"
+    )
+
+
+def _phone(expr: str) -> str:
+    digits = f"regexp_replace(normalize({expr}, NFKC), '\\D', '', 'g')"
+    return (
+        f"CASE WHEN btrim(normalize({expr}, NFKC)) LIKE '+81%' "
+        f"AND {digits} LIKE '81%' THEN '0' || substr({digits}, 3) "
+        f"ELSE {digits} END"
+    )
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "guest_reservations",
+        sa.Column("customer_phone_digits", sa.String(length=40), nullable=True),
+    )
+    op.add_column(
+        "guest_reservations", sa.Column("search_text", sa.Text(), nullable=True)
+    )
+
+    name = "COALESCE(customer_name, contact_info->>'name')"
+    phone = "COALESCE(customer_phone, contact_info->>'phone')"
+    email = "COALESCE(customer_email, contact_info->>'email')"
+    op.execute(f"""
+        UPDATE guest_reservations SET
+            customer_phone_digits = NULLIF({_phone(phone)}, ''),
+            search_text = NULLIF(concat_ws(E'\\n',
+                NULLIF({_fold(name)}, ''),
+                NULLIF({_phone(phone)}, ''),
+                NULLIF({_fold(email)}, ''),
+                NULLIF({_fold("notes")}, '')
+            ), '')
+        """)
+
+    op.create_index(
+        "ix_guest_reservations_shop_created",
+        "guest_reservations",
+        ["shop_id", "created_at", "id"],
+    )
+    op.create_index(
+        "ix_guest_reservations_shop_phone_digits",
+        "guest_reservations",
+        ["shop_id", "customer_phone_digits"],
+        postgresql_ops={"customer_phone_digits": "text_pattern_ops"},
+    )
+    op.create_index(
+        "ix_guest_reservations_search_text_trgm",
+        "guest_reservations",
+        ["search_text"],
+        postgresql_using="gin",
+        postgresql_ops={"search_text": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_guest_reservations_search_text_trgm", table_name="guest_reservations"
+    )
+    op.drop_index(
+        "ix_guest_reservations_shop_phone_digits", table_name="guest_reservations"
+    )
+    op.drop_index("ix_guest_reservations_shop_created", table_name="guest_reservations")
+    op.drop_column("guest_reservations", "search_text")
+    op.drop_column("guest_reservations", "customer_phone_digits")
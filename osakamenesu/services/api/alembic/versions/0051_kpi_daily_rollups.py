@@ -0,0 +1,85 @@
+"""add shop and therapist daily KPI rollups
+
+Revision ID: 0051_kpi_daily_rollups
+Revises: 0050_reservation_search_index
+Create Date: 2026-10-18 16:00:00.000000
+
+One row per JST day and shop (and per therapist) with reservation counts,
+booked vs. shift minutes, repeat bookings and review counters, maintained by
+``app.services.kpi_rollups``.  The tables start empty; fill them with
+``python -m scripts.backfill_kpi_rollups`` (or ``POST /api/ops/kpi/backfill``)
+after upgrading.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0051_kpi_daily_rollups"
+down_revision = "0050_reservation_search_index"
+branch_labels = None
+depends_on = None
+
+
+def _counter(name: str) -> sa.Column:
+    return sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "shop_daily_stats",
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        _counter("reservations_total"),
+        _counter("reservations_pending"),
+        _counter("reservations_confirmed"),
+        _counter("reservations_cancelled"),
+        _counter("reservations_no_show"),
+        _counter("repeat_reservations"),
+        _counter("booked_minutes"),
+        _counter("shift_minutes"),
+        _counter("reviews_pending"),
+        _counter("reviews_published"),
+        _counter("reviews_rejected"),
+        _counter("review_score_sum"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+        sa.PrimaryKeyConstraint("shop_id", "day"),
+    )
+    op.create_table(
+        "therapist_daily_stats",
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("therapist_id", postgresql.UUID(as_uuid=True), nullable=False),
+        _counter("reservations_total"),
+        _counter("reservations_confirmed"),
+        _counter("reservations_cancelled"),
+        _counter("repeat_reservations"),
+        _counter("booked_minutes"),
+        _counter("shift_minutes"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+        sa.PrimaryKeyConstraint("shop_id", "day", "therapist_id"),
+    )
+    op.create_index(
+        "ix_therapist_daily_stats_therapist_day",
+        "therapist_daily_stats",
+        ["therapist_id", "day"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_therapist_daily_stats_therapist_day", table_name="therapist_daily_stats"
+    )
+    op.drop_table("therapist_daily_stats")
+    op.drop_table("shop_daily_stats")
@@ -0,0 +1,55 @@
+"""add therapist feature store
+
+Revision ID: 0052_therapist_features
+Revises: 0051_kpi_daily_rollups
+Create Date: 2026-10-18 18:00:00.000000
+
+Precomputed recommended-scoring inputs per therapist, written by the
+``app.services.therapist_features`` batch job and loaded into memory by each
+API worker.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0052_therapist_features"
+down_revision = "0051_kpi_daily_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "therapist_features",
+        sa.Column("therapist_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("shop_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "total_bookings_30d", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("repeat_rate_30d", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("utilization_7d", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("avg_review_score", sa.Float(), nullable=False, server_default="0"),
+        sa.Column(
+            "days_since_first_shift",
+            sa.Integer(),
+            nullable=False,
+            server_default="365",
+        ),
+        sa.Column(
+            "availability_score", sa.Float(), nullable=False, server_default="0.5"
+        ),
+        sa.Column(
+            "computed_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.create_index("ix_therapist_features_shop_id", "therapist_features", ["shop_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_therapist_features_shop_id", table_name="therapist_features")
+    op.drop_table("therapist_features")
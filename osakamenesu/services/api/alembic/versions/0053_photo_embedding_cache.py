@@ -0,0 +1,38 @@
+"""add photo embedding cache
+
+Revision ID: 0053_photo_embedding_cache
+Revises: 0052_therapist_features
+Create Date: 2026-10-18 21:30:00.000000
+
+Embeddings keyed by image content hash and backend, so re-uploads of the same
+photo reuse the stored vector.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0053_photo_embedding_cache"
+down_revision = "0052_therapist_features"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "photo_embedding_cache",
+        sa.Column("content_hash", sa.String(length=64), primary_key=True),
+        sa.Column("backend", sa.String(length=64), primary_key=True),
+        sa.Column("embedding", postgresql.ARRAY(sa.Float()), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("photo_embedding_cache")
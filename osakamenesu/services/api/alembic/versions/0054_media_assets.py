@@ -0,0 +1,50 @@
+"""add media assets
+
+Revision ID: 0054_media_assets
+Revises: 0053_photo_embedding_cache
+Create Date: 2026-10-18 23:10:00.000000
+
+Uploaded photos keyed by storage folder and content hash, with the manifest of their resized
+WebP/AVIF variants so search documents can reference them.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0054_media_assets"
+down_revision = "0053_photo_embedding_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_assets",
+        sa.Column("folder", sa.String(length=255), primary_key=True),
+        sa.Column("content_hash", sa.String(length=64), primary_key=True),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("content_type", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column(
+            "variants",
+            postgresql.JSONB(astext_type=sa.Text()),
+            nullable=False,
+            server_default=sa.text("'[]'::jsonb"),
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.create_index("ix_media_assets_url", "media_assets", ["url"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_assets_url", table_name="media_assets")
+    op.drop_table("media_assets")
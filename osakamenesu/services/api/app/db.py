@@ -1,18 +1,186 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from __future__ import annotations
+
+import itertools
+import logging
+import time
+from typing import Any, AsyncIterator
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
 from .settings import settings
 from . import models
 
+logger = logging.getLogger("app.db")
+
+# Cookie telling read routes to stay on the primary until the given unix time,
+# so a guest sees their own reservation right after writing it.
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+
+# Seconds the replica is behind the primary; 0 while it has replayed
+# everything it received (an idle primary does not count as lag).
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+def _engine_options(url: str) -> dict[str, Any]:
+    options: dict[str, Any] = {"echo": False, "future": True}
+    if url.startswith("sqlite"):
+        # SQLite pools (StaticPool/NullPool) take no sizing arguments.
+        return options
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    if "+asyncpg" in url:
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+        }
+    return options
+
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+def create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(url, **_engine_options(url))
+
+
+engine = create_engine(settings.database_url)
 SessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
+class Replica:
+    """A read replica with a cached replication-lag check."""
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        max_lag_seconds: float,
+        check_interval: float,
+    ) -> None:
+        self.engine = create_engine(url)
+        self.sessionmaker = async_sessionmaker(
+            self.engine, class_=AsyncSession, expire_on_commit=False
+        )
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.lag: float | None = None
+        self._checked_at = 0.0
+
+    async def is_healthy(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            # Claim the check before awaiting so concurrent requests reuse the
+            # previous result instead of piling up lag queries.
+            self._checked_at = now
+            try:
+                async with self.engine.connect() as conn:
+                    self.lag = float(
+                        (await conn.execute(REPLICA_LAG_SQL)).scalar() or 0
+                    )
+            except Exception as exc:
+                logger.warning("replica lag check failed: %s", exc)
+                self.lag = None
+        return self.lag is not None and self.lag <= self.max_lag_seconds
+
+
+class ReplicaRouter:
+    """Round-robin over replicas, skipping lagging or unreachable ones."""
+
+    def __init__(self, replicas: list[Replica]) -> None:
+        self.replicas = replicas
+        self._cursor = itertools.count()
+
+    async def pick(self) -> async_sessionmaker[AsyncSession] | None:
+        if not self.replicas:
+            return None
+        start = next(self._cursor)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if await replica.is_healthy():
+                return replica.sessionmaker
+        return None
+
+
+def _replica_urls() -> list[str]:
+    raw = settings.database_replica_urls or ""
+    return [url.strip() for url in raw.split(",") if url.strip()]
+
+
+replica_router = ReplicaRouter(
+    [
+        Replica(
+            url,
+            max_lag_seconds=settings.db_replica_max_lag_seconds,
+            check_interval=settings.db_replica_lag_check_interval,
+        )
+        for url in _replica_urls()
+    ]
+)
+
+
 async def get_session() -> AsyncSession:
     async with SessionLocal() as session:
         yield session
 
 
+def mark_read_your_writes(response: Response) -> None:
+    """Pin this client's reads to the primary for a short while after a write."""
+    seconds = settings.db_read_your_writes_seconds
+    if seconds <= 0 or not replica_router.replicas:
+        return
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE,
+        str(int(time.time() + seconds)),
+        max_age=seconds,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _pinned_to_primary(request: Request) -> bool:
+    raw = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    if not raw:
+        return False
+    try:
+        return float(raw) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_session(
+    request: Request,
+    primary: AsyncSession = Depends(get_session),
+) -> AsyncIterator[AsyncSession]:
+    """Session for pure-read endpoints, served by a replica when possible.
+
+    Falls back to the primary session when no replica is configured, all
+    replicas lag beyond ``db_replica_max_lag_seconds``, or the client wrote a
+    reservation within ``db_read_your_writes_seconds``.
+    """
+    sessionmaker = None if _pinned_to_primary(request) else await replica_router.pick()
+    if sessionmaker is None:
+        yield primary
+        return
+    async with sessionmaker() as session:
+        yield session
+
+
 async def init_db() -> None:
     """Create tables if they do not exist (dev convenience)."""
     async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Needed by the trigram index on guest_reservations.search_text.
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(models.Base.metadata.create_all)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db import get_session
+from ...deps import require_admin, audit_admin
+from ...models.base import now_utc
+from ...schemas import AdminAuditStateResponse
+from .services.audit import reconstruct_state
+
+router = APIRouter()
+
+
+@router.get(
+    "/api/admin/audit/{target_type}/{target_id}/state",
+    summary="Reconstruct audited state",
+    response_model=AdminAuditStateResponse,
+)
+async def admin_audit_state(
+    target_type: str,
+    target_id: UUID,
+    at: datetime | None = Query(default=None),
+    db: AsyncSession = Depends(get_session),
+    _admin=Depends(require_admin),
+    _audit=Depends(audit_admin),
+):
+    """State of a target as recorded by the admin audit log at ``at``."""
+    if at is None:
+        at = now_utc()
+    elif at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    result = await reconstruct_state(
+        db, target_type=target_type, target_id=target_id, at=at
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="no audit history")
+    return AdminAuditStateResponse(
+        target_type=target_type, target_id=target_id, at=at, **result
+    )
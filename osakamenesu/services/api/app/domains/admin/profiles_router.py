@@ -19,6 +19,7 @@ from ...schemas import (
     ShopContentUpdate,
     ShopAdminDetail,
     ShopAdminList,
+    ShopContentStreamResponse,
 )
 from .services import profile_service
 from .services.audit import build_admin_audit_context
@@ -247,6 +248,30 @@ async def admin_bulk_ingest_shop_content(
     )
 
 
+@router.post(
+    "/api/admin/shops/content:ingest",
+    summary="Stream shop content as NDJSON",
+    response_model=ShopContentStreamResponse,
+)
+async def admin_ingest_shop_content_stream(
+    request: Request,
+    batch_size: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_session),
+    _admin=Depends(require_admin),
+    _audit=Depends(audit_admin),
+):
+    """Ingest one ``BulkShopContentItem`` per line of the request body."""
+    context = _admin_context(request)
+    return await _run_service(
+        profile_service.ingest_shop_content_stream(
+            audit_context=context,
+            db=db,
+            chunks=request.stream(),
+            batch_size=batch_size,
+        )
+    )
+
+
 @router.put(
     "/api/admin/shops/{shop_id}/availability",
     summary="Upsert availability",
@@ -8,6 +8,7 @@ from .profiles_router import (
     router as profiles_router,
     reindex_all as profiles_reindex_all,
 )
+from .audit_router import router as audit_router
 from .reviews_router import router as reviews_router
 from .therapist_shifts_api import router as therapist_shifts_router
 from .shop_dashboard_api import router as shop_dashboard_router
@@ -23,6 +24,7 @@ router.include_router(shops_router)
 router.include_router(guest_reservations_router)
 router.include_router(therapists_router)
 router.include_router(shop_dashboard_router)
+router.include_router(audit_router)
 
 reindex_all = profiles_reindex_all
 
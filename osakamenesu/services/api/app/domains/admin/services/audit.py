@@ -1,13 +1,40 @@
+"""Admin change audit log.
+
+Changes are stored per target as a chain: a full ``snapshot`` every
+``admin_audit_snapshot_interval`` changes and compact JSON-patch ``diff``
+rows in between.  Each diff is taken against the state the chain last
+recorded, and a change whose ``before`` differs from that state starts a new
+snapshot.  :func:`reconstruct_state` rebuilds the state of a target at any
+point in time from the latest snapshot and the diffs after it.
+
+While the API runs, :func:`record_change` only queues the change; the
+:class:`AuditLogWriter` started in the app lifespan serializes, diffs and
+inserts queued changes in batches so admin requests skip both the large
+encodes and the extra commit.
+"""
+
 from __future__ import annotations
 
+import asyncio
 import hashlib
-from dataclasses import dataclass
-from typing import Any
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Sequence
 
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, func, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .... import models
+from ....models.base import now_utc
+from ....monitoring.metrics import BACKGROUND_JOB_COUNT
+from ....settings import settings
+from ....utils.json_patch import apply_patch, make_patch
+
+logger = logging.getLogger("app.admin.audit")
+
+SNAPSHOT_FORMATS = ("snapshot", "full")
 
 
 @dataclass(frozen=True)
@@ -26,6 +53,343 @@ def build_admin_audit_context(
     return AdminAuditContext(ip_hash=ip_hash, admin_key_hash=key_hash)
 
 
+def diff_fields(
+    before: dict[str, Any], after: dict[str, Any]
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Return only the top-level fields that differ between two snapshots."""
+    keys = [key for key in {**before, **after} if before.get(key) != after.get(key)]
+    return (
+        {key: before.get(key) for key in keys},
+        {key: after.get(key) for key in keys},
+    )
+
+
+def build_change_log(
+    *,
+    context: AdminAuditContext | None,
+    target_type: str,
+    target_id: Any,
+    action: str,
+    before: Any,
+    after: Any,
+    format: str = "summary",
+) -> models.AdminChangeLog:
+    """Build a change log row for the caller to add to its own transaction.
+
+    Rows built here default to ``summary``: they are kept as-is and make the
+    next chained change of the target start with a fresh snapshot.
+    """
+    return models.AdminChangeLog(
+        ts=now_utc(),
+        target_type=target_type,
+        target_id=target_id,
+        action=action,
+        before_json=jsonable_encoder(before) if before is not None else None,
+        after_json=jsonable_encoder(after) if after is not None else None,
+        format=format,
+        admin_key_hash=context.admin_key_hash if context else None,
+        ip_hash=context.ip_hash if context else None,
+    )
+
+
+@dataclass
+class AuditEntry:
+    """A change waiting to be written; payloads are encoded by the writer."""
+
+    target_type: str
+    target_id: Any
+    action: str
+    before: Any
+    after: Any
+    admin_key_hash: str | None = None
+    ip_hash: str | None = None
+    ts: datetime = field(default_factory=now_utc)
+
+
+# Marks a chain whose last recorded state has not been loaded.
+_UNKNOWN = object()
+
+
+@dataclass
+class _ChainState:
+    has_rows: bool = False
+    has_snapshot: bool = False
+    diffs_since_snapshot: int = 0
+    # A summary row since the last snapshot means diffs would miss changes.
+    broken: bool = False
+    # State after the chain's latest row; the base of the next diff.
+    last_state: Any = _UNKNOWN
+
+
+def _last_snapshot_subquery(keys: Sequence[tuple[str, Any]]):
+    log = models.AdminChangeLog
+    return (
+        select(log.target_type, log.target_id, func.max(log.ts).label("ts"))
+        .where(
+            tuple_(log.target_type, log.target_id).in_(keys),
+            log.format.in_(SNAPSHOT_FORMATS),
+        )
+        .group_by(log.target_type, log.target_id)
+        .subquery()
+    )
+
+
+async def _load_chain_states(
+    db: AsyncSession, keys: Sequence[tuple[str, Any]], interval: int
+) -> dict[tuple[str, Any], _ChainState]:
+    log = models.AdminChangeLog
+    last_snapshot = _last_snapshot_subquery(keys)
+    result = await db.execute(
+        select(
+            log.target_type,
+            log.target_id,
+            log.format,
+            func.count(),
+            last_snapshot.c.ts,
+        )
+        .outerjoin(
+            last_snapshot,
+            and_(
+                last_snapshot.c.target_type == log.target_type,
+                last_snapshot.c.target_id == log.target_id,
+            ),
+        )
+        .where(
+            tuple_(log.target_type, log.target_id).in_(keys),
+            or_(last_snapshot.c.ts.is_(None), log.ts >= last_snapshot.c.ts),
+        )
+        .group_by(log.target_type, log.target_id, log.format, last_snapshot.c.ts)
+    )
+    states: dict[tuple[str, Any], _ChainState] = {}
+    for target_type, target_id, fmt, count, snapshot_ts in result.all():
+        state = states.setdefault((target_type, target_id), _ChainState())
+        state.has_rows = True
+        state.has_snapshot = snapshot_ts is not None
+        if fmt == "diff":
+            state.diffs_since_snapshot += count
+        elif fmt not in SNAPSHOT_FORMATS:
+            state.broken = True
+
+    # Only chains that can take another diff need their current state.
+    extendable = [
+        key
+        for key, state in states.items()
+        if state.has_snapshot
+        and not state.broken
+        and state.diffs_since_snapshot + 1 < interval
+    ]
+    if extendable:
+        await _load_last_states(db, extendable, states)
+    return states
+
+
+async def _load_last_states(
+    db: AsyncSession,
+    keys: Sequence[tuple[str, Any]],
+    states: dict[tuple[str, Any], _ChainState],
+) -> None:
+    """Replay each chain's latest snapshot and diffs into ``last_state``."""
+    log = models.AdminChangeLog
+    last_snapshot = _last_snapshot_subquery(keys)
+    result = await db.execute(
+        select(
+            log.target_type, log.target_id, log.format, log.after_json, log.patch_json
+        )
+        .join(
+            last_snapshot,
+            and_(
+                last_snapshot.c.target_type == log.target_type,
+                last_snapshot.c.target_id == log.target_id,
+            ),
+        )
+        .where(
+            tuple_(log.target_type, log.target_id).in_(keys),
+            log.ts >= last_snapshot.c.ts,
+        )
+        .order_by(log.ts)
+    )
+    replayed: dict[tuple[str, Any], Any] = {}
+    for target_type, target_id, fmt, after_json, patch_json in result.all():
+        key = (target_type, target_id)
+        if fmt in SNAPSHOT_FORMATS:
+            replayed[key] = after_json
+        elif key in replayed and replayed[key] is not _UNKNOWN:
+            try:
+                replayed[key] = apply_patch(replayed[key], patch_json or [])
+            except (IndexError, KeyError, TypeError, ValueError):
+                # A chain written before diffs followed it: start afresh.
+                replayed[key] = _UNKNOWN
+    for key, state in replayed.items():
+        states[key].last_state = state
+
+
+def _encode(entries: Sequence[AuditEntry]) -> list[tuple[AuditEntry, Any, Any]]:
+    return [
+        (
+            entry,
+            jsonable_encoder(entry.before) if entry.before is not None else None,
+            jsonable_encoder(entry.after) if entry.after is not None else None,
+        )
+        for entry in entries
+    ]
+
+
+async def persist_entries(
+    db: AsyncSession,
+    entries: Sequence[AuditEntry],
+    *,
+    snapshot_interval: int | None = None,
+    encoded: list[tuple[AuditEntry, Any, Any]] | None = None,
+) -> list[models.AdminChangeLog]:
+    """Write ``entries`` as snapshot/diff rows in one commit."""
+    if not entries:
+        return []
+    interval = max(1, snapshot_interval or settings.admin_audit_snapshot_interval)
+    encoded = encoded if encoded is not None else _encode(entries)
+    keys = list(
+        {(e.target_type, e.target_id) for e in entries if e.target_id is not None}
+    )
+    states = await _load_chain_states(db, keys, interval) if keys else {}
+
+    rows = []
+    for entry, before, after in encoded:
+        state = states.setdefault((entry.target_type, entry.target_id), _ChainState())
+        needs_snapshot = (
+            entry.target_id is None
+            or not state.has_snapshot
+            or state.broken
+            or state.diffs_since_snapshot + 1 >= interval
+            # A change the chain did not see happened in between
+            or state.last_state is _UNKNOWN
+            or state.last_state != before
+        )
+        row = models.AdminChangeLog(
+            ts=entry.ts,
+            target_type=entry.target_type,
+            target_id=entry.target_id,
+            action=entry.action,
+            admin_key_hash=entry.admin_key_hash,
+            ip_hash=entry.ip_hash,
+        )
+        if needs_snapshot:
+            row.format = "snapshot"
+            row.after_json = after
+            row.patch_json = None
+            # The very first row also keeps the original state.
+            row.before_json = None if state.has_rows else before
+            state.has_snapshot, state.broken = True, False
+            state.diffs_since_snapshot = 0
+        else:
+            row.format = "diff"
+            row.patch_json = make_patch(state.last_state, after)
+            state.diffs_since_snapshot += 1
+        state.last_state = after
+        state.has_rows = True
+        rows.append(row)
+
+    db.add_all(rows)
+    await db.commit()
+    return rows
+
+
+class AuditLogWriter:
+    """Buffer audit entries and insert them in batches from a background task."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        snapshot_interval: int = 20,
+        max_pending: int = 10_000,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.max_pending = max_pending
+        self.running = False
+        self.dropped = 0
+        self._pending: list[AuditEntry] = []
+        self._wakeup = asyncio.Event()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, entry: AuditEntry) -> None:
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            logger.warning("audit queue full, dropping %s change", entry.target_type)
+            return
+        self._pending.append(entry)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        written = 0
+        while self._pending:
+            batch = self._pending[: self.batch_size]
+            del self._pending[: len(batch)]
+            try:
+                encoded = await asyncio.to_thread(_encode, batch)
+                async with self.session_factory() as db:
+                    await persist_entries(
+                        db,
+                        batch,
+                        snapshot_interval=self.snapshot_interval,
+                        encoded=encoded,
+                    )
+            except asyncio.CancelledError:
+                self._pending[:0] = batch
+                raise
+            except Exception:
+                logger.exception("audit log flush failed")
+                BACKGROUND_JOB_COUNT.labels(
+                    job_type="admin_audit", status="error"
+                ).inc()
+                # Retry on the next flush unless the queue has filled up meanwhile.
+                if len(self._pending) + len(batch) <= self.max_pending:
+                    self._pending[:0] = batch
+                else:
+                    self.dropped += len(batch)
+                break
+            BACKGROUND_JOB_COUNT.labels(job_type="admin_audit", status="success").inc()
+            written += len(batch)
+        return written
+
+    async def run_forever(self, stop_event: asyncio.Event) -> None:
+        self.running = True
+        try:
+            while not stop_event.is_set():
+                self._wakeup.clear()
+                stop_wait = asyncio.ensure_future(stop_event.wait())
+                wake_wait = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    await asyncio.wait(
+                        {stop_wait, wake_wait},
+                        timeout=self.flush_interval,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                finally:
+                    stop_wait.cancel()
+                    wake_wait.cancel()
+                await self.flush()
+        finally:
+            self.running = False
+            await self.flush()
+
+
+_writer: AuditLogWriter | None = None
+
+
+def set_audit_writer(writer: AuditLogWriter | None) -> None:
+    """Route :func:`record_change` through ``writer`` (``None`` writes inline)."""
+    global _writer
+    _writer = writer
+
+
 async def record_change(
     db: AsyncSession,
     *,
@@ -38,21 +402,110 @@ async def record_change(
 ) -> None:
     """Persist admin change log without blocking primary flow."""
 
+    entry = AuditEntry(
+        target_type=target_type,
+        target_id=target_id,
+        action=action,
+        before=before,
+        after=after,
+        admin_key_hash=context.admin_key_hash if context else None,
+        ip_hash=context.ip_hash if context else None,
+    )
+    if _writer is not None and _writer.running:
+        _writer.enqueue(entry)
+        return
     try:
-        log = models.AdminChangeLog(
-            target_type=target_type,
-            target_id=target_id,
-            action=action,
-            before_json=jsonable_encoder(before) if before is not None else None,
-            after_json=jsonable_encoder(after) if after is not None else None,
-            admin_key_hash=context.admin_key_hash if context else None,
-            ip_hash=context.ip_hash if context else None,
-        )
-        db.add(log)
-        await db.commit()
+        await persist_entries(db, [entry])
     except Exception:
         # Never block on audit logging
-        pass
+        logger.warning("audit log write failed", exc_info=True)
+        try:
+            await db.rollback()
+        except Exception:  # pragma: no cover - defensive
+            pass
+
+
+async def reconstruct_state(
+    db: AsyncSession,
+    *,
+    target_type: str,
+    target_id: Any,
+    at: datetime | None = None,
+) -> dict[str, Any] | None:
+    """Rebuild the audited state of a target as of ``at`` (default: now).
+
+    Returns ``None`` when nothing was recorded for the target by then.
+    """
+    log = models.AdminChangeLog
+    at = at or now_utc()
+    target = (log.target_type == target_type, log.target_id == target_id)
+
+    snapshot = (
+        await db.execute(
+            select(log)
+            .where(*target, log.format.in_(SNAPSHOT_FORMATS), log.ts <= at)
+            .order_by(log.ts.desc())
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+
+    if snapshot is None:
+        # Before the first snapshot only its recorded original state is known.
+        first = (
+            await db.execute(
+                select(log)
+                .where(*target, log.format.in_(SNAPSHOT_FORMATS))
+                .order_by(log.ts)
+                .limit(1)
+            )
+        ).scalar_one_or_none()
+        if first is None or first.before_json is None:
+            return None
+        return {
+            "state": first.before_json,
+            "as_of": None,
+            "snapshot_id": None,
+            "diffs_applied": 0,
+        }
+
+    diffs = (
+        (
+            await db.execute(
+                select(log)
+                .where(
+                    *target,
+                    log.format == "diff",
+                    log.ts > snapshot.ts,
+                    log.ts <= at,
+                )
+                .order_by(log.ts)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    state = snapshot.after_json
+    as_of = snapshot.ts
+    for diff in diffs:
+        state = apply_patch(state, diff.patch_json or [])
+        as_of = diff.ts
+    return {
+        "state": state,
+        "as_of": as_of,
+        "snapshot_id": snapshot.id,
+        "diffs_applied": len(diffs),
+    }
 
 
-__all__ = ["AdminAuditContext", "build_admin_audit_context", "record_change"]
+__all__ = [
+    "AdminAuditContext",
+    "AuditEntry",
+    "AuditLogWriter",
+    "build_admin_audit_context",
+    "build_change_log",
+    "diff_fields",
+    "persist_entries",
+    "reconstruct_state",
+    "record_change",
+    "set_audit_writer",
+]
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 import logging
-from typing import Any
+from typing import Any, Sequence
+from uuid import UUID
 
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from .... import models
 from ....meili import index_profile
-from ....utils.datetime import now_jst
+from ....services.image_variants import with_image_variants
+from ....services.search_freshness import (
+    apply_staff_availability,
+    derive_profile_availability,
+)
 from ....utils.profiles import build_profile_doc
 
 logger = logging.getLogger("app.admin.profile_indexing")
@@ -40,28 +45,68 @@ async def build_profile_document(
     except Exception:  # pragma: no cover - defensive
         pass
 
-    today = now_jst().date()
-    res_today = await db.execute(
-        select(func.count())
-        .select_from(models.Availability)
-        .where(
-            models.Availability.profile_id == profile.id,
-            models.Availability.date == today,
-        )
-    )
-    count_today = res_today.scalar_one()
-    has_today = (count_today or 0) > 0
+    availability = (await derive_profile_availability(db, [profile]))[profile.id]
     res_out = await db.execute(
         select(models.Outlink).where(models.Outlink.profile_id == profile.id)
     )
     outlinks = list(res_out.scalars().all())
-    return build_profile_doc(
+    doc = build_profile_doc(
         profile,
-        today=has_today,
+        today=availability.today,
         tag_score=0.0,
         ctr7d=0.0,
         outlinks=outlinks,
     )
+    apply_staff_availability(doc["staff_preview"], availability)
+    await with_image_variants(db, [doc])
+    return doc
+
+
+async def build_profile_documents(
+    *, db: AsyncSession, profile_ids: Sequence[UUID]
+) -> list[dict[str, Any]]:
+    """Build search documents for many profiles with a fixed number of queries."""
+    if not profile_ids:
+        return []
+    result = await db.execute(
+        select(models.Profile)
+        .where(models.Profile.id.in_(list(profile_ids)))
+        .options(
+            selectinload(models.Profile.therapists),
+            selectinload(models.Profile.reviews),
+        )
+    )
+    profiles = list(result.scalars().all())
+    if not profiles:
+        return []
+
+    availability = await derive_profile_availability(db, profiles)
+    res_out = await db.execute(
+        select(models.Outlink).where(
+            models.Outlink.profile_id.in_([p.id for p in profiles])
+        )
+    )
+    outlinks_by_profile: dict[UUID, list[models.Outlink]] = {}
+    for outlink in res_out.scalars().all():
+        outlinks_by_profile.setdefault(outlink.profile_id, []).append(outlink)
+
+    docs = []
+    for profile in profiles:
+        profile_availability = availability[profile.id]
+        doc = build_profile_doc(
+            profile,
+            today=profile_availability.today,
+            tag_score=0.0,
+            ctr7d=0.0,
+            outlinks=outlinks_by_profile.get(profile.id, []),
+        )
+        apply_staff_availability(doc["staff_preview"], profile_availability)
+        docs.append(doc)
+    return await with_image_variants(db, docs)
 
 
-__all__ = ["reindex_profile_contact", "build_profile_document"]
+__all__ = [
+    "reindex_profile_contact",
+    "build_profile_document",
+    "build_profile_documents",
+]
@@ -3,7 +3,7 @@ from __future__ import annotations
 import logging
 from datetime import date, datetime, timezone
 from http import HTTPStatus
-from typing import Any, List, Optional
+from typing import Any, AsyncIterable, List, Optional
 from uuid import UUID
 
 from sqlalchemy import func, select
@@ -32,6 +32,7 @@ from ....schemas import (
     ShopAdminDetail,
     ShopAdminList,
     ShopAdminSummary,
+    ShopContentStreamResponse,
     StaffSummary,
 )
 from ....utils.datetime import (
@@ -58,6 +59,11 @@ from .profile_availability import (
     upsert_bulk_availability,
 )
 from .profile_indexing import build_profile_document, reindex_profile_contact
+from .shop_ingest import (
+    DEFAULT_BATCH_SIZE as DEFAULT_INGEST_BATCH_SIZE,
+    apply_shop_content_fields,
+    ingest_shop_content_stream as _ingest_shop_content_stream,
+)
 
 logger = logging.getLogger("app.admin.profile_service")
 
@@ -341,42 +347,7 @@ async def bulk_ingest_shop_content(
 
         summary = BulkShopIngestResult(shop_id=entry.shop_id)
         before_detail = await get_shop_detail(db=db, shop_id=entry.shop_id)
-        contact_json = dict(profile.contact_json or {})
-
-        if entry.contact is not None:
-            contact_json["phone"] = entry.contact.phone
-            if entry.contact.phone:
-                contact_json["tel"] = entry.contact.phone
-            contact_json["line_id"] = entry.contact.line_id
-            contact_json["line"] = entry.contact.line_id
-            contact_json["website_url"] = entry.contact.website_url
-            contact_json["web"] = entry.contact.website_url
-            contact_json["reservation_form_url"] = entry.contact.reservation_form_url
-            contact_json["sns"] = entry.contact.sns or []
-
-        if entry.description is not None:
-            contact_json["description"] = entry.description
-        if entry.catch_copy is not None:
-            contact_json["catch_copy"] = entry.catch_copy
-        if entry.address is not None:
-            contact_json["address"] = entry.address
-
-        if entry.service_tags is not None:
-            contact_json["service_tags"] = entry.service_tags
-            profile.body_tags = entry.service_tags
-
-        if entry.photos is not None:
-            profile.photos = entry.photos
-            summary.photos_updated = True
-
-        if entry.menus is not None:
-            contact_json["menus"] = [
-                site_bridge.serialize_bulk_menu(menu, profile.id)
-                for menu in entry.menus
-            ]
-            summary.menus_updated = True
-
-        profile.contact_json = contact_json
+        apply_shop_content_fields(profile, entry, summary)
 
         if entry.reviews:
             await _upsert_reviews(
@@ -422,6 +393,22 @@ async def bulk_ingest_shop_content(
     return BulkShopContentResponse(processed=processed, errors=errors)
 
 
+async def ingest_shop_content_stream(
+    *,
+    audit_context: AdminAuditContext | None,
+    db: AsyncSession,
+    chunks: AsyncIterable[bytes],
+    batch_size: int = DEFAULT_INGEST_BATCH_SIZE,
+) -> ShopContentStreamResponse:
+    return await _ingest_shop_content_stream(
+        audit_context=audit_context,
+        db=db,
+        chunks=chunks,
+        batch_size=batch_size,
+        index_callable=index_bulk,
+    )
+
+
 async def upsert_availability(
     *,
     audit_context: AdminAuditContext | None,
@@ -0,0 +1,497 @@
+"""Streaming NDJSON ingestion of shop content.
+
+Each line is one ``BulkShopContentItem``.  Lines are grouped into batches:
+the target profiles of a batch are loaded with one query, reviews and
+diaries are written with ``INSERT ... ON CONFLICT`` on their
+``(profile_id, external_id)`` constraints, availability rows are matched
+with one lookup, and the batch is committed together with compact audit
+diffs and the rebuilt KPI rollup buckets of its reviews.  Every touched profile is reindexed with a single Meilisearch
+request once the stream is exhausted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import date, timezone
+from typing import Any, AsyncIterable, AsyncIterator, Callable, List, Sequence
+from uuid import UUID
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .... import models
+from ....meili import index_bulk
+from ....models.base import now_utc
+from ....schemas import (
+    BulkShopContentItem,
+    BulkShopIngestResult,
+    ShopContentStreamError,
+    ShopContentStreamResponse,
+    ShopContentStreamStats,
+)
+from ....services.kpi_rollups import jst_day, refresh_shop_buckets
+from ....utils.datetime import now_jst
+from ....utils.profiles import normalize_review_aspects
+from . import site_bridge
+from .audit import AdminAuditContext, build_change_log, diff_fields
+from .profile_availability import slots_to_json
+from .profile_indexing import build_profile_documents
+
+logger = logging.getLogger("app.admin.shop_ingest")
+
+DEFAULT_BATCH_SIZE = 200
+# Keeps a multi-row VALUES clause well below the asyncpg bind-parameter limit.
+UPSERT_CHUNK_SIZE = 500
+
+_REVIEW_UPDATE_COLUMNS = (
+    "score",
+    "title",
+    "body",
+    "author_alias",
+    "visited_at",
+    "status",
+    "aspect_scores",
+    "updated_at",
+)
+_DIARY_UPDATE_COLUMNS = ("title", "text", "photos", "hashtags", "status")
+
+
+def apply_shop_content_fields(
+    profile: models.Profile,
+    entry: BulkShopContentItem,
+    summary: BulkShopIngestResult,
+) -> None:
+    """Copy the scalar/JSON content of ``entry`` onto ``profile``."""
+    contact_json = dict(profile.contact_json or {})
+
+    if entry.contact is not None:
+        contact_json["phone"] = entry.contact.phone
+        if entry.contact.phone:
+            contact_json["tel"] = entry.contact.phone
+        contact_json["line_id"] = entry.contact.line_id
+        contact_json["line"] = entry.contact.line_id
+        contact_json["website_url"] = entry.contact.website_url
+        contact_json["web"] = entry.contact.website_url
+        contact_json["reservation_form_url"] = entry.contact.reservation_form_url
+        contact_json["sns"] = entry.contact.sns or []
+
+    if entry.description is not None:
+        contact_json["description"] = entry.description
+    if entry.catch_copy is not None:
+        contact_json["catch_copy"] = entry.catch_copy
+    if entry.address is not None:
+        contact_json["address"] = entry.address
+
+    if entry.service_tags is not None:
+        contact_json["service_tags"] = entry.service_tags
+        profile.body_tags = entry.service_tags
+
+    if entry.photos is not None:
+        profile.photos = entry.photos
+        summary.photos_updated = True
+
+    if entry.menus is not None:
+        contact_json["menus"] = [
+            site_bridge.serialize_bulk_menu(menu, profile.id) for menu in entry.menus
+        ]
+        summary.menus_updated = True
+
+    profile.contact_json = contact_json
+
+
+def _content_snapshot(profile: models.Profile) -> dict[str, Any]:
+    snapshot = {
+        f"contact_json.{key}": value
+        for key, value in (profile.contact_json or {}).items()
+    }
+    snapshot["body_tags"] = list(profile.body_tags or [])
+    snapshot["photos"] = list(profile.photos or [])
+    return snapshot
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[tuple[int, bytes]]:
+    """Split a byte stream into ``(line_number, line)`` pairs, skipping blanks."""
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, line
+    if buffer.strip():
+        yield line_no + 1, buffer
+
+
+def _parse_line(
+    line_no: int, line: bytes
+) -> BulkShopContentItem | ShopContentStreamError:
+    try:
+        raw = json.loads(line)
+    except ValueError as exc:
+        return ShopContentStreamError(line=line_no, error=f"invalid_json: {exc}")
+    try:
+        return BulkShopContentItem.model_validate(raw)
+    except ValidationError as exc:
+        shop_id = raw.get("shop_id") if isinstance(raw, dict) else None
+        details = "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+            for err in exc.errors()
+        )
+        return ShopContentStreamError(
+            line=line_no,
+            shop_id=str(shop_id) if shop_id is not None else None,
+            error=f"invalid_row: {details}",
+        )
+
+
+async def _upsert_rows(
+    db: AsyncSession,
+    model: type[models.Base],
+    *,
+    constraint: str,
+    rows: Sequence[dict[str, Any]],
+    update_columns: Sequence[str],
+    returning: Sequence[Any] = (),
+) -> list[Any]:
+    """Upsert ``rows`` in chunks; returns the ``returning`` columns of every row."""
+    returned: list[Any] = []
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(model).values(list(rows[start : start + UPSERT_CHUNK_SIZE]))
+        stmt = stmt.on_conflict_do_update(
+            constraint=constraint,
+            set_={column: stmt.excluded[column] for column in update_columns},
+        )
+        if returning:
+            returned.extend((await db.execute(stmt.returning(*returning))).all())
+        else:
+            await db.execute(stmt)
+    return returned
+
+
+def _dedupe(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Keep the last row per external id.
+
+    ``ON CONFLICT DO UPDATE`` refuses to touch the same row twice in one
+    statement; rows without an external id never conflict.
+    """
+    keyed: dict[Any, dict[str, Any]] = {}
+    for row in rows:
+        key = (
+            (row["profile_id"], row["external_id"]) if row["external_id"] else object()
+        )
+        keyed.pop(key, None)
+        keyed[key] = row
+    return list(keyed.values())
+
+
+async def _upsert_reviews(
+    db: AsyncSession, items: list[tuple[UUID, BulkShopContentItem]]
+) -> tuple[int, set[tuple[UUID, date]]]:
+    """Upsert the batch's reviews; returns the count and the touched KPI buckets.
+
+    Updated rows keep their original ``created_at``, so the buckets are taken
+    from the stored rows rather than from the batch.
+    """
+    now = now_utc()
+    rows = _dedupe(
+        [
+            {
+                "id": uuid.uuid4(),
+                "profile_id": profile_id,
+                "external_id": review.external_id,
+                "score": review.score,
+                "title": review.title,
+                "body": review.body,
+                "author_alias": review.author_alias,
+                "visited_at": review.visited_at,
+                "status": review.status,
+                "aspect_scores": normalize_review_aspects(review.aspects or {}),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for profile_id, entry in items
+            for review in entry.reviews or []
+        ]
+    )
+    stored = await _upsert_rows(
+        db,
+        models.Review,
+        constraint="uq_reviews_profile_external",
+        rows=rows,
+        update_columns=_REVIEW_UPDATE_COLUMNS,
+        returning=(models.Review.profile_id, models.Review.created_at),
+    )
+    buckets = {(profile_id, jst_day(created_at)) for profile_id, created_at in stored}
+    return len(rows), buckets
+
+
+async def _upsert_diaries(
+    db: AsyncSession, items: list[tuple[UUID, BulkShopContentItem]]
+) -> int:
+    now = now_utc()
+    dated: list[dict[str, Any]] = []
+    undated: list[dict[str, Any]] = []
+    for profile_id, entry in items:
+        for diary in entry.diaries or []:
+            row = {
+                "id": uuid.uuid4(),
+                "profile_id": profile_id,
+                "external_id": diary.external_id,
+                "title": diary.title,
+                "text": diary.body,
+                "photos": diary.photos or [],
+                "hashtags": diary.hashtags or [],
+                "status": diary.status,
+                "created_at": now,
+            }
+            if diary.created_at:
+                created_at = diary.created_at
+                if created_at.tzinfo is None:
+                    created_at = created_at.replace(tzinfo=timezone.utc)
+                row["created_at"] = created_at
+                dated.append(row)
+            else:
+                undated.append(row)
+
+    # Only an explicit created_at may overwrite the stored one.
+    dated = _dedupe(dated)
+    undated = _dedupe(undated)
+    await _upsert_rows(
+        db,
+        models.Diary,
+        constraint="uq_diaries_profile_external",
+        rows=dated,
+        update_columns=(*_DIARY_UPDATE_COLUMNS, "created_at"),
+    )
+    await _upsert_rows(
+        db,
+        models.Diary,
+        constraint="uq_diaries_profile_external",
+        rows=undated,
+        update_columns=_DIARY_UPDATE_COLUMNS,
+    )
+    return len(dated) + len(undated)
+
+
+async def _upsert_availability(
+    db: AsyncSession, items: list[tuple[UUID, BulkShopContentItem]]
+) -> int:
+    wanted = {
+        (profile_id, day.date): slots_to_json(day.slots)
+        for profile_id, entry in items
+        for day in entry.availability or []
+    }
+    if not wanted:
+        return 0
+    result = await db.execute(
+        select(models.Availability).where(
+            models.Availability.profile_id.in_({pid for pid, _ in wanted}),
+            models.Availability.date.in_({day for _, day in wanted}),
+        )
+    )
+    existing = {(row.profile_id, row.date): row for row in result.scalars().all()}
+    today = now_jst().date()
+    for (profile_id, day), slots_json in wanted.items():
+        row = existing.get((profile_id, day))
+        if row is None:
+            db.add(
+                models.Availability(
+                    profile_id=profile_id,
+                    date=day,
+                    slots_json=slots_json,
+                    is_today=day == today,
+                )
+            )
+        else:
+            row.slots_json = slots_json
+            row.is_today = day == today
+    return len(wanted)
+
+
+async def _apply_batch(
+    db: AsyncSession,
+    batch: list[tuple[int, BulkShopContentItem]],
+    *,
+    audit_context: AdminAuditContext | None,
+    stats: ShopContentStreamStats,
+    errors: List[ShopContentStreamError],
+) -> set[UUID]:
+    shop_ids = {entry.shop_id for _, entry in batch}
+    result = await db.execute(
+        select(models.Profile).where(models.Profile.id.in_(shop_ids))
+    )
+    profiles = {profile.id: profile for profile in result.scalars().all()}
+
+    applied: list[tuple[UUID, BulkShopContentItem]] = []
+    missing: list[ShopContentStreamError] = []
+    logs = []
+    for line_no, entry in batch:
+        profile = profiles.get(entry.shop_id)
+        if profile is None:
+            missing.append(
+                ShopContentStreamError(
+                    line=line_no, shop_id=str(entry.shop_id), error="shop_not_found"
+                )
+            )
+            continue
+        before = _content_snapshot(profile)
+        summary = BulkShopIngestResult(shop_id=profile.id)
+        apply_shop_content_fields(profile, entry, summary)
+        before_diff, after_diff = diff_fields(before, _content_snapshot(profile))
+        after_diff["counts"] = {
+            "reviews": len(entry.reviews or []),
+            "diaries": len(entry.diaries or []),
+            "availability": len(entry.availability or []),
+        }
+        logs.append(
+            build_change_log(
+                context=audit_context,
+                target_type="shop",
+                target_id=profile.id,
+                action="bulk_ingest",
+                before=before_diff,
+                after=after_diff,
+            )
+        )
+        applied.append((profile.id, entry))
+
+    reviews, review_buckets = await _upsert_reviews(db, applied)
+    diaries = await _upsert_diaries(db, applied)
+    availability = await _upsert_availability(db, applied)
+    # Core upserts never reach the rollup change tracking; rebuild the
+    # touched review buckets in the same transaction.
+    await refresh_shop_buckets(db, review_buckets)
+    for log in logs:
+        db.add(log)
+    await db.commit()
+
+    errors.extend(missing)
+    stats.processed += len(applied)
+    stats.failed += len(missing)
+    stats.reviews_upserted += reviews
+    stats.diaries_upserted += diaries
+    stats.availability_upserts += availability
+    return {profile_id for profile_id, _ in applied}
+
+
+async def _apply_batch_isolating_errors(
+    db: AsyncSession,
+    batch: list[tuple[int, BulkShopContentItem]],
+    *,
+    audit_context: AdminAuditContext | None,
+    stats: ShopContentStreamStats,
+    errors: List[ShopContentStreamError],
+) -> set[UUID]:
+    """Apply ``batch``; when it fails, retry row by row to pin down the culprit."""
+    stats.batches += 1
+    try:
+        return await _apply_batch(
+            db, batch, audit_context=audit_context, stats=stats, errors=errors
+        )
+    except Exception as exc:
+        await db.rollback()
+        if len(batch) == 1:
+            line_no, entry = batch[0]
+            errors.append(
+                ShopContentStreamError(
+                    line=line_no, shop_id=str(entry.shop_id), error=str(exc)
+                )
+            )
+            stats.failed += 1
+            return set()
+        logger.warning("bulk ingest batch failed, retrying rows one by one: %s", exc)
+
+    touched: set[UUID] = set()
+    for row in batch:
+        touched |= await _apply_batch_isolating_errors(
+            db, [row], audit_context=audit_context, stats=stats, errors=errors
+        )
+    return touched
+
+
+async def ingest_shop_content_stream(
+    *,
+    audit_context: AdminAuditContext | None,
+    db: AsyncSession,
+    chunks: AsyncIterable[bytes],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    index_callable: Callable[[list[dict[str, Any]]], None] = index_bulk,
+) -> ShopContentStreamResponse:
+    """Ingest an NDJSON stream of shop content and reindex touched shops once."""
+    started = time.perf_counter()
+    stats = ShopContentStreamStats()
+    errors: List[ShopContentStreamError] = []
+    touched: set[UUID] = set()
+    batch: list[tuple[int, BulkShopContentItem]] = []
+
+    async def flush() -> None:
+        if batch:
+            touched.update(
+                await _apply_batch_isolating_errors(
+                    db,
+                    list(batch),
+                    audit_context=audit_context,
+                    stats=stats,
+                    errors=errors,
+                )
+            )
+            batch.clear()
+
+    async for line_no, line in iter_ndjson_lines(chunks):
+        stats.rows += 1
+        parsed = _parse_line(line_no, line)
+        if isinstance(parsed, ShopContentStreamError):
+            errors.append(parsed)
+            stats.failed += 1
+            continue
+        batch.append((line_no, parsed))
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+
+    if touched:
+        ordered = sorted(touched, key=str)
+        docs: list[dict[str, Any]] = []
+        for start in range(0, len(ordered), batch_size):
+            docs.extend(
+                await build_profile_documents(
+                    db=db, profile_ids=ordered[start : start + batch_size]
+                )
+            )
+        try:
+            await asyncio.to_thread(index_callable, docs)
+            stats.indexed = len(docs)
+        except Exception as exc:
+            logger.exception("bulk ingest reindex failed")
+            errors.append(
+                ShopContentStreamError(line=0, error=f"meili_unavailable: {exc}")
+            )
+
+    stats.elapsed_seconds = round(time.perf_counter() - started, 3)
+    if stats.elapsed_seconds > 0:
+        stats.rows_per_second = round(stats.rows / stats.elapsed_seconds, 1)
+    logger.info(
+        "bulk ingest finished: rows=%s processed=%s failed=%s %.1f rows/s",
+        stats.rows,
+        stats.processed,
+        stats.failed,
+        stats.rows_per_second,
+    )
+    return ShopContentStreamResponse(stats=stats, errors=errors)
+
+
+__all__ = [
+    "apply_shop_content_fields",
+    "ingest_shop_content_stream",
+    "iter_ndjson_lines",
+]
@@ -2,114 +2,172 @@
 
 This module provides background tasks for computing therapist photo embeddings.
 It can be run periodically to ensure all therapists have up-to-date embeddings.
+
+``compute_all_missing_embeddings`` is a producer/consumer pipeline: one
+producer pages through therapists whose embedding is missing or older than
+their last update (keyset on id), consumers embed each page's uncached photos
+in a process pool and store it with one bulk UPDATE.  With a checkpoint file the job records the
+last id below which every page is stored, so an interrupted run resumes there.
 """
 
 import asyncio
+import json
 import logging
-from typing import Optional
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, UTC, timedelta
+from pathlib import Path
+from typing import Any, Callable, Optional
 from uuid import UUID
-from datetime import datetime, UTC
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...settings import get_settings
+from ...db import SessionLocal
 from ...models import Therapist
-from ..site.services.photo_embedding_service import PhotoEmbeddingService
+from ..site.services.photo_embedding_service import (
+    PhotoEmbeddingService,
+    prepare_embedding_updates,
+    stale_photos_query,
+    write_embeddings,
+)
 
 logger = logging.getLogger(__name__)
-settings = get_settings()
+
+# Pages waiting for a consumer; bounds memory when the pool falls behind
+DEFAULT_QUEUE_SIZE = 4
+
+
+def default_workers() -> int:
+    return min(4, os.cpu_count() or 1)
+
+
+@dataclass
+class EmbeddingCheckpoint:
+    """Progress of a batch run; every therapist id <= ``after_id`` is done."""
+
+    after_id: Optional[str] = None
+    processed: int = 0
+    success: int = 0
+    failed: int = 0
+
+    @classmethod
+    def load(cls, path: Optional[Path]) -> "EmbeddingCheckpoint":
+        if path is None or not path.exists():
+            return cls()
+        return cls(**json.loads(path.read_text()))
+
+    def save(self, path: Optional[Path]) -> None:
+        if path is None:
+            return
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(asdict(self)))
+        tmp.replace(path)
+
+
+class _Watermark:
+    """Advance the checkpoint only over pages that are stored in order."""
+
+    def __init__(self, checkpoint: EmbeddingCheckpoint) -> None:
+        self.checkpoint = checkpoint
+        self._next = 0
+        self._done: dict[int, tuple[str, int, int]] = {}
+
+    def complete(self, seq: int, last_id: str, success: int, failed: int) -> bool:
+        self._done[seq] = (last_id, success, failed)
+        advanced = False
+        while self._next in self._done:
+            last_id, success, failed = self._done.pop(self._next)
+            self.checkpoint.after_id = last_id
+            self.checkpoint.processed += success + failed
+            self.checkpoint.success += success
+            self.checkpoint.failed += failed
+            self._next += 1
+            advanced = True
+        return advanced
 
 
 class PhotoEmbeddingTask:
     """Task for computing photo embeddings in batches."""
 
-    def __init__(self):
-        self.engine = create_async_engine(settings.DATABASE_URL, echo=False)
-        self.async_session = sessionmaker(
-            self.engine, class_=AsyncSession, expire_on_commit=False
-        )
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,
+        *,
+        workers: Optional[int] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ):
+        self.async_session = session_factory
+        # 0 computes in the event loop's thread (no worker processes)
+        self.workers = default_workers() if workers is None else workers
+        self.queue_size = queue_size
 
     async def compute_all_missing_embeddings(
         self,
         batch_size: int = 50,
-        max_total: Optional[int] = None
+        max_total: Optional[int] = None,
+        *,
+        checkpoint_path: Optional[Path] = None,
     ) -> dict:
-        """Compute embeddings for all therapists without embeddings.
+        """Compute embeddings for all therapists with missing or stale embeddings.
 
         Args:
-            batch_size: Number of therapists to process in each batch
+            batch_size: Number of therapists per page (one bulk UPDATE each)
             max_total: Maximum total number to process (None = unlimited)
+            checkpoint_path: File to resume from and record progress in; it is
+                removed once every stale therapist has been processed
 
         Returns:
             Dictionary with statistics about the process
         """
-        stats = {
+        checkpoint = EmbeddingCheckpoint.load(checkpoint_path)
+        stats: dict[str, Any] = {
             "started_at": datetime.now(UTC),
+            "resumed_after": checkpoint.after_id,
             "total_processed": 0,
             "total_success": 0,
             "total_failed": 0,
             "batches_processed": 0,
-            "errors": []
+            "errors": [],
         }
+        watermark = _Watermark(checkpoint)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 0 else None
+        consumers = [
+            asyncio.create_task(
+                self._consume(queue, executor, watermark, stats, checkpoint_path)
+            )
+            for _ in range(max(1, self.workers))
+        ]
+        producer = asyncio.create_task(
+            self._produce(
+                queue, checkpoint.after_id, batch_size, max_total, len(consumers)
+            )
+        )
+        tasks = [producer, *consumers]
+        exhausted = False
 
         try:
-            async with self.async_session() as session:
-                service = PhotoEmbeddingService(session)
-
-                processed = 0
-                while True:
-                    # Check if we've hit the max limit
-                    if max_total and processed >= max_total:
-                        break
-
-                    # Process next batch
-                    current_batch_size = batch_size
-                    if max_total:
-                        remaining = max_total - processed
-                        current_batch_size = min(batch_size, remaining)
-
-                    logger.info(f"Processing batch {stats['batches_processed'] + 1}, size: {current_batch_size}")
-
-                    # Compute embeddings for this batch
-                    results = await service.compute_embeddings_batch(
-                        therapist_ids=None,  # Process those without embeddings
-                        limit=current_batch_size
-                    )
-
-                    # If no results, we're done
-                    if not results:
-                        logger.info("No more therapists to process")
-                        break
-
-                    # Update statistics
-                    stats["batches_processed"] += 1
-                    for therapist_id, success in results.items():
-                        stats["total_processed"] += 1
-                        processed += 1
-                        if success:
-                            stats["total_success"] += 1
-                        else:
-                            stats["total_failed"] += 1
-                            stats["errors"].append({
-                                "therapist_id": therapist_id,
-                                "batch": stats["batches_processed"]
-                            })
-
-                    # Log progress
-                    logger.info(
-                        f"Batch {stats['batches_processed']} complete: "
-                        f"{len(results)} processed, "
-                        f"{sum(1 for s in results.values() if s)} succeeded"
-                    )
-
-                    # Small delay between batches
-                    await asyncio.sleep(1)
+            # Returns once everything finished, or as soon as one side failed
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            exhausted = producer.result()
+            if exhausted and checkpoint_path is not None:
+                checkpoint_path.unlink(missing_ok=True)
 
         except Exception as e:
             logger.error(f"Error in embedding computation task: {e}")
             stats["error"] = str(e)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
         finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            stats["checkpoint"] = None if exhausted else checkpoint.after_id
             stats["completed_at"] = datetime.now(UTC)
             stats["duration_seconds"] = (
                 stats["completed_at"] - stats["started_at"]
@@ -124,10 +182,89 @@ class PhotoEmbeddingTask:
 
         return stats
 
-    async def update_specific_therapists(
+    async def _produce(
         self,
-        therapist_ids: list[str],
-        force: bool = False
+        queue: asyncio.Queue,
+        after_id: Optional[str],
+        batch_size: int,
+        max_total: Optional[int],
+        consumers: int,
+    ) -> bool:
+        """Queue pages of stale therapists; True once none are left."""
+        exhausted = await self._queue_pages(queue, after_id, batch_size, max_total)
+        for _ in range(consumers):
+            await queue.put(None)
+        return exhausted
+
+    async def _queue_pages(
+        self,
+        queue: asyncio.Queue,
+        after_id: Optional[str],
+        batch_size: int,
+        max_total: Optional[int],
+    ) -> bool:
+        cursor = UUID(after_id) if after_id else None
+        queued = 0
+        seq = 0
+        async with self.async_session() as session:
+            while True:
+                limit = batch_size
+                if max_total:
+                    if queued >= max_total:
+                        return False
+                    limit = min(batch_size, max_total - queued)
+
+                rows = (await session.execute(stale_photos_query(cursor, limit))).all()
+                # Release the snapshot so the next page sees committed pages
+                await session.rollback()
+                if not rows:
+                    logger.info("No more therapists to process")
+                    return True
+
+                await queue.put((seq, rows))
+                seq += 1
+                queued += len(rows)
+                cursor = rows[-1].id
+
+    async def _consume(
+        self,
+        queue: asyncio.Queue,
+        executor: Optional[Executor],
+        watermark: _Watermark,
+        stats: dict[str, Any],
+        checkpoint_path: Optional[Path],
+    ) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            seq, rows = item
+
+            async with self.async_session() as session:
+                updates, failed = await prepare_embedding_updates(
+                    session, rows, executor=executor
+                )
+                await write_embeddings(session, updates)
+                await session.commit()
+
+            stats["batches_processed"] += 1
+            stats["total_processed"] += len(rows)
+            stats["total_success"] += len(updates)
+            stats["total_failed"] += len(failed)
+            stats["errors"].extend(
+                {"therapist_id": therapist_id, "batch": seq + 1}
+                for therapist_id in failed
+            )
+            logger.info(
+                f"Batch {seq + 1} complete: "
+                f"{len(rows)} processed, {len(updates)} succeeded"
+            )
+
+            if watermark.complete(seq, str(rows[-1].id), len(updates), len(failed)):
+                watermark.checkpoint.save(checkpoint_path)
+
+    async def update_specific_therapists(
+        self, therapist_ids: list[str], force: bool = False
     ) -> dict:
         """Update embeddings for specific therapists.
 
@@ -144,28 +281,30 @@ class PhotoEmbeddingTask:
             async with self.async_session() as session:
                 service = PhotoEmbeddingService(session)
 
-                for therapist_id in therapist_ids:
-                    try:
-                        # Check if update needed
-                        if not force:
-                            needs_update = await service.needs_recomputation(therapist_id)
-                            if not needs_update:
-                                logger.info(f"Therapist {therapist_id} does not need update")
-                                results[therapist_id] = {"success": True, "skipped": True}
-                                continue
-
-                        # Compute embedding
-                        success = await service.compute_therapist_embedding(therapist_id)
-                        results[therapist_id] = {"success": success}
-
-                        if success:
-                            logger.info(f"Successfully updated embedding for therapist {therapist_id}")
-                        else:
-                            logger.warning(f"Failed to update embedding for therapist {therapist_id}")
-
-                    except Exception as e:
-                        logger.error(f"Error updating therapist {therapist_id}: {e}")
-                        results[therapist_id] = {"success": False, "error": str(e)}
+                pending = list(therapist_ids)
+                if not force:
+                    needs_update = await service.needs_recomputation_batch(pending)
+                    for therapist_id, needed in needs_update.items():
+                        if not needed:
+                            logger.info(
+                                f"Therapist {therapist_id} does not need update"
+                            )
+                            results[therapist_id] = {"success": True, "skipped": True}
+                    pending = [tid for tid in pending if needs_update.get(tid)]
+
+                computed = await service.compute_embeddings_batch(
+                    pending, limit=max(1, len(pending)), published_only=False
+                )
+                for therapist_id, success in computed.items():
+                    results[therapist_id] = {"success": success}
+                    if success:
+                        logger.info(
+                            f"Successfully updated embedding for therapist {therapist_id}"
+                        )
+                    else:
+                        logger.warning(
+                            f"Failed to update embedding for therapist {therapist_id}"
+                        )
 
         except Exception as e:
             logger.error(f"Error in update task: {e}")
@@ -173,10 +312,7 @@ class PhotoEmbeddingTask:
 
         return results
 
-    async def cleanup_stale_embeddings(
-        self,
-        days_old: int = 30
-    ) -> dict:
+    async def cleanup_stale_embeddings(self, days_old: int = 30) -> dict:
         """Remove embeddings older than specified days.
 
         This can be useful if the embedding model changes and old
@@ -188,56 +324,45 @@ class PhotoEmbeddingTask:
         Returns:
             Dictionary with cleanup statistics
         """
-        from datetime import timedelta
-
-        stats = {
-            "cleaned": 0,
-            "errors": 0
-        }
+        stats = {"cleaned": 0, "errors": 0}
 
         try:
             async with self.async_session() as session:
                 cutoff_date = datetime.now(UTC) - timedelta(days=days_old)
-
-                # Find therapists with old embeddings
                 result = await session.execute(
-                    select(Therapist).where(
+                    update(Therapist)
+                    .where(
                         Therapist.photo_embedding != None,
-                        Therapist.photo_embedding_computed_at < cutoff_date
+                        Therapist.photo_embedding_computed_at < cutoff_date,
                     )
+                    .values(
+                        photo_embedding=None,
+                        photo_embedding_computed_at=None,
+                        updated_at=Therapist.updated_at,
+                    )
+                    .execution_options(synchronize_session=False)
                 )
-                therapists = result.scalars().all()
-
-                logger.info(f"Found {len(therapists)} therapists with stale embeddings")
-
-                # Clear their embeddings
-                for therapist in therapists:
-                    try:
-                        therapist.photo_embedding = None
-                        therapist.photo_embedding_computed_at = None
-                        stats["cleaned"] += 1
-                    except Exception as e:
-                        logger.error(f"Error cleaning therapist {therapist.id}: {e}")
-                        stats["errors"] += 1
-
+                stats["cleaned"] = result.rowcount or 0
                 await session.commit()
 
         except Exception as e:
             logger.error(f"Error in cleanup task: {e}")
             stats["error"] = str(e)
+            stats["errors"] += 1
 
-        logger.info(f"Cleanup completed: {stats['cleaned']} cleaned, {stats['errors']} errors")
+        logger.info(
+            f"Cleanup completed: {stats['cleaned']} cleaned, {stats['errors']} errors"
+        )
         return stats
 
 
 # Convenience function for running the task
 async def run_embedding_computation(
-    batch_size: int = 50,
-    max_total: Optional[int] = None
+    batch_size: int = 50, max_total: Optional[int] = None
 ) -> dict:
     """Run the embedding computation task.
 
     This is the main entry point for scheduled jobs or manual runs.
     """
     task = PhotoEmbeddingTask()
-    return await task.compute_all_missing_embeddings(batch_size, max_total)
\ No newline at end of file
+    return await task.compute_all_missing_embeddings(batch_size, max_total)
@@ -15,13 +15,14 @@ import logging
 import os
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
-from sqlalchemy import func, or_, select
+from sqlalchemy import func, literal, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .... import models, schemas
 from ....db import get_session
 from ....deps import require_dashboard_user, verify_shop_manager
 from ....settings import settings
+from ....utils.text import fold_search_text, looks_like_phone, phone_digits
 from ...site.guest_reservations import update_guest_reservation_status
 
 # GuestReservation statuses that map to dashboard status set
@@ -184,6 +185,42 @@ def _decode_cursor(cursor: str) -> tuple[datetime, UUID]:
         ) from exc
 
 
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Trigram indexes only help once the pattern holds a full trigram.
+_TRIGRAM_MIN_LENGTH = 3
+
+
+def _search_filter(query: str):
+    """Search clause for ``q`` over the normalized search columns.
+
+    Phone-like input is matched as a prefix of the phone digits (btree with
+    text_pattern_ops) and, once long enough, anywhere in ``search_text``;
+    everything else is folded like the stored text and matched through the
+    trigram index.
+    """
+    reservation = models.GuestReservation
+    if looks_like_phone(query):
+        digits = phone_digits(query)
+        if not digits:
+            return None
+        clause = reservation.customer_phone_digits.like(
+            f"{_escape_like(digits)}%", escape="\\"
+        )
+        if len(digits) >= _TRIGRAM_MIN_LENGTH:
+            clause = or_(
+                clause,
+                reservation.search_text.like(f"%{_escape_like(digits)}%", escape="\\"),
+            )
+        return clause
+    folded = fold_search_text(query)
+    if not folded:
+        return None
+    return reservation.search_text.like(f"%{_escape_like(folded)}%", escape="\\")
+
+
 @router.get(
     "/shops/{profile_id}/reservations",
     response_model=schemas.DashboardReservationListResponse,
@@ -224,19 +261,11 @@ async def list_dashboard_reservations(
         mapped_statuses = status_mapping.get(status_filter, [status_filter])
         filters.append(models.GuestReservation.status.in_(mapped_statuses))
 
-    # Text search - search customer fields
+    # Text search - served by the normalized search columns
     if query:
-        value = query.strip()
-        if value:
-            pattern = f"%{value}%"
-            filters.append(
-                or_(
-                    models.GuestReservation.customer_name.ilike(pattern),
-                    models.GuestReservation.customer_phone.ilike(pattern),
-                    models.GuestReservation.customer_email.ilike(pattern),
-                    models.GuestReservation.notes.ilike(pattern),
-                )
-            )
+        search_clause = _search_filter(query)
+        if search_clause is not None:
+            filters.append(search_clause)
 
     # Date filtering
     if mode:
@@ -265,75 +294,56 @@ async def list_dashboard_reservations(
         if sort == "latest"
         else models.GuestReservation.start_at
     )
-    order_clause = sort_column.asc() if direction == "asc" else sort_column.desc()
-    id_order_clause = (
-        models.GuestReservation.id.asc()
-        if direction == "asc"
-        else models.GuestReservation.id.desc()
+    sort_key = tuple_(sort_column, models.GuestReservation.id)
+    total_stmt = select(func.count()).select_from(
+        select(models.GuestReservation.id).where(*filters).subquery()
     )
 
-    # Cursor-based pagination
+    # Keyset pagination: backward pages are read in reverse order from the
+    # cursor, so both directions walk the (shop_id, sort column, id) index.
+    backward = bool(cursor) and cursor_direction == "backward"
+    ascending = (direction == "asc") != backward
     if cursor:
         cursor_value, cursor_id = _decode_cursor(cursor)
-        if direction == "desc":
-            if cursor_direction == "forward":
-                filters.append(
-                    or_(
-                        sort_column < cursor_value,
-                        (sort_column == cursor_value)
-                        & (models.GuestReservation.id < cursor_id),
-                    )
-                )
-            else:
-                filters.append(
-                    or_(
-                        sort_column > cursor_value,
-                        (sort_column == cursor_value)
-                        & (models.GuestReservation.id > cursor_id),
-                    )
-                )
-        else:
-            if cursor_direction == "forward":
-                filters.append(
-                    or_(
-                        sort_column > cursor_value,
-                        (sort_column == cursor_value)
-                        & (models.GuestReservation.id > cursor_id),
-                    )
-                )
-            else:
-                filters.append(
-                    or_(
-                        sort_column < cursor_value,
-                        (sort_column == cursor_value)
-                        & (models.GuestReservation.id < cursor_id),
-                    )
-                )
+        cursor_key = tuple_(literal(cursor_value), literal(cursor_id))
+        filters.append(sort_key > cursor_key if ascending else sort_key < cursor_key)
 
+    order_by = (
+        (sort_column.asc(), models.GuestReservation.id.asc())
+        if ascending
+        else (sort_column.desc(), models.GuestReservation.id.desc())
+    )
     stmt = (
         select(models.GuestReservation)
         .where(*filters)
-        .order_by(order_clause, id_order_clause)
+        .order_by(*order_by)
         .limit(limit + 1)
     )
 
-    total_stmt = select(func.count()).select_from(
-        select(models.GuestReservation).where(*filters).subquery()
-    )
-
     result = await db.execute(stmt)
     reservations = list(result.scalars().all())
-    next_cursor: Optional[str] = None
-    if len(reservations) > limit:
-        last_item = reservations.pop()
-        cursor_value = last_item.created_at if sort == "latest" else last_item.start_at
-        next_cursor = _encode_cursor(cursor_value, last_item.id)
+    has_more = len(reservations) > limit
+    reservations = reservations[:limit]
+    if backward:
+        reservations.reverse()
 
+    def _cursor_for(item: models.GuestReservation) -> str:
+        value = item.created_at if sort == "latest" else item.start_at
+        return _encode_cursor(value, item.id)
+
+    next_cursor: Optional[str] = None
     prev_cursor: Optional[str] = None
-    if cursor and reservations:
-        first_item = reservations[0]
-        first_value = first_item.created_at if sort == "latest" else first_item.start_at
-        prev_cursor = _encode_cursor(first_value, first_item.id)
+    if reservations:
+        if backward:
+            # We came from a later page, so there is always something after.
+            next_cursor = _cursor_for(reservations[-1])
+            if has_more:
+                prev_cursor = _cursor_for(reservations[0])
+        else:
+            if has_more:
+                next_cursor = _cursor_for(reservations[-1])
+            if cursor:
+                prev_cursor = _cursor_for(reservations[0])
 
     total = await db.scalar(total_stmt) or 0
 
@@ -89,23 +89,24 @@ async def get_shop_review_stats(
     """Get review statistics for a shop."""
     await _verify_shop_access(db, profile_id, user)
 
-    # Count by status
-    status_counts = {}
-    for status in ["pending", "published", "rejected"]:
-        count = await db.scalar(
-            select(func.count())
-            .select_from(models.Review)
-            .where(models.Review.profile_id == profile_id)
-            .where(models.Review.status == status)
+    # One grouped pass over the shop's reviews: count per status, plus the
+    # average score of the published ones.
+    result = await db.execute(
+        select(
+            models.Review.status,
+            func.count(),
+            func.avg(models.Review.score),
         )
-        status_counts[status] = count or 0
-
-    # Average score (published only)
-    avg_score = await db.scalar(
-        select(func.avg(models.Review.score))
         .where(models.Review.profile_id == profile_id)
-        .where(models.Review.status == "published")
+        .group_by(models.Review.status)
     )
+    status_counts = {"pending": 0, "published": 0, "rejected": 0}
+    avg_score = None
+    for status, count, average in result.all():
+        if status in status_counts:
+            status_counts[status] = int(count or 0)
+        if status == "published":
+            avg_score = average
 
     return {
         "total": sum(status_counts.values()),
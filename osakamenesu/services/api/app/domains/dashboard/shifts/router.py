@@ -14,7 +14,7 @@ from .... import models
 from ....db import get_session
 from ....deps import require_dashboard_user, verify_shop_manager
 from ....services.availability_sync import sync_availability_for_date
-from ....utils.cache import availability_cache
+from ....utils.cache import availability_cache, invalidate_therapist_slots
 
 logger = logging.getLogger(__name__)
 
@@ -336,6 +336,7 @@ async def create_shift(
     # Invalidate availability cache for this therapist's date
     cache_key = f"availability_slots:{payload.therapist_id}:{payload.date.isoformat()}"
     await availability_cache.invalidate(cache_key)
+    await invalidate_therapist_slots(payload.therapist_id)
     logger.debug("Invalidated cache (shift create): %s", cache_key)
 
     return _serialize(shift)
@@ -423,6 +424,7 @@ async def update_shift(
     # Invalidate availability cache for this therapist's date
     cache_key = f"availability_slots:{shift.therapist_id}:{shift.date.isoformat()}"
     await availability_cache.invalidate(cache_key)
+    await invalidate_therapist_slots(shift.therapist_id)
     logger.debug("Invalidated cache (shift update): %s", cache_key)
 
     return _serialize(shift)
@@ -467,4 +469,5 @@ async def delete_shift(
     # Invalidate availability cache for this therapist's date
     cache_key = f"availability_slots:{therapist_id}:{shift_date.isoformat()}"
     await availability_cache.invalidate(cache_key)
+    await invalidate_therapist_slots(therapist_id)
     logger.debug("Invalidated cache (shift delete): %s", cache_key)
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
-import uuid as uuid_module
+from datetime import timedelta
 from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
-from pydantic import BaseModel
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .... import models
@@ -15,11 +24,15 @@ from ....schemas import (
     DashboardShopListResponse,
     DashboardShopSummaryItem,
     DashboardShopContact,
+    DashboardShopKpiDay,
+    DashboardShopKpiResponse,
+    DashboardShopKpiSummary,
     DashboardShopMenu,
     DashboardShopProfileCreatePayload,
     DashboardShopProfileResponse,
     DashboardShopProfileUpdatePayload,
     DashboardShopStaff,
+    ImageVariant,
 )
 from ....services.dashboard_shop_service import (
     ALLOWED_PROFILE_STATUSES,
@@ -27,7 +40,10 @@ from ....services.dashboard_shop_service import (
     DashboardShopError,
     DashboardShopService,
 )
-from ....storage import MediaStorageError, get_media_storage
+from ....services.image_variants import digest_upload, public_variants, store_image
+from ....services.kpi_rollups import load_shop_daily_stats, summarize_shop_days
+from ....storage import MediaStorageError, MediaTooLargeError, get_media_storage
+from ....utils.datetime import now_jst
 from ..therapists.service import (
     MAX_PHOTO_BYTES,
     ALLOWED_IMAGE_CONTENT_TYPES,
@@ -121,11 +137,53 @@ async def update_dashboard_shop_profile(
         _handle_dashboard_error(error)
 
 
+@router.get("/shops/{profile_id}/kpis", response_model=DashboardShopKpiResponse)
+async def get_dashboard_shop_kpis(
+    profile_id: UUID,
+    days: int = Query(30, ge=1, le=366),
+    db: AsyncSession = Depends(get_session),
+    user: models.User = Depends(require_dashboard_user),
+) -> DashboardShopKpiResponse:
+    """Daily reservation/utilization KPIs for the last ``days`` JST days."""
+    await verify_shop_manager(db, user.id, profile_id)
+    end = now_jst().date()
+    start = end - timedelta(days=days - 1)
+    rows = await load_shop_daily_stats(db, profile_id, start, end)
+    return DashboardShopKpiResponse(
+        profile_id=profile_id,
+        start=start,
+        end=end,
+        summary=DashboardShopKpiSummary(**summarize_shop_days(rows)),
+        days=[
+            DashboardShopKpiDay(
+                day=row.day,
+                reservations_total=row.reservations_total,
+                reservations_pending=row.reservations_pending,
+                reservations_confirmed=row.reservations_confirmed,
+                reservations_cancelled=row.reservations_cancelled,
+                reservations_no_show=row.reservations_no_show,
+                repeat_reservations=row.repeat_reservations,
+                booked_minutes=row.booked_minutes,
+                shift_minutes=row.shift_minutes,
+                utilization=(
+                    round(row.booked_minutes / row.shift_minutes, 4)
+                    if row.shift_minutes
+                    else None
+                ),
+            )
+            for row in rows
+        ],
+    )
+
+
 class ShopPhotoUploadResponse(BaseModel):
     url: str
     filename: str
     content_type: str
     size: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    variants: List[ImageVariant] = Field(default_factory=list)
 
 
 @router.post(
@@ -145,60 +203,61 @@ async def upload_shop_photo(
     if not profile:
         raise HTTPException(status_code=404, detail="shop_not_found")
 
-    max_bytes = MAX_PHOTO_BYTES
-    chunk_size = 512 * 1024
-    size = 0
-    payload_bytes = bytearray()
-
-    while True:
-        chunk = await file.read(chunk_size)
-        if not chunk:
-            break
-        size += len(chunk)
-        if size > max_bytes:
-            await file.close()
+    try:
+        # Read from the upload's spool file; never held in memory as a whole
+        try:
+            digest = await digest_upload(file.file, max_bytes=MAX_PHOTO_BYTES)
+        except MediaTooLargeError:
             raise HTTPException(
                 status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail={"message": "file_too_large", "limit_bytes": MAX_PHOTO_BYTES},
             )
-        payload_bytes.extend(chunk)
-
-    await file.close()
-    if not payload_bytes:
-        raise HTTPException(
-            status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail={"message": "empty_file"},
-        )
-
-    payload = bytes(payload_bytes)
+        if not digest.size:
+            raise HTTPException(
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={"message": "empty_file"},
+            )
 
-    try:
-        mime, extension = detect_image_type(file.filename, file.content_type, payload)
-    except Exception:
-        raise HTTPException(
-            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            detail={"message": "unsupported_image_type"},
-        )
+        try:
+            mime, extension = detect_image_type(
+                file.filename, file.content_type, digest.head
+            )
+        except Exception:
+            raise HTTPException(
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail={"message": "unsupported_image_type"},
+            )
 
-    storage = get_media_storage()
-    stored_name = f"{uuid_module.uuid4().hex}{extension}"
-    folder = f"shops/{profile_id}"
+        storage = get_media_storage()
+        folder = f"shops/{profile_id}"
 
-    try:
-        stored = await storage.save_photo(
-            folder=folder, filename=stored_name, content=payload, content_type=mime
-        )
-    except MediaStorageError as exc:
-        raise HTTPException(
-            status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={"message": "upload_failed"},
-        ) from exc
+        try:
+            asset = await store_image(
+                db,
+                storage,
+                folder=folder,
+                source=file.file,
+                digest=digest,
+                content_type=mime,
+                extension=extension,
+            )
+        except MediaStorageError as exc:
+            raise HTTPException(
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail={"message": "upload_failed"},
+            ) from exc
+    finally:
+        await file.close()
+    await db.commit()
 
     return ShopPhotoUploadResponse(
-        url=stored.url,
-        filename=stored_name,
-        content_type=mime,
-        size=len(payload),
+        url=asset.url,
+        filename=asset.url.rsplit("/", 1)[-1],
+        content_type=asset.content_type,
+        size=asset.size,
+        width=asset.width,
+        height=asset.height,
+        variants=public_variants(asset.variants),
     )
 
 
@@ -27,6 +27,8 @@ from ....schemas import (
     DashboardTherapistSummary,
     DashboardTherapistUpdatePayload,
 )
+from ....services.image_variants import digest_upload
+from ....storage import MediaTooLargeError
 from .service import (
     ALLOWED_IMAGE_CONTENT_TYPES,
     MAX_PHOTO_BYTES,
@@ -200,44 +202,36 @@ async def upload_dashboard_therapist_photo(
 ) -> DashboardTherapistPhotoUploadResponse:
     await verify_shop_manager(db, user.id, profile_id)
     context = _audit_context_from_request(request)
-    max_bytes = MAX_PHOTO_BYTES
-    chunk_size = 512 * 1024
-    size = 0
-    payload_bytes = bytearray()
-
-    while True:
-        chunk = await file.read(chunk_size)
-        if not chunk:
-            break
-        size += len(chunk)
-        if size > max_bytes:
-            await file.close()
+    try:
+        # Read from the upload's spool file; never held in memory as a whole
+        try:
+            digest = await digest_upload(file.file, max_bytes=MAX_PHOTO_BYTES)
+        except MediaTooLargeError:
             raise HTTPException(
                 status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail={"message": "file_too_large", "limit_bytes": MAX_PHOTO_BYTES},
             )
-        payload_bytes.extend(chunk)
-
-    await file.close()
-    if not payload_bytes:
-        raise HTTPException(
-            status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail={"message": "empty_file"},
-        )
+        if not digest.size:
+            raise HTTPException(
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={"message": "empty_file"},
+            )
 
-    payload = bytes(payload_bytes)
-    storage = get_media_storage()
-    return await _run_service(
-        _service.upload_photo(
-            audit_context=context,
-            profile_id=profile_id,
-            filename=file.filename,
-            content_type=file.content_type,
-            payload=payload,
-            db=db,
-            storage=storage,
+        storage = get_media_storage()
+        return await _run_service(
+            _service.upload_photo(
+                audit_context=context,
+                profile_id=profile_id,
+                filename=file.filename,
+                content_type=file.content_type,
+                source=file.file,
+                digest=digest,
+                db=db,
+                storage=storage,
+            )
         )
-    )
+    finally:
+        await file.close()
 
 
 @router.post(
@@ -1,11 +1,10 @@
 from __future__ import annotations
 
 import mimetypes
-import uuid
 from datetime import datetime, timezone
 from http import HTTPStatus
 from dataclasses import dataclass
-from typing import Any, Iterable, List
+from typing import Any, BinaryIO, Iterable, List
 from uuid import UUID
 
 import sqlalchemy as sa
@@ -22,6 +21,12 @@ from ....schemas import (
     DashboardTherapistSummary,
     DashboardTherapistUpdatePayload,
 )
+from ....services.image_variants import (
+    UploadDigest,
+    public_variants,
+    store_image,
+    with_image_variants,
+)
 from ....storage import MediaStorageError, get_media_storage
 from ....utils.profiles import build_profile_doc
 from ....utils.text import strip_or_none
@@ -153,6 +158,7 @@ async def reindex_profile(db: AsyncSession, profile: models.Profile) -> None:
         ctr7d=0.0,
         outlinks=list(outlinks.scalars().all()),
     )
+    await with_image_variants(db, [doc])
     try:
         from ....meili import index_profile
 
@@ -482,24 +488,33 @@ class DashboardTherapistService:
         profile_id: UUID,
         filename: str | None,
         content_type: str | None,
-        payload: bytes,
+        source: BinaryIO,
+        digest: UploadDigest,
         db: AsyncSession,
         storage=None,
     ) -> DashboardTherapistPhotoUploadResponse:
         profile = await get_profile(db, profile_id)
-        mime, extension = detect_image_type(filename, content_type, payload)
+        mime, extension = detect_image_type(filename, content_type, digest.head)
         storage = storage or self._media_storage_factory()
-        stored_name = f"{uuid.uuid4().hex}{extension}"
         folder = f"therapists/{profile_id}"
 
         try:
-            stored = await storage.save_photo(
-                folder=folder, filename=stored_name, content=payload, content_type=mime
+            asset = await store_image(
+                db,
+                storage,
+                folder=folder,
+                source=source,
+                digest=digest,
+                content_type=mime,
+                extension=extension,
             )
         except MediaStorageError as exc:
             raise DashboardTherapistError(
                 HTTPStatus.INTERNAL_SERVER_ERROR, detail="upload_failed"
             ) from exc
+        # Persist the variant manifest on its own; record_change swallows
+        # audit failures and must not take the media_assets row with it.
+        await db.commit()
 
         await record_change(
             db,
@@ -507,14 +522,22 @@ class DashboardTherapistService:
             target_id=profile.id,
             action="upload_photo",
             before=None,
-            after={"key": stored.key, "url": stored.url, "content_type": mime},
+            after={
+                "content_hash": asset.content_hash,
+                "url": asset.url,
+                "content_type": asset.content_type,
+                "variants": len(asset.variants or []),
+            },
         )
 
         return DashboardTherapistPhotoUploadResponse(
-            url=stored.url,
-            filename=stored_name,
-            content_type=mime,
-            size=len(payload),
+            url=asset.url,
+            filename=asset.url.rsplit("/", 1)[-1],
+            content_type=asset.content_type,
+            size=asset.size,
+            width=asset.width,
+            height=asset.height,
+            variants=public_variants(asset.variants),
         )
 
     async def reorder_therapists(
@@ -8,7 +8,12 @@ from typing import Dict, Any
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from ...utils.cache import shop_cache, therapist_cache, availability_cache
+from ...utils.cache import (
+    availability_cache,
+    shop_cache,
+    therapist_cache,
+    therapist_slots_cache,
+)
 from ...utils.redis_cache import get_redis_cache
 
 logger = logging.getLogger(__name__)
@@ -58,6 +63,12 @@ async def get_cache_metrics() -> CacheMetrics:
             max_size=availability_cache._max_size,
             ttl_seconds=availability_cache._ttl,
         ),
+        CacheStats(
+            name="therapist_slots_cache",
+            size=therapist_slots_cache.size,
+            max_size=therapist_slots_cache._max_size,
+            ttl_seconds=therapist_slots_cache._ttl,
+        ),
     ]
 
     # Redis cache status
@@ -84,7 +95,15 @@ async def clear_caches(cache_type: str = "all") -> Dict[str, Any]:
         await shop_cache.clear()
         await therapist_cache.clear()
         await availability_cache.clear()
-        cleared.extend(["shop_cache", "therapist_cache", "availability_cache"])
+        await therapist_slots_cache.clear()
+        cleared.extend(
+            [
+                "shop_cache",
+                "therapist_cache",
+                "availability_cache",
+                "therapist_slots_cache",
+            ]
+        )
 
     if cache_type in ["all", "redis"]:
         redis = await get_redis_cache()
@@ -101,6 +120,9 @@ async def clear_caches(cache_type: str = "all") -> Dict[str, Any]:
     elif cache_type == "availability_cache":
         await availability_cache.clear()
         cleared.append("availability_cache")
+    elif cache_type == "therapist_slots_cache":
+        await therapist_slots_cache.clear()
+        cleared.append("therapist_slots_cache")
 
     if not cleared:
         raise HTTPException(status_code=400, detail=f"Invalid cache type: {cache_type}")
@@ -1,25 +1,39 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 import os
 import secrets
 import subprocess
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, Header, HTTPException, status
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
 from sqlalchemy import func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ... import models, schemas
 from ...db import get_session
+from ...monitoring.profiling import (
+    ProfilerBusy,
+    get_loop_monitor,
+    get_request_profile,
+    profile_for,
+)
+from ...notifications import get_outbox_summary, get_queue_stats
 from ...settings import settings
+from ...services.kpi_rollups import backfill_rollups
 from ...services.reservation_holds import expire_reserved_holds
+from ...services.search_freshness import refresh_time_dependent_fields
+from ...services.therapist_features import refresh_therapist_features
+from ...utils.datetime import now_jst
 from .cache_metrics import router as cache_router
 
 logger = logging.getLogger(__name__)
 
+KPI_BACKFILL_DEFAULT_DAYS = 90
+
 
 def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
@@ -51,48 +65,35 @@ router = APIRouter(
 
 
 async def _get_queue_stats(db: AsyncSession) -> schemas.OpsQueueStats:
-    # Legacy notification queue removed - return empty stats
-    return schemas.OpsQueueStats(
-        pending=0,
-        lag_seconds=0.0,
-        oldest_created_at=None,
-        next_attempt_at=None,
-    )
+    return await get_queue_stats(db, now=_utcnow())
 
 
 async def _get_outbox_summary(db: AsyncSession) -> schemas.OpsOutboxSummary:
-    # Legacy notification outbox removed - return empty stats
-    return schemas.OpsOutboxSummary(channels=[])
+    return await get_outbox_summary(db)
 
 
 async def _get_slots_summary(db: AsyncSession) -> schemas.OpsSlotsSummary:
     now = _utcnow()
     window_end = now + timedelta(hours=24)
 
-    # Use GuestReservation instead of old Reservation
-    pending_total_stmt = select(func.count(models.GuestReservation.id)).where(
-        models.GuestReservation.status == "pending"
-    )
-    pending_stale_stmt = (
-        select(func.count(models.GuestReservation.id))
-        .where(models.GuestReservation.status == "pending")
-        .where(models.GuestReservation.start_at < now)
-    )
-    confirmed_stmt = (
-        select(func.count(models.GuestReservation.id))
-        .where(models.GuestReservation.status == "confirmed")
-        .where(models.GuestReservation.start_at >= now)
-        .where(models.GuestReservation.start_at < window_end)
-    )
-
-    pending_total = int(await db.scalar(pending_total_stmt) or 0)
-    pending_stale = int(await db.scalar(pending_stale_stmt) or 0)
-    confirmed_next_24h = int(await db.scalar(confirmed_stmt) or 0)
+    # One pass over the status index instead of one count query per figure
+    reservation = models.GuestReservation
+    pending = reservation.status == "pending"
+    stmt = select(
+        func.count().filter(pending),
+        func.count().filter(pending, reservation.start_at < now),
+        func.count().filter(
+            reservation.status == "confirmed",
+            reservation.start_at >= now,
+            reservation.start_at < window_end,
+        ),
+    ).where(reservation.status.in_(("pending", "confirmed")))
+    pending_total, pending_stale, confirmed_next_24h = (await db.execute(stmt)).one()
 
     return schemas.OpsSlotsSummary(
-        pending_total=pending_total,
-        pending_stale=pending_stale,
-        confirmed_next_24h=confirmed_next_24h,
+        pending_total=int(pending_total or 0),
+        pending_stale=int(pending_stale or 0),
+        confirmed_next_24h=int(confirmed_next_24h or 0),
         window_start=now,
         window_end=window_end,
     )
@@ -146,6 +147,161 @@ async def expire_holds(
     return ExpireHoldsResponse(expired=expired, now=now)
 
 
+class KpiBackfillRequest(BaseModel):
+    start: date | None = None
+    end: date | None = None
+    shop_ids: list[UUID] | None = None
+
+
+class KpiBackfillResponse(BaseModel):
+    shops: int
+    buckets: int
+    start: date
+    end: date
+
+
+@router.post("/kpi/backfill", response_model=KpiBackfillResponse)
+async def backfill_kpi_rollups(
+    payload: KpiBackfillRequest | None = None,
+    db: AsyncSession = Depends(get_session),
+) -> KpiBackfillResponse:
+    """Rebuild the daily KPI rollups (default: the last 90 JST days).
+
+    Commits shop by shop; pass ``shop_ids`` to limit the rebuild.
+    """
+    payload = payload or KpiBackfillRequest()
+    end = payload.end or now_jst().date()
+    start = payload.start or end - timedelta(days=KPI_BACKFILL_DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="invalid_range")
+    result = await backfill_rollups(db, start=start, end=end, shop_ids=payload.shop_ids)
+    return KpiBackfillResponse(start=start, end=end, **result)
+
+
+class FeatureRefreshResponse(BaseModel):
+    therapists: int
+
+
+@router.post("/features/refresh", response_model=FeatureRefreshResponse)
+async def refresh_features(
+    db: AsyncSession = Depends(get_session),
+) -> FeatureRefreshResponse:
+    """Recompute ``therapist_features`` from the KPI rollups.
+
+    API workers pick up the new generation on their next reload tick.
+    """
+    therapists = await refresh_therapist_features(db)
+    return FeatureRefreshResponse(therapists=therapists)
+
+
+class ProfileRequest(BaseModel):
+    seconds: float = Field(10.0, gt=0, le=120)
+    interval_ms: float = Field(5.0, ge=1, le=100)
+    all_threads: bool = False
+    include_idle: bool = False
+
+
+def _collapsed_response(result) -> PlainTextResponse:
+    return PlainTextResponse(
+        result.collapsed(),
+        headers={
+            "X-Profile-Samples": str(result.samples),
+            "X-Profile-Idle-Samples": str(result.idle_samples),
+            "X-Profile-Duration": f"{result.duration:.3f}",
+        },
+    )
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_worker(payload: ProfileRequest | None = None) -> PlainTextResponse:
+    """Sample the event loop of the worker serving this call for ``seconds``.
+
+    Returns collapsed stacks (``a;b;c count`` per line) for flamegraph.pl or
+    speedscope.  Only this worker is profiled; idle time waiting for I/O is
+    left out unless ``include_idle`` is set.
+    """
+    payload = payload or ProfileRequest()
+    try:
+        result = await profile_for(
+            payload.seconds,
+            interval=payload.interval_ms / 1000,
+            all_threads=payload.all_threads,
+            include_idle=payload.include_idle,
+        )
+    except ProfilerBusy:
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="profiler_busy")
+    return _collapsed_response(result)
+
+
+@router.get("/profile/requests/{profile_id}", response_class=PlainTextResponse)
+async def get_request_profile_stacks(profile_id: str) -> PlainTextResponse:
+    """Collapsed stacks of a request profiled with ``X-Profile: 1``."""
+    result = get_request_profile(profile_id)
+    if result is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="profile_not_found")
+    return _collapsed_response(result)
+
+
+class BlockedLoopEventResponse(BaseModel):
+    at: datetime
+    duration_ms: float
+    stack: list[str]
+
+
+class LoopLagResponse(BaseModel):
+    threshold_ms: float
+    max_lag_ms: float
+    blocked: list[BlockedLoopEventResponse]
+
+
+@router.get("/profile/loop", response_model=LoopLagResponse)
+async def get_loop_lag() -> LoopLagResponse:
+    """Worst event-loop lag and the stacks of recent blocks in this worker."""
+    monitor = get_loop_monitor()
+    if monitor is None:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, detail="loop_monitor_disabled"
+        )
+    return LoopLagResponse(
+        threshold_ms=monitor.threshold * 1000,
+        max_lag_ms=monitor.max_lag * 1000,
+        blocked=[
+            BlockedLoopEventResponse(
+                at=event.at, duration_ms=event.duration * 1000, stack=list(event.stack)
+            )
+            for event in reversed(monitor.events)
+        ],
+    )
+
+
+class SearchFreshnessRequest(BaseModel):
+    profile_ids: list[UUID] | None = None
+
+
+class SearchFreshnessResponse(BaseModel):
+    updated: int
+
+
+@router.post("/search/refresh_time_fields", response_model=SearchFreshnessResponse)
+async def refresh_search_time_fields(
+    payload: SearchFreshnessRequest | None = None,
+    db: AsyncSession = Depends(get_session),
+) -> SearchFreshnessResponse:
+    """Refresh today/ranking/staff availability in the search index.
+
+    Without ``profile_ids`` every published profile is refreshed; schedule it
+    right after midnight JST as the day-rollover tick.
+    """
+    profile_ids = payload.profile_ids if payload else None
+    try:
+        updated = await refresh_time_dependent_fields(db, profile_ids)
+    except Exception as exc:  # pragma: no cover - meili failure path
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"meili_unavailable: {exc}"
+        ) from exc
+    return SearchFreshnessResponse(updated=updated)
+
+
 @router.post("/stamp", response_model=MigrateResponse)
 async def stamp_migration(
     request: StampRequest,
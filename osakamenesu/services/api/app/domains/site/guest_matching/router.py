@@ -8,8 +8,9 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ....db import get_session
+from ....db import get_read_session, get_session
 from ....rate_limiters import rate_limit_search
+from ....services.therapist_features import enrich_candidates
 from ..services.shop.search_service import ShopSearchService
 
 from .schemas import (
@@ -100,6 +101,7 @@ async def guest_matching_search(
 
     hits = search_res.get("results", []) if isinstance(search_res, dict) else []
     candidates_raw = [map_shop_to_candidate(shop) for shop in hits]
+    enrich_candidates(candidates_raw)
 
     scored: list[MatchingCandidate] = []
     for c in candidates_raw:
@@ -319,7 +321,7 @@ async def guest_matching_similar(
         le=1.0,
         description="Drop candidates below this score",
     ),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     _: None = Depends(rate_limit_search),
 ) -> SimilarResponse:
     base_id = staff_id or therapist_id
@@ -5,11 +5,11 @@ import sys
 from typing import Any, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ....db import get_session
+from ....db import get_session, mark_read_your_writes
 from ....deps import get_optional_site_user
 from ....models import GuestReservation, User
 from ....rate_limiters import rate_limit_reservation
@@ -51,6 +51,7 @@ def _safe_debug(debug: dict[str, Any] | None) -> dict[str, Any] | None:
 )
 async def create_guest_reservation_api(
     payload: GuestReservationPayload,
+    response: Response,
     db: AsyncSession = Depends(get_session),
     user: Optional[User] = Depends(get_optional_site_user),
     _: None = Depends(rate_limit_reservation),
@@ -63,6 +64,7 @@ async def create_guest_reservation_api(
         data["user_id"] = None
     reservation, debug = await parent.create_guest_reservation(db, data, now=None)
     if reservation:
+        mark_read_your_writes(response)
         return serialize_reservation(reservation, debug=None)
     return make_rejected_response(
         payload, _safe_debug(debug), user.id if user else None
@@ -76,6 +78,7 @@ async def create_guest_reservation_api(
 )
 async def hold_guest_reservation_api(
     payload: GuestReservationHoldPayload,
+    response: Response,
     idempotency_key: str = Header(..., alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_session),
     user: Optional[User] = Depends(get_optional_site_user),
@@ -106,6 +109,7 @@ async def hold_guest_reservation_api(
             detail="idempotency_key_conflict",
         )
     if reservation:
+        mark_read_your_writes(response)
         return serialize_reservation(reservation, debug=None)
     return make_rejected_response(
         payload, _safe_debug(debug), user.id if user else None
@@ -119,6 +123,7 @@ async def hold_guest_reservation_api(
 )
 async def cancel_guest_reservation_api(
     reservation_id: UUID,
+    response: Response,
     guest_token: Optional[str] = None,
     db: AsyncSession = Depends(get_session),
     user: Optional[User] = Depends(get_optional_site_user),
@@ -149,6 +154,7 @@ async def cancel_guest_reservation_api(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="reservation_not_found"
         )
+    mark_read_your_writes(response)
     return serialize_reservation(cancelled, debug=None)
 
 
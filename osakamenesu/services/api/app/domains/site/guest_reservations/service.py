@@ -11,13 +11,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from ....models import GuestReservation, Profile, Therapist, now_utc
+from ....monitoring.metrics import OMAKASE_ASSIGNMENT_COUNT, OMAKASE_LOCK_CONTENTION
+from ....notifications import enqueue_reservation_event
 from ....services.business_hours import (
     load_business_hours_from_profile,
     is_within_business_hours,
 )
-from ....services.push_notification import push_notification_service
-from ....utils.cache import availability_cache
+from ....utils.cache import availability_cache, invalidate_therapist_slots
 from ....utils.datetime import ensure_jst_datetime
+from ..therapist_availability import check_availability_batch
 from ..therapist_availability import is_available as _is_available_impl
 
 from .utils import (
@@ -65,13 +67,19 @@ async def assign_for_free(
     """
     Assign a therapist for omakase/free reservations.
 
-    v1 policy:
+    v2 policy:
     - Get published & booking-enabled therapists in the shop
-    - Filter by is_available=True
-    - Score by base_staff_id match, return highest scorer
+    - Check availability of all candidates in one batched, lock-free pass
+    - Score by base_staff_id match and rank
+    - Lock and re-verify only the top candidate (is_available lock=True),
+      falling back to the next one when a concurrent booking took the slot
+
+    If the batched pass fails, every candidate is verified in rank order.
+    ``debug`` carries ``lock_attempts`` and ``contended`` for observability.
     """
     debug: dict[str, Any] = {"rejected_reasons": []}
     candidates: list[dict[str, Any]] = []
+    shop = None
 
     try:
         if not db or not hasattr(db, "execute"):
@@ -116,10 +124,55 @@ async def assign_for_free(
         debug["rejected_reasons"].append("no_candidate")
         return None, debug
 
-    available_candidates: list[tuple[Any, float, int]] = []
+    candidate_ids = [cand["therapist_id"] for cand in candidates]
+    buffer_minutes = None
+    if shop is not None:
+        shop_buffer = int(getattr(shop, "buffer_minutes", 0) or 0)
+        buffer_minutes = {tid: shop_buffer for tid in candidate_ids}
 
+    batch: dict[Any, tuple[bool, dict[str, Any]]] | None
+    try:
+        batch = await check_availability_batch(
+            db, candidate_ids, start_at, end_at, buffer_minutes=buffer_minutes
+        )
+    except Exception:
+        logger.warning("assign_for_free_batch_check_failed", exc_info=True)
+        try:
+            await db.rollback()
+        except Exception:
+            pass
+        batch = None
+
+    ranked: list[tuple[Any, float, int]] = []
     for cand in candidates:
-        therapist_id = cand.get("therapist_id")
+        therapist_id = cand["therapist_id"]
+        if batch is not None:
+            ok, avail_debug = batch.get(
+                therapist_id, (False, {"rejected_reasons": ["internal_error"]})
+            )
+            if not ok:
+                debug.setdefault("skipped", []).append(
+                    {
+                        "therapist_id": str(therapist_id),
+                        "reasons": avail_debug.get("rejected_reasons") or [],
+                    }
+                )
+                continue
+
+        score = 0.5
+        if base_staff_id and str(base_staff_id) == str(therapist_id):
+            score = 0.9
+        score = max(0.0, min(1.0, score))
+
+        ranked.append((therapist_id, score, cand.get("display_order", 0)))
+
+    ranked.sort(key=lambda t: (-t[1], t[2], str(t[0])))
+
+    chosen = None
+    contended: list[str] = []
+    lock_attempts = 0
+    for therapist_id, _score, _order in ranked:
+        lock_attempts += 1
         try:
             ok, avail_debug = await is_available(
                 db, therapist_id, start_at, end_at, lock=True
@@ -128,26 +181,33 @@ async def assign_for_free(
             ok = False
             avail_debug = {"rejected_reasons": ["internal_error"]}
 
-        if not ok:
-            reasons = avail_debug.get("rejected_reasons") or []
-            debug.setdefault("skipped", []).append(
-                {"therapist_id": str(therapist_id), "reasons": reasons}
-            )
-            continue
+        if ok:
+            chosen = therapist_id
+            break
 
-        score = 0.5
-        if base_staff_id and str(base_staff_id) == str(therapist_id):
-            score = 0.9
-        score = max(0.0, min(1.0, score))
+        debug.setdefault("skipped", []).append(
+            {
+                "therapist_id": str(therapist_id),
+                "reasons": avail_debug.get("rejected_reasons") or [],
+            }
+        )
+        if batch is not None:
+            # Available in the lock-free pass but not under the lock: another
+            # booking won the race in between.
+            contended.append(str(therapist_id))
+            OMAKASE_LOCK_CONTENTION.inc()
 
-        available_candidates.append((therapist_id, score, cand.get("display_order", 0)))
+    debug["lock_attempts"] = lock_attempts
+    debug["contended"] = contended
 
-    if not available_candidates:
+    if chosen is None:
+        OMAKASE_ASSIGNMENT_COUNT.labels(result="unavailable").inc()
         debug["rejected_reasons"].append("no_available_therapist")
         return None, debug
 
-    available_candidates.sort(key=lambda t: (-t[1], t[2], str(t[0])))
-    chosen = available_candidates[0][0]
+    OMAKASE_ASSIGNMENT_COUNT.labels(
+        result="contended" if contended else "assigned"
+    ).inc()
     debug["rejected_reasons"] = []
     return chosen, debug
 
@@ -308,6 +368,7 @@ async def create_guest_reservation(
         if not getattr(reservation, "id", None):
             reservation.id = uuid4()
         db.add(reservation)
+        enqueue_reservation_event(db, reservation)
         await db.commit()
         await db.refresh(reservation)
 
@@ -317,6 +378,7 @@ async def create_guest_reservation(
                 f"availability_slots:{therapist_id}:{start_at.date().isoformat()}"
             )
             await availability_cache.invalidate(cache_key)
+            await invalidate_therapist_slots(therapist_id)
             logger.debug("Invalidated cache: %s", cache_key)
 
         return reservation, {}
@@ -531,6 +593,7 @@ async def create_guest_reservation_hold(
                 f"availability_slots:{therapist_id}:{start_at.date().isoformat()}"
             )
             await availability_cache.invalidate(cache_key)
+            await invalidate_therapist_slots(therapist_id)
             logger.debug("Invalidated cache (hold): %s", cache_key)
 
         return reservation, {}, None
@@ -561,9 +624,11 @@ async def cancel_guest_reservation(
         return None
     if str(reservation.status) == "cancelled":
         return reservation
+    previous_status = str(getattr(reservation.status, "value", reservation.status))
     attach_reason(reservation, reason)
     reservation.status = "cancelled"
     db.add(reservation)
+    enqueue_reservation_event(db, reservation, previous_status=previous_status)
     await db.commit()
     await db.refresh(reservation)
 
@@ -574,6 +639,7 @@ async def cancel_guest_reservation(
             f"{reservation.start_at.date().isoformat()}"
         )
         await availability_cache.invalidate(cache_key)
+        await invalidate_therapist_slots(reservation.therapist_id)
         logger.debug("Invalidated cache (cancel): %s", cache_key)
 
     return reservation
@@ -614,64 +680,11 @@ async def update_guest_reservation_status(
         reservation.status = "confirmed"
         attach_reason(reservation, reason)
         db.add(reservation)
+        # Delivered by the notifications worker after commit
+        enqueue_reservation_event(db, reservation, previous_status=current_status)
         await db.commit()
         await db.refresh(reservation)
 
-        # Send push notification for reservation confirmation
-        try:
-            # Get user ID from reservation (if linked to a user)
-            user_id = None
-            if hasattr(reservation, "user_id") and reservation.user_id:
-                user_id = reservation.user_id
-            elif reservation.customer_email:
-                # Try to find user by email
-                from ....models import User
-
-                user_res = await db.execute(
-                    select(User).where(User.email == reservation.customer_email)
-                )
-                user = user_res.scalar_one_or_none()
-                if user:
-                    user_id = user.id
-
-            # If we have a user, send push notification
-            if user_id:
-                # Get shop and therapist info
-                shop_res = await db.execute(
-                    select(Profile).where(Profile.id == reservation.shop_id)
-                )
-                shop = shop_res.scalar_one_or_none()
-
-                therapist_res = await db.execute(
-                    select(Therapist).where(Therapist.id == reservation.therapist_id)
-                )
-                therapist = therapist_res.scalar_one_or_none()
-
-                if shop and therapist:
-                    # Format date and time for notification
-                    start_jst = ensure_jst_datetime(reservation.start_at)
-                    date_str = start_jst.strftime("%Y/%m/%d")
-                    time_str = start_jst.strftime("%H:%M")
-
-                    await push_notification_service.notify_reservation_confirmation(
-                        user_id=user_id,
-                        reservation_id=reservation.id,
-                        shop_name=shop.name,
-                        therapist_name=therapist.name,
-                        date=date_str,
-                        time=time_str,
-                        db=db,
-                    )
-                    logger.info(
-                        f"Sent reservation confirmation notification for {reservation.id}"
-                    )
-
-        except Exception as e:
-            # Don't fail the reservation confirmation if push notification fails
-            logger.error(
-                f"Failed to send push notification for reservation {reservation.id}: {e}"
-            )
-
         return reservation, None
 
     if current_status in {"pending", "confirmed"} and next_status == "cancelled":
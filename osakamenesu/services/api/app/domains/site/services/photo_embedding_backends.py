@@ -0,0 +1,233 @@
+"""Pluggable backends turning therapist photos into similarity vectors.
+
+A backend embeds raw image bytes into a unit vector of ``EMBEDDING_DIM``
+floats.  Its ``name`` includes a version and keys the content-hash cache
+(``photo_embedding_cache``), so changing the feature extraction means bumping
+the name rather than clearing rows.
+
+- ``local``: CPU-only image features computed with NumPy/Pillow - an HSV
+  colour histogram, a histogram of oriented gradients and perceptual/difference
+  hash bits.  Robust to re-encoding and resizing, so re-uploads of the same
+  photo land next to each other.  Both are in ``requirements.txt``; on a
+  broken install without them it degrades to ``content-hash`` and logs an
+  error, since similarity search then only finds identical files.
+- ``content-hash``: deterministic pseudo-vector derived from the image bytes.
+  Needs no optional dependencies; identical files match, nothing else does.
+
+The module-level ``digest_files`` / ``embed_files`` helpers take plain paths so
+batch jobs can run them in worker processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Protocol, Sequence
+
+try:
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None  # type: ignore
+    Image = None  # type: ignore
+    ImageOps = None  # type: ignore
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Embedding dimensions - using 512 for balance between accuracy and storage
+EMBEDDING_DIM = 512
+
+DEFAULT_BACKEND = "local"
+_READ_CHUNK = 1 << 20
+
+
+class EmbeddingBackend(Protocol):
+    name: str
+    dim: int
+
+    def embed(self, data: bytes) -> list[float]: ...
+
+
+class ContentHashBackend:
+    """Pseudo-embedding from the image bytes; equal files get equal vectors."""
+
+    name = "content-hash-v1"
+    dim = EMBEDDING_DIM
+
+    def embed(self, data: bytes) -> list[float]:
+        digest = hashlib.shake_256(data).digest(self.dim * 2)
+        values = [
+            int.from_bytes(digest[i : i + 2], "big") / 32768.0
+            - 1.0
+            + math.sin(i // 2 * 0.1) * 0.1
+            for i in range(0, len(digest), 2)
+        ]
+        norm = math.sqrt(sum(value * value for value in values))
+        return [value / norm for value in values] if norm else values
+
+
+class LocalFeatureBackend:
+    """Colour histogram + HOG + perceptual hash features (NumPy/Pillow, CPU).
+
+    Block sizes add up to ``EMBEDDING_DIM``: 256 colour bins (16 hue x 4
+    saturation x 4 value), 128 gradient bins (4x4 cells x 8 orientations) and
+    128 hash bits (64 DCT pHash + 64 dHash).  Each block is normalised and
+    weighted before the whole vector is scaled to unit length.
+    """
+
+    name = "local-features-v1"
+    dim = EMBEDDING_DIM
+
+    SIZE = 64
+    GRAY_SIZE = 32
+    HUE_BINS, SAT_BINS, VAL_BINS = 16, 4, 4
+    HOG_CELLS, HOG_BINS = 4, 8
+    WEIGHTS = (0.5, 0.3, 0.2)
+
+    def __init__(self) -> None:
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy and Pillow are required for local embeddings")
+        n = self.GRAY_SIZE
+        k = np.arange(n)[:, None]
+        x = np.arange(n)[None, :]
+        # Orthonormal DCT-II basis for the pHash block
+        dct = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+        dct[0] /= np.sqrt(2.0)
+        self._dct = dct.astype(np.float32)
+
+    def embed(self, data: bytes) -> list[float]:
+        with Image.open(io.BytesIO(data)) as image:
+            # JPEG decoders can downscale while decoding; far cheaper than resize
+            image.draft("RGB", (self.SIZE * 2, self.SIZE * 2))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            small = image.resize((self.SIZE, self.SIZE), Image.BILINEAR)
+        gray = small.convert("L").resize((self.GRAY_SIZE, self.GRAY_SIZE))
+        gray_pixels = np.asarray(gray, dtype=np.float32) / 255.0
+
+        blocks = (
+            self._colour_histogram(small),
+            self._gradient_histogram(gray_pixels),
+            self._hash_bits(gray_pixels, small),
+        )
+        parts = []
+        for block, weight in zip(blocks, self.WEIGHTS):
+            norm = np.linalg.norm(block)
+            parts.append(block * (weight / norm) if norm > 0 else block)
+        vector = np.concatenate(parts)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        return vector.astype(np.float64).tolist()
+
+    def _colour_histogram(self, image) -> "np.ndarray":
+        hsv = np.asarray(image.convert("HSV"), dtype=np.uint16).reshape(-1, 3)
+        hue = hsv[:, 0] * self.HUE_BINS // 256
+        sat = hsv[:, 1] * self.SAT_BINS // 256
+        val = hsv[:, 2] * self.VAL_BINS // 256
+        index = (hue * self.SAT_BINS + sat) * self.VAL_BINS + val
+        size = self.HUE_BINS * self.SAT_BINS * self.VAL_BINS
+        counts = np.bincount(index, minlength=size).astype(np.float32)
+        # Square root (Hellinger) keeps one dominant colour from swamping the rest
+        return np.sqrt(counts / counts.sum())
+
+    def _gradient_histogram(self, gray: "np.ndarray") -> "np.ndarray":
+        gy, gx = np.gradient(gray)
+        magnitude = np.hypot(gx, gy)
+        # Unsigned orientation in [0, pi)
+        orientation = np.mod(np.arctan2(gy, gx), np.pi)
+        bins = np.minimum(
+            (orientation / np.pi * self.HOG_BINS).astype(np.intp), self.HOG_BINS - 1
+        )
+        cell_size = gray.shape[0] // self.HOG_CELLS
+        rows = np.arange(gray.shape[0]) // cell_size
+        cols = np.arange(gray.shape[1]) // cell_size
+        cell = rows[:, None] * self.HOG_CELLS + cols[None, :]
+        index = (cell * self.HOG_BINS + bins).ravel()
+        size = self.HOG_CELLS * self.HOG_CELLS * self.HOG_BINS
+        return np.bincount(index, weights=magnitude.ravel(), minlength=size).astype(
+            np.float32
+        )
+
+    def _hash_bits(self, gray: "np.ndarray", image) -> "np.ndarray":
+        coefficients = self._dct @ gray @ self._dct.T
+        low = coefficients[:8, :8].ravel()
+        phash = np.where(low > np.median(low[1:]), 1.0, -1.0)
+        strip = np.asarray(image.convert("L").resize((9, 8)), dtype=np.float32)
+        dhash = np.where(strip[:, 1:] > strip[:, :-1], 1.0, -1.0).ravel()
+        return np.concatenate([phash, dhash]).astype(np.float32)
+
+
+_BACKENDS = {
+    "local": LocalFeatureBackend,
+    "content-hash": ContentHashBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_embedding_backend(key: str = DEFAULT_BACKEND) -> EmbeddingBackend:
+    """Shared backend instance for ``key`` (one per process)."""
+    try:
+        factory = _BACKENDS[key]
+    except KeyError:
+        raise RuntimeError(f"Unsupported photo embedding backend: {key}") from None
+    if factory is LocalFeatureBackend and not NUMPY_AVAILABLE:
+        logger.error(
+            "DEGRADED: numpy/Pillow are missing from this install; the local "
+            "photo embedding backend is replaced by content-hash, which only "
+            "matches identical files. Install requirements.txt to fix."
+        )
+        return ContentHashBackend()
+    return factory()
+
+
+def digest_file(path: Path) -> str:
+    """sha256 of a file's content; the embedding cache key."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(_READ_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def digest_files(paths: Sequence[str]) -> list[Optional[str]]:
+    results: list[Optional[str]] = []
+    for path in paths:
+        try:
+            results.append(digest_file(Path(path)))
+        except OSError as exc:
+            logger.warning(f"Failed to read photo {path}: {exc}")
+            results.append(None)
+    return results
+
+
+def embed_files(key: str, paths: Sequence[str]) -> list[Optional[list[float]]]:
+    """Embed image files with backend ``key``; None for unreadable images."""
+    backend = get_embedding_backend(key)
+    results: list[Optional[list[float]]] = []
+    for path in paths:
+        try:
+            results.append(backend.embed(Path(path).read_bytes()))
+        except Exception as exc:
+            logger.warning(f"Failed to compute embedding for {path}: {exc}")
+            results.append(None)
+    return results
+
+
+__all__ = [
+    "ContentHashBackend",
+    "DEFAULT_BACKEND",
+    "EMBEDDING_DIM",
+    "EmbeddingBackend",
+    "LocalFeatureBackend",
+    "digest_file",
+    "digest_files",
+    "embed_files",
+    "get_embedding_backend",
+]
@@ -1,36 +1,220 @@
 """Photo embedding service for computing similarity vectors from therapist photos.
 
 This service handles the computation and storage of photo embeddings used for similarity matching.
-For MVP, we use a simple image feature extractor. In production, this would use a proper
-vision model like CLIP or similar.
+Vectors come from a pluggable backend (see ``photo_embedding_backends``) applied
+to the stored image file, and are cached by content hash so an identical photo
+is only embedded once, whatever its URL.
 """
 
-import hashlib
-import io
+import asyncio
 import logging
+from concurrent.futures import Executor
 from datetime import datetime, UTC
-from typing import Optional, Sequence
+from typing import Any, Optional, Sequence
+from uuid import UUID
 
-try:
-    import numpy as np
-    from PIL import Image
-
-    NUMPY_AVAILABLE = True
-except ImportError:
-    np = None  # type: ignore
-    Image = None  # type: ignore
-    NUMPY_AVAILABLE = False
-
-import requests
-from sqlalchemy import select, update
+from sqlalchemy import and_, bindparam, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ....models import Therapist
+from ....models import PhotoEmbeddingCache, Therapist
+from ....settings import settings
+from ....storage import MediaStorage, get_media_storage
+from .photo_embedding_backends import (
+    EMBEDDING_DIM,
+    digest_files,
+    embed_files,
+    get_embedding_backend,
+)
 
 logger = logging.getLogger(__name__)
 
-# Embedding dimensions - using 512 for balance between accuracy and storage
-EMBEDDING_DIM = 512
+
+# Columns needed to pick and embed a therapist's photo
+_PHOTO_COLUMNS = (
+    Therapist.id,
+    Therapist.photo_urls,
+    Therapist.main_photo_index,
+    Therapist.updated_at,
+)
+
+
+async def _run(executor: Optional[Executor], fn, *args):
+    if executor is None:
+        return await asyncio.to_thread(fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def embed_photo_urls(
+    db: AsyncSession,
+    photo_urls: Sequence[str],
+    *,
+    executor: Optional[Executor] = None,
+    backend: Optional[str] = None,
+    storage: Optional[MediaStorage] = None,
+) -> dict[str, Optional[list[float]]]:
+    """Embeddings for stored photo URLs, reusing cached vectors by content.
+
+    Files are hashed, cached vectors are fetched in one query, and only
+    distinct uncached images are embedded (in ``executor`` when given, e.g. a
+    process pool).  New vectors are added to the cache in ``db``; the caller
+    commits.  URLs without a local file map to None.
+    """
+    key = backend or settings.photo_embedding_backend
+    backend_name = get_embedding_backend(key).name
+    storage = storage or get_media_storage()
+
+    paths: dict[str, str] = {}
+    for url in dict.fromkeys(photo_urls):
+        path = storage.local_path(url)
+        if path is None:
+            logger.info(f"No local file for photo {url}")
+        else:
+            paths[url] = str(path)
+
+    digests = dict(zip(paths, await _run(executor, digest_files, list(paths.values()))))
+    hashes = {digest for digest in digests.values() if digest}
+    vectors: dict[str, list[float]] = {}
+    if hashes:
+        result = await db.execute(
+            select(
+                PhotoEmbeddingCache.content_hash, PhotoEmbeddingCache.embedding
+            ).where(
+                PhotoEmbeddingCache.backend == backend_name,
+                PhotoEmbeddingCache.content_hash.in_(hashes),
+            )
+        )
+        vectors.update((digest, list(embedding)) for digest, embedding in result.all())
+
+    # One file per distinct uncached image
+    missing: dict[str, str] = {}
+    for url, digest in digests.items():
+        if digest and digest not in vectors:
+            missing.setdefault(digest, paths[url])
+    if missing:
+        computed = await _run(executor, embed_files, key, list(missing.values()))
+        fresh = [
+            {"content_hash": digest, "backend": backend_name, "embedding": embedding}
+            for digest, embedding in zip(missing, computed)
+            if embedding is not None
+        ]
+        if fresh:
+            await db.execute(
+                pg_insert(PhotoEmbeddingCache).values(fresh).on_conflict_do_nothing()
+            )
+        vectors.update((row["content_hash"], row["embedding"]) for row in fresh)
+
+    return {
+        url: vectors.get(digests.get(url) or "") for url in dict.fromkeys(photo_urls)
+    }
+
+
+def select_main_photo(
+    photo_urls: Optional[Sequence[str]], main_photo_index: Optional[int]
+) -> Optional[tuple[int, str]]:
+    """Index and URL of the photo to embed (main photo, else the first)."""
+    if not photo_urls:
+        return None
+    index = main_photo_index or 0
+    if index >= len(photo_urls):
+        index = 0
+    return index, photo_urls[index]
+
+
+def needs_embedding_clause():
+    """SQL condition for therapists whose embedding is missing or stale."""
+    return and_(
+        Therapist.photo_urls != None,  # noqa: E711
+        func.cardinality(Therapist.photo_urls) > 0,
+        or_(
+            Therapist.photo_embedding == None,  # noqa: E711
+            Therapist.photo_embedding_computed_at == None,  # noqa: E711
+            Therapist.updated_at > Therapist.photo_embedding_computed_at,
+        ),
+    )
+
+
+def stale_photos_query(after_id: Optional[UUID] = None, limit: int = 100):
+    """Next page (by id) of published therapists needing an embedding."""
+    query = select(*_PHOTO_COLUMNS).where(
+        Therapist.status == "published", needs_embedding_clause()
+    )
+    if after_id is not None:
+        query = query.where(Therapist.id > after_id)
+    return query.order_by(Therapist.id).limit(limit)
+
+
+async def prepare_embedding_updates(
+    db: AsyncSession, rows: Sequence[Any], *, executor: Optional[Executor] = None
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """Embed the main photo of each ``_PHOTO_COLUMNS`` row.
+
+    Returns the :func:`write_embeddings` rows and the ids that got no vector.
+    """
+    photos = {}
+    failed = []
+    for row in rows:
+        photo = select_main_photo(row.photo_urls, row.main_photo_index)
+        if photo is None:
+            logger.info(f"Therapist {row.id} has no photos")
+            failed.append(str(row.id))
+        else:
+            photos[row.id] = photo
+    embeddings = await embed_photo_urls(
+        db, [url for _, url in photos.values()], executor=executor
+    )
+
+    computed_at = datetime.now(UTC)
+    updates = []
+    for row in rows:
+        if row.id not in photos:
+            continue
+        main_index, photo_url = photos[row.id]
+        embedding = embeddings.get(photo_url)
+        if embedding is None:
+            logger.warning(f"Failed to compute embedding for therapist {row.id}")
+            failed.append(str(row.id))
+            continue
+        updates.append(
+            {
+                "id": row.id,
+                "seen_updated_at": row.updated_at,
+                "embedding": embedding,
+                "main_photo_index": main_index,
+                "computed_at": computed_at,
+            }
+        )
+    return updates, failed
+
+
+async def write_embeddings(db: AsyncSession, rows: Sequence[dict[str, Any]]) -> None:
+    """Store computed embeddings with one executemany UPDATE.
+
+    Each row carries ``id``, ``seen_updated_at`` (the ``updated_at`` read when
+    the photo was picked), ``embedding``, ``main_photo_index`` and
+    ``computed_at``.  Therapists edited since then are left alone - they are
+    stale again and the next run picks them up.  ``updated_at`` is kept as-is
+    so storing an embedding never marks the row stale by itself.
+    """
+    if not rows:
+        return
+    table = Therapist.__table__
+    stmt = (
+        table.update()
+        .where(
+            table.c.id == bindparam("b_id"),
+            table.c.updated_at == bindparam("b_seen_updated_at"),
+        )
+        .values(
+            photo_embedding=bindparam("b_embedding"),
+            photo_embedding_computed_at=bindparam("b_computed_at"),
+            main_photo_index=bindparam("b_main_photo_index"),
+            updated_at=table.c.updated_at,
+        )
+    )
+    await db.execute(
+        stmt, [{f"b_{key}": value for key, value in row.items()} for row in rows]
+    )
 
 
 class PhotoEmbeddingService:
@@ -42,151 +226,75 @@ class PhotoEmbeddingService:
     async def compute_embedding_for_photo_url(
         self, photo_url: str
     ) -> Optional[list[float]]:
-        """Compute embedding vector for a single photo URL.
-
-        For MVP, this generates a deterministic pseudo-embedding based on the URL.
-        In production, this would:
-        1. Download the image
-        2. Preprocess it (resize, normalize)
-        3. Pass through a vision model (CLIP, ResNet, etc.)
-        4. Return the feature vector
-        """
-        if not NUMPY_AVAILABLE:
-            logger.warning("numpy not available, cannot compute photo embedding")
-            return None
+        """Compute embedding vector for a single stored photo URL.
 
-        try:
-            # For MVP: Generate deterministic pseudo-embedding from URL hash
-            # This ensures same photo always gets same embedding
-            url_hash = hashlib.sha256(photo_url.encode()).hexdigest()
-
-            # Convert hash to numbers and normalize
-            # Take chunks of the hash and convert to floats
-            embedding = []
-            chunk_size = len(url_hash) // EMBEDDING_DIM
-
-            for i in range(EMBEDDING_DIM):
-                chunk = url_hash[i * chunk_size : (i + 1) * chunk_size]
-                # Convert hex to int and normalize to [-1, 1]
-                value = int(chunk[:4], 16) / 32768.0 - 1.0
-                embedding.append(value)
-
-            # Add some variation based on position
-            for i in range(len(embedding)):
-                embedding[i] += np.sin(i * 0.1) * 0.1
-
-            # Normalize to unit vector
-            norm = np.linalg.norm(embedding)
-            if norm > 0:
-                embedding = [x / norm for x in embedding]
-
-            return embedding
-
-        except Exception as e:
-            logger.warning(f"Failed to compute embedding for {photo_url}: {e}")
-            return None
+        Uses the configured backend and the content-hash cache; returns None
+        when the photo has no local file or cannot be decoded.
+        """
+        embeddings = await embed_photo_urls(self.db, [photo_url])
+        await self.db.commit()
+        return embeddings.get(photo_url)
 
     async def compute_therapist_embedding(self, therapist_id: str) -> bool:
         """Compute and store photo embedding for a therapist.
 
         Returns True if successful, False otherwise.
         """
-        try:
-            # Fetch therapist
-            result = await self.db.execute(
-                select(Therapist).where(Therapist.id == therapist_id)
-            )
-            therapist = result.scalar_one_or_none()
-
-            if not therapist:
-                logger.warning(f"Therapist {therapist_id} not found")
-                return False
-
-            # Check if therapist has photos
-            if not therapist.photo_urls or len(therapist.photo_urls) == 0:
-                logger.info(f"Therapist {therapist_id} has no photos")
-                return False
-
-            # Use main photo or first photo
-            main_index = therapist.main_photo_index or 0
-            if main_index >= len(therapist.photo_urls):
-                main_index = 0
-
-            photo_url = therapist.photo_urls[main_index]
-
-            # Compute embedding
-            embedding = await self.compute_embedding_for_photo_url(photo_url)
-
-            if embedding is None:
-                logger.warning(
-                    f"Failed to compute embedding for therapist {therapist_id}"
-                )
-                return False
-
-            # Update therapist with embedding
-            await self.db.execute(
-                update(Therapist)
-                .where(Therapist.id == therapist_id)
-                .values(
-                    photo_embedding=embedding,
-                    photo_embedding_computed_at=datetime.now(UTC),
-                    main_photo_index=main_index,
-                )
-            )
-            await self.db.commit()
-
-            logger.info(f"Successfully computed embedding for therapist {therapist_id}")
-            return True
-
-        except Exception as e:
-            logger.error(f"Error computing embedding for therapist {therapist_id}: {e}")
-            await self.db.rollback()
+        results = await self._embed_and_store(
+            select(*_PHOTO_COLUMNS).where(Therapist.id == therapist_id)
+        )
+        if not results:
+            logger.warning(f"Therapist {therapist_id} not found")
             return False
+        return results[str(therapist_id)]
 
     async def compute_embeddings_batch(
-        self, therapist_ids: Optional[Sequence[str]] = None, limit: int = 100
+        self,
+        therapist_ids: Optional[Sequence[str]] = None,
+        limit: int = 100,
+        *,
+        published_only: bool = True,
     ) -> dict[str, bool]:
         """Compute embeddings for multiple therapists.
 
+        Embeddings are written with one bulk UPDATE and one commit per call.
+
         Args:
-            therapist_ids: Specific therapist IDs to process. If None, process uncomputed ones.
+            therapist_ids: Specific therapist IDs to process. If None, process
+                therapists whose embedding is missing or stale.
             limit: Maximum number to process in this batch.
+            published_only: Skip unpublished therapists among ``therapist_ids``.
 
         Returns:
             Dict mapping therapist_id to success status.
         """
-        results = {}
-
-        try:
-            # Build query
-            query = select(Therapist).where(
+        if not therapist_ids:
+            return await self._embed_and_store(stale_photos_query(limit=limit))
+        query = select(*_PHOTO_COLUMNS).where(Therapist.id.in_(therapist_ids))
+        if published_only:
+            query = query.where(
                 Therapist.status == "published", Therapist.photo_urls != None
             )
+        return await self._embed_and_store(query.order_by(Therapist.id).limit(limit))
 
-            if therapist_ids:
-                query = query.where(Therapist.id.in_(therapist_ids))
-            else:
-                # Process therapists without embeddings
-                query = query.where(Therapist.photo_embedding == None)
-
-            query = query.limit(limit)
-
-            # Fetch therapists
-            result = await self.db.execute(query)
-            therapists = result.scalars().all()
-
-            logger.info(f"Processing {len(therapists)} therapists for embeddings")
+    async def _embed_and_store(self, query) -> dict[str, bool]:
+        results: dict[str, bool] = {}
+        try:
+            rows = (await self.db.execute(query)).all()
+            logger.info(f"Processing {len(rows)} therapists for embeddings")
 
-            # Process each therapist
-            for therapist in therapists:
-                success = await self.compute_therapist_embedding(str(therapist.id))
-                results[str(therapist.id)] = success
+            updates, failed = await prepare_embedding_updates(self.db, rows)
+            results = {str(row.id): True for row in rows}
+            results.update((therapist_id, False) for therapist_id in failed)
 
+            await write_embeddings(self.db, updates)
+            await self.db.commit()
             return results
 
         except Exception as e:
             logger.error(f"Error in batch embedding computation: {e}")
-            return results
+            await self.db.rollback()
+            return {therapist_id: False for therapist_id in results}
 
     async def needs_recomputation(self, therapist_id: str) -> bool:
         """Check if a therapist needs embedding recomputation.
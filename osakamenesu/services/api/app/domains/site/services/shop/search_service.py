@@ -4,7 +4,7 @@ import logging
 import time as time_module
 from collections import defaultdict
 from datetime import date, datetime, time, timedelta
-from typing import Any, Dict, Iterable, List, Set
+from typing import Any, Dict, Iterable, List, Optional, Set
 from uuid import UUID, uuid4
 
 from sqlalchemy import select, func, or_
@@ -12,6 +12,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
 from app.meili import build_filter, search as meili_search
+from app.monitoring.health import get_health_monitor
+from app.services.image_variants import load_image_variants, variants_by_url
 from app.schemas import (
     FacetValue,
     NextAvailableSlot,
@@ -27,6 +29,11 @@ from .shared import normalize_promotions, normalize_staff_uuid, safe_float, safe
 
 logger = logging.getLogger(__name__)
 
+
+class MeiliUnavailable(RuntimeError):
+    """Meilisearch is skipped while the health monitor reports it degraded."""
+
+
 PRICE_BAND_LABELS: Dict[str, str] = {key: label for key, *_rest, label in PRICE_BANDS}
 PRICE_BAND_LABELS.setdefault("unknown", "価格未設定")
 SERVICE_TYPE_LABELS: Dict[str, str] = {
@@ -97,7 +104,10 @@ def _facet_label(name: str, value: str) -> str:
     return value
 
 
-def _normalize_staff_preview(raw: Any) -> List[ShopStaffPreview]:
+def _normalize_staff_preview(
+    raw: Any, image_variants: Optional[Dict[str, list]] = None
+) -> List[ShopStaffPreview]:
+    image_variants = image_variants or {}
     previews: List[ShopStaffPreview] = []
     if not isinstance(raw, list):
         return previews
@@ -155,6 +165,7 @@ def _normalize_staff_preview(raw: Any) -> List[ShopStaffPreview]:
                 avatar_url=(str(entry.get("avatar_url")).strip() or None)
                 if entry.get("avatar_url") is not None
                 else None,
+                avatar_variants=image_variants.get(entry.get("avatar_url")) or [],
                 specialties=specialties,
                 today_available=today_available,
                 next_available_at=next_available_at,
@@ -173,6 +184,7 @@ def _doc_to_shop_summary(doc: Dict[str, Any]) -> ShopSummary:
     review_score = doc.get("review_score")
     rating = review_score if review_score is not None else doc.get("rating")
     review_count = doc.get("review_count")
+    image_variants = variants_by_url(doc)
     return ShopSummary(
         id=UUID(doc["id"]),
         slug=doc.get("slug"),
@@ -194,6 +206,7 @@ def _doc_to_shop_summary(doc: Dict[str, Any]) -> ShopSummary:
         rating=rating,
         review_count=review_count,
         lead_image_url=first_photo,
+        lead_image_variants=image_variants.get(first_photo) or [],
         badges=list(doc.get("ranking_badges", []) or []),
         today_available=doc.get("today"),
         next_available_at=None,
@@ -210,7 +223,9 @@ def _doc_to_shop_summary(doc: Dict[str, Any]) -> ShopSummary:
         ranking_score=doc.get("ranking_score"),
         diary_count=doc.get("diary_count"),
         has_diaries=doc.get("has_diaries"),
-        staff_preview=_normalize_staff_preview(doc.get("staff_preview")),
+        staff_preview=_normalize_staff_preview(
+            doc.get("staff_preview"), image_variants
+        ),
     )
 
 
@@ -384,8 +399,11 @@ async def _derive_next_availability_from_slots_sot(
     return results
 
 
-def _profile_to_shop_summary(profile: models.Profile) -> ShopSummary:
+def _profile_to_shop_summary(
+    profile: models.Profile, image_variants: Optional[Dict[str, list]] = None
+) -> ShopSummary:
     """Convert a Profile model to ShopSummary."""
+    image_variants = image_variants or {}
     first_photo = None
     if profile.photos and len(profile.photos) > 0:
         first_photo = profile.photos[0]
@@ -438,6 +456,7 @@ def _profile_to_shop_summary(profile: models.Profile) -> ShopSummary:
                         avatar_url=str(s.get("avatar_url"))
                         if s.get("avatar_url")
                         else None,
+                        avatar_variants=image_variants.get(s.get("avatar_url")) or [],
                         specialties=s.get("specialties", [])
                         if isinstance(s.get("specialties"), list)
                         else [],
@@ -473,6 +492,7 @@ def _profile_to_shop_summary(profile: models.Profile) -> ShopSummary:
         rating=rating,
         review_count=review_count,
         lead_image_url=first_photo,
+        lead_image_variants=image_variants.get(first_photo) or [],
         badges=profile.ranking_badges or [],
         today_available=None,
         next_available_at=None,
@@ -493,6 +513,15 @@ def _profile_to_shop_summary(profile: models.Profile) -> ShopSummary:
     )
 
 
+def _profile_image_urls(profile: models.Profile) -> list[str]:
+    """Lead photo and staff avatars ``_profile_to_shop_summary`` shows."""
+    urls = list((profile.photos or [])[:1])
+    staff = (profile.contact_json or {}).get("staff")
+    if isinstance(staff, list):
+        urls.extend(s.get("avatar_url") for s in staff[:3] if isinstance(s, dict))
+    return [url for url in urls if url]
+
+
 async def _search_from_postgres(
     db: AsyncSession,
     *,
@@ -543,7 +572,10 @@ async def _search_from_postgres(
     result = await db.execute(stmt)
     profiles = result.scalars().all()
 
-    shops = [_profile_to_shop_summary(p) for p in profiles]
+    image_variants = await load_image_variants(
+        db, (url for p in profiles for url in _profile_image_urls(p))
+    )
+    shops = [_profile_to_shop_summary(p, image_variants) for p in profiles]
     return shops, total
 
 
@@ -726,7 +758,11 @@ async def _search_shops_impl(
             "today",
         ],
     }
+    health = get_health_monitor()
     try:
+        if health is not None and not health.is_available("meilisearch"):
+            # Don't wait on a Meili the health checks already found down or slow
+            raise MeiliUnavailable("meilisearch is degraded")
         res = meili_search(
             q=params.get("q"),
             filter_expr=params.get("filter"),
@@ -736,7 +772,12 @@ async def _search_shops_impl(
             facets=params.get("facets"),
         )
     except Exception as e:
-        logger.warning("meili_search failed, falling back to PostgreSQL: %s", e)
+        if isinstance(e, MeiliUnavailable):
+            logger.debug("%s, searching PostgreSQL directly", e)
+        else:
+            if health is not None:
+                health.report_failure("meilisearch")
+            logger.warning("meili_search failed, falling back to PostgreSQL: %s", e)
         results, total = await _search_from_postgres(
             db,
             q=q,
@@ -2,17 +2,18 @@
 
 from __future__ import annotations
 
-from datetime import date, datetime, timedelta
+from datetime import datetime, timedelta
 from typing import Any
 from uuid import UUID
 
 from pydantic import BaseModel, Field
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from .....models import Profile, Therapist, TherapistShift
+from .....models import Profile, Therapist
+from .....utils.cache import therapist_slots_cache, therapist_slots_cache_key
 from .....utils.datetime import now_jst
+from ...therapist_availability import list_daily_slots_batch
 from .shared import ShopNotFoundError
 
 
@@ -167,37 +168,44 @@ class ShopTherapistsService:
         if profile is None or getattr(profile, "status", "draft") != "published":
             raise ShopNotFoundError("shop not found")
 
-        # Fetch published therapists
+        # Fetch the page of published therapists; the total comes from a window
+        # count over the same filter instead of a second query.
         offset = max(page - 1, 0) * page_size
+        published = (
+            Therapist.profile_id == shop_id,
+            Therapist.status == "published",
+        )
         stmt = (
-            select(Therapist)
-            .where(
-                Therapist.profile_id == shop_id,
-                Therapist.status == "published",
-            )
+            select(Therapist, func.count().over().label("total"))
+            .where(*published)
             .order_by(
                 Therapist.display_order.asc().nulls_last(), Therapist.created_at.desc()
             )
             .offset(offset)
             .limit(page_size)
         )
-        result = await self.db.execute(stmt)
-        therapists = result.scalars().all()
-
-        # Count total
-        count_stmt = select(Therapist.id).where(
-            Therapist.profile_id == shop_id,
-            Therapist.status == "published",
-        )
-        count_result = await self.db.execute(count_stmt)
-        total = len(count_result.scalars().all())
+        rows = (await self.db.execute(stmt)).all()
+        therapists = [row[0] for row in rows]
+        if rows:
+            total = int(rows[0][1])
+        elif offset == 0:
+            total = 0
+        else:
+            # Page past the end: no row carries the window count.
+            total = int(
+                await self.db.scalar(
+                    select(func.count()).select_from(Therapist).where(*published)
+                )
+                or 0
+            )
 
         # Fetch availability if requested
-        availability_map: dict[UUID, list[TherapistShift]] = {}
+        availability_map: dict[UUID, list[tuple[datetime, datetime]]] = {}
         if include_availability and therapists:
-            therapist_ids = [t.id for t in therapists]
             availability_map = await self._fetch_availability(
-                therapist_ids, days=availability_days
+                [t.id for t in therapists],
+                days=availability_days,
+                buffer_minutes=int(getattr(profile, "buffer_minutes", 0) or 0),
             )
 
         # Build response
@@ -206,10 +214,12 @@ class ShopTherapistsService:
         items: list[TherapistListItem] = []
 
         for therapist in therapists:
-            shifts = availability_map.get(therapist.id, [])
-            slots = self._build_availability_slots(shifts)
+            open_slots = availability_map.get(therapist.id, [])
+            slots = self._build_availability_slots(open_slots)
             today_available = any(
-                slot.starts_at.date() == today and slot.is_available for slot in slots
+                slot.starts_at.astimezone(now.tzinfo).date() == today
+                and slot.is_available
+                for slot in slots
             )
             next_available_at = self._find_next_available(slots, now)
 
@@ -239,7 +249,7 @@ class ShopTherapistsService:
             avatar_url = photo_urls[0] if photo_urls else None
 
             # Compute recommended score
-            has_availability = bool(shifts)
+            has_availability = bool(open_slots)
             recommended_score = round(
                 _compute_simple_recommended_score(therapist, profile, has_availability),
                 3,
@@ -275,57 +285,76 @@ class ShopTherapistsService:
         therapist_ids: list[UUID],
         *,
         days: int = 7,
-    ) -> dict[UUID, list[TherapistShift]]:
-        """Fetch availability shifts for therapists.
+        buffer_minutes: int = 0,
+    ) -> dict[UUID, list[tuple[datetime, datetime]]]:
+        """Fetch open slots for therapists from the availability SoT.
+
+        Slots are cached per therapist-day; therapists with any uncached day
+        are computed together in one batch (shifts, breaks, reservations and
+        buffer) for the whole range.
 
         Args:
-            therapist_ids: List of therapist IDs
-            days: Number of days to fetch
+            therapist_ids: List of therapist IDs (all from the same shop)
+            days: Number of days after today to fetch
+            buffer_minutes: Shop buffer between reservations
 
         Returns:
-            Map of therapist ID to shifts
+            Map of therapist ID to open (start, end) intervals in time order
         """
-        now = now_jst()
-        start_date = now.date()
-        end_date = start_date + timedelta(days=days)
-
-        stmt = select(TherapistShift).where(
-            TherapistShift.therapist_id.in_(therapist_ids),
-            TherapistShift.date >= start_date,
-            TherapistShift.date <= end_date,
-            TherapistShift.availability_status == "available",
-        )
-        result = await self.db.execute(stmt)
-        shifts = result.scalars().all()
-
-        # Group by therapist
-        availability_map: dict[UUID, list[TherapistShift]] = {}
-        for shift in shifts:
-            if shift.therapist_id not in availability_map:
-                availability_map[shift.therapist_id] = []
-            availability_map[shift.therapist_id].append(shift)
-
-        return availability_map
+        start_date = now_jst().date()
+        day_list = [start_date + timedelta(days=offset) for offset in range(days + 1)]
+        keys = {
+            (therapist_id, day): therapist_slots_cache_key(therapist_id, day)
+            for therapist_id in therapist_ids
+            for day in day_list
+        }
+        cached = await therapist_slots_cache.get_many(list(keys.values()))
+
+        missing = [
+            therapist_id
+            for therapist_id in therapist_ids
+            if any(keys[(therapist_id, day)] not in cached for day in day_list)
+        ]
+        if missing:
+            computed = await list_daily_slots_batch(
+                self.db,
+                missing,
+                day_list[0],
+                day_list[-1],
+                buffer_minutes={
+                    therapist_id: buffer_minutes for therapist_id in missing
+                },
+            )
+            fresh = {
+                keys[(therapist_id, day)]: slots
+                for therapist_id, by_day in computed.items()
+                for day, slots in by_day.items()
+            }
+            await therapist_slots_cache.set_many(fresh)
+            cached.update(fresh)
+
+        return {
+            therapist_id: [
+                slot
+                for day in day_list
+                for slot in cached.get(keys[(therapist_id, day)], [])
+            ]
+            for therapist_id in therapist_ids
+        }
 
     def _build_availability_slots(
         self,
-        shifts: list[TherapistShift],
+        open_slots: list[tuple[datetime, datetime]],
     ) -> list[AvailabilitySlotResponse]:
-        """Convert shifts to availability slots."""
-        slots: list[AvailabilitySlotResponse] = []
-        for shift in shifts:
-            if not shift.start_at or not shift.end_at:
-                continue
-            slots.append(
-                AvailabilitySlotResponse(
-                    starts_at=shift.start_at,
-                    ends_at=shift.end_at,
-                    is_available=shift.availability_status == "available",
-                )
+        """Convert open intervals to availability slots."""
+        return [
+            AvailabilitySlotResponse(
+                starts_at=starts_at,
+                ends_at=ends_at,
+                is_available=True,
             )
-        # Sort by start time
-        slots.sort(key=lambda s: s.starts_at)
-        return slots
+            for starts_at, ends_at in open_slots
+        ]
 
     def _find_next_available(
         self,
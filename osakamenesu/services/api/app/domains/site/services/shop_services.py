@@ -32,6 +32,7 @@ from ....schemas import (
     StaffTags,
     DiarySnippet,
 )
+from ....services.therapist_features import get_feature_table
 from ....utils.profiles import compute_review_summary, normalize_review_aspects
 from ....utils.datetime import now_jst
 from ....utils.text import normalize_contact_value
@@ -358,9 +359,15 @@ async def _get_shop_detail_impl(
 
     staff_members: List[StaffSummary] = []
     default_intent = GuestIntent()
-    for therapist in getattr(profile, "therapists", []):
-        if getattr(therapist, "status", "draft") != "published":
-            continue
+    published_therapists = [
+        therapist
+        for therapist in getattr(profile, "therapists", [])
+        if getattr(therapist, "status", "draft") == "published"
+    ]
+    staff_features = get_feature_table().features_for(
+        [therapist.id for therapist in published_therapists]
+    )
+    for therapist, features in zip(published_therapists, staff_features):
         avatar_url = None
         photo_list = getattr(therapist, "photo_urls", None) or []
         if photo_list:
@@ -375,7 +382,12 @@ async def _get_shop_detail_impl(
             if getattr(therapist, "mood_tag", None)
             else None,
             price_tier=getattr(therapist, "price_rank", None) or 1,
-            availability_score=0.5,
+            total_bookings_30d=features.total_bookings_30d,
+            repeat_rate_30d=features.repeat_rate_30d,
+            avg_review_score=features.avg_review_score,
+            days_since_first_shift=features.days_since_first_shift,
+            utilization_7d=features.utilization_7d,
+            availability_score=features.availability_score,
         )
         score = compute_recommended_score(default_intent, therapist_profile)
 
@@ -7,7 +7,7 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...db import get_session
+from ...db import get_read_session, get_session
 from ...schemas import ReviewCreateRequest
 from ...utils.cache import shop_cache
 from .services.shop.search_service import ShopSearchService
@@ -165,7 +165,7 @@ async def search_shops(
     sort: str | None = Query(default=None),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=12, ge=1, le=50),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     service = ShopSearchService(db)
     return await service.search(
@@ -199,7 +199,7 @@ async def search_shops(
 
 
 @router.get("/{shop_id}")
-async def get_shop_detail(shop_id: str, db: AsyncSession = Depends(get_session)):
+async def get_shop_detail(shop_id: str, db: AsyncSession = Depends(get_read_session)):
     # Try sample data first (for demo/development)
     sample_response = _get_sample_shop_response(shop_id)
     if sample_response:
@@ -225,7 +225,7 @@ async def list_shop_diaries(
     shop_id: UUID,
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=6, ge=1, le=20),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     service = ShopDiaryService(db)
     try:
@@ -240,7 +240,7 @@ async def get_shop_availability(
     shop_id: UUID,
     date_from: date | None = Query(default=None),
     date_to: date | None = Query(default=None),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     service = ShopAvailabilityService(db)
     try:
@@ -259,7 +259,7 @@ async def list_shop_reviews(
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=10, ge=1, le=50),
     sort_by: str = Query(default="newest", pattern="^(newest|highest|lowest)$"),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     service = ShopReviewService(db)
     try:
@@ -293,34 +293,35 @@ def _get_sample_therapists_response(shop_slug: str) -> dict | None:
     therapists = sample.get("therapists", [])
     # Build a lookup for additional therapist info (age, photos, etc.)
     therapist_lookup = {t["id"]: t for t in therapists}
-    return {
-        "shop_id": sample.get("id", "sample-shop-id"),
-        "total": len(staff),
-        "items": [
+    items = []
+    for s in staff:
+        extra = therapist_lookup.get(s["id"], {})
+        items.append(
             {
                 "id": s["id"],
                 "name": s["name"],
                 "alias": s.get("alias"),
-                "age": therapist_lookup.get(s["id"], {}).get("age"),
+                "age": extra.get("age"),
                 "headline": s.get("headline"),
                 "avatar_url": s.get("avatar_url"),
-                "photos": therapist_lookup.get(s["id"], {}).get(
+                "photos": extra.get(
                     "photos", [s["avatar_url"]] if s.get("avatar_url") else []
                 ),
                 "specialties": s.get("specialties", []),
-                "tags": therapist_lookup.get(s["id"], {}).get("tags"),
-                "price_rank": therapist_lookup.get(s["id"], {}).get("price_rank"),
-                "today_available": therapist_lookup.get(s["id"], {}).get(
-                    "available_today", False
-                ),
+                "tags": extra.get("tags"),
+                "price_rank": extra.get("price_rank"),
+                "today_available": extra.get("available_today", False),
                 "next_available_at": None,
                 "availability_slots": [],
                 "recommended_score": s.get("recommended_score"),
                 "rating": s.get("rating"),
                 "review_count": s.get("review_count"),
             }
-            for s in staff
-        ],
+        )
+    return {
+        "shop_id": sample.get("id", "sample-shop-id"),
+        "total": len(staff),
+        "items": items,
     }
 
 
@@ -335,7 +336,7 @@ async def list_shop_therapists(
     ),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=50),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     """List therapists for a shop with optional availability.
 
@@ -29,10 +29,18 @@ from .helpers import (
     _filter_active_reservations,
     _reservation_status_value,
 )
+from .locks import (
+    TherapistLockTimeout,
+    acquire_therapist_lock,
+    supports_therapist_lock,
+    therapist_lock_key,
+)
 from .service import (
+    check_availability_batch,
     has_overlapping_reservation,
     is_available,
     list_daily_slots,
+    list_daily_slots_batch,
     list_availability_summary,
     resolve_therapist_id,
     _fetch_therapist_with_buffer,
@@ -73,10 +81,17 @@ __all__ = [
     "_is_active_reservation",
     "_filter_active_reservations",
     "_reservation_status_value",
+    # Locks
+    "TherapistLockTimeout",
+    "acquire_therapist_lock",
+    "supports_therapist_lock",
+    "therapist_lock_key",
     # Service
+    "check_availability_batch",
     "has_overlapping_reservation",
     "is_available",
     "list_daily_slots",
+    "list_daily_slots_batch",
     "list_availability_summary",
     "resolve_therapist_id",
     "_fetch_therapist_with_buffer",
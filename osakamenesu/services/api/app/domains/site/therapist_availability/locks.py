@@ -0,0 +1,95 @@
+"""Per-therapist booking locks.
+
+Row locks (``SELECT ... FOR UPDATE``) cannot lock the *absence* of an
+overlapping reservation, so two transactions can both see a free slot and
+both insert.  Booking transactions instead take a transaction-scoped
+PostgreSQL advisory lock keyed by therapist: bookings for the same therapist
+run their check-and-insert one after another, bookings for different
+therapists never wait on each other.
+
+The lock is taken with ``pg_try_advisory_xact_lock`` and a bounded retry
+rather than a blocking call under ``lock_timeout``: giving up never aborts
+the transaction and no session setting outlives the attempt.  Callers take
+it inside a savepoint so that rolling the savepoint back releases it again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ....settings import settings
+
+# Separates these keys from any other advisory lock users in the database.
+_LOCK_NAMESPACE = b"therapist_booking:"
+# Polling interval bounds while another booking holds the lock
+_RETRY_MIN_SECONDS = 0.01
+_RETRY_MAX_SECONDS = 0.2
+
+
+class TherapistLockTimeout(Exception):
+    """The booking lock stayed busy for ``reservation_lock_timeout_ms``."""
+
+
+def therapist_lock_key(therapist_id: UUID | str) -> int:
+    """Stable signed 64-bit advisory lock key for ``therapist_id``."""
+    digest = hashlib.blake2b(
+        _LOCK_NAMESPACE + str(therapist_id).encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _dialect_name(db: Any) -> str | None:
+    get_bind = getattr(db, "get_bind", None)
+    if get_bind is None:
+        return None
+    try:
+        return get_bind().dialect.name
+    except Exception:
+        return None
+
+
+def supports_therapist_lock(db: Any) -> bool:
+    """Whether ``db`` is bound to PostgreSQL, which has advisory locks."""
+    return _dialect_name(db) == "postgresql"
+
+
+async def acquire_therapist_lock(db: AsyncSession, therapist_id: UUID) -> bool:
+    """Hold the booking lock for ``therapist_id`` until the transaction ends.
+
+    Retries for at most ``reservation_lock_timeout_ms`` while a concurrent
+    booking of the same therapist holds the lock, then raises
+    :class:`TherapistLockTimeout`; the transaction stays usable.  Returns
+    False without locking on databases other than PostgreSQL (SQLite in
+    tests).
+    """
+    if not supports_therapist_lock(db):
+        return False
+    key = therapist_lock_key(therapist_id)
+    deadline = time.monotonic() + settings.reservation_lock_timeout_ms / 1000.0
+    delay = _RETRY_MIN_SECONDS
+    while True:
+        result = await db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key}
+        )
+        if result.scalar():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TherapistLockTimeout(str(therapist_id))
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, _RETRY_MAX_SECONDS)
+
+
+__all__ = [
+    "TherapistLockTimeout",
+    "acquire_therapist_lock",
+    "supports_therapist_lock",
+    "therapist_lock_key",
+]
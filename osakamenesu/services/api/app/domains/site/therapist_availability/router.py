@@ -7,7 +7,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ....db import get_session
+from ....db import get_read_session, get_session
 from ....utils.cache import availability_cache
 from ....utils.datetime import JST
 from .helpers import determine_slot_status
@@ -39,7 +39,7 @@ async def get_availability_summary_api(
     therapist_id: UUID,
     date_from: date = Query(..., description="inclusive YYYY-MM-DD"),
     date_to: date = Query(..., description="inclusive YYYY-MM-DD"),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     if date_from > date_to:
         raise HTTPException(
@@ -59,7 +59,7 @@ async def get_availability_summary_api(
 async def get_availability_slots_api(
     therapist_id: str,
     date: date = Query(..., description="target YYYY-MM-DD"),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     resolved_id = await _pkg._resolve_therapist_id(db, therapist_id)
     if not resolved_id:
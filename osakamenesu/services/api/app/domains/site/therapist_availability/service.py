@@ -12,7 +12,7 @@ from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
-from ....models import GuestReservation, Therapist, TherapistShift
+from ....models import GuestReservation, Profile, Therapist, TherapistShift
 from ....utils.datetime import JST
 from .constants import ACTIVE_RESERVATION_STATUSES
 from .helpers import (
@@ -25,6 +25,7 @@ from .helpers import (
     _parse_breaks,
     _subtract_intervals,
 )
+from .locks import acquire_therapist_lock, supports_therapist_lock
 from .schemas import AvailabilitySummaryItem, AvailabilitySummaryResponse
 
 logger = logging.getLogger(__name__)
@@ -70,13 +71,19 @@ async def has_overlapping_reservation(
         therapist_id: セラピストID
         start_at: 開始時刻
         end_at: 終了時刻
-        lock: Trueの場合、SELECT FOR UPDATEでロックを取得（レースコンディション対策）
-              SQLiteなどFOR UPDATEをサポートしないDBでは自動的にスキップ
+        lock: Trueの場合、セラピスト単位のadvisory lockを取得してから判定する
+              （空きがあればトランザクション終了まで保持、レースコンディション対策）
 
     Race Condition Handling:
-        - PostgreSQL: FOR UPDATE でロック取得
-        - SQLite: FOR UPDATE 非サポートのため、OperationalError 時はロックなしで続行
-        - 他のDBエラー: ログ出力後、ロックなしで続行（安全側に倒す）
+        - PostgreSQL: SAVEPOINT 内で pg_try_advisory_xact_lock を取得し、
+          同一セラピストの予約処理を直列化。既存行の FOR UPDATE と違い
+          「予約がない」状態も保護できる。別セラピストの予約は互いに待たない
+        - 重複ありの場合は SAVEPOINT をロールバックしてロックを即解放する
+          （おまかせ割当で次の候補へ進んでも不要なロックを抱えない）
+        - ロック取得に失敗 (待ち時間超過など): 重複ありとして扱う (fail-closed)。
+          失敗は SAVEPOINT 内に閉じるので外側のトランザクションは継続できる
+        - SQLite: advisory lock 非サポートのため FOR UPDATE を試み、
+          OperationalError 時はロックなしで続行
     """
     stmt = select(GuestReservation).where(
         GuestReservation.therapist_id == therapist_id,
@@ -88,6 +95,26 @@ async def has_overlapping_reservation(
     )
     # Use JST for consistency with reservation timestamps
     now = datetime.now(JST)
+    if lock and supports_therapist_lock(db):
+        try:
+            async with db.begin_nested() as savepoint:
+                await acquire_therapist_lock(db, therapist_id)
+                result = await db.execute(stmt)
+                overlapping = bool(
+                    _filter_active_reservations(list(result.scalars().all()), now)
+                )
+                if overlapping:
+                    # Nothing will be booked for this therapist: release the lock
+                    await savepoint.rollback()
+                return overlapping
+        except Exception as exc:
+            logger.warning(
+                "therapist booking lock failed: therapist_id=%s %s(%s)",
+                therapist_id,
+                type(exc).__name__,
+                exc,
+            )
+            return True
     if lock:
         try:
             result = await db.execute(stmt.with_for_update())
@@ -104,8 +131,6 @@ async def has_overlapping_reservation(
                     exc_name,
                     exc,
                 )
-            # ロックなしで再実行（race condition のリスクはあるが、
-            # データ損失よりは二重チェックで安全側に倒す）
     result = await db.execute(stmt)
     reservations = list(result.scalars().all())
     return bool(_filter_active_reservations(reservations, now))
@@ -128,7 +153,7 @@ async def is_available(
     - 既存予約との重なり: バッファ込みでチェック（予約と予約の間にバッファを確保）
 
     Args:
-        lock: Trueの場合、予約重複チェック時にSELECT FOR UPDATEでロックを取得（レースコンディション対策）
+        lock: Trueの場合、予約重複チェック前にセラピスト単位のロックを取得（レースコンディション対策）
     """
     if not start_at or not end_at or start_at >= end_at:
         return False, {"rejected_reasons": ["invalid_time_range"]}
@@ -170,7 +195,7 @@ async def is_available(
                 return False, {"rejected_reasons": ["on_break"]}
 
         # 3) 既存予約との重なり（バッファ込みでチェック）
-        # lock=Trueの場合、SELECT FOR UPDATEでロックを取得してレースコンディションを防ぐ
+        # lock=Trueの場合、セラピスト単位のadvisory lockを取得してレースコンディションを防ぐ
         if await has_overlapping_reservation(
             db, therapist_id, buffered_start, buffered_end, lock=lock
         ):
@@ -182,6 +207,96 @@ async def is_available(
         return False, {"rejected_reasons": ["internal_error"]}
 
 
+async def check_availability_batch(
+    db: AsyncSession,
+    therapist_ids: list[UUID],
+    start_at: datetime,
+    end_at: datetime,
+    *,
+    buffer_minutes: dict[UUID, int] | None = None,
+) -> dict[UUID, tuple[bool, dict[str, Any]]]:
+    """複数セラピストの予約可否を一括で判定する (ロックなし)。
+
+    :func:`is_available` と同じルール (シフト境界はバッファなし、休憩・既存予約は
+    バッファ込み) を、セラピスト数に関わらずシフト・予約それぞれ1クエリで評価する。
+    結果は候補の絞り込み用であり、確定前には ``is_available(..., lock=True)`` で
+    再検証すること。``buffer_minutes`` 省略時は所属店舗の設定を参照する。
+    """
+    ids = list(dict.fromkeys(therapist_ids))
+    if not ids:
+        return {}
+    if not start_at or not end_at or start_at >= end_at:
+        return {
+            tid: (False, {"rejected_reasons": ["invalid_time_range"]}) for tid in ids
+        }
+
+    if buffer_minutes is None:
+        rows = await db.execute(
+            select(Therapist.id, Profile.buffer_minutes)
+            .join(Profile, Profile.id == Therapist.profile_id)
+            .where(Therapist.id.in_(ids))
+        )
+        buffer_minutes = {tid: int(minutes or 0) for tid, minutes in rows.all()}
+
+    shifts_stmt = select(TherapistShift).where(
+        TherapistShift.therapist_id.in_(ids),
+        TherapistShift.availability_status == "available",
+        TherapistShift.start_at <= start_at,
+        TherapistShift.end_at >= end_at,
+    )
+    shift_by_therapist: dict[UUID, TherapistShift] = {}
+    for shift in (await db.execute(shifts_stmt)).scalars().all():
+        shift_by_therapist.setdefault(shift.therapist_id, shift)
+
+    # 最大バッファで広めに取得し、セラピストごとのバッファで絞り込む
+    max_delta = timedelta(minutes=max(buffer_minutes.values(), default=0))
+    reservations_stmt = select(GuestReservation).where(
+        GuestReservation.therapist_id.in_(list(shift_by_therapist)),
+        GuestReservation.status.in_(ACTIVE_RESERVATION_STATUSES),
+        and_(
+            GuestReservation.start_at < end_at + max_delta,
+            GuestReservation.end_at > start_at - max_delta,
+        ),
+    )
+    reservations_by_therapist: dict[UUID, list[GuestReservation]] = defaultdict(list)
+    if shift_by_therapist:
+        reservations = (await db.execute(reservations_stmt)).scalars().all()
+        for reservation in _filter_active_reservations(reservations, datetime.now(JST)):
+            reservations_by_therapist[reservation.therapist_id].append(reservation)
+
+    result: dict[UUID, tuple[bool, dict[str, Any]]] = {}
+    for therapist_id in ids:
+        shift = shift_by_therapist.get(therapist_id)
+        if shift is None:
+            result[therapist_id] = (False, {"rejected_reasons": ["no_shift"]})
+            continue
+        buffer_delta = timedelta(minutes=buffer_minutes.get(therapist_id, 0))
+        buffered_start = start_at - buffer_delta
+        buffered_end = end_at + buffer_delta
+        if any(
+            _overlaps(buffered_start, buffered_end, br_start, br_end)
+            for br_start, br_end in _parse_breaks(shift.break_slots, shift.date)
+        ):
+            result[therapist_id] = (False, {"rejected_reasons": ["on_break"]})
+            continue
+        if any(
+            _overlaps(
+                buffered_start,
+                buffered_end,
+                _ensure_aware(r.start_at),
+                _ensure_aware(r.end_at),
+            )
+            for r in reservations_by_therapist.get(therapist_id, [])
+        ):
+            result[therapist_id] = (
+                False,
+                {"rejected_reasons": ["overlap_existing_reservation"]},
+            )
+            continue
+        result[therapist_id] = (True, {"rejected_reasons": []})
+    return result
+
+
 async def _fetch_shifts(
     db: AsyncSession,
     therapist_id: UUID,
@@ -268,6 +383,88 @@ def _calculate_available_slots(
     return _normalize_intervals(open_intervals)
 
 
+async def list_daily_slots_batch(
+    db: AsyncSession,
+    therapist_ids: list[UUID],
+    date_from: date,
+    date_to: date,
+    *,
+    buffer_minutes: dict[UUID, int] | None = None,
+) -> dict[UUID, dict[date, list[tuple[datetime, datetime]]]]:
+    """Open slots per therapist and day for ``date_from``..``date_to`` (inclusive).
+
+    Same rules as :func:`list_daily_slots` (shifts minus breaks minus active
+    reservations with buffer) but with one query each for shifts and
+    reservations regardless of how many therapists and days are requested.
+    ``buffer_minutes`` is looked up from the therapists' profiles when omitted.
+    """
+    ids = list(dict.fromkeys(therapist_ids))
+    if not ids:
+        return {}
+
+    if buffer_minutes is None:
+        rows = await db.execute(
+            select(Therapist.id, Profile.buffer_minutes)
+            .join(Profile, Profile.id == Therapist.profile_id)
+            .where(Therapist.id.in_(ids))
+        )
+        buffer_minutes = {tid: int(minutes or 0) for tid, minutes in rows.all()}
+
+    range_start, _ = _day_window(date_from)
+    _, range_end = _day_window(date_to)
+    shifts_stmt = select(TherapistShift).where(
+        TherapistShift.therapist_id.in_(ids),
+        TherapistShift.availability_status == "available",
+        or_(
+            and_(
+                TherapistShift.date >= date_from,
+                TherapistShift.date <= date_to,
+            ),
+            # Overnight shifts from the previous day that extend into date_from
+            and_(
+                TherapistShift.date == date_from - timedelta(days=1),
+                TherapistShift.end_at > range_start,
+            ),
+        ),
+    )
+    shifts = list((await db.execute(shifts_stmt)).scalars().all())
+
+    reservations_stmt = select(GuestReservation).where(
+        GuestReservation.therapist_id.in_(ids),
+        GuestReservation.status.in_(ACTIVE_RESERVATION_STATUSES),
+        and_(
+            GuestReservation.start_at < range_end,
+            GuestReservation.end_at > range_start,
+        ),
+    )
+    reservations = list((await db.execute(reservations_stmt)).scalars().all())
+    reservations = _filter_active_reservations(reservations, datetime.now(JST))
+
+    shifts_by_therapist: dict[UUID, list[TherapistShift]] = defaultdict(list)
+    for shift in shifts:
+        shifts_by_therapist[shift.therapist_id].append(shift)
+    reservations_by_therapist: dict[UUID, list[GuestReservation]] = defaultdict(list)
+    for reservation in reservations:
+        reservations_by_therapist[reservation.therapist_id].append(reservation)
+
+    result: dict[UUID, dict[date, list[tuple[datetime, datetime]]]] = {}
+    for therapist_id in ids:
+        open_intervals = _calculate_available_slots(
+            shifts_by_therapist.get(therapist_id, []),
+            reservations_by_therapist.get(therapist_id, []),
+            buffer_minutes.get(therapist_id, 0),
+        )
+        days: dict[date, list[tuple[datetime, datetime]]] = {}
+        current = date_from
+        while current <= date_to:
+            days[current] = (
+                _filter_slots_by_date(open_intervals, current) if open_intervals else []
+            )
+            current += timedelta(days=1)
+        result[therapist_id] = days
+    return result
+
+
 async def list_daily_slots(
     db: AsyncSession,
     therapist_id: UUID,
@@ -5,7 +5,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ....db import get_session
+from ....db import get_read_session
 from .schemas import (
     TherapistTags,
     TherapistInfo,
@@ -47,7 +47,7 @@ async def get_therapist_detail(
     slot_granularity_minutes: int = Query(
         default=30, ge=15, le=120, description="Slot granularity in minutes"
     ),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     """Get therapist detail with shop info and availability.
 
@@ -188,7 +188,7 @@ async def get_similar_therapists(
     limit: int = Query(
         default=6, ge=1, le=20, description="Number of similar therapists to return"
     ),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
     """Get similar therapists based on tag similarity.
 
@@ -1,13 +1,16 @@
 from contextlib import asynccontextmanager
 
+import asyncio
 import logging
 import sentry_sdk
-from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from .admin_htmx.router import router as admin_htmx_router
+from .media_files import MediaFiles
 from .meili import ensure_indexes
+from .monitoring.health import build_health_monitor, set_health_monitor
+from .monitoring.metrics import get_metrics_collector, get_prometheus_metrics
 from .settings import settings
 
 # Initialize Sentry for error monitoring
@@ -35,6 +38,7 @@ from .domains.dashboard import (
 )
 from .domains.line import router as line_router
 from .domains.ops import router as ops_router
+from .domains.ops.router import require_ops_token
 from .domains.push.router import router as push_router
 from .domains.site import (
     favorites_router,
@@ -47,7 +51,7 @@ from .domains.site import (
 from .domains.test import router as test_router
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from .db import get_session
+from .db import SessionLocal, get_session
 from . import models
 
 
@@ -88,11 +92,152 @@ async def lifespan(app: FastAPI):
         logger.warning("Redis cache init error: %s", exc)
 
     logger.info(
-        "Notifications worker runs outside the API process. Start it via `python -m app.scripts.notifications_worker`.",
+        "Notifications worker runs outside the API process. Start it via `python -m scripts.notifications_worker`.",
     )
 
+    # Keep time-dependent search fields fresh (shift/reservation changes, day rollover)
+    freshness_stop = asyncio.Event()
+    freshness_task = None
+    remove_change_tracking = None
+    if settings.search_freshness_enabled:
+        from .db import SessionLocal
+        from .services.search_freshness import (
+            SearchFreshnessScheduler,
+            install_change_tracking,
+        )
+
+        scheduler = SearchFreshnessScheduler(
+            SessionLocal,
+            interval_seconds=settings.search_freshness_interval_seconds,
+        )
+        remove_change_tracking = install_change_tracking(scheduler)
+        freshness_task = asyncio.create_task(scheduler.run_forever(freshness_stop))
+
+    # Rebuild KPI rollup buckets touched by committed reservation/shift/review changes
+    rollup_stop = asyncio.Event()
+    rollup_task = None
+    remove_rollup_tracking = None
+    if settings.kpi_rollups_enabled:
+        from .db import SessionLocal
+        from .services import kpi_rollups
+
+        rollup_scheduler = kpi_rollups.KpiRollupScheduler(
+            SessionLocal,
+            interval_seconds=settings.kpi_rollup_interval_seconds,
+        )
+        remove_rollup_tracking = kpi_rollups.install_change_tracking(rollup_scheduler)
+        rollup_task = asyncio.create_task(rollup_scheduler.run_forever(rollup_stop))
+
+    # Keep this worker's in-memory therapist feature table on the latest generation
+    features_stop = asyncio.Event()
+    features_task = None
+    if settings.feature_store_enabled:
+        from .db import SessionLocal
+        from .services.therapist_features import FeatureStoreLoader
+
+        feature_loader = FeatureStoreLoader(
+            SessionLocal,
+            interval_seconds=settings.feature_store_reload_seconds,
+        )
+        features_task = asyncio.create_task(feature_loader.run_forever(features_stop))
+
+    # Flush in-process API/cache metrics to Prometheus and Redis
+    metrics_stop = asyncio.Event()
+    metrics_collector = get_metrics_collector()
+    try:
+        await metrics_collector.initialize()
+    except Exception as exc:  # pragma: no cover - defensive logging
+        logger.warning("Metrics collector init error: %s", exc)
+    metrics_task = asyncio.create_task(metrics_collector.run_forever(metrics_stop))
+
+    # Check Postgres/Meilisearch/Redis in the background; /health reads the cache
+    health_stop = asyncio.Event()
+    set_health_monitor(health_monitor)
+    health_task = asyncio.create_task(health_monitor.run_forever(health_stop))
+
+    # Record event-loop lag and the stack of anything blocking the loop
+    loop_stop = asyncio.Event()
+    loop_task = None
+    if settings.loop_lag_monitor_enabled:
+        from .monitoring.profiling import LoopLagMonitor, set_loop_monitor
+
+        loop_monitor = LoopLagMonitor(threshold=settings.loop_lag_threshold_seconds)
+        set_loop_monitor(loop_monitor)
+        loop_task = asyncio.create_task(loop_monitor.run_forever(loop_stop))
+
+    # Write admin audit logs in batches off the request path
+    audit_stop = asyncio.Event()
+    audit_task = None
+    if settings.admin_audit_async_enabled:
+        from .db import SessionLocal
+        from .domains.admin.services.audit import AuditLogWriter, set_audit_writer
+
+        audit_writer = AuditLogWriter(
+            SessionLocal,
+            batch_size=settings.admin_audit_batch_size,
+            flush_interval=settings.admin_audit_flush_interval_seconds,
+            snapshot_interval=settings.admin_audit_snapshot_interval,
+        )
+        set_audit_writer(audit_writer)
+        audit_task = asyncio.create_task(audit_writer.run_forever(audit_stop))
+
     yield
 
+    if audit_task is not None:
+        audit_stop.set()
+        try:
+            await audit_task
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning("Audit writer shutdown error: %s", exc)
+        set_audit_writer(None)
+
+    if loop_task is not None:
+        loop_stop.set()
+        try:
+            await loop_task
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning("Loop lag monitor shutdown error: %s", exc)
+        set_loop_monitor(None)
+
+    health_stop.set()
+    try:
+        await health_task
+    except Exception as exc:  # pragma: no cover - defensive logging
+        logger.warning("Health monitor shutdown error: %s", exc)
+    set_health_monitor(None)
+
+    metrics_stop.set()
+    try:
+        await metrics_task
+        await metrics_collector.close()
+    except Exception as exc:  # pragma: no cover - defensive logging
+        logger.warning("Metrics collector shutdown error: %s", exc)
+
+    if features_task is not None:
+        features_stop.set()
+        try:
+            await features_task
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning("Feature store shutdown error: %s", exc)
+
+    if rollup_task is not None:
+        rollup_stop.set()
+        try:
+            await rollup_task
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning("KPI rollup shutdown error: %s", exc)
+    if remove_rollup_tracking is not None:
+        remove_rollup_tracking()
+
+    if freshness_task is not None:
+        freshness_stop.set()
+        try:
+            await freshness_task
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning("Search freshness shutdown error: %s", exc)
+    if remove_change_tracking is not None:
+        remove_change_tracking()
+
     # Shutdown all rate limiters
     from .rate_limiters import shutdown_all_rate_limiters
 
@@ -153,10 +298,68 @@ app.add_middleware(
     ],
 )
 
-# Add cache headers middleware
-from .middleware.cache_headers import CacheHeadersMiddleware
+# Response post-processing runs as stages of a single pure-ASGI layer
+from .middleware.pipeline import ASGIPipelineMiddleware
+from .middleware.cache_headers import CacheHeadersStage
+from .middleware.performance import PerformanceMonitoringStage
+from .middleware.profiling import RequestProfilingStage
+from .middleware.query_tracking import QueryTrackingStage
+
+_pipeline_stages = [CacheHeadersStage()]
+if settings.performance_monitoring_enabled:
+    _pipeline_stages.insert(0, PerformanceMonitoringStage())
+if settings.sql_instrumentation_enabled:
+    from .db import engine as _engine, replica_router as _replica_router
+    from .monitoring.queries import install_query_tracking
+
+    install_query_tracking(_engine)
+    for _replica in _replica_router.replicas:
+        install_query_tracking(_replica.engine)
+    _pipeline_stages.insert(
+        0,
+        QueryTrackingStage(n_plus_one_threshold=settings.sql_n_plus_one_threshold),
+    )
 
-app.add_middleware(CacheHeadersMiddleware)
+if settings.admission_control_enabled:
+    from .db import engine as _primary_engine
+    from .middleware.admission import (
+        AdmissionControlStage,
+        AdmissionController,
+        engine_pool_usage,
+    )
+    from .monitoring.profiling import get_loop_monitor
+
+    _pool_capacity = settings.db_pool_size + settings.db_max_overflow
+
+    def _under_pressure() -> bool:
+        loop_monitor = get_loop_monitor()
+        if (
+            loop_monitor is not None
+            and loop_monitor.recent_lag >= settings.admission_loop_lag_seconds
+        ):
+            return True
+        usage = engine_pool_usage(_primary_engine, _pool_capacity)
+        return usage >= settings.admission_pool_usage_threshold
+
+    admission_controller = AdmissionController(
+        settings.admission_max_concurrency or _pool_capacity * 2,
+        reserved=settings.admission_reserved_slots,
+        low_share=settings.admission_low_priority_share,
+        pressure=_under_pressure,
+    )
+    # Outside everything but the profiler: shed requests cost next to nothing
+    _pipeline_stages.insert(
+        0,
+        AdmissionControlStage(
+            admission_controller, retry_after=settings.admission_retry_after_seconds
+        ),
+    )
+
+if settings.request_profiling_enabled and settings.admin_api_key:
+    # Outermost, so the profile covers every other stage too
+    _pipeline_stages.insert(0, RequestProfilingStage(settings.admin_api_key))
+
+app.add_middleware(ASGIPipelineMiddleware, stages=_pipeline_stages)
 
 media_backend = getattr(settings, "media_storage_backend", "memory")
 if media_backend and media_backend.lower() == "local":
@@ -165,7 +368,24 @@ if media_backend and media_backend.lower() == "local":
     mount_path = settings.media_url_prefix
     if not mount_path.startswith("/"):
         mount_path = f"/{mount_path}"
-    app.mount(mount_path, StaticFiles(directory=str(media_root)), name="media")
+    app.mount(
+        mount_path,
+        MediaFiles(
+            directory=media_root,
+            max_age=settings.media_cache_max_age,
+            negotiate=settings.media_negotiate_formats,
+            accel_redirect_prefix=settings.media_accel_redirect_prefix,
+        ),
+        name="media",
+    )
+
+
+health_monitor = build_health_monitor(
+    SessionLocal,
+    interval=settings.health_check_interval_seconds,
+    timeout=settings.health_check_timeout_seconds,
+    slow_ms=settings.health_check_slow_ms,
+)
 
 
 @app.get("/healthz")
@@ -173,40 +393,43 @@ async def healthz():
     return {"ok": True}
 
 
-@app.get("/health")
-async def health(db: AsyncSession = Depends(get_session)):
-    """Health check endpoint with DB connectivity check."""
-    from datetime import datetime, timezone
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_ops_token)])
+async def metrics():
+    """Prometheus exposition (all workers when PROMETHEUS_MULTIPROC_DIR is set).
+
+    Guarded by ``OPS_API_TOKEN`` like ``/api/ops``; scrape with a bearer token.
+    """
+    await get_metrics_collector().flush()
+    payload, content_type = get_prometheus_metrics()
+    return Response(content=payload, media_type=content_type)
+
 
+@app.get("/health")
+async def health():
+    """Dependency health from the background checks; 503 when the DB is down."""
+    snapshot = await health_monitor.current()
     checks = {
-        "status": "healthy",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "status": snapshot.status,
+        "timestamp": snapshot.timestamp.isoformat(),
         "version": API_METADATA["version"],
         "checks": {},
+        "dependencies": {},
     }
-
-    # Database check
-    try:
-        result = await db.execute(select(1))
-        result.scalar()
-        checks["checks"]["database"] = "ok"
-    except Exception as e:
-        checks["checks"]["database"] = f"error: {str(e)}"
-        checks["status"] = "unhealthy"
-
-    # Redis check (optional)
-    try:
-        from .utils.redis_cache import get_redis_cache
-
-        redis_cache = await get_redis_cache()
-        if redis_cache and redis_cache._connected:
-            checks["checks"]["redis"] = "ok"
+    for result in snapshot.checks:
+        if result.status == "healthy":
+            checks["checks"][result.name] = "ok"
+        elif result.status == "degraded":
+            checks["checks"][result.name] = f"degraded: {result.message}"
         else:
-            checks["checks"]["redis"] = "not connected"
-    except Exception:
-        checks["checks"]["redis"] = "not configured"
-
-    if checks["status"] == "unhealthy":
+            checks["checks"][result.name] = f"error: {result.message}"
+        checks["dependencies"][result.name] = {
+            "status": result.status,
+            "response_time_ms": round(result.response_time, 2),
+            "checked_at": result.checked_at.isoformat(),
+            **health_monitor.latency_summary(result.name),
+        }
+
+    if snapshot.status == "unhealthy":
         raise HTTPException(status_code=503, detail=checks)
 
     return checks
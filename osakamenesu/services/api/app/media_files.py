@@ -0,0 +1,178 @@
+"""Serve locally stored media with CDN-friendly caching.
+
+Files the upload pipeline stored are named after their content hash, so a
+URL never changes meaning: those responses are cacheable for a year as
+``immutable`` and carry a strong ``ETag`` derived from the name, without
+hashing (or even reading) the body.  Other files get a shorter public
+lifetime and Starlette's stat-based validator.
+
+Range requests and ``If-None-Match``/``If-Range`` are handled by
+Starlette's file responses.  The body goes out through the ASGI
+``pathsend`` extension when the server offers it, or, with
+``accel_redirect_prefix`` set, is handed to nginx via ``X-Accel-Redirect``
+so it is sent with ``sendfile`` and never passes through Python.
+
+A request for an image variant (``<hash>-w640.webp``) may be answered
+with a sibling in a better format (``<hash>-w640.avif``) when the client's
+``Accept`` lists it; such responses carry ``Vary: Accept``.
+"""
+
+from __future__ import annotations
+
+import os
+import posixpath
+from typing import Optional
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .services.image_variants import HASHED_FILE_NAME
+
+# Content-hashed names never change meaning, so caches may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Variant formats in order of preference when the client accepts several
+NEGOTIABLE_FORMATS = {"avif": "image/avif", "webp": "image/webp"}
+
+
+class MediaFileResponse(FileResponse):
+    # Fewer thread hops per file than Starlette's 64 KiB when streaming
+    chunk_size = 256 * 1024
+
+
+def accepted_types(accept: str) -> set[str]:
+    """Media types ``accept`` lists explicitly with a non-zero quality."""
+    types = set()
+    for item in accept.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            types.add(media_type.lower())
+    return types
+
+
+class MediaFiles(StaticFiles):
+    """:class:`StaticFiles` with long-lived caching for content-hashed names."""
+
+    def __init__(
+        self,
+        *,
+        directory: str | os.PathLike[str],
+        max_age: int = 3600,
+        negotiate: bool = True,
+        accel_redirect_prefix: Optional[str] = None,
+    ) -> None:
+        super().__init__(directory=directory)
+        self._real_directory = os.path.realpath(directory)
+        self.max_age = max_age
+        self.negotiate = negotiate
+        self.accel_redirect_prefix = (
+            accel_redirect_prefix.rstrip("/") if accel_redirect_prefix else None
+        )
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if self.negotiate and scope["method"] in ("GET", "HEAD"):
+            candidates = self._alternatives(path, Headers(scope=scope).get("accept"))
+            if candidates:
+                path = await anyio.to_thread.run_sync(
+                    self._first_existing, candidates, path
+                )
+        return await super().get_response(path, scope)
+
+    def _alternatives(self, path: str, accept: Optional[str]) -> list[str]:
+        """Siblings of a variant the client prefers over ``path``, best first."""
+        directory, name = posixpath.split(path)
+        match = HASHED_FILE_NAME.match(name)
+        if (
+            not accept
+            or match is None
+            or match["variant"] is None
+            or match["ext"] not in NEGOTIABLE_FORMATS
+        ):
+            return []
+        accepted = accepted_types(accept)
+        candidates = []
+        for fmt, media_type in NEGOTIABLE_FORMATS.items():
+            if fmt == match["ext"]:
+                break
+            if media_type in accepted:
+                candidates.append(
+                    posixpath.join(
+                        directory, f"{match['hash']}-{match['variant']}.{fmt}"
+                    )
+                )
+        return candidates
+
+    def _first_existing(self, candidates: list[str], default: str) -> str:
+        # One stat per better format, never a directory listing
+        for candidate in candidates:
+            _, stat_result = self.lookup_path(candidate)
+            if stat_result is not None:
+                return candidate
+        return default
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        name = os.path.basename(full_path)
+        match = HASHED_FILE_NAME.match(name)
+        headers: dict[str, str] = {}
+        if match is None:
+            headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        else:
+            headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            headers["ETag"] = f'"{name}"'
+            if (
+                self.negotiate
+                and match["variant"] is not None
+                and match["ext"] in NEGOTIABLE_FORMATS
+            ):
+                headers["Vary"] = "Accept"
+
+        response = MediaFileResponse(
+            full_path,
+            status_code=status_code,
+            headers=headers,
+            stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        if self.accel_redirect_prefix is not None:
+            return self._accel_redirect(full_path, response)
+        return response
+
+    def _accel_redirect(
+        self, full_path: str | os.PathLike[str], response: FileResponse
+    ) -> Response:
+        relative = os.path.relpath(full_path, self._real_directory)
+        location = "/".join(quote(part) for part in relative.split(os.sep))
+        headers = {
+            key: value
+            for key, value in response.headers.items()
+            # nginx sets the length (and handles Range) for the file it sends
+            if key not in ("content-length", "accept-ranges")
+        }
+        headers["X-Accel-Redirect"] = f"{self.accel_redirect_prefix}/{location}"
+        return Response(status_code=response.status_code, headers=headers)
+
+
+__all__ = [
+    "IMMUTABLE_CACHE_CONTROL",
+    "MediaFileResponse",
+    "MediaFiles",
+    "accepted_types",
+]
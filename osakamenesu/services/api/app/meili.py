@@ -133,6 +133,25 @@ def index_bulk(docs: list[dict]):
     _wait_for_task(task, client)
 
 
+def update_documents_partial(docs: list[dict], *, batch_size: int = 500):
+    """Merge ``docs`` into existing documents; fields not sent are kept.
+
+    All batches are enqueued before waiting so Meili can process them back to
+    back.
+    """
+    if not docs:
+        return
+    ensure_indexes_if_needed()
+    client = get_client()
+    index = client.index(INDEX)
+    tasks = [
+        index.update_documents(docs[start : start + batch_size])
+        for start in range(0, len(docs), batch_size)
+    ]
+    for task in tasks:
+        _wait_for_task(task, client)
+
+
 def delete_profile(doc_id: str):
     ensure_indexes_if_needed()
     client = get_client()
@@ -1,22 +1,38 @@
 """Middleware package."""
 
-from .cache_headers import CacheHeadersMiddleware
+from .pipeline import ASGIPipelineMiddleware, PipelineStage, RequestContext
+from .admission import AdmissionControlStage, AdmissionController
+from .cache_headers import CacheHeadersMiddleware, CacheHeadersStage
+from .profiling import RequestProfilingStage
+from .query_tracking import QueryTrackingStage
 from .rate_limit import RateLimitMiddleware, create_rate_limit_dependency
 from .enhanced_rate_limit import (
     EnhancedRateLimitMiddleware,
+    EnhancedRateLimitStage,
     create_enhanced_rate_limiter,
 )
 from .security_headers import (
     SecurityHeadersMiddleware,
+    SecurityHeadersStage,
     create_security_headers_middleware,
 )
 
 __all__ = [
+    "ASGIPipelineMiddleware",
+    "PipelineStage",
+    "RequestContext",
+    "AdmissionControlStage",
+    "AdmissionController",
     "CacheHeadersMiddleware",
+    "CacheHeadersStage",
+    "QueryTrackingStage",
+    "RequestProfilingStage",
     "RateLimitMiddleware",
     "create_rate_limit_dependency",
     "EnhancedRateLimitMiddleware",
+    "EnhancedRateLimitStage",
     "create_enhanced_rate_limiter",
     "SecurityHeadersMiddleware",
+    "SecurityHeadersStage",
     "create_security_headers_middleware",
 ]
@@ -0,0 +1,280 @@
+"""Admission control: per-priority concurrency limits, queueing and shedding.
+
+Every request in the API competes for the same DB connections and event
+loop.  Under a spike, cheap browse traffic (search, matching) would crowd
+out reservations, so requests are classified by path into priorities that
+share one pool of concurrency slots:
+
+* ``critical`` (reservation and hold writes) may use every slot,
+* ``normal`` (dashboard, auth, everything unclassified) all but the slots
+  reserved for critical requests,
+* ``low`` (browse) only a share of those.
+
+A request that finds no free slot waits in its priority's queue until its
+deadline.  While the DB pool is nearly exhausted or the event loop lags,
+the non-critical limits shrink and low-priority requests that cannot run
+at once are rejected with 503 and ``Retry-After`` instead of queueing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi.responses import JSONResponse
+from starlette.responses import Response
+
+from ..monitoring.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_QUEUED,
+    ADMISSION_SHED_COUNT,
+)
+from .pipeline import PipelineStage, RequestContext
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    LOW = 0
+    NORMAL = 1
+    CRITICAL = 2
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+
+@dataclass(frozen=True)
+class AdmissionRule:
+    """Requests under ``prefix`` (and one of ``methods``, if set) get ``priority``."""
+
+    prefix: str
+    priority: Priority
+    methods: Optional[frozenset[str]] = None
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods is not None and method not in self.methods:
+            return False
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+
+# First match wins; anything unmatched is NORMAL
+DEFAULT_RULES: tuple[AdmissionRule, ...] = (
+    # create, hold and cancel in guest_reservations/router.py
+    AdmissionRule("/api/guest/reservations", Priority.CRITICAL, frozenset({"POST"})),
+    AdmissionRule("/api/guest/matching", Priority.LOW),
+    AdmissionRule("/api/v1/shops", Priority.LOW, frozenset({"GET"})),
+    AdmissionRule("/api/v1/therapists", Priority.LOW, frozenset({"GET"})),
+)
+
+# Probes and ops endpoints must answer however busy the API is
+_EXEMPT_PATHS = frozenset({"/health", "/healthz", "/metrics"})
+_EXEMPT_PREFIXES = ("/api/ops/",)
+
+# Seconds a request may wait for a slot before it is shed
+DEFAULT_MAX_WAIT = {
+    Priority.CRITICAL: 10.0,
+    Priority.NORMAL: 2.0,
+    Priority.LOW: 0.5,
+}
+# Waiting requests per priority; later arrivals are shed at once
+DEFAULT_MAX_QUEUE = {
+    Priority.CRITICAL: 200,
+    Priority.NORMAL: 100,
+    Priority.LOW: 50,
+}
+
+
+class AdmissionController:
+    """Hand out concurrency slots by priority, queueing up to a deadline.
+
+    ``pressure`` is polled on every decision; while it returns ``True`` the
+    normal limit halves, the low limit drops to a quarter and low-priority
+    requests are not queued.  Waiters are woken highest priority first.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        *,
+        reserved: int = 8,
+        low_share: float = 0.6,
+        max_wait: Optional[dict[Priority, float]] = None,
+        max_queue: Optional[dict[Priority, int]] = None,
+        pressure: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.limit = max(1, limit)
+        self.reserved = min(max(0, reserved), self.limit - 1)
+        self.low_share = low_share
+        self.max_wait = {**DEFAULT_MAX_WAIT, **(max_wait or {})}
+        self.max_queue = {**DEFAULT_MAX_QUEUE, **(max_queue or {})}
+        self._pressure = pressure or (lambda: False)
+        self.in_flight = 0
+        self._queues: dict[Priority, deque[asyncio.Future[None]]] = {
+            priority: deque() for priority in Priority
+        }
+
+    def capacity(self, priority: Priority, pressured: bool = False) -> int:
+        """Slots ``priority`` may occupy in total (with every other priority)."""
+        if priority is Priority.CRITICAL:
+            return self.limit
+        capacity = self.limit - self.reserved
+        if priority is Priority.LOW:
+            capacity = int(capacity * self.low_share)
+            if pressured:
+                capacity //= 4
+        elif pressured:
+            capacity //= 2
+        return max(1, capacity)
+
+    def _admit(self, priority: Priority) -> None:
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(priority=priority.label).inc()
+
+    def _queued_ahead(self, priority: Priority) -> bool:
+        return any(self._queues[p] for p in Priority if p >= priority)
+
+    async def acquire(self, priority: Priority) -> Optional[str]:
+        """Take a slot; ``None`` once admitted, otherwise why it was shed."""
+        pressured = self._pressure()
+        if not self._queued_ahead(priority) and self.in_flight < self.capacity(
+            priority, pressured
+        ):
+            self._admit(priority)
+            return None
+        if priority is Priority.LOW and pressured:
+            return "overloaded"
+        queue = self._queues[priority]
+        if len(queue) >= self.max_queue[priority]:
+            return "queue_full"
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        queued = ADMISSION_QUEUED.labels(priority=priority.label)
+        queued.inc()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=self.max_wait[priority])
+        except BaseException:
+            # The request was cancelled while queued; hand back a slot
+            # granted in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release(priority)
+            raise
+        finally:
+            queued.dec()
+            if not waiter.done():
+                queue.remove(waiter)
+                waiter.cancel()
+        if waiter.cancelled():
+            return "timeout"
+        ADMISSION_QUEUE_WAIT.labels(priority=priority.label).observe(
+            time.perf_counter() - started
+        )
+        return None
+
+    def release(self, priority: Priority) -> None:
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.labels(priority=priority.label).dec()
+        pressured = self._pressure()
+        for waiting in sorted(Priority, reverse=True):
+            queue = self._queues[waiting]
+            while queue and self.in_flight < self.capacity(waiting, pressured):
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self._admit(waiting)
+                waiter.set_result(None)
+
+    def snapshot(self) -> dict[str, Any]:
+        pressured = self._pressure()
+        return {
+            "in_flight": self.in_flight,
+            "pressured": pressured,
+            "queued": {p.label: len(self._queues[p]) for p in Priority},
+            "capacity": {p.label: self.capacity(p, pressured) for p in Priority},
+        }
+
+
+def engine_pool_usage(engine: Any, capacity: int) -> float:
+    """Fraction of ``capacity`` DB connections checked out of ``engine``'s pool."""
+    checkedout = getattr(engine.pool, "checkedout", None)
+    if checkedout is None or capacity <= 0:
+        # SQLite's StaticPool/NullPool have no notion of exhaustion
+        return 0.0
+    return checkedout() / capacity
+
+
+class AdmissionControlStage(PipelineStage):
+    """Classify requests, wait for an admission slot and release it when done."""
+
+    def __init__(
+        self,
+        controller: AdmissionController,
+        *,
+        rules: Sequence[AdmissionRule] = DEFAULT_RULES,
+        retry_after: int = 2,
+    ) -> None:
+        self.controller = controller
+        self.rules = tuple(rules)
+        self.retry_after = retry_after
+
+    def classify(self, ctx: RequestContext) -> Optional[Priority]:
+        """Priority of the request, or ``None`` when it bypasses admission."""
+        path = ctx.path
+        if (
+            ctx.method == "OPTIONS"
+            or path in _EXEMPT_PATHS
+            or path.startswith(_EXEMPT_PREFIXES)
+        ):
+            return None
+        for rule in self.rules:
+            if rule.matches(ctx.method, path):
+                return rule.priority
+        return Priority.NORMAL
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        priority = self.classify(ctx)
+        if priority is None:
+            return None
+        reason = await self.controller.acquire(priority)
+        if reason is None:
+            ctx.state["admission.priority"] = priority
+            return None
+        ADMISSION_SHED_COUNT.labels(priority=priority.label, reason=reason).inc()
+        logger.info(
+            "Shed %s %s (priority=%s, reason=%s)",
+            ctx.method,
+            ctx.path,
+            priority.label,
+            reason,
+        )
+        return JSONResponse(
+            status_code=503,
+            content={
+                "detail": "Service is busy, please retry shortly",
+                "retry_after": self.retry_after,
+            },
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    async def on_complete(self, ctx: RequestContext) -> None:
+        priority: Optional[Priority] = ctx.state.pop("admission.priority", None)
+        if priority is not None:
+            self.controller.release(priority)
+
+
+__all__ = [
+    "AdmissionControlStage",
+    "AdmissionController",
+    "AdmissionRule",
+    "DEFAULT_RULES",
+    "Priority",
+    "engine_pool_usage",
+]
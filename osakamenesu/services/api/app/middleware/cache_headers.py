@@ -3,14 +3,13 @@
 from __future__ import annotations
 
 import hashlib
-import json
-from typing import Callable
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
 
+from .pipeline import ASGIPipelineMiddleware, PipelineStage, RequestContext
 
-class CacheHeadersMiddleware(BaseHTTPMiddleware):
+
+class CacheHeadersStage(PipelineStage):
     """Add appropriate cache headers to API responses."""
 
     # Cache configurations for different endpoints
@@ -31,18 +30,24 @@ class CacheHeadersMiddleware(BaseHTTPMiddleware):
         "/api/reservations": {"no_cache": True},
     }
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
+    async def on_response(self, ctx: RequestContext) -> None:
+        headers = ctx.headers
+        assert headers is not None
+
+        # Handlers that set their own policy (media files) know better,
+        # including for their 304s
+        if "cache-control" in headers:
+            return
 
         # Only add cache headers for successful GET requests
-        if request.method != "GET" or response.status_code >= 300:
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-            return response
+        if ctx.method != "GET" or ctx.status_code >= 300:
+            headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            headers["Pragma"] = "no-cache"
+            headers["Expires"] = "0"
+            return
 
         # Find matching cache config
-        path = request.url.path
+        path = ctx.path
         cache_config = None
 
         for pattern, config in self.CACHE_CONFIGS.items():
@@ -56,7 +61,7 @@ class CacheHeadersMiddleware(BaseHTTPMiddleware):
 
         # Apply cache headers
         if cache_config.get("no_cache"):
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
         else:
             cache_parts = []
 
@@ -72,28 +77,44 @@ class CacheHeadersMiddleware(BaseHTTPMiddleware):
             if max_age > 0:
                 cache_parts.append(f"stale-while-revalidate={min(max_age * 2, 3600)}")
 
-            response.headers["Cache-Control"] = ", ".join(cache_parts)
-
-        # Add ETag for conditional requests
-        if hasattr(response, "_body") and response._body:
-            # Generate ETag from response body
-            etag = self._generate_etag(response._body)
-            response.headers["ETag"] = etag
-
-            # Check if client sent If-None-Match
-            client_etag = request.headers.get("If-None-Match")
-            if client_etag and client_etag == etag:
-                # Return 304 Not Modified
-                return Response(status_code=304, headers=response.headers)
+            headers["Cache-Control"] = ", ".join(cache_parts)
 
-        # Add Vary header for content negotiation
+        # Add Vary header for content negotiation (keeping e.g. CORS "Origin")
         vary_headers = ["Accept", "Accept-Encoding"]
         if cache_config.get("private"):
             vary_headers.append("Authorization")
-        response.headers["Vary"] = ", ".join(vary_headers)
+        for value in vary_headers:
+            headers.add_vary_header(value)
+
+        # Add ETag for conditional requests, only on responses shared caches
+        # may keep: private and no-store bodies (dashboard, auth) are never
+        # hashed.  Only single-chunk bodies are hashed; streaming responses
+        # pass through untouched.
+        if (
+            cache_config.get("public")
+            and not cache_config.get("no_cache")
+            and ctx.body
+            and "etag" not in headers
+        ):
+            etag = self._generate_etag(ctx.body)
+            headers["ETag"] = etag
 
-        return response
+            # Check if client sent If-None-Match
+            client_etag = ctx.request.headers.get("If-None-Match")
+            if client_etag and client_etag == etag:
+                # Return 304 Not Modified
+                ctx.status_code = 304
+                ctx.body = b""
 
     def _generate_etag(self, content: bytes) -> str:
         """Generate ETag from response content."""
         return f'"{hashlib.md5(content).hexdigest()}"'
+
+
+class CacheHeadersMiddleware(ASGIPipelineMiddleware):
+    """Standalone ASGI middleware running only :class:`CacheHeadersStage`."""
+
+    CACHE_CONFIGS = CacheHeadersStage.CACHE_CONFIGS
+
+    def __init__(self, app: ASGIApp) -> None:
+        super().__init__(app, stages=[CacheHeadersStage()])
@@ -3,32 +3,50 @@
 from __future__ import annotations
 
 import logging
-from typing import Callable, Optional
+import math
+from typing import Optional, Sequence
 from datetime import datetime, timedelta, timezone
 
-from fastapi import Request, Response
+from fastapi import Request
 from fastapi.responses import JSONResponse
 from starlette.status import HTTP_429_TOO_MANY_REQUESTS, HTTP_503_SERVICE_UNAVAILABLE
+from starlette.types import ASGIApp
 
-from ..utils.ratelimit import RateLimiter, create_rate_limiter
+from ..utils.ratelimit import RateLimitTier, create_multi_tier_rate_limiter
 from ..settings import settings
+from .pipeline import ASGIPipelineMiddleware, PipelineStage, RequestContext
 
 logger = logging.getLogger(__name__)
 
-
-class EnhancedRateLimitMiddleware:
+DEFAULT_TIERS = (
+    # Tier 1: Global rate limit (DDoS protection)
+    # 1000 requests per minute per IP (aggressive clients); charged on every
+    # attempt, including ones the other tiers reject, so a flood trips it
+    RateLimitTier(name="global", max_events=1000, window_sec=60.0, always_consume=True),
+    # Tier 2: Burst protection
+    # 100 requests per 10 seconds per IP (burst prevention)
+    RateLimitTier(name="burst", max_events=100, window_sec=10.0),
+    # Tier 3: Sustained traffic limit
+    # 300 requests per minute per IP (normal usage)
+    RateLimitTier(name="sustained", max_events=300, window_sec=60.0),
+)
+
+
+class EnhancedRateLimitStage(PipelineStage):
     """Enhanced rate limiting with multiple tiers and DDoS protection."""
 
     def __init__(
         self,
         redis_client,
         exclude_paths: Optional[set[str]] = None,
+        tiers: Sequence[RateLimitTier] = DEFAULT_TIERS,
     ):
-        """Initialize enhanced rate limit middleware.
+        """Initialize enhanced rate limit stage.
 
         Args:
             redis_client: Redis client for distributed rate limiting
             exclude_paths: Set of paths to exclude from rate limiting
+            tiers: Rate limit tiers, all checked in one round trip
         """
         self.exclude_paths = exclude_paths or {
             "/health",
@@ -37,31 +55,13 @@ class EnhancedRateLimitMiddleware:
             "/api/ops/health/backup",
         }
 
-        # Tier 1: Global rate limit (DDoS protection)
-        # 1000 requests per minute per IP (aggressive clients)
-        self.global_limiter = create_rate_limiter(
-            max_events=1000,
-            window_sec=60.0,
+        self.limiter = create_multi_tier_rate_limiter(
+            tiers=tiers,
             redis_client=redis_client,
-            namespace=f"{settings.rate_limit_namespace}:global",
+            namespace=f"{settings.rate_limit_namespace}:tiers",
         )
-
-        # Tier 2: Burst protection
-        # 100 requests per 10 seconds per IP (burst prevention)
-        self.burst_limiter = create_rate_limiter(
-            max_events=100,
-            window_sec=10.0,
-            redis_client=redis_client,
-            namespace=f"{settings.rate_limit_namespace}:burst",
-        )
-
-        # Tier 3: Sustained traffic limit
-        # 300 requests per minute per IP (normal usage)
-        self.sustained_limiter = create_rate_limiter(
-            max_events=300,
-            window_sec=60.0,
-            redis_client=redis_client,
-            namespace=f"{settings.rate_limit_namespace}:sustained",
+        self.sustained_tier = next(
+            (tier for tier in self.limiter.tiers if tier.name == "sustained"), None
         )
 
         # Track suspicious IPs
@@ -94,16 +94,18 @@ class EnhancedRateLimitMiddleware:
         ]
         return any(path.startswith(pattern) for pattern in health_patterns)
 
-    async def __call__(self, request: Request, call_next: Callable) -> Response:
-        """Process the request with enhanced rate limiting."""
-        path = request.url.path
+    async def on_request(self, ctx: RequestContext) -> Optional[JSONResponse]:
+        """Check the request against every rate limit tier."""
+        path = ctx.path
 
         # Skip rate limiting for excluded paths and health checks
         if path in self.exclude_paths or self._is_health_check(path):
-            return await call_next(request)
+            return None
+
+        ctx.state["rate_limit.checked"] = True
 
         # Extract client IP
-        client_ip = self._extract_client_ip(request)
+        client_ip = self._extract_client_ip(ctx.request)
         key_prefix = f"ip:{client_ip}"
 
         # Check if IP is in suspicious list
@@ -125,58 +127,75 @@ class EnhancedRateLimitMiddleware:
                 # Remove from suspicious list after cooldown
                 del self.suspicious_ips[client_ip]
 
-        # Check all rate limit tiers
-        limiters = [
-            ("global", self.global_limiter),
-            ("burst", self.burst_limiter),
-            ("sustained", self.sustained_limiter),
-        ]
-
-        for tier_name, limiter in limiters:
-            allowed, retry_after = await limiter.allow(f"{key_prefix}:{tier_name}")
-
-            if not allowed:
-                # Log rate limit violation
-                logger.warning(
-                    f"Rate limit exceeded - Tier: {tier_name}, IP: {client_ip}, "
-                    f"Path: {path}, Retry after: {retry_after}s"
-                )
+        # Check all rate limit tiers in a single round trip
+        allowed, tier, retry_after = await self.limiter.allow(key_prefix)
 
-                # Mark IP as suspicious if hitting global limit
-                if tier_name == "global":
-                    self.suspicious_ips[client_ip] = datetime.now(timezone.utc)
-
-                # Return rate limit response
-                return JSONResponse(
-                    status_code=HTTP_429_TOO_MANY_REQUESTS,
-                    content={
-                        "detail": f"Rate limit exceeded ({tier_name})",
-                        "retry_after": retry_after,
-                        "tier": tier_name,
-                    },
-                    headers={
-                        "Retry-After": str(int(retry_after)),
-                        "X-RateLimit-Limit": str(limiter.max_events),
-                        "X-RateLimit-Window": str(limiter.window),
-                        "X-RateLimit-Tier": tier_name,
-                    },
-                )
+        if not allowed:
+            # Log rate limit violation
+            logger.warning(
+                f"Rate limit exceeded - Tier: {tier.name}, IP: {client_ip}, "
+                f"Path: {path}, Retry after: {retry_after}s"
+            )
 
-        # Process the request
-        response = await call_next(request)
+            # Mark IP as suspicious if hitting global limit
+            if tier.name == "global":
+                self.suspicious_ips[client_ip] = datetime.now(timezone.utc)
+
+            # Return rate limit response
+            return JSONResponse(
+                status_code=HTTP_429_TOO_MANY_REQUESTS,
+                content={
+                    "detail": f"Rate limit exceeded ({tier.name})",
+                    "retry_after": retry_after,
+                    "tier": tier.name,
+                },
+                headers={
+                    "Retry-After": str(max(1, math.ceil(retry_after))),
+                    "X-RateLimit-Limit": str(tier.max_events),
+                    "X-RateLimit-Window": str(tier.window_sec),
+                    "X-RateLimit-Tier": tier.name,
+                },
+            )
 
-        # Add rate limit headers to successful responses
-        if response.status_code < 400:
-            response.headers["X-RateLimit-Limit-Sustained"] = str(
-                self.sustained_limiter.max_events
+        return None
+
+    async def on_response(self, ctx: RequestContext) -> None:
+        """Add rate limit headers to successful responses."""
+        if (
+            ctx.status_code < 400
+            and self.sustained_tier is not None
+            and ctx.state.get("rate_limit.checked")
+        ):
+            ctx.headers["X-RateLimit-Limit-Sustained"] = str(
+                self.sustained_tier.max_events
             )
-            response.headers["X-RateLimit-Window-Sustained"] = str(
-                self.sustained_limiter.window
+            ctx.headers["X-RateLimit-Window-Sustained"] = str(
+                self.sustained_tier.window_sec
             )
 
-        return response
+
+class EnhancedRateLimitMiddleware(ASGIPipelineMiddleware):
+    """Standalone ASGI middleware running only :class:`EnhancedRateLimitStage`."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        redis_client,
+        exclude_paths: Optional[set[str]] = None,
+        tiers: Sequence[RateLimitTier] = DEFAULT_TIERS,
+    ):
+        super().__init__(
+            app,
+            stages=[
+                EnhancedRateLimitStage(
+                    redis_client=redis_client,
+                    exclude_paths=exclude_paths,
+                    tiers=tiers,
+                )
+            ],
+        )
 
 
-def create_enhanced_rate_limiter(redis_client) -> EnhancedRateLimitMiddleware:
-    """Create an instance of enhanced rate limiting middleware."""
-    return EnhancedRateLimitMiddleware(redis_client=redis_client)
+def create_enhanced_rate_limiter(redis_client) -> EnhancedRateLimitStage:
+    """Create an enhanced rate limiting stage for an ASGI pipeline."""
+    return EnhancedRateLimitStage(redis_client=redis_client)
@@ -3,13 +3,11 @@
 from __future__ import annotations
 
 import logging
-import time
 import traceback
-from typing import Callable, Optional
+from typing import Optional
 
-from fastapi import Request, Response
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
 from starlette.status import (
     HTTP_400_BAD_REQUEST,
     HTTP_401_UNAUTHORIZED,
@@ -19,15 +17,26 @@ from starlette.status import (
     HTTP_422_UNPROCESSABLE_ENTITY,
     HTTP_500_INTERNAL_SERVER_ERROR,
 )
-
-from ..monitoring import capture_exception, set_context, set_tag, set_user_context
+from starlette.types import ASGIApp, Message
+
+from ..monitoring import (
+    capture_exception,
+    capture_message,
+    set_context,
+    set_tag,
+    set_user_context,
+)
 from ..monitoring.metrics import ERROR_COUNT
+from .pipeline import ASGIPipelineMiddleware, PipelineStage, RequestContext
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on the request body kept around for error reports.
+MAX_CAPTURED_BODY_BYTES = 10 * 1024
 
-class ErrorTrackingMiddleware(BaseHTTPMiddleware):
-    """Middleware to track errors and send them to Sentry."""
+
+class ErrorTrackingStage(PipelineStage):
+    """Pipeline stage tracking errors and sending them to Sentry."""
 
     # Error codes that should not be sent to Sentry
     IGNORED_STATUS_CODES = {
@@ -41,28 +50,24 @@ class ErrorTrackingMiddleware(BaseHTTPMiddleware):
 
     def __init__(
         self,
-        app,
         capture_request_body: bool = True,
         capture_response_body: bool = False,
         sanitize_headers: bool = True,
     ):
-        """Initialize error tracking middleware.
+        """Initialize error tracking stage.
 
         Args:
-            app: FastAPI application
             capture_request_body: Whether to capture request body in error context
             capture_response_body: Whether to capture response body in error context
             sanitize_headers: Whether to sanitize sensitive headers
         """
-        super().__init__(app)
         self.capture_request_body = capture_request_body
         self.capture_response_body = capture_response_body
         self.sanitize_headers = sanitize_headers
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Process the request and track any errors."""
-        # Start timing
-        start_time = time.time()
+    async def on_request(self, ctx: RequestContext) -> None:
+        """Set the error context for the request."""
+        request = ctx.request
 
         # Set request context
         self._set_request_context(request)
@@ -74,33 +79,50 @@ class ErrorTrackingMiddleware(BaseHTTPMiddleware):
                 email=getattr(request.state.user, "email", None),
             )
 
-        try:
-            response = await call_next(request)
-
-            # Track client errors (4xx)
-            if 400 <= response.status_code < 500:
-                self._track_client_error(request, response)
-
-            # Track server errors (5xx)
-            elif response.status_code >= 500:
-                await self._track_server_error(request, response)
-
-            return response
-
-        except Exception as exc:
-            # Track unhandled exceptions
-            duration = time.time() - start_time
-            await self._track_exception(request, exc, duration)
-
-            # Return error response
-            return JSONResponse(
-                status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-                content={
-                    "detail": "An internal server error occurred",
-                    "type": "internal_server_error",
-                    "request_id": getattr(request.state, "request_id", None),
-                },
-            )
+        if self.capture_request_body:
+            # The app consumes the body stream, so keep a bounded copy of it
+            # while it is read instead of re-reading it on failure.
+            captured = bytearray()
+            ctx.state["error_tracking.body"] = captured
+            receive = ctx.receive
+
+            async def capturing_receive() -> Message:
+                message = await receive()
+                if message["type"] == "http.request":
+                    remaining = MAX_CAPTURED_BODY_BYTES - len(captured)
+                    if remaining > 0:
+                        captured.extend(message.get("body", b"")[:remaining])
+                return message
+
+            ctx.receive = capturing_receive
+        return None
+
+    async def on_response(self, ctx: RequestContext) -> None:
+        """Track client and server error responses."""
+        status_code = ctx.status_code
+        # Track client errors (4xx)
+        if 400 <= status_code < 500:
+            self._track_client_error(ctx)
+
+        # Track server errors (5xx); responses produced by on_error were
+        # already reported with the exception attached.
+        elif status_code >= 500 and "error_tracking.exception" not in ctx.state:
+            await self._track_server_error(ctx)
+
+    async def on_error(self, ctx: RequestContext, exc: Exception) -> JSONResponse:
+        """Track unhandled exceptions and return a generic error response."""
+        ctx.state["error_tracking.exception"] = exc
+        await self._track_exception(ctx, exc, ctx.elapsed)
+
+        # Return error response
+        return JSONResponse(
+            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "detail": "An internal server error occurred",
+                "type": "internal_server_error",
+                "request_id": getattr(ctx.request.state, "request_id", None),
+            },
+        )
 
     def _set_request_context(self, request: Request) -> None:
         """Set request context for error tracking."""
@@ -128,47 +150,46 @@ class ErrorTrackingMiddleware(BaseHTTPMiddleware):
 
         set_context("request", context)
 
-    def _track_client_error(self, request: Request, response: Response) -> None:
+    def _track_client_error(self, ctx: RequestContext) -> None:
         """Track client errors (4xx) for metrics."""
         ERROR_COUNT.labels(
-            error_type=f"client_{response.status_code}",
+            error_type=f"client_{ctx.status_code}",
             severity="warning",
         ).inc()
 
         # Log for debugging
-        logger.debug(
-            f"Client error: {response.status_code} {request.method} {request.url.path}"
-        )
+        logger.debug(f"Client error: {ctx.status_code} {ctx.method} {ctx.path}")
 
-    async def _track_server_error(self, request: Request, response: Response) -> None:
+    async def _track_server_error(self, ctx: RequestContext) -> None:
         """Track server errors (5xx)."""
+        status_code = ctx.status_code
         ERROR_COUNT.labels(
-            error_type=f"server_{response.status_code}",
+            error_type=f"server_{status_code}",
             severity="error",
         ).inc()
 
         # Only send to Sentry if not in ignored list
-        if response.status_code not in self.IGNORED_STATUS_CODES:
-            # Try to get response body if enabled
+        if status_code not in self.IGNORED_STATUS_CODES:
+            # Response body is only available for single-chunk responses
             response_body = None
-            if self.capture_response_body and hasattr(response, "body"):
+            if self.capture_response_body and ctx.body:
                 try:
-                    response_body = response.body.decode() if response.body else None
+                    response_body = ctx.body.decode()
                 except Exception:
                     pass
 
             capture_message(
-                f"Server error: {response.status_code}",
+                f"Server error: {status_code}",
                 level="error",
-                response_status=response.status_code,
+                response_status=status_code,
                 response_body=response_body,
-                request_path=request.url.path,
-                request_method=request.method,
+                request_path=ctx.path,
+                request_method=ctx.method,
             )
 
     async def _track_exception(
         self,
-        request: Request,
+        ctx: RequestContext,
         exc: Exception,
         duration: float,
     ) -> None:
@@ -178,10 +199,12 @@ class ErrorTrackingMiddleware(BaseHTTPMiddleware):
             severity="error",
         ).inc()
 
+        request = ctx.request
+
         # Prepare extra context
         extra_context = {
-            "request_method": request.method,
-            "request_path": request.url.path,
+            "request_method": ctx.method,
+            "request_path": ctx.path,
             "request_duration": duration,
             "exception_type": type(exc).__name__,
             "exception_message": str(exc),
@@ -189,13 +212,9 @@ class ErrorTrackingMiddleware(BaseHTTPMiddleware):
         }
 
         # Add request body if enabled
-        if self.capture_request_body:
-            try:
-                body = await request.body()
-                if body:
-                    extra_context["request_body"] = body.decode()
-            except Exception:
-                pass
+        body = ctx.state.get("error_tracking.body")
+        if body:
+            extra_context["request_body"] = body.decode(errors="replace")
 
         # Add request ID if available
         if hasattr(request.state, "request_id"):
@@ -206,7 +225,7 @@ class ErrorTrackingMiddleware(BaseHTTPMiddleware):
 
         # Log locally as well
         logger.error(
-            f"Unhandled exception in {request.method} {request.url.path}: {exc}",
+            f"Unhandled exception in {ctx.method} {ctx.path}: {exc}",
             exc_info=True,
             extra=extra_context,
         )
@@ -254,6 +273,30 @@ class ErrorTrackingMiddleware(BaseHTTPMiddleware):
         return sanitized
 
 
+class ErrorTrackingMiddleware(ASGIPipelineMiddleware):
+    """Standalone ASGI middleware running only :class:`ErrorTrackingStage`."""
+
+    IGNORED_STATUS_CODES = ErrorTrackingStage.IGNORED_STATUS_CODES
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        capture_request_body: bool = True,
+        capture_response_body: bool = False,
+        sanitize_headers: bool = True,
+    ):
+        super().__init__(
+            app,
+            stages=[
+                ErrorTrackingStage(
+                    capture_request_body=capture_request_body,
+                    capture_response_body=capture_response_body,
+                    sanitize_headers=sanitize_headers,
+                )
+            ],
+        )
+
+
 def create_error_tracking_middleware(**kwargs) -> type[ErrorTrackingMiddleware]:
     """Create a configured ErrorTrackingMiddleware class."""
 
@@ -3,173 +3,210 @@
 from __future__ import annotations
 
 import logging
-import time
 import uuid
-from typing import Callable, Optional
+from contextlib import ExitStack
+from typing import Optional
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
 
 from ..monitoring import set_context, set_tag, start_transaction
-from ..monitoring.metrics import API_REQUEST_DURATION, MetricsCollector
+from ..monitoring.metrics import MetricsCollector, get_metrics_collector
+from ..monitoring.queries import current_query_stats
+from .pipeline import ASGIPipelineMiddleware, PipelineStage, RequestContext
 
 logger = logging.getLogger(__name__)
 
+_SKIPPED_PATHS = frozenset({"/health", "/metrics", "/healthz"})
 
-class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
-    """Middleware to monitor API performance and track metrics."""
+
+class PerformanceMonitoringStage(PipelineStage):
+    """Pipeline stage monitoring API performance and tracking metrics."""
 
     def __init__(
         self,
-        app,
         metrics_collector: Optional[MetricsCollector] = None,
         slow_request_threshold: float = 3.0,  # seconds
         track_db_queries: bool = True,
         track_cache_operations: bool = True,
     ):
-        """Initialize performance monitoring middleware.
+        """Initialize performance monitoring stage.
 
         Args:
-            app: FastAPI application
-            metrics_collector: Metrics collector instance
+            metrics_collector: Metrics collector (defaults to the process-wide one)
             slow_request_threshold: Threshold for slow request warnings (seconds)
             track_db_queries: Whether to track database query metrics
             track_cache_operations: Whether to track cache operation metrics
         """
-        super().__init__(app)
-        self.metrics_collector = metrics_collector or MetricsCollector()
+        self.metrics_collector = metrics_collector or get_metrics_collector()
         self.slow_request_threshold = slow_request_threshold
         self.track_db_queries = track_db_queries
         self.track_cache_operations = track_cache_operations
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Process the request and monitor performance."""
+    async def on_request(self, ctx: RequestContext) -> None:
+        """Start the transaction and attach the performance context."""
         # Generate request ID
         request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
+        state = ctx.request.state
+        state.request_id = request_id
 
         # Skip performance monitoring for health checks
-        if request.url.path in ["/health", "/metrics", "/healthz"]:
-            return await call_next(request)
-
-        # Start performance transaction
-        with start_transaction(
-            op="http.server",
-            name=f"{request.method} {request.url.path}",
-        ) as transaction:
-            # Set transaction tags
-            transaction.set_tag("http.method", request.method)
-            transaction.set_tag("http.path", request.url.path)
-            transaction.set_tag("request.id", request_id)
-
-            # Track request start
-            start_time = time.time()
-            request.state.start_time = start_time
-
-            # Initialize performance context
-            perf_context = {
-                "db_queries": 0,
-                "db_time": 0.0,
-                "cache_hits": 0,
-                "cache_misses": 0,
-                "cache_time": 0.0,
-            }
-            request.state.performance = perf_context
-
-            try:
-                # Process request
-                response = await call_next(request)
-
-                # Calculate duration
-                duration = time.time() - start_time
-
-                # Set response tags
-                transaction.set_tag("http.status_code", response.status_code)
-                transaction.set_status(
-                    "ok" if response.status_code < 400 else "error"
-                )
-
-                # Record metrics
-                await self._record_metrics(request, response, duration)
-
-                # Add performance headers
-                response.headers["X-Request-ID"] = request_id
-                response.headers["X-Response-Time"] = f"{duration * 1000:.2f}ms"
-
-                # Add performance context to response
-                if hasattr(request.state, "performance"):
-                    response.headers["X-DB-Queries"] = str(perf_context["db_queries"])
-                    response.headers["X-DB-Time"] = f"{perf_context['db_time'] * 1000:.2f}ms"
-                    response.headers["X-Cache-Hits"] = str(perf_context["cache_hits"])
-                    response.headers["X-Cache-Misses"] = str(perf_context["cache_misses"])
-
-                # Warn about slow requests
-                if duration > self.slow_request_threshold:
-                    logger.warning(
-                        f"Slow request detected: {request.method} {request.url.path} "
-                        f"took {duration:.2f}s (threshold: {self.slow_request_threshold}s)",
-                        extra={
-                            "request_id": request_id,
-                            "duration": duration,
-                            "db_queries": perf_context["db_queries"],
-                            "db_time": perf_context["db_time"],
-                        },
-                    )
-
-                return response
-
-            except Exception as exc:
-                # Record error metrics
-                duration = time.time() - start_time
-                transaction.set_status("internal_error")
-
-                await self.metrics_collector.record_api_request(
-                    method=request.method,
-                    endpoint=request.url.path,
-                    status_code=500,
-                    duration=duration,
-                )
-
-                raise
+        if ctx.path in _SKIPPED_PATHS:
+            return None
+
+        # Start performance transaction; closed in on_complete
+        stack = ExitStack()
+        transaction = stack.enter_context(
+            start_transaction(
+                op="http.server",
+                name=f"{ctx.method} {ctx.path}",
+            )
+        )
+        transaction.set_tag("http.method", ctx.method)
+        transaction.set_tag("http.path", ctx.path)
+        transaction.set_tag("request.id", request_id)
+
+        state.start_time = ctx.start_time
+        state.performance = {
+            "db_queries": 0,
+            "db_time": 0.0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "cache_time": 0.0,
+        }
+        ctx.state["performance.transaction"] = transaction
+        ctx.state["performance.stack"] = stack
+        return None
+
+    async def on_response(self, ctx: RequestContext) -> None:
+        """Add performance headers to the response."""
+        transaction = ctx.state.get("performance.transaction")
+        if transaction is None:
+            return
+
+        headers = ctx.headers
+        assert headers is not None
+        state = ctx.request.state
+        perf_context = state.performance
+        duration = ctx.elapsed
+        query_stats = current_query_stats()
+        if self.track_db_queries and query_stats is not None:
+            perf_context["db_queries"] = query_stats.count
+            perf_context["db_time"] = query_stats.duration
+
+        headers["X-Request-ID"] = state.request_id
+        headers["X-Response-Time"] = f"{duration * 1000:.2f}ms"
+        headers["X-DB-Queries"] = str(perf_context["db_queries"])
+        headers["X-DB-Time"] = f"{perf_context['db_time'] * 1000:.2f}ms"
+        headers["X-Cache-Hits"] = str(perf_context["cache_hits"])
+        headers["X-Cache-Misses"] = str(perf_context["cache_misses"])
+
+    async def on_error(self, ctx: RequestContext, exc: Exception) -> None:
+        """Mark the transaction as failed; the error itself is not handled."""
+        transaction = ctx.state.get("performance.transaction")
+        if transaction is not None:
+            transaction.set_status("internal_error")
+            ctx.state["performance.error"] = exc
+        return None
+
+    async def on_complete(self, ctx: RequestContext) -> None:
+        """Record metrics once the response has been delivered."""
+        stack: Optional[ExitStack] = ctx.state.pop("performance.stack", None)
+        if stack is None:
+            return
+
+        transaction = ctx.state.pop("performance.transaction")
+        duration = ctx.elapsed
+        error: Optional[Exception] = ctx.state.pop("performance.error", None)
+        status_code = ctx.status_code if ctx.status_code is not None else 500
+
+        try:
+            transaction.set_tag("http.status_code", status_code)
+            transaction.set_status("ok" if status_code < 400 else "error")
+            await self._record_metrics(ctx, status_code, duration)
+        finally:
+            if error is not None:
+                stack.__exit__(type(error), error, error.__traceback__)
+            else:
+                stack.close()
+
+        # Warn about slow requests
+        if duration > self.slow_request_threshold:
+            perf_context = ctx.request.state.performance
+            logger.warning(
+                f"Slow request detected: {ctx.method} {ctx.path} "
+                f"took {duration:.2f}s (threshold: {self.slow_request_threshold}s)",
+                extra={
+                    "request_id": ctx.request.state.request_id,
+                    "duration": duration,
+                    "db_queries": perf_context["db_queries"],
+                    "db_time": perf_context["db_time"],
+                },
+            )
 
     async def _record_metrics(
         self,
-        request: Request,
-        response: Response,
+        ctx: RequestContext,
+        status_code: int,
         duration: float,
     ) -> None:
         """Record performance metrics."""
-        # Record API request metrics
+        # Record API request metrics; labelled by route template, not raw path
         await self.metrics_collector.record_api_request(
-            method=request.method,
-            endpoint=request.url.path,
-            status_code=response.status_code,
+            method=ctx.method,
+            endpoint=ctx.route_path or "unmatched",
+            status_code=status_code,
             duration=duration,
         )
 
+        perf_context = ctx.request.state.performance
+
         # Set performance measurements
         set_context("performance", {
             "duration": duration,
-            "db_queries": request.state.performance["db_queries"],
-            "db_time": request.state.performance["db_time"],
-            "cache_hits": request.state.performance["cache_hits"],
-            "cache_misses": request.state.performance["cache_misses"],
-            "cache_time": request.state.performance["cache_time"],
+            "db_queries": perf_context["db_queries"],
+            "db_time": perf_context["db_time"],
+            "cache_hits": perf_context["cache_hits"],
+            "cache_misses": perf_context["cache_misses"],
+            "cache_time": perf_context["cache_time"],
         })
 
         # Log performance summary
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug(
-                f"Request completed: {request.method} {request.url.path} - "
-                f"Status: {response.status_code}, Duration: {duration * 1000:.2f}ms, "
-                f"DB: {request.state.performance['db_queries']} queries "
-                f"({request.state.performance['db_time'] * 1000:.2f}ms), "
-                f"Cache: {request.state.performance['cache_hits']} hits, "
-                f"{request.state.performance['cache_misses']} misses",
-                extra={"request_id": request.state.request_id},
+                f"Request completed: {ctx.method} {ctx.path} - "
+                f"Status: {status_code}, Duration: {duration * 1000:.2f}ms, "
+                f"DB: {perf_context['db_queries']} queries "
+                f"({perf_context['db_time'] * 1000:.2f}ms), "
+                f"Cache: {perf_context['cache_hits']} hits, "
+                f"{perf_context['cache_misses']} misses",
+                extra={"request_id": ctx.request.state.request_id},
             )
 
 
+class PerformanceMonitoringMiddleware(ASGIPipelineMiddleware):
+    """Standalone ASGI middleware running only :class:`PerformanceMonitoringStage`."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        metrics_collector: Optional[MetricsCollector] = None,
+        slow_request_threshold: float = 3.0,
+        track_db_queries: bool = True,
+        track_cache_operations: bool = True,
+    ):
+        super().__init__(
+            app,
+            stages=[
+                PerformanceMonitoringStage(
+                    metrics_collector=metrics_collector,
+                    slow_request_threshold=slow_request_threshold,
+                    track_db_queries=track_db_queries,
+                    track_cache_operations=track_cache_operations,
+                )
+            ],
+        )
+
+
 def create_performance_monitoring_middleware(
     **kwargs,
 ) -> type[PerformanceMonitoringMiddleware]:
@@ -179,4 +216,4 @@ def create_performance_monitoring_middleware(
         def __init__(self, app):
             super().__init__(app, **kwargs)
 
-    return ConfiguredPerformanceMonitoringMiddleware
\ No newline at end of file
+    return ConfiguredPerformanceMonitoringMiddleware
@@ -0,0 +1,210 @@
+"""Composable pure-ASGI middleware pipeline.
+
+Every ``BaseHTTPMiddleware`` layer runs the downstream app in a separate task
+and re-streams the response body through a memory channel.  Stacking several
+of them adds measurable per-request latency and breaks streaming responses.
+
+``ASGIPipelineMiddleware`` runs a list of lightweight stages inside a single
+ASGI layer instead.  Stages see the request before the app runs, may short
+circuit it with their own response, adjust the response status/headers before
+they are sent, handle exceptions and run bookkeeping once the response has
+been delivered.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Optional, Sequence
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class RequestContext:
+    """Per-request state shared by the stages of a pipeline."""
+
+    __slots__ = (
+        "scope",
+        "receive",
+        "start_time",
+        "status_code",
+        "headers",
+        "body",
+        "state",
+        "response_started",
+        "_request",
+    )
+
+    def __init__(self, scope: Scope, receive: Receive) -> None:
+        self.scope = scope
+        self.receive = receive
+        self.start_time = time.perf_counter()
+        self.status_code: Optional[int] = None
+        self.headers: Optional[MutableHeaders] = None
+        # Complete response body, only populated for single-chunk responses.
+        self.body: Optional[bytes] = None
+        # Scratch space for stages (keyed by stage-specific names).
+        self.state: dict[str, Any] = {}
+        self.response_started = False
+        self._request: Optional[Request] = None
+
+    @property
+    def request(self) -> Request:
+        if self._request is None:
+            self._request = Request(self.scope, self.receive)
+        return self._request
+
+    @property
+    def path(self) -> str:
+        return self.scope["path"]
+
+    @property
+    def method(self) -> str:
+        return self.scope["method"]
+
+    @property
+    def route_path(self) -> Optional[str]:
+        """Path template of the matched route, once the router has run."""
+        return getattr(self.scope.get("route"), "path", None)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the request entered the pipeline."""
+        return time.perf_counter() - self.start_time
+
+
+class PipelineStage:
+    """Base class for pipeline stages. Override only the hooks you need."""
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        """Inspect the request; return a response to short circuit the app."""
+        return None
+
+    async def on_response(self, ctx: RequestContext) -> None:
+        """Adjust ``ctx.status_code``/``ctx.headers``/``ctx.body`` before sending."""
+
+    async def on_error(self, ctx: RequestContext, exc: Exception) -> Optional[Response]:
+        """Observe an unhandled exception; return a response to handle it."""
+        return None
+
+    async def on_complete(self, ctx: RequestContext) -> None:
+        """Run after the response has been sent (or the request failed)."""
+
+
+class ASGIPipelineMiddleware:
+    """Run a sequence of :class:`PipelineStage` objects in one ASGI layer.
+
+    Stages are listed outermost first: ``on_request`` runs in order, while
+    ``on_response``, ``on_error`` and ``on_complete`` run in reverse so the
+    first stage has the final say, exactly as with nested middlewares.
+    """
+
+    def __init__(self, app: ASGIApp, stages: Sequence[PipelineStage] = ()) -> None:
+        self.app = app
+        self.stages = tuple(stages)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.stages:
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext(scope, receive)
+        entered: list[PipelineStage] = []
+        pending_start: Optional[Message] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal pending_start
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                # Hold the start message until the first body chunk so stages
+                # can see single-chunk bodies (ETag) without buffering streams.
+                pending_start = message
+                return
+            if pending_start is not None:
+                start, pending_start = pending_start, None
+                start, message = await self._finalize(ctx, entered, start, message)
+                ctx.response_started = True
+                await send(start)
+            await send(message)
+
+        try:
+            response: Optional[Response] = None
+            for stage in self.stages:
+                entered.append(stage)
+                response = await stage.on_request(ctx)
+                if response is not None:
+                    break
+
+            if response is not None:
+                await response(scope, ctx.receive, send_wrapper)
+                return
+
+            try:
+                await self.app(scope, ctx.receive, send_wrapper)
+            except Exception as exc:
+                handled = await self._handle_error(ctx, entered, exc)
+                if handled is None or ctx.response_started:
+                    raise
+                pending_start = None
+                await handled(scope, ctx.receive, send_wrapper)
+                return
+
+            if pending_start is not None:
+                # App sent a start message without any body message.
+                await send_wrapper({"type": "http.response.body", "body": b""})
+        finally:
+            for stage in reversed(entered):
+                try:
+                    await stage.on_complete(ctx)
+                except Exception:  # pragma: no cover - defensive logging
+                    logger.exception(
+                        "Pipeline stage %s failed in on_complete",
+                        type(stage).__name__,
+                    )
+
+    async def _finalize(
+        self,
+        ctx: RequestContext,
+        entered: list[PipelineStage],
+        start: Message,
+        message: Message,
+    ) -> tuple[Message, Message]:
+        is_single_chunk = message["type"] == "http.response.body" and not message.get(
+            "more_body", False
+        )
+        original_body = message.get("body", b"") if is_single_chunk else None
+
+        ctx.status_code = start["status"]
+        ctx.headers = MutableHeaders(raw=list(start.get("headers", [])))
+        ctx.body = original_body
+
+        for stage in reversed(entered):
+            await stage.on_response(ctx)
+
+        if is_single_chunk and ctx.body is not original_body:
+            body = ctx.body or b""
+            if ctx.status_code == 304:
+                del ctx.headers["content-length"]
+            else:
+                ctx.headers["content-length"] = str(len(body))
+            message = {**message, "body": body}
+
+        start = {**start, "status": ctx.status_code, "headers": ctx.headers.raw}
+        return start, message
+
+    async def _handle_error(
+        self,
+        ctx: RequestContext,
+        entered: list[PipelineStage],
+        exc: Exception,
+    ) -> Optional[Response]:
+        for stage in reversed(entered):
+            response = await stage.on_error(ctx, exc)
+            if response is not None:
+                return response
+        return None
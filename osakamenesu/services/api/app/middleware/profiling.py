@@ -0,0 +1,75 @@
+"""Opt-in sampling profile of a single request for admins."""
+
+from __future__ import annotations
+
+import logging
+import secrets
+from typing import Optional
+
+from ..monitoring.profiling import (
+    ProfilerBusy,
+    SamplingProfiler,
+    store_request_profile,
+)
+from .pipeline import PipelineStage, RequestContext
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+# Finer than the ops endpoint's default: a request lasts milliseconds
+REQUEST_SAMPLE_INTERVAL = 0.001
+
+
+class RequestProfilingStage(PipelineStage):
+    """Profile requests sent with ``X-Profile: 1`` and a valid ``X-Admin-Key``.
+
+    The response carries ``X-Profile-Id`` and ``X-Profile-Samples``; the
+    collapsed stacks are served by ``GET /api/ops/profile/requests/{id}``.
+    The sampler sees the whole event loop thread, so other requests running
+    concurrently in the worker show up in the profile as well.
+    """
+
+    def __init__(self, admin_key: str) -> None:
+        self.admin_key = admin_key
+
+    def _authorized(self, ctx: RequestContext) -> bool:
+        headers = ctx.request.headers
+        if headers.get(PROFILE_HEADER) not in ("1", "true"):
+            return False
+        candidate = headers.get("x-admin-key") or ""
+        return bool(self.admin_key) and secrets.compare_digest(
+            candidate, self.admin_key
+        )
+
+    async def on_request(self, ctx: RequestContext) -> None:
+        if not self._authorized(ctx):
+            return None
+        try:
+            profiler = SamplingProfiler(interval=REQUEST_SAMPLE_INTERVAL).start()
+        except ProfilerBusy:
+            ctx.state["profiling.busy"] = True
+            return None
+        ctx.state["profiling.profiler"] = profiler
+        return None
+
+    async def on_response(self, ctx: RequestContext) -> None:
+        headers = ctx.headers
+        assert headers is not None
+        if ctx.state.pop("profiling.busy", False):
+            headers["X-Profile"] = "busy"
+            return
+        profiler: Optional[SamplingProfiler] = ctx.state.pop("profiling.profiler", None)
+        if profiler is None:
+            return
+        result = profiler.stop()
+        headers["X-Profile-Id"] = store_request_profile(result)
+        headers["X-Profile-Samples"] = str(result.samples)
+
+    async def on_complete(self, ctx: RequestContext) -> None:
+        # The response never started (unhandled error); release the sampler
+        profiler: Optional[SamplingProfiler] = ctx.state.pop("profiling.profiler", None)
+        if profiler is not None:
+            profiler.stop()
+
+
+__all__ = ["RequestProfilingStage"]
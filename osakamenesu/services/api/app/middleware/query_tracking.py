@@ -0,0 +1,95 @@
+"""Per-request SQL statistics, ``Server-Timing`` and N+1 warnings."""
+
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+from ..monitoring.metrics import (
+    DATABASE_N_PLUS_ONE_COUNT,
+    DATABASE_REQUEST_DURATION,
+    DATABASE_REQUEST_QUERIES,
+)
+from ..monitoring.queries import QueryStats, start_tracking, stop_tracking
+from .pipeline import PipelineStage, RequestContext
+
+logger = logging.getLogger(__name__)
+
+_SKIPPED_PATHS = frozenset({"/health", "/metrics", "/healthz"})
+# Label for requests no route matched; raw paths would explode cardinality
+_UNMATCHED_ROUTE = "unmatched"
+
+
+def route_label(ctx: RequestContext) -> str:
+    """Route template (``/api/v1/shops/{shop_id}``) of the handled request."""
+    path = ctx.route_path
+    return f"{ctx.method} {path}" if path else _UNMATCHED_ROUTE
+
+
+class QueryTrackingStage(PipelineStage):
+    """Track the SQL a request issues (needs ``install_query_tracking``).
+
+    Adds ``Server-Timing: db;dur=..`` to responses, observes the per-route
+    query count/time histograms and logs a warning when one normalized
+    statement runs more than ``n_plus_one_threshold`` times in a request.
+    """
+
+    def __init__(
+        self, *, n_plus_one_threshold: int = 10, server_timing: bool = True
+    ) -> None:
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.server_timing = server_timing
+
+    async def on_request(self, ctx: RequestContext) -> None:
+        if ctx.path in _SKIPPED_PATHS:
+            return None
+        stats, token = start_tracking()
+        ctx.state["query_tracking.stats"] = stats
+        ctx.state["query_tracking.token"] = token
+        return None
+
+    async def on_response(self, ctx: RequestContext) -> None:
+        stats: Optional[QueryStats] = ctx.state.get("query_tracking.stats")
+        if stats is None or not self.server_timing:
+            return
+        headers = ctx.headers
+        assert headers is not None
+        timings = [
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+            f"app;dur={ctx.elapsed * 1000:.1f}",
+        ]
+        existing = headers.get("server-timing")
+        headers["Server-Timing"] = ", ".join(
+            [existing, *timings] if existing else timings
+        )
+
+    async def on_complete(self, ctx: RequestContext) -> None:
+        stats: Optional[QueryStats] = ctx.state.pop("query_tracking.stats", None)
+        if stats is None:
+            return
+        stop_tracking(ctx.state.pop("query_tracking.token"))
+
+        route = route_label(ctx)
+        DATABASE_REQUEST_QUERIES.labels(route=route).observe(stats.count)
+        DATABASE_REQUEST_DURATION.labels(route=route).observe(stats.duration)
+
+        repeated = stats.repeated(self.n_plus_one_threshold)
+        if repeated:
+            DATABASE_N_PLUS_ONE_COUNT.labels(route=route).inc()
+            for statement, count in repeated:
+                logger.warning(
+                    "Possible N+1: statement ran %s times in %s (%s queries total): %s",
+                    count,
+                    route,
+                    stats.count,
+                    statement[:500],
+                    extra={
+                        "route": route,
+                        "path": ctx.path,
+                        "repeat_count": count,
+                        "db_queries": stats.count,
+                    },
+                )
+
+
+__all__ = ["QueryTrackingStage", "route_label"]
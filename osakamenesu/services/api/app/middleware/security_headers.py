@@ -3,62 +3,58 @@
 from __future__ import annotations
 
 import logging
-from typing import Callable
+from starlette.types import ASGIApp
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from .pipeline import ASGIPipelineMiddleware, PipelineStage, RequestContext
 
 logger = logging.getLogger(__name__)
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Middleware to add security headers to all responses."""
+class SecurityHeadersStage(PipelineStage):
+    """Pipeline stage adding security headers to all responses."""
 
     def __init__(
         self,
-        app,
         enable_hsts: bool = True,
         enable_csp: bool = True,
         report_uri: str | None = None,
     ):
-        """Initialize security headers middleware.
+        """Initialize security headers stage.
 
         Args:
-            app: FastAPI application
             enable_hsts: Enable HTTP Strict Transport Security
             enable_csp: Enable Content Security Policy
             report_uri: URI for CSP violation reports
         """
-        super().__init__(app)
         self.enable_hsts = enable_hsts
         self.enable_csp = enable_csp
         self.report_uri = report_uri
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def on_response(self, ctx: RequestContext) -> None:
         """Add security headers to the response."""
-        response = await call_next(request)
+        path = ctx.path
+        response_headers = ctx.headers
+        assert response_headers is not None
 
         # Skip headers for health checks and internal endpoints
-        if request.url.path.startswith("/health") or request.url.path.startswith(
-            "/api/ops/"
-        ):
-            return response
+        if path.startswith("/health") or path.startswith("/api/ops/"):
+            return
 
         # X-Content-Type-Options
         # Prevents MIME type sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
+        response_headers["X-Content-Type-Options"] = "nosniff"
 
         # X-Frame-Options
         # Prevents clickjacking attacks
-        response.headers["X-Frame-Options"] = "DENY"
+        response_headers["X-Frame-Options"] = "DENY"
 
         # X-XSS-Protection
         # Enable browser's XSS protection (legacy, but still useful)
-        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response_headers["X-XSS-Protection"] = "1; mode=block"
 
         # Referrer-Policy
         # Controls referrer information sent with requests
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response_headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
 
         # Permissions-Policy (replacing Feature-Policy)
         # Restrict browser features
@@ -73,15 +69,15 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "usb=()",
             "interest-cohort=()",  # Disable FLoC
         ]
-        response.headers["Permissions-Policy"] = ", ".join(permissions)
+        response_headers["Permissions-Policy"] = ", ".join(permissions)
 
         # HTTP Strict Transport Security (HSTS)
         # Force HTTPS for future requests
-        if self.enable_hsts and request.url.scheme == "https":
+        if self.enable_hsts and ctx.scope.get("scheme") == "https":
             # max-age=31536000 (1 year)
             # includeSubDomains: Apply to all subdomains
             # preload: Allow browser preload lists
-            response.headers["Strict-Transport-Security"] = (
+            response_headers["Strict-Transport-Security"] = (
                 "max-age=31536000; includeSubDomains; preload"
             )
 
@@ -118,21 +114,49 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
                     "max_age": 86400,
                     "endpoints": [{"url": self.report_uri}],
                 }
-                response.headers["Report-To"] = str(report_to).replace("'", '"')
+                response_headers["Report-To"] = str(report_to).replace("'", '"')
 
             # Set CSP header
             csp_header = "; ".join(csp_directives)
 
             # Use Report-Only mode for initial deployment
             # Change to Content-Security-Policy when confident
-            response.headers["Content-Security-Policy-Report-Only"] = csp_header
+            response_headers["Content-Security-Policy-Report-Only"] = csp_header
 
         # Additional security headers for API responses
-        if request.url.path.startswith("/api/"):
+        if path.startswith("/api/"):
             # Prevent API responses from being embedded
-            response.headers["X-Permitted-Cross-Domain-Policies"] = "none"
+            response_headers["X-Permitted-Cross-Domain-Policies"] = "none"
+
+
+class SecurityHeadersMiddleware(ASGIPipelineMiddleware):
+    """Standalone ASGI middleware running only :class:`SecurityHeadersStage`."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        enable_hsts: bool = True,
+        enable_csp: bool = True,
+        report_uri: str | None = None,
+    ):
+        """Initialize security headers middleware.
 
-        return response
+        Args:
+            app: ASGI application
+            enable_hsts: Enable HTTP Strict Transport Security
+            enable_csp: Enable Content Security Policy
+            report_uri: URI for CSP violation reports
+        """
+        super().__init__(
+            app,
+            stages=[
+                SecurityHeadersStage(
+                    enable_hsts=enable_hsts,
+                    enable_csp=enable_csp,
+                    report_uri=report_uri,
+                )
+            ],
+        )
 
 
 def create_security_headers_middleware(
@@ -4,15 +4,16 @@ Models package - re-exports all models for backward compatibility.
 Models are organized into domain-specific modules:
 - base: Base class, enums, and utilities
 - profile: Profile (Shop) model
-- therapist: Therapist and TherapistShift models
+- therapist: Therapist, TherapistShift and PhotoEmbeddingCache models
 - user: User, ShopManager, UserAuthToken, UserSession
 - favorite: UserFavorite, UserTherapistFavorite
-- content: Diary, Availability, Outlink, Click, Consent
+- content: Diary, Availability, Outlink, Click, Consent, MediaAsset
 - review: Review, Report
-- notification: DashboardNotificationSetting
+- notification: DashboardNotificationSetting, NotificationOutbox
 - admin: AdminLog, AdminChangeLog
 - reservation: GuestReservation (unified reservation model)
 - matching: GuestMatchLog
+- kpi: ShopDailyStats, TherapistDailyStats, TherapistFeature
 """
 
 # Base and utilities
@@ -36,7 +37,7 @@ from .base import (
 from .profile import Profile
 
 # Therapist
-from .therapist import Therapist, TherapistShift
+from .therapist import PhotoEmbeddingCache, Therapist, TherapistShift
 
 # User and auth
 from .user import User, ShopManager, UserAuthToken, UserSession
@@ -45,13 +46,13 @@ from .user import User, ShopManager, UserAuthToken, UserSession
 from .favorite import UserFavorite, UserTherapistFavorite
 
 # Content
-from .content import Diary, Availability, Outlink, Click, Consent
+from .content import Diary, Availability, Outlink, Click, Consent, MediaAsset
 
 # Review and Report
 from .review import Review, Report
 
 # Notification
-from .notification import DashboardNotificationSetting
+from .notification import DashboardNotificationSetting, NotificationOutbox
 
 # Admin
 from .admin import AdminLog, AdminChangeLog
@@ -65,6 +66,9 @@ from .matching import GuestMatchLog
 # Push Notification
 from .push_subscription import PushSubscription
 
+# KPI rollups
+from .kpi import ShopDailyStats, TherapistDailyStats, TherapistFeature
+
 __all__ = [
     # Base
     "Base",
@@ -85,6 +89,7 @@ __all__ = [
     # Therapist
     "Therapist",
     "TherapistShift",
+    "PhotoEmbeddingCache",
     # User
     "User",
     "ShopManager",
@@ -99,11 +104,13 @@ __all__ = [
     "Outlink",
     "Click",
     "Consent",
+    "MediaAsset",
     # Review
     "Review",
     "Report",
     # Notification
     "DashboardNotificationSetting",
+    "NotificationOutbox",
     # Admin
     "AdminLog",
     "AdminChangeLog",
@@ -113,4 +120,8 @@ __all__ = [
     "GuestMatchLog",
     # Push Notification
     "PushSubscription",
+    # KPI rollups
+    "ShopDailyStats",
+    "TherapistDailyStats",
+    "TherapistFeature",
 ]
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, DateTime
+from sqlalchemy import String, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 from datetime import datetime
@@ -30,9 +30,19 @@ class AdminLog(Base):
 
 
 class AdminChangeLog(Base):
-    """Admin change audit log model."""
+    """Admin change audit log model.
+
+    ``format`` tells how the change is stored: ``snapshot`` rows hold the full
+    state after the change in ``after_json``, ``diff`` rows only a JSON patch
+    against the previous state in ``patch_json``.  ``full`` marks rows written
+    before diffs existed (full before/after) and ``summary`` rows describe bulk
+    imports without being part of the snapshot/diff chain.
+    """
 
     __tablename__ = "admin_change_logs"
+    __table_args__ = (
+        Index("ix_admin_change_logs_target_ts", "target_type", "target_id", "ts"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -47,5 +57,9 @@ class AdminChangeLog(Base):
     action: Mapped[str] = mapped_column(String(32))
     before_json: Mapped[dict | None] = mapped_column(JSONB)
     after_json: Mapped[dict | None] = mapped_column(JSONB)
+    format: Mapped[str] = mapped_column(
+        String(16), default="full", server_default="full", nullable=False
+    )
+    patch_json: Mapped[list | None] = mapped_column(JSONB)
     admin_key_hash: Mapped[str | None] = mapped_column(String(128), index=True)
     ip_hash: Mapped[str | None] = mapped_column(String(128), index=True)
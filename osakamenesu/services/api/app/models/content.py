@@ -1,4 +1,4 @@
-"""Content models (Diary, Availability, Outlink, Click, Consent)."""
+"""Content models (Diary, Availability, Outlink, Click, Consent, MediaAsset)."""
 
 from __future__ import annotations
 
@@ -124,3 +124,25 @@ class Consent(Base):
     )
     ip: Mapped[str | None] = mapped_column(String(64))
     user_agent: Mapped[str | None] = mapped_column(Text)
+
+
+class MediaAsset(Base):
+    """An uploaded photo keyed by folder and content, with its variants."""
+
+    __tablename__ = "media_assets"
+
+    # Storage folder (one per shop/therapist); files are never shared across
+    # folders, so one owner's upload cannot surface under another's path
+    folder: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # sha256 of the uploaded bytes; re-uploads to the folder reuse the row
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    url: Mapped[str] = mapped_column(Text, unique=True, index=True)
+    content_type: Mapped[str] = mapped_column(String(64))
+    size: Mapped[int] = mapped_column(Integer)
+    width: Mapped[int | None] = mapped_column(Integer)
+    height: Mapped[int | None] = mapped_column(Integer)
+    # [{"name", "url", "format", "content_type", "width", "height", "size"}]
+    variants: Mapped[list[dict]] = mapped_column(JSONB, default=list)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=now_utc
+    )
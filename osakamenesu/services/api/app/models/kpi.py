@@ -0,0 +1,108 @@
+"""Daily KPI rollups per shop and per therapist, and therapist scoring features.
+
+Rows are derived from reservations, shifts and reviews and rewritten bucket by
+bucket by :mod:`app.services.kpi_rollups`; never edit them by hand.  Like the
+shift table they reference shops and therapists without foreign keys, so a
+rebuild never fails on rows whose owner is already gone.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Date, DateTime, Float, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from datetime import datetime, date
+
+from .base import Base, now_utc
+
+
+class ShopDailyStats(Base):
+    """Per-shop counters for one JST day."""
+
+    __tablename__ = "shop_daily_stats"
+
+    shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    # Reservations bucketed by the JST day of start_at
+    reservations_total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reservations_pending: Mapped[int] = mapped_column(
+        Integer, default=0, nullable=False
+    )
+    reservations_confirmed: Mapped[int] = mapped_column(
+        Integer, default=0, nullable=False
+    )
+    reservations_cancelled: Mapped[int] = mapped_column(
+        Integer, default=0, nullable=False
+    )
+    reservations_no_show: Mapped[int] = mapped_column(
+        Integer, default=0, nullable=False
+    )
+    repeat_reservations: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    booked_minutes: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    shift_minutes: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Reviews bucketed by the JST day of created_at
+    reviews_pending: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reviews_published: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reviews_rejected: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    review_score_sum: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=now_utc, nullable=False
+    )
+
+
+class TherapistDailyStats(Base):
+    """Per-therapist counters for one JST day."""
+
+    __tablename__ = "therapist_daily_stats"
+    __table_args__ = (
+        Index("ix_therapist_daily_stats_therapist_day", "therapist_id", "day"),
+    )
+
+    shop_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    therapist_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True
+    )
+    reservations_total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reservations_confirmed: Mapped[int] = mapped_column(
+        Integer, default=0, nullable=False
+    )
+    reservations_cancelled: Mapped[int] = mapped_column(
+        Integer, default=0, nullable=False
+    )
+    repeat_reservations: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    booked_minutes: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    shift_minutes: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=now_utc, nullable=False
+    )
+
+
+class TherapistFeature(Base):
+    """Precomputed recommended-scoring inputs of one therapist.
+
+    Rewritten as a whole by the :mod:`app.services.therapist_features` batch job.
+    """
+
+    __tablename__ = "therapist_features"
+
+    therapist_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True
+    )
+    shop_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), nullable=False, index=True
+    )
+    total_bookings_30d: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    repeat_rate_30d: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    utilization_7d: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    avg_review_score: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    days_since_first_shift: Mapped[int] = mapped_column(
+        Integer, default=365, nullable=False
+    )
+    availability_score: Mapped[float] = mapped_column(
+        Float, default=0.5, nullable=False
+    )
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=now_utc, nullable=False
+    )
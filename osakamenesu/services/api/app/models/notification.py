@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy import String, DateTime, ForeignKey, Index, Integer, Text
 from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
 import uuid
 from datetime import datetime
@@ -43,3 +43,49 @@ class DashboardNotificationSetting(Base):
     updated_by_user: Mapped[Optional["User"]] = relationship(
         back_populates="notification_settings_updated"
     )
+
+
+class NotificationOutbox(Base):
+    """Transactional outbox for reservation notifications.
+
+    Rows are written in the same transaction as the reservation change and
+    delivered by the notifications worker.  ``channel == "fanout"`` rows carry
+    the reservation event and are expanded into one row per delivery channel
+    (push/email/line/slack) so each channel retries independently.
+    """
+
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index(
+            "ix_notification_outbox_status_next_attempt", "status", "next_attempt_at"
+        ),
+        Index("ix_notification_outbox_channel_status", "channel", "status"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    reservation_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("guest_reservations.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    event: Mapped[str] = mapped_column(String(32), nullable=False)
+    channel: Mapped[str] = mapped_column(String(16), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=now_utc, nullable=False
+    )
+    locked_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=now_utc, nullable=False
+    )
+    sent_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
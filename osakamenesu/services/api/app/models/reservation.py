@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import (
+    event,
     String,
     Text,
     Integer,
@@ -16,6 +17,7 @@ from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 from datetime import datetime
 
+from ..utils.text import fold_search_text, phone_digits
 from .base import (
     Base,
     GuestReservationStatus,
@@ -35,6 +37,20 @@ class GuestReservation(Base):
             "ix_guest_reservations_status_reserved_until", "status", "reserved_until"
         ),
         Index("ix_guest_reservations_user_start", "user_id", "start_at"),
+        # Dashboard search: keyset pagination, phone prefix and trigram lookups
+        Index("ix_guest_reservations_shop_created", "shop_id", "created_at", "id"),
+        Index(
+            "ix_guest_reservations_shop_phone_digits",
+            "shop_id",
+            "customer_phone_digits",
+            postgresql_ops={"customer_phone_digits": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_guest_reservations_search_text_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -95,9 +111,34 @@ class GuestReservation(Base):
     customer_name: Mapped[str | None] = mapped_column(String(120), nullable=True)
     customer_phone: Mapped[str | None] = mapped_column(String(40), nullable=True)
     customer_email: Mapped[str | None] = mapped_column(String(160), nullable=True)
+    # Derived from the customer fields on every write (see _refresh_search_fields)
+    customer_phone_digits: Mapped[str | None] = mapped_column(String(40), nullable=True)
+    search_text: Mapped[str | None] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=now_utc, nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=now_utc, onupdate=now_utc, nullable=False
     )
+
+
+def build_reservation_search_text(reservation: GuestReservation) -> str:
+    """Folded name, phone digits, lower-cased email and notes, one per line."""
+    contact = reservation.contact_info or {}
+    parts = [
+        fold_search_text(reservation.customer_name or contact.get("name")),
+        phone_digits(reservation.customer_phone or contact.get("phone")),
+        fold_search_text(reservation.customer_email or contact.get("email")),
+        fold_search_text(reservation.notes),
+    ]
+    return "\n".join(part for part in parts if part)
+
+
+@event.listens_for(GuestReservation, "before_insert")
+@event.listens_for(GuestReservation, "before_update")
+def _refresh_search_fields(_mapper, _connection, target: GuestReservation) -> None:
+    contact = target.contact_info or {}
+    target.customer_phone_digits = (
+        phone_digits(target.customer_phone or contact.get("phone")) or None
+    )
+    target.search_text = build_reservation_search_text(target) or None
@@ -1,4 +1,4 @@
-"""Therapist and TherapistShift models."""
+"""Therapist, TherapistShift and PhotoEmbeddingCache models."""
 
 from __future__ import annotations
 
@@ -157,3 +157,18 @@ class TherapistShift(Base):
             "therapist_id", "start_at", "end_at", name="uq_therapist_shifts_slot"
         ),
     )
+
+
+class PhotoEmbeddingCache(Base):
+    """Photo embedding keyed by image content, so identical files embed once."""
+
+    __tablename__ = "photo_embedding_cache"
+
+    # sha256 of the image bytes
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # Backend name including its version, e.g. "local-features-v1"
+    backend: Mapped[str] = mapped_column(String(64), primary_key=True)
+    embedding: Mapped[list[float]] = mapped_column(ARRAY(Float), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=now_utc, nullable=False
+    )
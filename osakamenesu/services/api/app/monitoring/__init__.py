@@ -16,11 +16,17 @@ from .metrics import (
     track_cache_operation,
     track_background_job,
 )
+from .queries import current_query_stats, install_query_tracking
 from .health import (
+    HealthCheck,
+    HealthMonitor,
+    build_health_monitor,
     check_database_health,
     check_redis_health,
     check_meili_health,
+    get_health_monitor,
     get_system_health,
+    set_health_monitor,
 )
 
 __all__ = [
@@ -38,9 +44,17 @@ __all__ = [
     "track_database_query",
     "track_cache_operation",
     "track_background_job",
+    # SQL instrumentation
+    "current_query_stats",
+    "install_query_tracking",
     # Health
+    "HealthCheck",
+    "HealthMonitor",
+    "build_health_monitor",
     "check_database_health",
     "check_redis_health",
     "check_meili_health",
+    "get_health_monitor",
     "get_system_health",
+    "set_health_monitor",
 ]
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""In-process metrics aggregation flushed to Prometheus/Redis periodically.
+
+Request and cache metrics used to be written to Redis (and Prometheus) on
+every request, putting a Redis round trip on the hot path.  Recording now only
+bumps counters and a log-linear latency histogram in the current
+:class:`MetricsWindow`; nothing is awaited and no lock is taken - handlers and
+middleware run on the event loop thread, so the updates cannot interleave.
+
+``MetricsCollector.flush`` swaps in a fresh window (a single reference
+assignment) and applies the finished one in bulk: counter increments and
+histogram bucket counts to Prometheus, one Redis pipeline for the shared
+dashboards.  Histograms created with the Prometheus bucket bounds also count
+samples per Prometheus bucket as they are recorded, so the exported buckets
+are exact rather than estimated from the log-linear ones.  ``MetricsCollector.run_forever`` flushes every few seconds and
+``/metrics`` flushes before rendering, so scrapes of a single worker are
+always current.
+"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional, Sequence
+
+# Sub-buckets per power of two; bucket width is at most 1/32 (~3%) of its value
+_SUB_BUCKET_BITS = 6
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_HALF_SUB_BUCKETS = _SUB_BUCKETS >> 1
+_UNIT = 1e-6  # histogram values are integer microseconds
+
+
+def _bucket_index(value: int) -> int:
+    if value < _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - _SUB_BUCKET_BITS
+    return shift * _HALF_SUB_BUCKETS + (value >> shift)
+
+
+def _bucket_bounds(index: int) -> tuple[int, int]:
+    """``[lower, upper)`` microseconds covered by bucket ``index``."""
+    if index < _SUB_BUCKETS:
+        return index, index + 1
+    shift = index // _HALF_SUB_BUCKETS - 1
+    mantissa = index - shift * _HALF_SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """HDR-style histogram: exact below 64us, ~3% relative precision above.
+
+    Buckets are stored sparsely, so an idle route costs a few dict entries
+    however wide the recorded range is.
+    """
+
+    __slots__ = ("counts", "count", "total", "max", "bounds", "bound_counts")
+
+    def __init__(self, bounds: Sequence[float] = ()) -> None:
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # Sorted inclusive upper bounds (Prometheus ``le``) counted exactly
+        self.bounds = tuple(bounds)
+        self.bound_counts = [0] * len(self.bounds)
+
+    def record(self, seconds: float) -> None:
+        index = _bucket_index(max(0, int(seconds / _UNIT)))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if self.bounds:
+            bound = bisect_left(self.bounds, seconds)
+            if bound < len(self.bounds):
+                self.bound_counts[bound] += 1
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if self.bounds and self.bounds == other.bounds:
+            for bound, count in enumerate(other.bound_counts):
+                self.bound_counts[bound] += count
+        else:
+            self.bounds, self.bound_counts = (), []
+
+    def counts_for(self, bounds: Sequence[float]) -> list[int]:
+        """Samples per ``le`` bucket of ``bounds`` (which must end with +Inf).
+
+        Exact when the histogram was created with the same bounds; otherwise
+        each log-linear bucket is attributed by its upper edge, which may
+        move samples near a bound one bucket up but never down.
+        """
+        bounds = tuple(bounds)
+        if bounds == self.bounds:
+            return list(self.bound_counts)
+        result = [0] * len(bounds)
+        for index, count in self.counts.items():
+            _, upper = _bucket_bounds(index)
+            result[min(bisect_left(bounds, upper * _UNIT), len(bounds) - 1)] += count
+        return result
+
+    def buckets(self) -> Iterator[tuple[float, int]]:
+        """``(midpoint seconds, count)`` of every non-empty bucket, ascending."""
+        for index in sorted(self.counts):
+            lower, upper = _bucket_bounds(index)
+            yield (lower + upper) / 2 * _UNIT, self.counts[index]
+
+    def percentile(self, q: float) -> float:
+        """Approximate ``q``-th percentile (0-100) in seconds."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for value, count in self.buckets():
+            seen += count
+            if seen >= rank:
+                return min(value, self.max)
+        return self.max
+
+
+@dataclass
+class MetricsWindow:
+    """Everything recorded since the previous flush."""
+
+    # (method, endpoint, status) -> latencies
+    requests: dict[tuple[str, str, int], LatencyHistogram] = field(default_factory=dict)
+    cache: Counter = field(default_factory=Counter)
+
+    def __bool__(self) -> bool:
+        return bool(self.requests or self.cache)
+
+
+def observe_histogram(child: Any, histogram: LatencyHistogram) -> None:
+    """Add a whole histogram to a Prometheus ``Histogram`` child at once.
+
+    prometheus_client only offers ``observe(value)``; adding per-bucket counts
+    to the child's values keeps a flush proportional to the number of buckets
+    instead of the number of requests.  This relies on the child's
+    ``_upper_bounds``/``_buckets``/``_sum`` (non-cumulative values, the
+    file-backed ``MmapedValue`` in multiprocess mode), so requirements.txt
+    caps prometheus-client at the versions tested against.
+    """
+    for bucket, count in zip(child._buckets, histogram.counts_for(child._upper_bounds)):
+        if count:
+            bucket.inc(count)
+    child._sum.inc(histogram.total)
+
+
+class MetricsAggregator:
+    """Per-route request counters/latencies and cache hit counters.
+
+    ``latency_bounds`` are the Prometheus bucket bounds latencies are
+    exported with; they are counted exactly while recording.
+    """
+
+    def __init__(self, latency_bounds: Sequence[float] = ()) -> None:
+        self.latency_bounds = tuple(latency_bounds)
+        self._window = MetricsWindow()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_request(
+        self, method: str, endpoint: str, status_code: int, duration: float
+    ) -> None:
+        requests = self._window.requests
+        key = (method, endpoint, status_code)
+        histogram = requests.get(key)
+        if histogram is None:
+            histogram = requests[key] = LatencyHistogram(self.latency_bounds)
+        histogram.record(duration)
+
+    def record_cache(self, operation: str, hit: bool) -> None:
+        self._window.cache[(operation, "hit" if hit else "miss")] += 1
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    @property
+    def cache_hit_rate(self) -> Optional[float]:
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total * 100 if total else None
+
+    def swap(self) -> MetricsWindow:
+        """Detach the current window; recording continues into a new one."""
+        window, self._window = self._window, MetricsWindow()
+        return window
+
+
+__all__ = [
+    "LatencyHistogram",
+    "MetricsAggregator",
+    "MetricsWindow",
+    "observe_histogram",
+]
@@ -5,16 +5,19 @@ from __future__ import annotations
 import asyncio
 import logging
 import time
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 import httpx
 import redis.asyncio as redis
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from ..settings import settings
+from .metrics import DEPENDENCY_CHECK_DURATION, DEPENDENCY_HEALTH
 
 logger = logging.getLogger(__name__)
 
@@ -71,6 +74,26 @@ class SystemHealth:
         }
 
 
+# Reported pool stat -> pool method; pools without queueing (StaticPool,
+# NullPool) lack some of them, so each one is optional.
+_POOL_STATS = {
+    "size": "size",
+    "checked_in": "checkedin",
+    "checked_out": "checkedout",
+    "overflow": "overflow",
+}
+
+
+def _pool_details(pool: Any) -> Dict[str, Any]:
+    """Connection pool stats the pool class offers."""
+    details: Dict[str, Any] = {"pool": type(pool).__name__}
+    for key, method in _POOL_STATS.items():
+        stat = getattr(pool, method, None)
+        if callable(stat):
+            details[key] = stat()
+    return details
+
+
 async def check_database_health(
     session: AsyncSession,
     timeout: float = 5.0,
@@ -86,14 +109,7 @@ async def check_database_health(
         )
         result.scalar()
 
-        # Check connection pool stats
-        pool = session.bind.pool
-        details = {
-            "size": pool.size(),
-            "checked_in": pool.checkedin(),
-            "overflow": pool.overflow(),
-            "total": pool.total(),
-        }
+        details = _pool_details(session.bind.pool)
 
         response_time = (time.time() - start_time) * 1000
         return HealthCheckResult(
@@ -300,42 +316,271 @@ async def get_system_health(
     check_external: bool = True,
 ) -> SystemHealth:
     """Get overall system health status."""
-    checks: List[HealthCheckResult] = []
+    pending = []
 
     # Database check
     if session:
-        checks.append(await check_database_health(session))
+        pending.append(check_database_health(session))
 
-    # Redis check
-    checks.append(await check_redis_health())
-
-    # Meilisearch check
-    checks.append(await check_meili_health())
+    # Redis and Meilisearch checks
+    pending.append(check_redis_health())
+    pending.append(check_meili_health())
 
     # External API checks
     if check_external:
         # Add any external API health checks here
         pass
 
-    # Determine overall status
-    unhealthy_count = sum(1 for check in checks if check.status == "unhealthy")
-    degraded_count = sum(1 for check in checks if check.status == "degraded")
-
-    if unhealthy_count > 0:
-        overall_status = "unhealthy"
-    elif degraded_count > 0:
-        overall_status = "degraded"
-    else:
-        overall_status = "healthy"
+    # Run concurrently: the slowest dependency bounds the total, not the sum
+    checks: List[HealthCheckResult] = list(await asyncio.gather(*pending))
 
     return SystemHealth(
-        status=overall_status,
+        status=_overall_status(checks),
         version=_get_version(),
         environment=settings.sentry_environment or "production",
         checks=checks,
     )
 
 
+def _overall_status(
+    checks: List[HealthCheckResult], critical: Optional[set[str]] = None
+) -> str:
+    """Unhealthy if a critical check failed, degraded if anything else did."""
+    if any(
+        check.status == "unhealthy" and (critical is None or check.name in critical)
+        for check in checks
+    ):
+        return "unhealthy"
+    if any(check.status != "healthy" for check in checks):
+        return "degraded"
+    return "healthy"
+
+
+# ---------------------------------------------------------------------------
+# Cached background checks
+# ---------------------------------------------------------------------------
+
+_STATUS_VALUE = {"healthy": 1.0, "degraded": 0.5, "unhealthy": 0.0}
+
+
+@dataclass
+class HealthCheck:
+    """A dependency check; ``run`` receives its timeout in seconds."""
+
+    name: str
+    run: Callable[[float], Awaitable[HealthCheckResult]]
+    timeout: float = 2.0
+    # A failing critical dependency makes the service unhealthy; any other
+    # failing dependency only degrades it
+    critical: bool = False
+
+
+class _DependencyState:
+    __slots__ = ("history", "suspended_until")
+
+    def __init__(self, history: int) -> None:
+        self.history: deque[HealthCheckResult] = deque(maxlen=history)
+        self.suspended_until = 0.0
+
+
+class HealthMonitor:
+    """Run dependency checks concurrently in the background and cache them.
+
+    Probes read :meth:`snapshot` (or :meth:`current`), which costs nothing
+    while :meth:`run_forever` keeps the results fresh.  Each dependency keeps
+    its last ``history`` results so callers can see latency trends and decide
+    to shed work: :meth:`is_available` is ``False`` while a dependency is
+    unhealthy, slower than ``slow_ms`` (degraded), or was reported failing
+    by a caller since the last check (:meth:`report_failure`).
+    """
+
+    def __init__(
+        self,
+        checks: List[HealthCheck],
+        *,
+        interval: float = 10.0,
+        slow_ms: float = 1000.0,
+        history: int = 30,
+    ) -> None:
+        self.checks = {check.name: check for check in checks}
+        self.interval = interval
+        self.slow_ms = slow_ms
+        self._state = {name: _DependencyState(history) for name in self.checks}
+        self._snapshot: Optional[SystemHealth] = None
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _run(self, check: HealthCheck) -> HealthCheckResult:
+        started = time.perf_counter()
+        try:
+            # The checks time out themselves; this bounds anything they miss
+            result = await asyncio.wait_for(
+                check.run(check.timeout), timeout=check.timeout + 0.5
+            )
+        except asyncio.TimeoutError:
+            result = HealthCheckResult(
+                name=check.name,
+                status="unhealthy",
+                response_time=(time.perf_counter() - started) * 1000,
+                message=f"{check.name} check timed out after {check.timeout}s",
+            )
+        except Exception as exc:
+            logger.warning("Health check %s failed: %s", check.name, exc)
+            result = HealthCheckResult(
+                name=check.name,
+                status="unhealthy",
+                response_time=(time.perf_counter() - started) * 1000,
+                message=f"{check.name} error: {exc}",
+            )
+        if result.status == "healthy" and result.response_time > self.slow_ms:
+            result.status = "degraded"
+            result.message = (
+                f"{check.name} responded in {result.response_time:.0f}ms "
+                f"(slower than {self.slow_ms:.0f}ms)"
+            )
+        return result
+
+    async def refresh(self) -> SystemHealth:
+        """Run every check concurrently and replace the cached snapshot."""
+        async with self._lock:
+            return await self._refresh_locked()
+
+    async def _refresh_locked(self) -> SystemHealth:
+        checks = list(
+            await asyncio.gather(*(self._run(c) for c in self.checks.values()))
+        )
+        for result in checks:
+            state = self._state[result.name]
+            state.history.append(result)
+            if result.status == "healthy":
+                state.suspended_until = 0.0
+            DEPENDENCY_HEALTH.labels(dependency=result.name).set(
+                _STATUS_VALUE.get(result.status, 0.0)
+            )
+            DEPENDENCY_CHECK_DURATION.labels(dependency=result.name).observe(
+                result.response_time / 1000
+            )
+        critical = {c.name for c in self.checks.values() if c.critical}
+        self._snapshot = SystemHealth(
+            status=_overall_status(checks, critical),
+            version=_get_version(),
+            environment=settings.sentry_environment or "production",
+            checks=checks,
+        )
+        self._refreshed_at = time.monotonic()
+        return self._snapshot
+
+    def snapshot(self) -> Optional[SystemHealth]:
+        return self._snapshot
+
+    def _stale(self, max_age: float) -> bool:
+        return self._snapshot is None or time.monotonic() - self._refreshed_at > max_age
+
+    async def current(self, max_age: Optional[float] = None) -> SystemHealth:
+        """The cached snapshot, refreshed first when older than ``max_age``.
+
+        Concurrent probes that find it stale wait for a single refresh.
+        """
+        max_age = self.interval * 2 if max_age is None else max_age
+        if self._stale(max_age):
+            async with self._lock:
+                if self._stale(max_age):
+                    await self._refresh_locked()
+        assert self._snapshot is not None
+        return self._snapshot
+
+    def is_available(self, name: str) -> bool:
+        """Whether callers should use ``name`` right now (unknown: yes)."""
+        state = self._state.get(name)
+        if state is None or not state.history:
+            return True
+        if time.monotonic() < state.suspended_until:
+            return False
+        return state.history[-1].status == "healthy"
+
+    def report_failure(self, name: str) -> None:
+        """Mark ``name`` unavailable until its next successful check."""
+        state = self._state.get(name)
+        if state is not None:
+            state.suspended_until = time.monotonic() + self.interval
+
+    def latency_summary(self, name: str) -> Dict[str, Any]:
+        """Latency percentiles and failures over the dependency's history."""
+        state = self._state.get(name)
+        history = list(state.history) if state else []
+        timings = sorted(result.response_time for result in history)
+
+        def pct(p: float) -> Optional[float]:
+            if not timings:
+                return None
+            return round(timings[min(len(timings) - 1, int(p * len(timings)))], 2)
+
+        return {
+            "samples": len(history),
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "max_ms": round(timings[-1], 2) if timings else None,
+            "failures": sum(1 for r in history if r.status == "unhealthy"),
+            "available": self.is_available(name),
+        }
+
+    async def run_forever(self, stop_event: asyncio.Event) -> None:
+        while not stop_event.is_set():
+            try:
+                await self.refresh()
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.warning("Health refresh failed: %s", exc)
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def build_health_monitor(
+    session_factory: async_sessionmaker[AsyncSession],
+    *,
+    interval: float = 10.0,
+    timeout: float = 2.0,
+    slow_ms: float = 1000.0,
+) -> HealthMonitor:
+    """Checks for the API's own dependencies: Postgres, Meilisearch, Redis."""
+
+    async def database(check_timeout: float) -> HealthCheckResult:
+        async with session_factory() as session:
+            return await check_database_health(session, timeout=check_timeout)
+
+    checks = [
+        HealthCheck("database", database, timeout=timeout, critical=True),
+        HealthCheck(
+            "meilisearch",
+            lambda check_timeout: check_meili_health(timeout=check_timeout),
+            timeout=timeout,
+        ),
+    ]
+    if settings.redis_url:
+        checks.append(
+            HealthCheck(
+                "redis",
+                lambda check_timeout: check_redis_health(timeout=check_timeout),
+                timeout=timeout,
+            )
+        )
+    return HealthMonitor(checks, interval=interval, slow_ms=slow_ms)
+
+
+_health_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> Optional[HealthMonitor]:
+    return _health_monitor
+
+
+def set_health_monitor(monitor: Optional[HealthMonitor]) -> None:
+    global _health_monitor
+    _health_monitor = monitor
+
+
+@lru_cache(maxsize=1)
 def _get_version() -> str:
     """Get application version."""
     import os
@@ -354,4 +599,4 @@ def _get_version() -> str:
         )
         return result.stdout.strip()
     except Exception:
-        return "unknown"
\ No newline at end of file
+        return "unknown"
@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 import time
 from contextlib import contextmanager
 from dataclasses import dataclass, field
@@ -10,10 +12,26 @@ from datetime import datetime, timezone
 from typing import Any, Callable, Dict, Optional, TypeVar
 
 import redis.asyncio as redis
-from prometheus_client import Counter, Histogram, Gauge, Info
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    Info,
+    generate_latest,
+    multiprocess,
+)
 from sentry_sdk import set_measurement
 
 from ..settings import settings
+from .aggregator import (
+    LatencyHistogram,
+    MetricsAggregator,
+    MetricsWindow,
+    observe_histogram,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +45,13 @@ API_REQUEST_COUNT = Counter(
     ["method", "endpoint", "status"],
 )
 
+# Aggregated latencies are counted against these bounds while recording
+API_REQUEST_DURATION_BUCKETS = Histogram.DEFAULT_BUCKETS
 API_REQUEST_DURATION = Histogram(
     "osakamenesu_api_request_duration_seconds",
     "API request duration in seconds",
     ["method", "endpoint"],
+    buckets=API_REQUEST_DURATION_BUCKETS,
 )
 
 DATABASE_QUERY_COUNT = Counter(
@@ -45,6 +66,25 @@ DATABASE_QUERY_DURATION = Histogram(
     ["operation", "table"],
 )
 
+DATABASE_REQUEST_QUERIES = Histogram(
+    "osakamenesu_database_queries_per_request",
+    "Database queries issued while handling one request",
+    ["route"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+DATABASE_REQUEST_DURATION = Histogram(
+    "osakamenesu_database_time_per_request_seconds",
+    "Total database time spent while handling one request",
+    ["route"],
+)
+
+DATABASE_N_PLUS_ONE_COUNT = Counter(
+    "osakamenesu_database_n_plus_one_total",
+    "Requests in which one normalized statement repeated past the threshold",
+    ["route"],
+)
+
 CACHE_OPERATION_COUNT = Counter(
     "osakamenesu_cache_operations_total",
     "Total number of cache operations",
@@ -54,6 +94,7 @@ CACHE_OPERATION_COUNT = Counter(
 CACHE_HIT_RATE = Gauge(
     "osakamenesu_cache_hit_rate",
     "Cache hit rate percentage",
+    multiprocess_mode="liveall",
 )
 
 BACKGROUND_JOB_COUNT = Counter(
@@ -80,6 +121,68 @@ RESERVATION_COUNT = Counter(
     ["status", "source"],
 )
 
+OMAKASE_ASSIGNMENT_COUNT = Counter(
+    "osakamenesu_omakase_assignments_total",
+    "Omakase therapist assignments by outcome",
+    ["result"],
+)
+
+OMAKASE_LOCK_CONTENTION = Counter(
+    "osakamenesu_omakase_lock_contention_total",
+    "Ranked omakase candidates lost to a concurrent booking at lock time",
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "osakamenesu_event_loop_lag_seconds",
+    "Delay of a periodic event-loop timer past its deadline",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+EVENT_LOOP_BLOCKED_COUNT = Counter(
+    "osakamenesu_event_loop_blocked_total",
+    "Times the event loop was blocked past the lag threshold",
+)
+
+DEPENDENCY_HEALTH = Gauge(
+    "osakamenesu_dependency_health",
+    "Latest health check per dependency (1 healthy, 0.5 degraded, 0 unhealthy)",
+    ["dependency"],
+    multiprocess_mode="liveall",
+)
+
+DEPENDENCY_CHECK_DURATION = Histogram(
+    "osakamenesu_dependency_check_duration_seconds",
+    "Duration of background dependency health checks",
+    ["dependency"],
+)
+
+ADMISSION_SHED_COUNT = Counter(
+    "osakamenesu_admission_shed_total",
+    "Requests rejected with 503 by admission control",
+    ["priority", "reason"],
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    "osakamenesu_admission_queue_wait_seconds",
+    "Time admitted requests spent queued for a concurrency slot",
+    ["priority"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "osakamenesu_admission_in_flight",
+    "Requests holding an admission slot",
+    ["priority"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_QUEUED = Gauge(
+    "osakamenesu_admission_queued",
+    "Requests waiting for an admission slot",
+    ["priority"],
+    multiprocess_mode="livesum",
+)
+
 ERROR_COUNT = Counter(
     "osakamenesu_errors_total",
     "Total number of errors",
@@ -105,30 +208,131 @@ class MetricsSummary:
     performance: Dict[str, float] = field(default_factory=dict)
 
 
+def multiprocess_dir() -> Optional[str]:
+    """Shared metrics directory when running several worker processes.
+
+    prometheus_client switches to file-backed values when
+    ``PROMETHEUS_MULTIPROC_DIR`` is set before it is imported, so it has to be
+    exported for the whole server (e.g. ``uvicorn --workers N``).
+    """
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
+
+def get_prometheus_metrics() -> tuple[bytes, str]:
+    """Render all metrics (of every worker in multiprocess mode)."""
+    registry = REGISTRY
+    if multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
 class MetricsCollector:
-    """Central metrics collector with Redis backend."""
+    """Central metrics collector with Redis backend.
 
-    def __init__(self, redis_client: Optional[redis.Redis] = None):
+    API request and cache metrics are aggregated in process and written out
+    by :meth:`flush`; the other ``record_*`` methods write through.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        *,
+        flush_interval: float = 5.0,
+    ):
         self.redis = redis_client
         self.namespace = "osakamenesu:metrics"
-        self._cache_hits = 0
-        self._cache_misses = 0
+        self.flush_interval = flush_interval
+        self.aggregator = MetricsAggregator(latency_bounds=API_REQUEST_DURATION_BUCKETS)
 
     async def initialize(self) -> None:
         """Initialize metrics collector."""
         if not self.redis and settings.redis_url:
             self.redis = await redis.from_url(settings.redis_url)
 
-        # Set system info
-        SYSTEM_INFO.info({
-            "environment": settings.sentry_environment or "production",
-            "version": _get_app_version(),
-        })
+        # Info metrics are not supported by the multiprocess collector
+        if not multiprocess_dir():
+            SYSTEM_INFO.info({
+                "environment": settings.sentry_environment or "production",
+                "version": _get_app_version(),
+            })
 
     async def close(self) -> None:
-        """Close connections."""
+        """Flush pending metrics and close connections."""
+        await self.flush()
         if self.redis:
             await self.redis.close()
+        if multiprocess_dir():
+            multiprocess.mark_process_dead(os.getpid())
+
+    async def flush(self) -> None:
+        """Write everything aggregated since the last flush."""
+        window = self.aggregator.swap()
+        if not window:
+            return
+        self._flush_prometheus(window)
+        if self.redis:
+            try:
+                await self._flush_redis(window)
+            except Exception as exc:
+                logger.warning("metrics flush to redis failed: %s", exc)
+
+    async def run_forever(self, stop_event: asyncio.Event) -> None:
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def _flush_prometheus(self, window: MetricsWindow) -> None:
+        for (method, endpoint, status_code), latency in window.requests.items():
+            API_REQUEST_COUNT.labels(
+                method=method,
+                endpoint=endpoint,
+                status=str(status_code),
+            ).inc(latency.count)
+            observe_histogram(
+                API_REQUEST_DURATION.labels(method=method, endpoint=endpoint),
+                latency,
+            )
+
+        for (operation, result), count in window.cache.items():
+            CACHE_OPERATION_COUNT.labels(operation=operation, result=result).inc(count)
+        hit_rate = self.aggregator.cache_hit_rate
+        if hit_rate is not None:
+            CACHE_HIT_RATE.set(hit_rate)
+
+    async def _flush_redis(self, window: MetricsWindow) -> None:
+        pipe = self.redis.pipeline()
+        routes: Dict[tuple[str, str], LatencyHistogram] = {}
+        for (method, endpoint, status_code), latency in window.requests.items():
+            key = f"{self.namespace}:api:{method}:{endpoint}:{status_code}"
+            pipe.hincrby(key, "count", latency.count)
+            pipe.hincrbyfloat(key, "total_duration", latency.total)
+            pipe.expire(key, 86400)  # 1 day TTL
+            routes.setdefault((method, endpoint), LatencyHistogram()).merge(latency)
+
+        # Latency percentiles of the last window per route
+        for (method, endpoint), latency in routes.items():
+            key = f"{self.namespace}:latency:{method}:{endpoint}"
+            pipe.hset(
+                key,
+                mapping={
+                    "count": latency.count,
+                    "p50": latency.percentile(50),
+                    "p95": latency.percentile(95),
+                    "p99": latency.percentile(99),
+                    "max": latency.max,
+                },
+            )
+            pipe.expire(key, 86400)
+
+        for (operation, result), count in window.cache.items():
+            key = f"{self.namespace}:cache:{operation}"
+            pipe.hincrby(key, result, count)
+            pipe.expire(key, 86400)
+        await pipe.execute()
 
     @contextmanager
     def track_duration(self, metric_name: str, labels: Optional[Dict[str, str]] = None):
@@ -147,31 +351,12 @@ class MetricsCollector:
         status_code: int,
         duration: float,
     ) -> None:
-        """Record API request metrics."""
-        # Prometheus metrics
-        API_REQUEST_COUNT.labels(
-            method=method,
-            endpoint=endpoint,
-            status=str(status_code),
-        ).inc()
-
-        API_REQUEST_DURATION.labels(
-            method=method,
-            endpoint=endpoint,
-        ).observe(duration)
+        """Record API request metrics (written out on the next flush)."""
+        self.aggregator.record_request(method, endpoint, status_code, duration)
 
         # Sentry performance
         set_measurement("http.response_time", duration * 1000, "millisecond")
 
-        # Redis metrics
-        if self.redis:
-            key = f"{self.namespace}:api:{method}:{endpoint}:{status_code}"
-            pipe = self.redis.pipeline()
-            pipe.hincrby(key, "count", 1)
-            pipe.hincrbyfloat(key, "total_duration", duration)
-            pipe.expire(key, 86400)  # 1 day TTL
-            await pipe.execute()
-
     async def record_database_query(
         self,
         operation: str,
@@ -213,31 +398,8 @@ class MetricsCollector:
         hit: bool,
         key: Optional[str] = None,
     ) -> None:
-        """Record cache operation metrics."""
-        result = "hit" if hit else "miss"
-
-        # Prometheus metrics
-        CACHE_OPERATION_COUNT.labels(
-            operation=operation,
-            result=result,
-        ).inc()
-
-        # Update hit rate
-        if hit:
-            self._cache_hits += 1
-        else:
-            self._cache_misses += 1
-
-        total = self._cache_hits + self._cache_misses
-        if total > 0:
-            hit_rate = (self._cache_hits / total) * 100
-            CACHE_HIT_RATE.set(hit_rate)
-
-        # Redis metrics
-        if self.redis:
-            metrics_key = f"{self.namespace}:cache:{operation}"
-            await self.redis.hincrby(metrics_key, result, 1)
-            await self.redis.expire(metrics_key, 86400)
+        """Record cache operation metrics (written out on the next flush)."""
+        self.aggregator.record_cache(operation, hit)
 
     async def record_background_job(
         self,
@@ -383,9 +545,22 @@ class MetricsCollector:
 
     async def export_to_prometheus(self) -> str:
         """Export metrics in Prometheus format."""
-        from prometheus_client import generate_latest
+        await self.flush()
+        payload, _ = get_prometheus_metrics()
+        return payload.decode()
 
-        return generate_latest().decode()
+
+_collector: Optional[MetricsCollector] = None
+
+
+def get_metrics_collector() -> MetricsCollector:
+    """Process-wide collector shared by the middleware and the flush loop."""
+    global _collector
+    if _collector is None:
+        _collector = MetricsCollector(
+            flush_interval=settings.metrics_flush_interval_seconds
+        )
+    return _collector
 
 
 def _get_app_version() -> str:
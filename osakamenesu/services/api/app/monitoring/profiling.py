@@ -0,0 +1,288 @@
+"""Sampling profiler and event-loop lag monitor for production workers.
+
+:class:`SamplingProfiler` runs a daemon thread that reads the event loop
+thread's Python stack (``sys._current_frames``) every few milliseconds and
+counts identical stacks.  The profiled code is never instrumented, so the cost
+is one stack walk per sample on the sampler thread.  The result is rendered
+in the collapsed-stack format (``root;caller;leaf count`` per line) read by
+flamegraph.pl, speedscope and inferno.  Only one profiler runs per process at
+a time; a second :meth:`~SamplingProfiler.start` raises :class:`ProfilerBusy`.
+
+:class:`LoopLagMonitor` measures how late a periodic timer fires on the event
+loop.  A watchdog thread watches the timer's heartbeat; when the loop has not
+come back for ``threshold`` seconds it captures the stack the loop thread is
+stuck in (a synchronous HTTP client call, CPU-heavy code), logs it and keeps
+the last few events for ``GET /api/ops/profile/loop``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from types import FrameType
+from typing import Optional
+from uuid import uuid4
+
+from .metrics import EVENT_LOOP_BLOCKED_COUNT, EVENT_LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 128
+REQUEST_PROFILE_HISTORY = 20
+
+_session_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profiling session is running in this process."""
+
+
+@lru_cache(maxsize=4096)
+def _short_filename(filename: str) -> str:
+    prefixes = [p for p in sys.path if p and filename.startswith(p.rstrip("/") + "/")]
+    if not prefixes:
+        return filename
+    return filename[len(max(prefixes, key=len).rstrip("/")) + 1 :]
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{_short_filename(code.co_filename)}:{code.co_qualname}"
+
+
+def collapse_stack(frame: Optional[FrameType]) -> tuple[str, ...]:
+    """Frame labels from the outermost caller down to ``frame``."""
+    labels: list[str] = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def _is_idle(stack: tuple[str, ...]) -> bool:
+    # The loop waiting for I/O in selectors.<Epoll|Kqueue|...>Selector.select
+    if not stack:
+        return False
+    filename, _, qualname = stack[-1].rpartition(":")
+    return filename.endswith("selectors.py") and qualname.endswith(".select")
+
+
+@dataclass
+class ProfileResult:
+    stacks: Counter = field(default_factory=Counter)
+    samples: int = 0
+    idle_samples: int = 0
+    duration: float = 0.0
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, heaviest first, one ``a;b;c count`` per line."""
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class SamplingProfiler:
+    """Sample one thread's stack (by default the caller's) at a fixed interval."""
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.005,
+        thread_id: Optional[int] = None,
+        all_threads: bool = False,
+        include_idle: bool = False,
+    ) -> None:
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.all_threads = all_threads
+        self.include_idle = include_idle
+        self.result = ProfileResult()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        if not _session_lock.acquire(blocking=False):
+            raise ProfilerBusy("a profiling session is already running")
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> ProfileResult:
+        if self._thread is None:
+            return self.result
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.result.duration = time.perf_counter() - self._started_at
+        _session_lock.release()
+        return self.result
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        result = self.result
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.all_threads:
+                targets = [f for tid, f in frames.items() if tid != own]
+            else:
+                targets = [frames.get(self.thread_id)]
+            for frame in targets:
+                if frame is None:
+                    continue
+                stack = collapse_stack(frame)
+                result.samples += 1
+                if not self.include_idle and _is_idle(stack):
+                    result.idle_samples += 1
+                    continue
+                result.stacks[stack] += 1
+
+
+async def profile_for(seconds: float, **options) -> ProfileResult:
+    """Profile the running event loop's thread for ``seconds``."""
+    profiler = SamplingProfiler(**options).start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        result = profiler.stop()
+    return result
+
+
+# Per-request profiles, looked up by the id returned in ``X-Profile-Id``
+_request_profiles: OrderedDict[str, ProfileResult] = OrderedDict()
+
+
+def store_request_profile(result: ProfileResult) -> str:
+    profile_id = uuid4().hex
+    _request_profiles[profile_id] = result
+    while len(_request_profiles) > REQUEST_PROFILE_HISTORY:
+        _request_profiles.popitem(last=False)
+    return profile_id
+
+
+def get_request_profile(profile_id: str) -> Optional[ProfileResult]:
+    return _request_profiles.get(profile_id)
+
+
+# ---------------------------------------------------------------------------
+# Event-loop lag
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class BlockedLoopEvent:
+    at: datetime
+    duration: float
+    stack: tuple[str, ...]
+
+
+class LoopLagMonitor:
+    """Measure event-loop lag and capture the stack of long blocks."""
+
+    def __init__(
+        self,
+        *,
+        threshold: float = 0.1,
+        interval: float = 0.05,
+        history: int = 20,
+    ) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.events: deque[BlockedLoopEvent] = deque(maxlen=history)
+        self.max_lag = 0.0
+        # Rises with each lagging tick and decays over ~1s of healthy ones
+        self.recent_lag = 0.0
+        self._beat = time.monotonic()
+        self._reported_beat: Optional[float] = None
+        self._thread_id: Optional[int] = None
+        self._watchdog_stop = threading.Event()
+
+    async def run_forever(self, stop_event: asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._watchdog_stop.clear()
+        watchdog = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        watchdog.start()
+        try:
+            while not stop_event.is_set():
+                self._beat = time.monotonic()
+                expected = loop.time() + self.interval
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._record_lag(max(0.0, loop.time() - expected))
+        finally:
+            self._watchdog_stop.set()
+            await asyncio.to_thread(watchdog.join)
+
+    def _record_lag(self, lag: float) -> None:
+        EVENT_LOOP_LAG.observe(lag)
+        self.max_lag = max(self.max_lag, lag)
+        self.recent_lag = max(lag, self.recent_lag * 0.8 + lag * 0.2)
+        if lag >= self.threshold and self._reported_beat == self._beat and self.events:
+            # The watchdog saw this block while it lasted; store its full length
+            self.events[-1].duration = lag
+
+    def _watch(self) -> None:
+        check_every = min(self.interval, self.threshold) / 2
+        while not self._watchdog_stop.wait(check_every):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or beat == self._reported_beat:
+                continue
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._thread_id)
+            stack = collapse_stack(frame)
+            del frame
+            self.events.append(
+                BlockedLoopEvent(
+                    at=datetime.now(timezone.utc), duration=stalled, stack=stack
+                )
+            )
+            EVENT_LOOP_BLOCKED_COUNT.inc()
+            logger.warning(
+                "Event loop blocked for more than %.0fms at:\n  %s",
+                stalled * 1000,
+                "\n  ".join(stack[-15:]),
+            )
+
+
+_loop_monitor: Optional[LoopLagMonitor] = None
+
+
+def get_loop_monitor() -> Optional[LoopLagMonitor]:
+    return _loop_monitor
+
+
+def set_loop_monitor(monitor: Optional[LoopLagMonitor]) -> None:
+    global _loop_monitor
+    _loop_monitor = monitor
+
+
+__all__ = [
+    "BlockedLoopEvent",
+    "LoopLagMonitor",
+    "ProfileResult",
+    "ProfilerBusy",
+    "SamplingProfiler",
+    "collapse_stack",
+    "get_loop_monitor",
+    "get_request_profile",
+    "profile_for",
+    "set_loop_monitor",
+    "store_request_profile",
+]
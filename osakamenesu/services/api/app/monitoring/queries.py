@@ -0,0 +1,164 @@
+"""SQL instrumentation: per-query metrics and per-request query statistics.
+
+:func:`install_query_tracking` hooks ``before/after_cursor_execute`` on the
+sync engine behind an async engine.  Every statement feeds the
+``DATABASE_QUERY_*`` metrics; while a request is being tracked (see
+``app.middleware.query_tracking``) it also lands in that request's
+:class:`QueryStats` through a context variable - SQLAlchemy runs the sync
+events in a greenlet that shares the awaiting task's context.
+
+Statements are grouped by fingerprint (literals, bind parameters and IN lists
+collapsed), so the same lookup issued once per row of a result shows up as one
+fingerprint with a high count: the N+1 pattern.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .metrics import DATABASE_QUERY_COUNT, DATABASE_QUERY_DURATION
+
+logger = logging.getLogger(__name__)
+
+_START_KEY = "query_tracking.start"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+_WHITESPACE = re.compile(r"\s+")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?(\w+)\"?", re.IGNORECASE)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Normalise a SQL statement so repeats with other parameters match."""
+    text = _POSTCOMPILE.sub("(?)", statement)
+    text = _STRING_LITERAL.sub("?", text)
+    text = _PARAMETER.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _IN_LIST.sub("(?)", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=2048)
+def _labels(statement: str) -> tuple[str, str]:
+    """``(operation, table)`` metric labels for a statement."""
+    stripped = statement.lstrip()
+    operation = stripped.split(None, 1)[0].upper() if stripped else "UNKNOWN"
+    match = _TABLE.search(statement)
+    return operation, match.group(1) if match else "unknown"
+
+
+class QueryStats:
+    """Queries issued while handling one request."""
+
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Fingerprints issued more than ``threshold`` times, most frequent first."""
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count > threshold
+        ]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_tracking_stats", default=None
+)
+
+
+def start_tracking() -> tuple[QueryStats, Token]:
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def stop_tracking(token: Token) -> None:
+    _current.reset(token)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Statistics of the request being handled, if it is tracked."""
+    return _current.get()
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    starts = conn.info.get(_START_KEY)
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    operation, table = _labels(statement)
+    DATABASE_QUERY_COUNT.labels(operation=operation, table=table).inc()
+    DATABASE_QUERY_DURATION.labels(operation=operation, table=table).observe(duration)
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+def _handle_error(exception_context: Any) -> None:
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None:
+        starts = connection.info.get(_START_KEY)
+        if starts:
+            starts.pop()
+
+
+def install_query_tracking(engine: AsyncEngine | Engine):
+    """Instrument ``engine``; returns a callable removing the listeners."""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    listeners = (
+        ("before_cursor_execute", _before_cursor_execute),
+        ("after_cursor_execute", _after_cursor_execute),
+        ("handle_error", _handle_error),
+    )
+    for name, listener in listeners:
+        if not event.contains(sync_engine, name, listener):
+            event.listen(sync_engine, name, listener)
+
+    def remove() -> None:
+        for name, listener in listeners:
+            if event.contains(sync_engine, name, listener):
+                event.remove(sync_engine, name, listener)
+
+    return remove
+
+
+__all__ = [
+    "QueryStats",
+    "current_query_stats",
+    "fingerprint",
+    "install_query_tracking",
+    "start_tracking",
+    "stop_tracking",
+]
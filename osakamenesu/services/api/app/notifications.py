@@ -1,20 +1,66 @@
-"""Legacy notification system - deprecated and stubbed out.
+"""Reservation notifications via a transactional outbox.
 
-The notification system that was previously used for old Reservation notifications
-has been removed. A new notification system for GuestReservation may be added later.
+Reservation changes call :func:`enqueue_reservation_event`, which only adds a
+``NotificationOutbox`` row to the caller's session, so the notification is
+committed (or rolled back) together with the reservation and the request does
+no extra lookups or network I/O.
+
+``scripts/notifications_worker.py`` runs :class:`NotificationWorker`, which
+claims due rows with ``SELECT ... FOR UPDATE SKIP LOCKED`` (several workers can
+run side by side), expands each reservation event into one row per delivery
+channel (push/email/LINE/Slack) and delivers those concurrently, retrying
+failures with exponential backoff.  :func:`get_queue_stats` and
+:func:`get_outbox_summary` feed ``/api/ops/queue`` and ``/api/ops/outbox``.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from dataclasses import dataclass
-from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+from uuid import UUID, uuid4
+
+import httpx
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas
+from .review_notifications import LINE_NOTIFY_API_URL
+from .settings import settings
+from .utils.datetime import ensure_jst_datetime
 
 logger = logging.getLogger("app.notifications")
 
+FANOUT_CHANNEL = "fanout"
+DELIVERY_CHANNELS = ("push", "email", "line", "slack")
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+_OPEN_STATUSES = (STATUS_PENDING, STATUS_PROCESSING)
+
+SENT_RETENTION = timedelta(days=7)
+_PURGE_INTERVAL = timedelta(hours=1)
+
+# Channel -> key of the credential in DashboardNotificationSetting.channels
+_CHANNEL_SECRETS = {"line": "token", "slack": "webhook_url"}
+
+_STATUS_LABELS = {
+    "pending": "新しい予約リクエスト",
+    "confirmed": "予約確定",
+    "cancelled": "予約キャンセル",
+}
+
 __all__ = (
+    "NotificationWorker",
     "ReservationNotification",
-    "is_notification_worker_enabled",
+    "enqueue_reservation_event",
+    "get_outbox_summary",
+    "get_queue_stats",
+    "run_worker_forever",
 )
 
 
@@ -43,6 +89,532 @@ class ReservationNotification:
     event: Optional[str] = None
 
 
-def is_notification_worker_enabled() -> bool:
-    """Legacy notification worker is always disabled."""
-    return False
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _status_value(value: Any) -> str:
+    return str(getattr(value, "value", value))
+
+
+def _new_row(**values: Any) -> models.NotificationOutbox:
+    # Column defaults only apply on flush; set them eagerly so the row is
+    # complete as soon as it is added.
+    now = _utcnow()
+    values.setdefault("id", uuid4())
+    values.setdefault("status", STATUS_PENDING)
+    values.setdefault("attempts", 0)
+    values.setdefault("next_attempt_at", now)
+    values.setdefault("created_at", now)
+    return models.NotificationOutbox(**values)
+
+
+def enqueue_reservation_event(
+    db: AsyncSession,
+    reservation: models.GuestReservation,
+    *,
+    previous_status: str | None = None,
+) -> models.NotificationOutbox:
+    """Queue a notification for the current status of ``reservation``.
+
+    Call before committing the reservation change; the row shares its
+    transaction.
+    """
+    status = _status_value(reservation.status)
+    row = _new_row(
+        reservation_id=reservation.id,
+        event=f"reservation.{status}",
+        channel=FANOUT_CHANNEL,
+        payload={"status": status, "previous_status": previous_status},
+    )
+    db.add(row)
+    return row
+
+
+async def get_queue_stats(
+    db: AsyncSession, *, now: datetime | None = None
+) -> schemas.OpsQueueStats:
+    """Pending outbox rows and how long the oldest due one has been waiting."""
+    now = now or _utcnow()
+    Outbox = models.NotificationOutbox
+    result = await db.execute(
+        select(
+            func.count(Outbox.id),
+            func.min(Outbox.created_at),
+            func.min(Outbox.next_attempt_at),
+        ).where(Outbox.status.in_(_OPEN_STATUSES))
+    )
+    pending, oldest_created_at, next_attempt_at = result.one()
+    lag_seconds = 0.0
+    if next_attempt_at is not None and next_attempt_at <= now:
+        lag_seconds = (now - next_attempt_at).total_seconds()
+    return schemas.OpsQueueStats(
+        pending=int(pending or 0),
+        lag_seconds=lag_seconds,
+        oldest_created_at=oldest_created_at,
+        next_attempt_at=next_attempt_at,
+    )
+
+
+async def get_outbox_summary(db: AsyncSession) -> schemas.OpsOutboxSummary:
+    """Pending outbox rows per channel."""
+    Outbox = models.NotificationOutbox
+    result = await db.execute(
+        select(Outbox.channel, func.count(Outbox.id))
+        .where(Outbox.status.in_(_OPEN_STATUSES))
+        .group_by(Outbox.channel)
+        .order_by(Outbox.channel)
+    )
+    return schemas.OpsOutboxSummary(
+        channels=[
+            schemas.OpsOutboxChannelSummary(channel=channel, pending=int(count))
+            for channel, count in result.all()
+        ]
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt after ``attempts`` failed tries."""
+    base = settings.reservation_notification_retry_base_seconds
+    multiplier = settings.reservation_notification_retry_backoff_multiplier
+    return timedelta(seconds=base * multiplier ** max(0, attempts - 1))
+
+
+def _shop_message(status: str, context: dict[str, Any]) -> str:
+    label = _STATUS_LABELS.get(status, f"予約ステータス変更 ({status})")
+    return (
+        f"【{label}】\n"
+        f"店舗: {context['shop_name']}\n"
+        f"セラピスト: {context['therapist_name']}\n"
+        f"日時: {context['date']} {context['time']}\n"
+        f"お客様: {context['customer_name']}"
+    )
+
+
+def build_delivery_payloads(
+    status: str,
+    context: dict[str, Any],
+    *,
+    user_id: UUID | None,
+    setting: models.DashboardNotificationSetting | None,
+) -> list[tuple[str, dict[str, Any]]]:
+    """Channels (with their payloads) that should hear about ``status``."""
+    deliveries: list[tuple[str, dict[str, Any]]] = []
+    if status == "confirmed" and user_id is not None:
+        deliveries.append(
+            (
+                "push",
+                {
+                    "user_id": str(user_id),
+                    "reservation_id": context["reservation_id"],
+                    "shop_name": context["shop_name"],
+                    "therapist_name": context["therapist_name"],
+                    "date": context["date"],
+                    "time": context["time"],
+                },
+            )
+        )
+
+    if setting is None or status not in (setting.trigger_status or []):
+        return deliveries
+
+    channels = setting.channels or {}
+    message = _shop_message(status, context)
+    email = channels.get("email") or {}
+    if (
+        email.get("enabled")
+        and email.get("recipients")
+        and settings.notify_email_endpoint
+    ):
+        deliveries.append(
+            (
+                "email",
+                {
+                    "recipients": list(email["recipients"]),
+                    "subject": f"【{context['shop_name']}】{_STATUS_LABELS.get(status, status)}",
+                    "message": message,
+                    "reservation_id": context["reservation_id"],
+                    "shop_id": context["shop_id"],
+                },
+            )
+        )
+    # Credentials stay in the shop's settings; senders look them up when
+    # delivering so they are never copied into outbox rows.
+    for channel, secret_key in _CHANNEL_SECRETS.items():
+        config = channels.get(channel) or {}
+        if config.get("enabled") and config.get(secret_key):
+            deliveries.append(
+                (channel, {"shop_id": context["shop_id"], "message": message})
+            )
+    return deliveries
+
+
+async def expand_fanout_rows(
+    db: AsyncSession, rows: Sequence[models.NotificationOutbox]
+) -> list[models.NotificationOutbox]:
+    """Turn reservation events into per-channel delivery rows.
+
+    Reservations, shops, therapists, users and notification settings are
+    loaded with one query each for the whole batch.
+    """
+    reservation_ids = [row.reservation_id for row in rows if row.reservation_id]
+    reservations: dict[UUID, models.GuestReservation] = {}
+    if reservation_ids:
+        result = await db.execute(
+            select(models.GuestReservation).where(
+                models.GuestReservation.id.in_(reservation_ids)
+            )
+        )
+        reservations = {r.id: r for r in result.scalars().all()}
+
+    shop_ids = {r.shop_id for r in reservations.values()}
+    therapist_ids = {r.therapist_id for r in reservations.values() if r.therapist_id}
+    emails = {
+        r.customer_email
+        for r in reservations.values()
+        if not r.user_id and r.customer_email
+    }
+
+    shop_names: dict[UUID, str] = {}
+    notification_settings: dict[UUID, models.DashboardNotificationSetting] = {}
+    if shop_ids:
+        result = await db.execute(
+            select(models.Profile.id, models.Profile.name).where(
+                models.Profile.id.in_(shop_ids)
+            )
+        )
+        shop_names = {pid: name for pid, name in result.all()}
+        result = await db.execute(
+            select(models.DashboardNotificationSetting).where(
+                models.DashboardNotificationSetting.profile_id.in_(shop_ids)
+            )
+        )
+        notification_settings = {s.profile_id: s for s in result.scalars().all()}
+
+    therapist_names: dict[UUID, str] = {}
+    if therapist_ids:
+        result = await db.execute(
+            select(models.Therapist.id, models.Therapist.name).where(
+                models.Therapist.id.in_(therapist_ids)
+            )
+        )
+        therapist_names = {tid: name for tid, name in result.all()}
+
+    users_by_email: dict[str, UUID] = {}
+    if emails:
+        result = await db.execute(
+            select(models.User.email, models.User.id).where(
+                models.User.email.in_(emails)
+            )
+        )
+        users_by_email = {email: uid for email, uid in result.all()}
+
+    created: list[models.NotificationOutbox] = []
+    for row in rows:
+        reservation = reservations.get(row.reservation_id)
+        if reservation is None:
+            continue
+        status = (row.payload or {}).get("status") or _status_value(reservation.status)
+        start = ensure_jst_datetime(reservation.start_at)
+        context = {
+            "reservation_id": str(reservation.id),
+            "shop_id": str(reservation.shop_id),
+            "shop_name": shop_names.get(reservation.shop_id) or "店舗",
+            "therapist_name": therapist_names.get(reservation.therapist_id)
+            or "おまかせ",
+            "customer_name": reservation.customer_name or "-",
+            "date": start.strftime("%Y/%m/%d"),
+            "time": start.strftime("%H:%M"),
+        }
+        user_id = reservation.user_id or users_by_email.get(reservation.customer_email)
+        for channel, payload in build_delivery_payloads(
+            status,
+            context,
+            user_id=user_id,
+            setting=notification_settings.get(reservation.shop_id),
+        ):
+            delivery = _new_row(
+                reservation_id=reservation.id,
+                event=row.event,
+                channel=channel,
+                payload=payload,
+            )
+            db.add(delivery)
+            created.append(delivery)
+    return created
+
+
+Sender = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class NotificationWorker:
+    """Claim outbox rows in batches and deliver them concurrently."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        http_client: httpx.AsyncClient,
+        *,
+        batch_size: int | None = None,
+        max_attempts: int | None = None,
+        visibility_timeout: timedelta | None = None,
+        senders: dict[str, Sender] | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.http = http_client
+        self.batch_size = batch_size or settings.reservation_notification_batch_size
+        self.max_attempts = (
+            max_attempts or settings.reservation_notification_max_attempts
+        )
+        self.visibility_timeout = visibility_timeout or timedelta(
+            seconds=settings.reservation_notification_visibility_timeout_seconds
+        )
+        self.senders: dict[str, Sender] = {
+            "push": self._send_push,
+            "email": self._send_email,
+            "line": self._send_line,
+            "slack": self._send_slack,
+            **(senders or {}),
+        }
+        self._purged_at: datetime | None = None
+
+    async def claim(self, now: datetime) -> list[models.NotificationOutbox]:
+        """Lock due rows (skipping ones other workers hold) and mark them taken.
+
+        Rows stuck in ``processing`` longer than the visibility timeout (a
+        worker died mid-delivery) are claimed again.
+        """
+        Outbox = models.NotificationOutbox
+        stmt = (
+            select(Outbox)
+            .where(
+                or_(
+                    and_(
+                        Outbox.status == STATUS_PENDING,
+                        Outbox.next_attempt_at <= now,
+                    ),
+                    and_(
+                        Outbox.status == STATUS_PROCESSING,
+                        Outbox.locked_at < now - self.visibility_timeout,
+                    ),
+                )
+            )
+            .order_by(Outbox.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with self.session_factory() as db:
+            rows = list((await db.execute(stmt)).scalars().all())
+            for row in rows:
+                row.status = STATUS_PROCESSING
+                row.locked_at = now
+                row.attempts = (row.attempts or 0) + 1
+            await db.commit()
+        return rows
+
+    async def process_once(self, now: datetime | None = None) -> int:
+        """Run one claim/deliver cycle; returns the number of rows handled."""
+        now = now or _utcnow()
+        rows = await self.claim(now)
+        if not rows:
+            await self._maybe_purge(now)
+            return 0
+
+        fanout = [row for row in rows if row.channel == FANOUT_CHANNEL]
+        deliveries = [row for row in rows if row.channel != FANOUT_CHANNEL]
+        outcomes: dict[UUID, Optional[BaseException]] = {}
+
+        if fanout:
+            try:
+                async with self.session_factory() as db:
+                    await expand_fanout_rows(db, fanout)
+                    await db.commit()
+            except Exception as exc:
+                logger.exception("notification fanout failed")
+                outcomes.update({row.id: exc for row in fanout})
+            else:
+                outcomes.update({row.id: None for row in fanout})
+
+        results = await asyncio.gather(
+            *(self._deliver(row) for row in deliveries), return_exceptions=True
+        )
+        for row, result in zip(deliveries, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            outcomes[row.id] = result if isinstance(result, BaseException) else None
+
+        await self._record(rows, outcomes, now)
+        return len(rows)
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        interval = settings.reservation_notification_worker_interval_seconds
+        while not stop_event.is_set():
+            try:
+                handled = await self.process_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("notification worker cycle failed")
+                handled = 0
+            # Drain backlogs without sleeping; idle otherwise.
+            if handled >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, row: models.NotificationOutbox) -> None:
+        sender = self.senders.get(row.channel)
+        if sender is None:
+            raise ValueError(f"unknown notification channel: {row.channel}")
+        await sender(row.payload or {})
+
+    async def _record(
+        self,
+        rows: Sequence[models.NotificationOutbox],
+        outcomes: dict[UUID, Optional[BaseException]],
+        now: datetime,
+    ) -> None:
+        from .monitoring.metrics import BACKGROUND_JOB_COUNT
+
+        Outbox = models.NotificationOutbox
+        async with self.session_factory() as db:
+            for row in rows:
+                error = outcomes.get(row.id)
+                if error is None:
+                    values: dict[str, Any] = {
+                        "status": STATUS_SENT,
+                        "sent_at": now,
+                        "locked_at": None,
+                        "last_error": None,
+                    }
+                    result = "success"
+                elif row.attempts >= self.max_attempts:
+                    values = {
+                        "status": STATUS_FAILED,
+                        "locked_at": None,
+                        "last_error": repr(error)[:1000],
+                    }
+                    result = "failed"
+                    logger.warning(
+                        "notification %s (%s) gave up after %d attempts: %r",
+                        row.id,
+                        row.channel,
+                        row.attempts,
+                        error,
+                    )
+                else:
+                    values = {
+                        "status": STATUS_PENDING,
+                        "next_attempt_at": now + retry_delay(row.attempts),
+                        "locked_at": None,
+                        "last_error": repr(error)[:1000],
+                    }
+                    result = "retry"
+                await db.execute(
+                    update(Outbox).where(Outbox.id == row.id).values(**values)
+                )
+                BACKGROUND_JOB_COUNT.labels(
+                    job_type=f"notification_{row.channel}", status=result
+                ).inc()
+            await db.commit()
+
+    async def _maybe_purge(self, now: datetime) -> None:
+        if self._purged_at is not None and now - self._purged_at < _PURGE_INTERVAL:
+            return
+        self._purged_at = now
+        Outbox = models.NotificationOutbox
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(Outbox).where(
+                    Outbox.status == STATUS_SENT,
+                    Outbox.sent_at < now - SENT_RETENTION,
+                )
+            )
+            await db.commit()
+
+    async def _send_push(self, payload: dict[str, Any]) -> None:
+        from .services.push_notification import push_notification_service
+
+        async with self.session_factory() as db:
+            await push_notification_service.notify_reservation_confirmation(
+                user_id=UUID(payload["user_id"]),
+                reservation_id=payload["reservation_id"],
+                shop_name=payload["shop_name"],
+                therapist_name=payload["therapist_name"],
+                date=payload["date"],
+                time=payload["time"],
+                db=db,
+            )
+
+    async def _send_email(self, payload: dict[str, Any]) -> None:
+        endpoint = settings.notify_email_endpoint
+        if not endpoint:
+            raise RuntimeError("notify_email_endpoint is not configured")
+        response = await self.http.post(endpoint, json=payload)
+        response.raise_for_status()
+
+    async def _channel_secret(
+        self, payload: dict[str, Any], channel: str
+    ) -> Optional[str]:
+        """Current credential of the shop's ``channel``; None once disabled."""
+        if "shop_id" not in payload:
+            # Row enqueued before credentials were kept out of the outbox
+            return payload.get(_CHANNEL_SECRETS[channel])
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(models.DashboardNotificationSetting.channels).where(
+                    models.DashboardNotificationSetting.profile_id
+                    == UUID(payload["shop_id"])
+                )
+            )
+            channels = result.scalar_one_or_none() or {}
+        config = channels.get(channel) or {}
+        if not config.get("enabled"):
+            return None
+        return config.get(_CHANNEL_SECRETS[channel]) or None
+
+    async def _send_line(self, payload: dict[str, Any]) -> None:
+        token = await self._channel_secret(payload, "line")
+        if token is None:
+            logger.info(
+                "LINE notifications disabled for shop %s", payload.get("shop_id")
+            )
+            return
+        response = await self.http.post(
+            LINE_NOTIFY_API_URL,
+            headers={"Authorization": f"Bearer {token}"},
+            data={"message": payload["message"]},
+        )
+        response.raise_for_status()
+
+    async def _send_slack(self, payload: dict[str, Any]) -> None:
+        webhook_url = await self._channel_secret(payload, "slack")
+        if webhook_url is None:
+            logger.info(
+                "Slack notifications disabled for shop %s", payload.get("shop_id")
+            )
+            return
+        response = await self.http.post(webhook_url, json={"text": payload["message"]})
+        response.raise_for_status()
+
+
+async def run_worker_forever(
+    stop_event: asyncio.Event,
+    *,
+    session_factory: Callable[[], AsyncSession] | None = None,
+) -> None:
+    """Entry point used by ``scripts/notifications_worker.py``."""
+    if session_factory is None:
+        from .db import SessionLocal
+
+        session_factory = SessionLocal
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        worker = NotificationWorker(session_factory, client)
+        logger.info(
+            "notifications worker started (batch=%d, interval=%.1fs)",
+            worker.batch_size,
+            settings.reservation_notification_worker_interval_seconds,
+        )
+        await worker.run(stop_event)
@@ -52,6 +52,7 @@ from .profile import (
 
 # Shop
 from .shop import (
+    ImageVariant,
     NextAvailableSlot,
     ShopStaffPreview,
     ShopSummary,
@@ -105,6 +106,10 @@ from .admin import (
     BulkShopContentRequest,
     BulkShopIngestResult,
     BulkShopContentResponse,
+    ShopContentStreamError,
+    ShopContentStreamStats,
+    ShopContentStreamResponse,
+    AdminAuditStateResponse,
     ShopAdminSummary,
     ShopAdminList,
     ShopAdminDetail,
@@ -132,6 +137,9 @@ from .dashboard import (
     DashboardReservationItem,
     DashboardReservationListResponse,
     DashboardReservationUpdateRequest,
+    DashboardShopKpiDay,
+    DashboardShopKpiSummary,
+    DashboardShopKpiResponse,
     DashboardTherapistSummary,
     DashboardTherapistDetail,
     DashboardTherapistPhotoUploadResponse,
@@ -174,6 +182,7 @@ __all__ = [
     "ProfileMarketingUpdate",
     "FacetValue",
     # Shop
+    "ImageVariant",
     "NextAvailableSlot",
     "ShopStaffPreview",
     "ShopSummary",
@@ -219,6 +228,10 @@ __all__ = [
     "BulkShopContentRequest",
     "BulkShopIngestResult",
     "BulkShopContentResponse",
+    "ShopContentStreamError",
+    "ShopContentStreamStats",
+    "ShopContentStreamResponse",
+    "AdminAuditStateResponse",
     "ShopAdminSummary",
     "ShopAdminList",
     "ShopAdminDetail",
@@ -243,6 +256,9 @@ __all__ = [
     "DashboardReservationItem",
     "DashboardReservationListResponse",
     "DashboardReservationUpdateRequest",
+    "DashboardShopKpiDay",
+    "DashboardShopKpiSummary",
+    "DashboardShopKpiResponse",
     "DashboardTherapistSummary",
     "DashboardTherapistDetail",
     "DashboardTherapistPhotoUploadResponse",
@@ -88,6 +88,40 @@ class BulkShopContentResponse(BaseModel):
     errors: List[Dict[str, Any]] = Field(default_factory=list)
 
 
+class ShopContentStreamError(BaseModel):
+    line: int
+    shop_id: Optional[str] = None
+    error: str
+
+
+class ShopContentStreamStats(BaseModel):
+    rows: int = 0
+    processed: int = 0
+    failed: int = 0
+    batches: int = 0
+    reviews_upserted: int = 0
+    diaries_upserted: int = 0
+    availability_upserts: int = 0
+    indexed: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+
+
+class ShopContentStreamResponse(BaseModel):
+    stats: ShopContentStreamStats = Field(default_factory=ShopContentStreamStats)
+    errors: List[ShopContentStreamError] = Field(default_factory=list)
+
+
+class AdminAuditStateResponse(BaseModel):
+    target_type: str
+    target_id: UUID
+    at: datetime
+    state: Any = None
+    as_of: Optional[datetime] = None
+    snapshot_id: Optional[UUID] = None
+    diffs_applied: int = 0
+
+
 class ShopAdminSummary(BaseModel):
     id: UUID
     name: str
@@ -6,11 +6,12 @@ from .base import (
     List,
     Optional,
     UUID,
+    date,
     datetime,
     ReservationSlotStatusLiteral,
     ReservationStatusLiteral,
 )
-from .shop import AvailabilityCalendar
+from .shop import AvailabilityCalendar, ImageVariant
 from ..enums import TherapistStatusLiteral
 
 
@@ -196,6 +197,40 @@ class DashboardReservationUpdateRequest(BaseModel):
     note: Optional[str] = None
 
 
+# KPI schemas
+class DashboardShopKpiDay(BaseModel):
+    day: date
+    reservations_total: int = 0
+    reservations_pending: int = 0
+    reservations_confirmed: int = 0
+    reservations_cancelled: int = 0
+    reservations_no_show: int = 0
+    repeat_reservations: int = 0
+    booked_minutes: int = 0
+    shift_minutes: int = 0
+    utilization: Optional[float] = None
+
+
+class DashboardShopKpiSummary(BaseModel):
+    reservations_total: int = 0
+    reservations_confirmed: int = 0
+    reservations_cancelled: int = 0
+    reservations_no_show: int = 0
+    booked_minutes: int = 0
+    shift_minutes: int = 0
+    utilization: Optional[float] = None
+    cancellation_rate: Optional[float] = None
+    repeat_rate: Optional[float] = None
+
+
+class DashboardShopKpiResponse(BaseModel):
+    profile_id: UUID
+    start: date
+    end: date
+    summary: DashboardShopKpiSummary
+    days: List[DashboardShopKpiDay] = Field(default_factory=list)
+
+
 # Therapist schemas
 class DashboardTherapistSummary(BaseModel):
     id: UUID
@@ -222,6 +257,9 @@ class DashboardTherapistPhotoUploadResponse(BaseModel):
     filename: str
     content_type: str
     size: int = Field(ge=0)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    variants: List[ImageVariant] = Field(default_factory=list)
 
 
 class DashboardTherapistCreatePayload(BaseModel):
@@ -77,6 +77,8 @@ class ProfileDoc(BaseModel):
     ranking_score: Optional[float] = None
     diary_count: Optional[int] = None
     has_diaries: Optional[bool] = None
+    # [{"src": photo/avatar URL, "variants": [ImageVariant, ...]}]
+    image_variants: List[Dict[str, Any]] = Field(default_factory=list)
 
 
 class AvailabilityOut(BaseModel):
@@ -22,6 +22,16 @@ class NextAvailableSlot(BaseModel):
     status: Literal["ok", "maybe"]
 
 
+class ImageVariant(BaseModel):
+    """A resized rendition of an uploaded photo (see ``media_assets``)."""
+
+    name: str
+    url: str
+    format: str
+    width: int
+    height: int
+
+
 class ShopStaffPreview(BaseModel):
     id: Optional[str] = None
     name: str
@@ -30,6 +40,7 @@ class ShopStaffPreview(BaseModel):
     rating: Optional[float] = None
     review_count: Optional[int] = None
     avatar_url: Optional[str] = None
+    avatar_variants: List[ImageVariant] = Field(default_factory=list)
     specialties: List[str] = Field(default_factory=list)
     today_available: Optional[bool] = None
     next_available_at: Optional[datetime] = None
@@ -57,6 +68,7 @@ class ShopSummary(BaseModel):
     rating: Optional[float] = None
     review_count: Optional[int] = None
     lead_image_url: Optional[str] = None
+    lead_image_variants: List[ImageVariant] = Field(default_factory=list)
     badges: List[str] = Field(default_factory=list)
     today_available: Optional[bool] = None
     next_available_at: Optional[datetime] = None
@@ -39,6 +39,7 @@ from .dashboard_shop_helpers import (
     update_contact_json,
     update_optional_field,
 )
+from .image_variants import with_image_variants
 
 JST = ZoneInfo("Asia/Tokyo")
 
@@ -522,6 +523,7 @@ class DashboardShopService:
             ctr7d=0.0,
             outlinks=outlinks,
         )
+        await with_image_variants(db, [doc])
         try:
             self._indexer(doc)
         except Exception:
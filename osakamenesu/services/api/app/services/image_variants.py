@@ -0,0 +1,446 @@
+"""Decode uploaded photos once and store responsive variants.
+
+Uploads are hashed first: a file stored before in the same folder reuses
+its ``media_assets`` row, so nothing is decoded or written again.  Reuse
+never crosses folders, so an upload always gets a URL under its own
+owner's folder.  Otherwise the image is decoded
+once in a small worker pool, rotated per its EXIF orientation and re-encoded
+without metadata (EXIF GPS positions, camera serials, XMP).  A square
+thumbnail and one variant per configured width are encoded in every
+configured format Pillow supports (AVIF, WebP), each resized from the next
+larger one rather than from the original.
+
+File names derive from the content hash, so a URL never changes meaning and
+can be cached forever.  The variant manifest is kept on the ``media_assets``
+row; search documents and ``ShopSummary`` look it up by the original URL.
+Without Pillow, or for files it cannot decode, the upload is stored as sent
+under the same hashed name, without variants.
+
+Uploads are read from their spool file in chunks and never copied into one
+``bytes`` object: :func:`digest_upload` hashes and size-checks them, Pillow
+decodes from the file, and originals kept as sent are streamed to storage.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Iterable, Mapping, Optional, Sequence, Union
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..settings import settings
+from ..storage import checked_chunks, iter_file
+
+try:
+    from PIL import Image, ImageOps
+
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None  # type: ignore
+    ImageOps = None  # type: ignore
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Hex digits of the sha256 used in stored file names
+HASH_NAME_LENGTH = 32
+# Originals in these formats are re-encoded without metadata; others (GIF,
+# HEIC) are kept as uploaded so animations and unusual codecs survive
+_REENCODED_ORIGINALS = {"jpeg", "png", "webp"}
+_CONTENT_TYPES = {
+    "avif": "image/avif",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+}
+_EXTENSIONS = {"avif": ".avif", "jpeg": ".jpg", "png": ".png", "webp": ".webp"}
+_HASHED_NAME = re.compile(rf"/[0-9a-f]{{{HASH_NAME_LENGTH}}}\.[a-z0-9]+$")
+# A stored file name: ``<hash>.<ext>`` or ``<hash>-<variant>.<format>``
+HASHED_FILE_NAME = re.compile(
+    rf"^(?P<hash>[0-9a-f]{{{HASH_NAME_LENGTH}}})"
+    r"(?:-(?P<variant>[a-z0-9]+))?\.(?P<ext>[a-z0-9]+)$"
+)
+# Manifest keys copied into search documents and API responses
+_PUBLIC_KEYS = ("name", "url", "format", "width", "height")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+@dataclass
+class EncodedImage:
+    name: str
+    format: str
+    width: int
+    height: int
+    content: bytes
+
+    @property
+    def content_type(self) -> str:
+        return _CONTENT_TYPES[self.format]
+
+
+@dataclass
+class ProcessedImage:
+    width: int
+    height: int
+    # None when the upload is kept as sent (GIF, HEIC)
+    original: Optional[EncodedImage]
+    variants: list[EncodedImage] = field(default_factory=list)
+
+
+@dataclass
+class UploadDigest:
+    content_hash: str
+    size: int
+    # First chunk, enough to sniff the file type from its magic bytes
+    head: bytes
+
+
+async def digest_upload(source: BinaryIO, *, max_bytes: int) -> UploadDigest:
+    """Hash ``source`` chunk by chunk and rewind it.
+
+    Raises :class:`~app.storage.MediaTooLargeError` as soon as more than
+    ``max_bytes`` have been read.
+    """
+    digest = hashlib.sha256()
+    head = b""
+    size = 0
+    async for chunk in checked_chunks(iter_file(source), max_bytes=max_bytes):
+        size += len(chunk)
+        if not head:
+            head = chunk
+        digest.update(chunk)
+    await asyncio.to_thread(source.seek, 0)
+    return UploadDigest(content_hash=digest.hexdigest(), size=size, head=head)
+
+
+def parse_list(raw: str) -> list[str]:
+    return [item.strip().lower() for item in raw.split(",") if item.strip()]
+
+
+def encodable_formats(formats: Iterable[str]) -> list[str]:
+    """The subset of ``formats`` this Pillow build can write."""
+    if not PIL_AVAILABLE:
+        return []
+    Image.init()
+    return [fmt for fmt in formats if fmt.upper() in Image.SAVE]
+
+
+def _encode(image: Any, fmt: str, *, quality: int, icc_profile: Any) -> bytes:
+    options: dict[str, Any] = {}
+    if icc_profile:
+        # Colour data, not metadata: dropping it shifts wide-gamut photos
+        options["icc_profile"] = icc_profile
+    if fmt == "jpeg":
+        options.update(quality=quality, optimize=True, progressive=True)
+    elif fmt == "png":
+        options["optimize"] = True
+    elif fmt == "webp":
+        options.update(quality=quality, method=4)
+    else:
+        options["quality"] = quality
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt.upper(), **options)
+    return buffer.getvalue()
+
+
+def process_image(
+    data: Union[bytes, BinaryIO],
+    *,
+    widths: Sequence[int],
+    formats: Sequence[str],
+    thumbnail_size: int,
+    quality: int,
+) -> Optional[ProcessedImage]:
+    """Strip, resize and encode ``data``; ``None`` when it cannot be decoded."""
+    if not PIL_AVAILABLE:
+        return None
+    if isinstance(data, bytes):
+        data = io.BytesIO(data)
+    try:
+        with Image.open(data) as source:
+            source_format = (source.format or "").lower()
+            icc_profile = source.info.get("icc_profile")
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    except Exception as exc:
+        logger.warning("Could not decode uploaded image: %s", exc)
+        return None
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    # Nothing from the source's info (EXIF, XMP, comments) reaches the encoders
+    image.info = {}
+    width, height = image.size
+
+    original: Optional[EncodedImage] = None
+    if source_format in _REENCODED_ORIGINALS:
+        original = EncodedImage(
+            "original",
+            source_format,
+            width,
+            height,
+            _encode(
+                image,
+                source_format,
+                quality=max(quality, 90),
+                icc_profile=icc_profile,
+            ),
+        )
+
+    variants: list[EncodedImage] = []
+    thumb = ImageOps.fit(image, (thumbnail_size, thumbnail_size), Image.LANCZOS)
+    for fmt in formats:
+        variants.append(
+            EncodedImage(
+                "thumb",
+                fmt,
+                thumbnail_size,
+                thumbnail_size,
+                _encode(thumb, fmt, quality=quality, icc_profile=icc_profile),
+            )
+        )
+
+    # Widest first, each resized from the previous one: cheaper than going
+    # back to the full-size original every time
+    current = image
+    targets = sorted({min(w, width) for w in widths if w > 0}, reverse=True)
+    for target in targets:
+        target_height = max(1, round(height * target / width))
+        if current.width != target:
+            current = current.resize(
+                (target, target_height), Image.LANCZOS, reducing_gap=3.0
+            )
+        for fmt in formats:
+            variants.append(
+                EncodedImage(
+                    f"w{target}",
+                    fmt,
+                    target,
+                    target_height,
+                    _encode(current, fmt, quality=quality, icc_profile=icc_profile),
+                )
+            )
+    return ProcessedImage(width, height, original, variants)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.media_image_workers),
+            thread_name_prefix="image-variants",
+        )
+    return _executor
+
+
+async def store_image(
+    db: AsyncSession,
+    storage: Any,
+    *,
+    folder: str,
+    source: BinaryIO,
+    digest: UploadDigest,
+    content_type: str,
+    extension: str,
+) -> models.MediaAsset:
+    """Store ``source`` and its variants under ``folder``, or reuse its copy there.
+
+    ``digest`` comes from :func:`digest_upload` on the same file.  Raises
+    :class:`~app.storage.MediaStorageError` when a write fails.  The
+    ``media_assets`` row is inserted but not committed.
+    """
+    content_hash = digest.content_hash
+    existing = await db.get(
+        models.MediaAsset, {"folder": folder, "content_hash": content_hash}
+    )
+    if existing is not None:
+        return existing
+
+    processed = await asyncio.get_running_loop().run_in_executor(
+        _get_executor(),
+        lambda: process_image(
+            source,
+            widths=[int(w) for w in parse_list(settings.media_variant_widths)],
+            formats=encodable_formats(parse_list(settings.media_variant_formats)),
+            thumbnail_size=settings.media_thumbnail_size,
+            quality=settings.media_variant_quality,
+        ),
+    )
+
+    stem = content_hash[:HASH_NAME_LENGTH]
+    width = processed.width if processed else None
+    height = processed.height if processed else None
+    variants = processed.variants if processed else []
+    original = processed.original if processed else None
+    if original is not None:
+        original_type = original.content_type
+        save_original = storage.save_photo(
+            folder=folder,
+            filename=f"{stem}{_EXTENSIONS[original.format]}",
+            content=original.content,
+            content_type=original_type,
+        )
+    else:
+        original_type = content_type
+        await asyncio.to_thread(source.seek, 0)
+        save_original = storage.save_stream(
+            folder=folder,
+            filename=f"{stem}{extension}",
+            chunks=iter_file(source),
+            content_type=original_type,
+            max_bytes=digest.size,
+        )
+
+    stored = await asyncio.gather(
+        save_original,
+        *(
+            storage.save_photo(
+                folder=folder,
+                filename=f"{stem}-{variant.name}.{variant.format}",
+                content=variant.content,
+                content_type=variant.content_type,
+            )
+            for variant in variants
+        ),
+    )
+
+    asset = models.MediaAsset(
+        folder=folder,
+        content_hash=content_hash,
+        url=stored[0].url,
+        content_type=original_type,
+        size=stored[0].size,
+        width=width,
+        height=height,
+        variants=[
+            {
+                "name": variant.name,
+                "url": saved.url,
+                "format": variant.format,
+                "content_type": variant.content_type,
+                "width": variant.width,
+                "height": variant.height,
+                "size": len(variant.content),
+            }
+            for variant, saved in zip(variants, stored[1:])
+        ],
+    )
+    # A concurrent upload of the same file wrote the same names; keep its row
+    await db.execute(
+        pg_insert(models.MediaAsset)
+        .values(
+            folder=asset.folder,
+            content_hash=asset.content_hash,
+            url=asset.url,
+            content_type=asset.content_type,
+            size=asset.size,
+            width=asset.width,
+            height=asset.height,
+            variants=asset.variants,
+        )
+        .on_conflict_do_nothing()
+    )
+    return asset
+
+
+def public_variants(variants: Optional[Iterable[dict[str, Any]]]) -> list[dict]:
+    """Manifest entries trimmed to what clients need for ``srcset``."""
+    return [
+        {key: variant.get(key) for key in _PUBLIC_KEYS} for variant in variants or []
+    ]
+
+
+async def load_image_variants(
+    db: AsyncSession, urls: Iterable[Optional[str]]
+) -> dict[str, list[dict]]:
+    """Variants of every URL in ``urls`` that the upload pipeline stored.
+
+    URLs without a hashed file name (external images, uploads from before
+    the pipeline) are skipped without a query.
+    """
+    candidates = {
+        url for url in urls if url and _HASHED_NAME.search(url.split("?", 1)[0])
+    }
+    if not candidates:
+        return {}
+    result = await db.execute(
+        select(models.MediaAsset.url, models.MediaAsset.variants).where(
+            models.MediaAsset.url.in_(candidates)
+        )
+    )
+    return {url: public_variants(variants) for url, variants in result.all()}
+
+
+def doc_image_urls(doc: Mapping[str, Any]) -> list[str]:
+    """Images a search document shows in lists: lead photo and staff avatars."""
+    urls = list((doc.get("photos") or [])[:1])
+    urls.extend(
+        entry.get("avatar_url")
+        for entry in doc.get("staff_preview") or []
+        if isinstance(entry, dict)
+    )
+    return [url for url in dict.fromkeys(urls) if url]
+
+
+def attach_image_variants(
+    doc: dict[str, Any], variants: Mapping[str, list[dict]]
+) -> dict[str, Any]:
+    # Kept apart from staff_preview, which the freshness job patches in place
+    doc["image_variants"] = [
+        {"src": url, "variants": variants[url]}
+        for url in doc_image_urls(doc)
+        if url in variants
+    ]
+    return doc
+
+
+async def with_image_variants(
+    db: AsyncSession, docs: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """Attach variants to every document with at most one query."""
+    variants = await load_image_variants(
+        db, (url for doc in docs for url in doc_image_urls(doc))
+    )
+    for doc in docs:
+        attach_image_variants(doc, variants)
+    return docs
+
+
+def variants_by_url(doc: Mapping[str, Any]) -> dict[str, list[dict]]:
+    """Inverse of :func:`attach_image_variants` for reading a stored document."""
+    return {
+        entry["src"]: entry.get("variants") or []
+        for entry in doc.get("image_variants") or []
+        if isinstance(entry, dict) and entry.get("src")
+    }
+
+
+__all__ = [
+    "EncodedImage",
+    "HASHED_FILE_NAME",
+    "PIL_AVAILABLE",
+    "ProcessedImage",
+    "UploadDigest",
+    "attach_image_variants",
+    "digest_upload",
+    "doc_image_urls",
+    "encodable_formats",
+    "load_image_variants",
+    "process_image",
+    "public_variants",
+    "store_image",
+    "variants_by_url",
+    "with_image_variants",
+]
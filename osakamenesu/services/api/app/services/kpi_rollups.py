@@ -0,0 +1,512 @@
+"""Per-shop and per-therapist daily KPI rollups.
+
+``shop_daily_stats`` / ``therapist_daily_stats`` hold one row per JST day with
+reservation counts by status, booked vs. shift minutes, repeat bookings and
+review counters, so dashboard stats and the therapist feature store
+(:mod:`app.services.therapist_features`) read a handful of pre-aggregated
+rows instead of scanning the source tables.
+
+Buckets are rebuilt, never incremented: :func:`refresh_shop_rollups`
+recomputes every bucket of one shop in a day range from the source rows.
+Committed reservation/shift/review changes mark their ``(shop, day)`` buckets
+dirty (see :func:`install_change_tracking`) and :class:`KpiRollupScheduler`
+rebuilds them shortly after; bulk writers that bypass the ORM call
+:func:`refresh_shop_buckets` themselves.  :func:`backfill_rollups` rebuilds
+whole ranges; run it once after deploying and whenever the derivation changes.
+Readers that must be exact regardless of the scheduler (dashboard review
+counts) query the source tables instead.
+
+A reservation counts as a repeat when the same guest (user account or phone
+number) already had a confirmed visit before it - at the same shop for the
+shop rollup, with the same therapist for the therapist rollup.  Inserting an
+older visit later does not revisit newer buckets until they are rebuilt.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Iterable, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import and_, delete, event, exists, func, insert, inspect, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from .. import models
+from ..utils.datetime import JST, ensure_aware_datetime
+
+logger = logging.getLogger(__name__)
+
+# Statuses counted as reservation requests; drafts, holds and expired holds
+# never reached the shop.
+COUNTED_STATUSES = ("pending", "confirmed", "cancelled", "no_show")
+# Statuses occupying the therapist's time.
+ACTIVE_STATUSES = ("pending", "confirmed")
+DEFAULT_BACKFILL_CHUNK_DAYS = 31
+
+_SESSION_INFO_KEY = "kpi_rollup_buckets"
+
+# (model, shop id attribute, day attribute)
+_TRACKED = (
+    (models.GuestReservation, "shop_id", "start_at"),
+    (models.TherapistShift, "shop_id", "date"),
+    (models.Review, "profile_id", "created_at"),
+)
+
+_SHOP_COUNTERS = (
+    "reservations_total",
+    "reservations_pending",
+    "reservations_confirmed",
+    "reservations_cancelled",
+    "reservations_no_show",
+    "repeat_reservations",
+    "booked_minutes",
+    "shift_minutes",
+    "reviews_pending",
+    "reviews_published",
+    "reviews_rejected",
+    "review_score_sum",
+)
+_THERAPIST_COUNTERS = (
+    "reservations_total",
+    "reservations_confirmed",
+    "reservations_cancelled",
+    "repeat_reservations",
+    "booked_minutes",
+    "shift_minutes",
+)
+
+
+def jst_day(value: datetime | date) -> date:
+    """JST calendar day of ``value`` (naive datetimes are taken as UTC)."""
+    if isinstance(value, datetime):
+        return ensure_aware_datetime(value).astimezone(JST).date()
+    return value
+
+
+def _day_bounds(start: date, end: date) -> tuple[datetime, datetime]:
+    """Half-open UTC-comparable range covering JST days ``start``..``end``."""
+    lower = datetime.combine(start, time.min, tzinfo=JST)
+    upper = datetime.combine(end + timedelta(days=1), time.min, tzinfo=JST)
+    return lower, upper
+
+
+def _minutes(start_at: datetime, end_at: datetime) -> int:
+    return max(0, int((end_at - start_at).total_seconds() // 60))
+
+
+def shift_minutes(shift: Any) -> int:
+    """Working minutes of a shift row, breaks excluded; ``off`` shifts are 0."""
+    from ..domains.site.therapist_availability.helpers import (
+        _parse_breaks,
+        _subtract_intervals,
+    )
+
+    if shift.availability_status == "off":
+        return 0
+    remaining = _subtract_intervals(
+        [(shift.start_at, shift.end_at)],
+        _parse_breaks(shift.break_slots, shift.date),
+    )
+    return sum(_minutes(start, end) for start, end in remaining)
+
+
+def aggregate_rollups(
+    reservations: Iterable[Any],
+    shifts: Iterable[Any],
+    reviews: Iterable[Any],
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Fold source rows into shop and therapist bucket rows.
+
+    ``reservations`` rows carry ``shop_id``, ``therapist_id``, ``start_at``,
+    ``end_at``, ``status``, ``shop_repeat`` and ``therapist_repeat``; ``shifts``
+    are TherapistShift-like rows and ``reviews`` carry ``shop_id``,
+    ``created_at``, ``status`` and ``score``.  Only non-empty buckets are
+    returned.
+    """
+    shops: dict[tuple[UUID, date], dict[str, int]] = defaultdict(
+        lambda: dict.fromkeys(_SHOP_COUNTERS, 0)
+    )
+    therapists: dict[tuple[UUID, UUID, date], dict[str, int]] = defaultdict(
+        lambda: dict.fromkeys(_THERAPIST_COUNTERS, 0)
+    )
+
+    for row in reservations:
+        if row.status not in COUNTED_STATUSES:
+            continue
+        day = jst_day(row.start_at)
+        buckets = [(shops[(row.shop_id, day)], row.shop_repeat)]
+        if row.therapist_id is not None:
+            buckets.append(
+                (therapists[(row.shop_id, row.therapist_id, day)], row.therapist_repeat)
+            )
+        for counters, is_repeat in buckets:
+            counters["reservations_total"] += 1
+            if f"reservations_{row.status}" in counters:
+                counters[f"reservations_{row.status}"] += 1
+            if row.status == "confirmed" and is_repeat:
+                counters["repeat_reservations"] += 1
+            if row.status in ACTIVE_STATUSES:
+                counters["booked_minutes"] += _minutes(row.start_at, row.end_at)
+
+    for shift in shifts:
+        minutes = shift_minutes(shift)
+        if not minutes:
+            continue
+        shops[(shift.shop_id, shift.date)]["shift_minutes"] += minutes
+        therapists[(shift.shop_id, shift.therapist_id, shift.date)][
+            "shift_minutes"
+        ] += minutes
+
+    for review in reviews:
+        counters = shops[(review.shop_id, jst_day(review.created_at))]
+        counters[f"reviews_{review.status}"] += 1
+        if review.status == "published":
+            counters["review_score_sum"] += review.score or 0
+
+    now = models.now_utc()
+    shop_rows = [
+        {"shop_id": shop_id, "day": day, **counters, "updated_at": now}
+        for (shop_id, day), counters in shops.items()
+    ]
+    therapist_rows = [
+        {
+            "shop_id": shop_id,
+            "therapist_id": therapist_id,
+            "day": day,
+            **counters,
+            "updated_at": now,
+        }
+        for (shop_id, therapist_id, day), counters in therapists.items()
+    ]
+    return shop_rows, therapist_rows
+
+
+def _reservation_rows_stmt(shop_id: UUID, lower: datetime, upper: datetime):
+    reservation = models.GuestReservation
+    prior = aliased(models.GuestReservation)
+    same_guest = or_(
+        and_(reservation.user_id.is_not(None), prior.user_id == reservation.user_id),
+        and_(
+            reservation.customer_phone_digits.is_not(None),
+            reservation.customer_phone_digits != "",
+            prior.customer_phone_digits == reservation.customer_phone_digits,
+        ),
+    )
+    earlier_visit = and_(
+        prior.status == "confirmed",
+        prior.start_at < reservation.start_at,
+        same_guest,
+    )
+    return select(
+        reservation.shop_id,
+        reservation.therapist_id,
+        reservation.start_at,
+        reservation.end_at,
+        reservation.status,
+        exists()
+        .where(prior.shop_id == reservation.shop_id, earlier_visit)
+        .label("shop_repeat"),
+        exists()
+        .where(
+            reservation.therapist_id.is_not(None),
+            prior.therapist_id == reservation.therapist_id,
+            earlier_visit,
+        )
+        .label("therapist_repeat"),
+    ).where(
+        reservation.shop_id == shop_id,
+        reservation.status.in_(COUNTED_STATUSES),
+        reservation.start_at >= lower,
+        reservation.start_at < upper,
+    )
+
+
+async def refresh_shop_rollups(
+    db: AsyncSession, shop_id: UUID, start: date, end: date
+) -> int:
+    """Rebuild the shop's and its therapists' buckets for ``start``..``end``.
+
+    Runs inside the caller's transaction; returns the number of non-empty
+    shop buckets written.
+    """
+    lower, upper = _day_bounds(start, end)
+    shift = models.TherapistShift
+    review = models.Review
+
+    reservations = (
+        await db.execute(_reservation_rows_stmt(shop_id, lower, upper))
+    ).all()
+    shifts = (
+        await db.execute(
+            select(
+                shift.shop_id,
+                shift.therapist_id,
+                shift.date,
+                shift.start_at,
+                shift.end_at,
+                shift.break_slots,
+                shift.availability_status,
+            ).where(shift.shop_id == shop_id, shift.date.between(start, end))
+        )
+    ).all()
+    reviews = (
+        await db.execute(
+            select(
+                review.profile_id.label("shop_id"),
+                review.created_at,
+                review.status,
+                review.score,
+            ).where(
+                review.profile_id == shop_id,
+                review.created_at >= lower,
+                review.created_at < upper,
+            )
+        )
+    ).all()
+
+    shop_rows, therapist_rows = aggregate_rollups(reservations, shifts, reviews)
+    for table in (models.ShopDailyStats, models.TherapistDailyStats):
+        await db.execute(
+            delete(table).where(table.shop_id == shop_id, table.day.between(start, end))
+        )
+    if shop_rows:
+        await db.execute(insert(models.ShopDailyStats), shop_rows)
+    if therapist_rows:
+        await db.execute(insert(models.TherapistDailyStats), therapist_rows)
+    return len(shop_rows)
+
+
+def _day_runs(days: Iterable[date]) -> list[tuple[date, date]]:
+    """Collapse ``days`` into ``(start, end)`` runs of consecutive days."""
+    runs: list[tuple[date, date]] = []
+    for day in sorted(set(days)):
+        if runs and runs[-1][1] + timedelta(days=1) == day:
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+async def refresh_shop_buckets(
+    db: AsyncSession, buckets: Iterable[tuple[UUID, date]]
+) -> int:
+    """Rebuild exactly the given ``(shop, day)`` buckets in the caller's transaction.
+
+    For writers that bypass the ORM (bulk upserts), whose changes never reach
+    :func:`install_change_tracking`.  Far-apart days are rebuilt as separate
+    ranges instead of everything in between.
+    """
+    days_by_shop: dict[UUID, set[date]] = defaultdict(set)
+    for shop_id, day in buckets:
+        days_by_shop[shop_id].add(day)
+    written = 0
+    for shop_id, days in days_by_shop.items():
+        for start, end in _day_runs(days):
+            written += await refresh_shop_rollups(db, shop_id, start, end)
+    return written
+
+
+async def backfill_rollups(
+    db: AsyncSession,
+    *,
+    start: date,
+    end: date,
+    shop_ids: Optional[Sequence[UUID]] = None,
+    chunk_days: int = DEFAULT_BACKFILL_CHUNK_DAYS,
+) -> dict[str, int]:
+    """Rebuild every bucket in ``start``..``end``, committing per chunk.
+
+    Without ``shop_ids`` all shops are rebuilt.
+    """
+    if shop_ids is None:
+        shop_ids = list(
+            (await db.execute(select(models.Profile.id).order_by(models.Profile.id)))
+            .scalars()
+            .all()
+        )
+    buckets = 0
+    for shop_id in shop_ids:
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(end, chunk_start + timedelta(days=chunk_days - 1))
+            buckets += await refresh_shop_rollups(db, shop_id, chunk_start, chunk_end)
+            await db.commit()
+            chunk_start = chunk_end + timedelta(days=1)
+    return {"shops": len(shop_ids), "buckets": buckets}
+
+
+# ---------------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------------
+
+
+async def load_shop_daily_stats(
+    db: AsyncSession, shop_id: UUID, start: date, end: date
+) -> list[models.ShopDailyStats]:
+    stats = models.ShopDailyStats
+    result = await db.execute(
+        select(stats)
+        .where(stats.shop_id == shop_id, stats.day.between(start, end))
+        .order_by(stats.day)
+    )
+    return list(result.scalars().all())
+
+
+def _ratio(numerator: int, denominator: int) -> Optional[float]:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def summarize_shop_days(rows: Sequence[Any]) -> dict[str, Any]:
+    """Totals and rates over ShopDailyStats-like rows."""
+    totals = {
+        name: sum(getattr(row, name) or 0 for row in rows)
+        for name in (
+            "reservations_total",
+            "reservations_confirmed",
+            "reservations_cancelled",
+            "reservations_no_show",
+            "repeat_reservations",
+            "booked_minutes",
+            "shift_minutes",
+        )
+    }
+    return {
+        **{k: v for k, v in totals.items() if k != "repeat_reservations"},
+        "utilization": _ratio(totals["booked_minutes"], totals["shift_minutes"]),
+        "cancellation_rate": _ratio(
+            totals["reservations_cancelled"], totals["reservations_total"]
+        ),
+        "repeat_rate": _ratio(
+            totals["repeat_reservations"], totals["reservations_confirmed"]
+        ),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------------------------------
+
+
+class KpiRollupScheduler:
+    """Rebuild dirty ``(shop, day)`` buckets shortly after their changes commit."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        interval_seconds: float = 5.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self._pending: dict[UUID, set[date]] = {}
+
+    @property
+    def pending(self) -> frozenset[tuple[UUID, date]]:
+        return frozenset(
+            (shop_id, day) for shop_id, days in self._pending.items() for day in days
+        )
+
+    def mark_dirty(self, buckets: Iterable[tuple[UUID, date]]) -> None:
+        for shop_id, day in buckets:
+            if shop_id is not None and day is not None:
+                self._pending.setdefault(shop_id, set()).add(day)
+
+    async def tick(self) -> int:
+        """Rebuild pending buckets (one range per shop) in a single commit."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            async with self.session_factory() as db:
+                written = 0
+                for shop_id, days in pending.items():
+                    written += await refresh_shop_rollups(
+                        db, shop_id, min(days), max(days)
+                    )
+                await db.commit()
+                return written
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("kpi rollup refresh failed")
+            # Retry on the next tick.
+            for shop_id, days in pending.items():
+                self._pending.setdefault(shop_id, set()).update(days)
+            return 0
+
+    async def run_forever(self, stop_event: asyncio.Event) -> None:
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            await self.tick()
+
+
+def _attribute_values(obj: Any, name: str) -> set[Any]:
+    """Current value plus the value replaced in this flush, if any."""
+    values = {getattr(obj, name, None)}
+    history = inspect(obj).attrs[name].history
+    values.update(history.deleted or ())
+    values.discard(None)
+    return values
+
+
+def _collect_dirty_buckets(session: Session, flush_context: Any) -> None:
+    buckets: set[tuple[UUID, date]] = session.info.setdefault(_SESSION_INFO_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        for model, shop_attr, day_attr in _TRACKED:
+            if not isinstance(obj, model):
+                continue
+            days = {jst_day(value) for value in _attribute_values(obj, day_attr)}
+            for shop_id in _attribute_values(obj, shop_attr):
+                buckets.update((shop_id, day) for day in days)
+
+
+def install_change_tracking(scheduler: KpiRollupScheduler) -> Callable[[], None]:
+    """Mark buckets dirty when reservation/shift/review changes are committed.
+
+    Returns a callable removing the listeners again.
+    """
+
+    def after_commit(session: Session) -> None:
+        buckets = session.info.pop(_SESSION_INFO_KEY, None)
+        if buckets:
+            scheduler.mark_dirty(buckets)
+
+    def after_rollback(session: Session) -> None:
+        session.info.pop(_SESSION_INFO_KEY, None)
+
+    listeners = [
+        ("after_flush", _collect_dirty_buckets),
+        ("after_commit", after_commit),
+        ("after_rollback", after_rollback),
+    ]
+    for name, fn in listeners:
+        event.listen(Session, name, fn)
+
+    def remove() -> None:
+        for name, fn in listeners:
+            event.remove(Session, name, fn)
+
+    return remove
+
+
+__all__ = [
+    "ACTIVE_STATUSES",
+    "COUNTED_STATUSES",
+    "KpiRollupScheduler",
+    "aggregate_rollups",
+    "backfill_rollups",
+    "install_change_tracking",
+    "jst_day",
+    "load_shop_daily_stats",
+    "refresh_shop_buckets",
+    "refresh_shop_rollups",
+    "shift_minutes",
+    "summarize_shop_days",
+]
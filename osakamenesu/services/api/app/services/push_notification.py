@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from typing import Any, Dict, List, Optional
@@ -172,7 +173,9 @@ class PushNotificationService:
         # Send to all active subscriptions
         for subscription in subscriptions:
             try:
-                self._send_webpush(
+                # pywebpush is blocking; keep the event loop free
+                await asyncio.to_thread(
+                    self._send_webpush,
                     subscription_info={
                         "endpoint": subscription.endpoint,
                         "keys": {
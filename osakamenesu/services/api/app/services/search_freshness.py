@@ -0,0 +1,381 @@
+"""Keep the time-dependent fields of search documents fresh.
+
+``today``, ``ranking_score`` (through its today boost) and the staff
+``today_available`` / ``next_available_at`` values go stale at the JST day
+rollover and whenever shifts or reservations change.  Instead of rebuilding
+whole documents, affected profiles are recomputed and sent to Meilisearch as
+partial updates in batches.
+
+Changes are collected from committed sessions (see
+:func:`install_change_tracking`) and flushed by :class:`SearchFreshnessScheduler`,
+which also refreshes every published profile when the JST date changes.  Every
+worker runs a scheduler; on PostgreSQL a per-day advisory lock makes only one
+of them run the full rollover refresh.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Iterable, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from .. import models
+from ..meili import update_documents_partial
+from ..utils.datetime import now_jst
+from ..utils.profiles import (
+    _collect_promotions,
+    _compute_ranking_score,
+    compute_review_summary,
+)
+from ..utils.staff_preview import _build_staff_preview
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+# Separates the rollover lock keys from other advisory lock users.
+_ROLLOVER_LOCK_NAMESPACE = b"search_freshness_rollover:"
+STAFF_LOOKAHEAD_DAYS = 14
+
+# Rows whose changes can flip a profile's time-dependent fields.  Both carry
+# the owning profile id as ``shop_id``.
+_TRACKED_MODELS = (models.TherapistShift, models.GuestReservation)
+_SESSION_INFO_KEY = "search_freshness_profile_ids"
+
+
+@dataclass
+class ProfileAvailability:
+    """Time-dependent availability of one profile."""
+
+    today: bool = False
+    staff: dict[str, tuple[bool, Any]] = field(default_factory=dict)
+
+
+async def derive_profile_availability(
+    db: AsyncSession,
+    profiles: Sequence[models.Profile],
+    *,
+    today: Optional[date] = None,
+) -> dict[UUID, ProfileAvailability]:
+    """Derive availability for ``profiles`` (therapists must be loaded).
+
+    Staff availability comes from the guest availability SoT in one batch.
+    Profiles without published therapists fall back to ``Availability`` rows
+    for today, as the full index build used to.
+    """
+    from app.domains.site.services.shop.search_service import (
+        _derive_next_availability_from_slots_sot,
+    )
+
+    today = today or now_jst().date()
+    therapist_ids_by_profile: dict[UUID, list[UUID]] = {}
+    for profile in profiles:
+        therapists = profile.__dict__.get("therapists") or []
+        therapist_ids_by_profile[profile.id] = [
+            t.id for t in therapists if getattr(t, "status", None) == "published"
+        ]
+
+    all_ids = [tid for ids in therapist_ids_by_profile.values() for tid in ids]
+    staff_map = (
+        await _derive_next_availability_from_slots_sot(
+            db, all_ids, lookahead_days=STAFF_LOOKAHEAD_DAYS
+        )
+        if all_ids
+        else {}
+    )
+
+    legacy_ids = [pid for pid, ids in therapist_ids_by_profile.items() if not ids]
+    legacy_today: set[UUID] = set()
+    if legacy_ids:
+        rows = await db.execute(
+            select(models.Availability.profile_id)
+            .where(
+                models.Availability.profile_id.in_(legacy_ids),
+                models.Availability.date == today,
+            )
+            .group_by(models.Availability.profile_id)
+            .having(func.count() > 0)
+        )
+        legacy_today = {profile_id for (profile_id,) in rows.all()}
+
+    result: dict[UUID, ProfileAvailability] = {}
+    for profile_id, therapist_ids in therapist_ids_by_profile.items():
+        staff: dict[str, tuple[bool, Any]] = {}
+        for therapist_id in therapist_ids:
+            today_available, next_slot = staff_map.get(therapist_id, (False, None))
+            staff[str(therapist_id)] = (
+                bool(today_available and next_slot is not None),
+                next_slot.start_at if next_slot is not None else None,
+            )
+        if therapist_ids:
+            has_today = any(available for available, _ in staff.values())
+        else:
+            has_today = profile_id in legacy_today
+        result[profile_id] = ProfileAvailability(today=has_today, staff=staff)
+    return result
+
+
+def apply_staff_availability(
+    staff_preview: list[dict[str, Any]],
+    availability: ProfileAvailability,
+) -> list[dict[str, Any]]:
+    """Set ``today_available`` / ``next_available_at`` on staff entries."""
+    for entry in staff_preview:
+        staff_id = entry.get("id")
+        if not staff_id or staff_id not in availability.staff:
+            continue
+        today_available, next_available_at = availability.staff[staff_id]
+        entry["today_available"] = today_available
+        entry["next_available_at"] = (
+            next_available_at.isoformat() if next_available_at is not None else None
+        )
+    return staff_preview
+
+
+def build_time_dependent_patch(
+    profile: models.Profile, availability: ProfileAvailability
+) -> dict[str, Any]:
+    """Partial document holding only the time-dependent fields of ``profile``."""
+    contact_json = profile.contact_json or {}
+    review_score, review_count, _ = compute_review_summary(
+        profile, contact_json.get("reviews")
+    )
+    ranking_score = _compute_ranking_score(
+        profile,
+        today=availability.today,
+        review_score=review_score,
+        review_count=review_count,
+        promotions=_collect_promotions(profile, contact_json),
+        tag_score=0.0,
+        ctr7d=0.0,
+    )
+    staff_preview = apply_staff_availability(
+        _build_staff_preview(profile, contact_json), availability
+    )
+    return {
+        "id": str(profile.id),
+        "today": availability.today,
+        "ranking_score": ranking_score,
+        "staff_preview": staff_preview,
+    }
+
+
+async def _load_published_profiles(
+    db: AsyncSession, profile_ids: Optional[Sequence[UUID]]
+) -> list[models.Profile]:
+    stmt = (
+        select(models.Profile)
+        .where(models.Profile.status == "published")
+        .options(
+            selectinload(models.Profile.therapists),
+            selectinload(models.Profile.reviews),
+        )
+        .order_by(models.Profile.id)
+    )
+    if profile_ids is not None:
+        stmt = stmt.where(models.Profile.id.in_(profile_ids))
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def _published_profile_ids(db: AsyncSession) -> list[UUID]:
+    result = await db.execute(
+        select(models.Profile.id)
+        .where(models.Profile.status == "published")
+        .order_by(models.Profile.id)
+    )
+    return list(result.scalars().all())
+
+
+async def refresh_time_dependent_fields(
+    db: AsyncSession,
+    profile_ids: Optional[Iterable[UUID]] = None,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Push fresh time-dependent fields for ``profile_ids`` (all when ``None``).
+
+    Only published profiles are touched, since a partial update for an id
+    that is not indexed would create a stub document.  Returns the number of
+    documents updated.
+    """
+    if profile_ids is None:
+        ids = await _published_profile_ids(db)
+    else:
+        ids = list(dict.fromkeys(profile_ids))
+
+    today = now_jst().date()
+    updated = 0
+    for start in range(0, len(ids), batch_size):
+        profiles = await _load_published_profiles(db, ids[start : start + batch_size])
+        if not profiles:
+            continue
+        availability = await derive_profile_availability(db, profiles, today=today)
+        patches = [
+            build_time_dependent_patch(profile, availability[profile.id])
+            for profile in profiles
+        ]
+        await asyncio.to_thread(
+            update_documents_partial, patches, batch_size=batch_size
+        )
+        updated += len(patches)
+    return updated
+
+
+def _rollover_lock_key(day: date) -> int:
+    digest = hashlib.blake2b(
+        _ROLLOVER_LOCK_NAMESPACE + day.isoformat().encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _is_postgres(db: Any) -> bool:
+    get_bind = getattr(db, "get_bind", None)
+    if get_bind is None:
+        return False
+    try:
+        return get_bind().dialect.name == "postgresql"
+    except Exception:
+        return False
+
+
+async def _claim_rollover(db: AsyncSession, day: date) -> bool:
+    """Take ``day``'s rollover lock until ``db``'s transaction ends.
+
+    False when another worker holds it.  Always True off PostgreSQL, where
+    there is a single process (SQLite in tests).
+    """
+    if not _is_postgres(db):
+        return True
+    result = await db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"),
+        {"key": _rollover_lock_key(day)},
+    )
+    return bool(result.scalar())
+
+
+class SearchFreshnessScheduler:
+    """Debounce profile refreshes and run the day-rollover refresh."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        interval_seconds: float = 5.0,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._pending: set[UUID] = set()
+        self._current_day: Optional[date] = None
+
+    @property
+    def pending(self) -> frozenset[UUID]:
+        return frozenset(self._pending)
+
+    def mark_stale(self, profile_ids: Iterable[UUID]) -> None:
+        self._pending.update(pid for pid in profile_ids if pid is not None)
+
+    async def tick(self) -> int:
+        """Refresh pending profiles, or everything after the JST day rolled over."""
+        today = now_jst().date()
+        previous_day = self._current_day
+        rolled_over = previous_day is not None and today != previous_day
+        self._current_day = today
+        if not rolled_over and not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, set()
+        try:
+            async with self.session_factory() as db:
+                if rolled_over and not await _claim_rollover(db, today):
+                    logger.info("day rollover refresh for %s runs elsewhere", today)
+                    rolled_over = False
+                    if not pending:
+                        return 0
+                started = time.monotonic()
+                updated = await refresh_time_dependent_fields(
+                    db,
+                    None if rolled_over else pending,
+                    batch_size=self.batch_size,
+                )
+                if rolled_over and _is_postgres(db):
+                    # Keep the lock until every worker's first tick of the new
+                    # day has seen it taken, or a fast refresh runs twice.
+                    held = time.monotonic() - started
+                    await asyncio.sleep(max(0.0, self.interval_seconds - held))
+                return updated
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("search freshness refresh failed")
+            # Retry on the next tick.
+            self._pending.update(pending)
+            if rolled_over:
+                self._current_day = previous_day
+            return 0
+
+    async def run_forever(self, stop_event: asyncio.Event) -> None:
+        self._current_day = now_jst().date()
+        while not stop_event.is_set():
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            await self.tick()
+
+
+def _collect_changed_profiles(session: Session, flush_context: Any) -> None:
+    changed: set[UUID] = session.info.setdefault(_SESSION_INFO_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _TRACKED_MODELS) and obj.shop_id is not None:
+            changed.add(obj.shop_id)
+
+
+def install_change_tracking(scheduler: SearchFreshnessScheduler) -> Callable[[], None]:
+    """Mark profiles stale when shift/reservation changes are committed.
+
+    Returns a callable removing the listeners again.
+    """
+
+    def after_commit(session: Session) -> None:
+        changed = session.info.pop(_SESSION_INFO_KEY, None)
+        if changed:
+            scheduler.mark_stale(changed)
+
+    def after_rollback(session: Session) -> None:
+        session.info.pop(_SESSION_INFO_KEY, None)
+
+    listeners = [
+        ("after_flush", _collect_changed_profiles),
+        ("after_commit", after_commit),
+        ("after_rollback", after_rollback),
+    ]
+    for name, fn in listeners:
+        event.listen(Session, name, fn)
+
+    def remove() -> None:
+        for name, fn in listeners:
+            event.remove(Session, name, fn)
+
+    return remove
+
+
+__all__ = [
+    "ProfileAvailability",
+    "SearchFreshnessScheduler",
+    "apply_staff_availability",
+    "build_time_dependent_patch",
+    "derive_profile_availability",
+    "install_change_tracking",
+    "refresh_time_dependent_fields",
+]
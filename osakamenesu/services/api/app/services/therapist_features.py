@@ -0,0 +1,355 @@
+"""Therapist feature store for recommended scoring.
+
+``TherapistProfile`` needs booking volume, repeat rate, utilization, review
+score, tenure and availability per therapist.  Deriving them per request
+costs several queries per page, so a batch job
+(:func:`refresh_therapist_features`, run via ``scripts.refresh_therapist_features``
+or ``POST /api/ops/features/refresh``) computes them for every therapist from
+the KPI rollups and shifts into ``therapist_features``.
+
+Each API worker keeps the whole table in memory as a :class:`FeatureTable` -
+one compact typed array per feature plus an id -> row index - and
+:class:`FeatureStoreLoader` swaps in a fresh copy whenever the batch job has
+written a new generation.  Scoring code reads it without touching the
+database; therapists missing from the table get the ``TherapistProfile``
+defaults.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from array import array
+from dataclasses import asdict, dataclass, fields
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Iterable, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..utils.datetime import now_jst
+
+logger = logging.getLogger(__name__)
+
+BOOKINGS_WINDOW_DAYS = 30
+UTILIZATION_WINDOW_DAYS = 7
+AVAILABILITY_WINDOW_DAYS = 7
+INSERT_CHUNK_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class TherapistFeatures:
+    """Scoring inputs of one therapist; defaults match ``TherapistProfile``."""
+
+    total_bookings_30d: int = 0
+    repeat_rate_30d: float = 0.0
+    utilization_7d: float = 0.0
+    avg_review_score: float = 0.0
+    days_since_first_shift: int = 365
+    availability_score: float = 0.5
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+FEATURE_NAMES = tuple(f.name for f in fields(TherapistFeatures))
+_DEFAULTS = TherapistFeatures()
+# array typecodes: 32-bit ints for counters, 32-bit floats for ratios/scores
+_TYPECODES = {
+    name: "i" if isinstance(getattr(_DEFAULTS, name), int) else "f"
+    for name in FEATURE_NAMES
+}
+
+
+class FeatureTable:
+    """Immutable column-oriented snapshot of ``therapist_features``."""
+
+    def __init__(
+        self,
+        therapist_ids: Sequence[UUID],
+        columns: dict[str, array],
+        *,
+        generation: Optional[datetime] = None,
+    ) -> None:
+        self._index = {tid: row for row, tid in enumerate(therapist_ids)}
+        self._columns = columns
+        self.generation = generation
+
+    @classmethod
+    def empty(cls) -> "FeatureTable":
+        return cls([], {name: array(_TYPECODES[name]) for name in FEATURE_NAMES})
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[Any], *, generation: Optional[datetime] = None
+    ) -> "FeatureTable":
+        """Build from rows carrying ``therapist_id`` and every feature name."""
+        ids: list[UUID] = []
+        columns = {name: array(_TYPECODES[name]) for name in FEATURE_NAMES}
+        for row in rows:
+            ids.append(row.therapist_id)
+            for name in FEATURE_NAMES:
+                columns[name].append(getattr(row, name))
+        return cls(ids, columns, generation=generation)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, therapist_id: object) -> bool:
+        return therapist_id in self._index
+
+    def get(self, therapist_id: UUID) -> Optional[TherapistFeatures]:
+        row = self._index.get(therapist_id)
+        if row is None:
+            return None
+        return TherapistFeatures(
+            **{name: self._columns[name][row] for name in FEATURE_NAMES}
+        )
+
+    def take(self, therapist_ids: Sequence[Optional[UUID]]) -> dict[str, list[Any]]:
+        """Feature columns for ``therapist_ids`` (defaults for unknown ids)."""
+        rows = [self._index.get(tid) for tid in therapist_ids]  # type: ignore[arg-type]
+        result: dict[str, list[Any]] = {}
+        for name in FEATURE_NAMES:
+            column = self._columns[name]
+            default = getattr(_DEFAULTS, name)
+            result[name] = [default if row is None else column[row] for row in rows]
+        return result
+
+    def features_for(
+        self, therapist_ids: Sequence[Optional[UUID]]
+    ) -> list[TherapistFeatures]:
+        columns = self.take(therapist_ids)
+        return [
+            TherapistFeatures(**{name: columns[name][i] for name in FEATURE_NAMES})
+            for i in range(len(therapist_ids))
+        ]
+
+
+_table = FeatureTable.empty()
+
+
+def get_feature_table() -> FeatureTable:
+    """The feature table currently loaded in this worker."""
+    return _table
+
+
+def set_feature_table(table: FeatureTable) -> None:
+    global _table
+    _table = table
+
+
+def _as_uuid(value: Any) -> Optional[UUID]:
+    if isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def enrich_candidates(candidates: Iterable[dict[str, Any]]) -> None:
+    """Fill missing scoring features of matching candidates from the table."""
+    table = get_feature_table()
+    if not len(table):
+        return
+    candidates = list(candidates)
+    ids = [_as_uuid(c.get("therapist_id") or c.get("id")) for c in candidates]
+    for candidate, tid, features in zip(candidates, ids, table.features_for(ids)):
+        if tid not in table:
+            continue
+        for name, value in features.as_dict().items():
+            if name != "availability_score":
+                candidate.setdefault(name, value)
+
+
+# ---------------------------------------------------------------------------
+# Batch job
+# ---------------------------------------------------------------------------
+
+
+def _ratio(numerator: Any, denominator: Any) -> float:
+    return float(numerator) / float(denominator) if denominator else 0.0
+
+
+async def compute_therapist_features(
+    db: AsyncSession, *, today: Optional[date] = None
+) -> list[dict[str, Any]]:
+    """Feature rows for every therapist, from four grouped queries."""
+    today = today or now_jst().date()
+    bookings_since = today - timedelta(days=BOOKINGS_WINDOW_DAYS - 1)
+    utilization_since = today - timedelta(days=UTILIZATION_WINDOW_DAYS - 1)
+    availability_until = today + timedelta(days=AVAILABILITY_WINDOW_DAYS - 1)
+
+    therapists = (
+        await db.execute(select(models.Therapist.id, models.Therapist.profile_id))
+    ).all()
+
+    stats = models.TherapistDailyStats
+    past = stats.day.between(bookings_since, today)
+    recent = stats.day.between(utilization_since, today)
+    upcoming = stats.day.between(today, availability_until)
+    usage = {
+        row[0]: row[1:]
+        for row in (
+            await db.execute(
+                select(
+                    stats.therapist_id,
+                    func.coalesce(
+                        func.sum(stats.reservations_confirmed).filter(past), 0
+                    ),
+                    func.coalesce(func.sum(stats.repeat_reservations).filter(past), 0),
+                    func.coalesce(func.sum(stats.booked_minutes).filter(recent), 0),
+                    func.coalesce(func.sum(stats.shift_minutes).filter(recent), 0),
+                    func.coalesce(func.sum(stats.booked_minutes).filter(upcoming), 0),
+                    func.coalesce(func.sum(stats.shift_minutes).filter(upcoming), 0),
+                )
+                .where(stats.day.between(bookings_since, availability_until))
+                .group_by(stats.therapist_id)
+            )
+        ).all()
+    }
+
+    shift = models.TherapistShift
+    first_shift = dict(
+        (
+            await db.execute(
+                select(shift.therapist_id, func.min(shift.date)).group_by(
+                    shift.therapist_id
+                )
+            )
+        ).all()
+    )
+
+    # Reviews are written per shop; every therapist inherits the shop average.
+    shop_stats = models.ShopDailyStats
+    review_scores = {
+        shop_id: _ratio(score_sum, published)
+        for shop_id, score_sum, published in (
+            await db.execute(
+                select(
+                    shop_stats.shop_id,
+                    func.sum(shop_stats.review_score_sum),
+                    func.sum(shop_stats.reviews_published),
+                ).group_by(shop_stats.shop_id)
+            )
+        ).all()
+    }
+
+    computed_at = models.now_utc()
+    rows: list[dict[str, Any]] = []
+    for therapist_id, shop_id in therapists:
+        confirmed, repeats, booked, shifted, booked_next, shifted_next = usage.get(
+            therapist_id, (0, 0, 0, 0, 0, 0)
+        )
+        first_day = first_shift.get(therapist_id)
+        rows.append(
+            {
+                "therapist_id": therapist_id,
+                "shop_id": shop_id,
+                "total_bookings_30d": int(confirmed),
+                "repeat_rate_30d": _ratio(repeats, confirmed),
+                "utilization_7d": _ratio(booked, shifted),
+                "avg_review_score": review_scores.get(shop_id, 0.0),
+                "days_since_first_shift": (
+                    max(0, (today - first_day).days)
+                    if first_day is not None
+                    else _DEFAULTS.days_since_first_shift
+                ),
+                # Share of the coming week's shift time still open
+                "availability_score": (
+                    max(0.0, 1.0 - _ratio(booked_next, shifted_next))
+                    if shifted_next
+                    else 0.0
+                ),
+                "computed_at": computed_at,
+            }
+        )
+    return rows
+
+
+async def refresh_therapist_features(
+    db: AsyncSession, *, today: Optional[date] = None
+) -> int:
+    """Recompute and replace the whole feature table in one transaction."""
+    rows = await compute_therapist_features(db, today=today)
+    await db.execute(delete(models.TherapistFeature))
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        await db.execute(
+            insert(models.TherapistFeature), rows[start : start + INSERT_CHUNK_SIZE]
+        )
+    await db.commit()
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Per-worker loading
+# ---------------------------------------------------------------------------
+
+
+async def load_feature_table(db: AsyncSession) -> FeatureTable:
+    feature = models.TherapistFeature
+    columns = [getattr(feature, name) for name in FEATURE_NAMES]
+    result = await db.execute(
+        select(feature.therapist_id, *columns, feature.computed_at)
+    )
+    rows = result.all()
+    generation = max((row.computed_at for row in rows), default=None)
+    return FeatureTable.from_rows(rows, generation=generation)
+
+
+class FeatureStoreLoader:
+    """Reload the in-memory table whenever a new generation was written."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        interval_seconds: float = 60.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+
+    async def tick(self) -> bool:
+        """Swap in a fresh table if the stored generation changed."""
+        try:
+            async with self.session_factory() as db:
+                generation = await db.scalar(
+                    select(func.max(models.TherapistFeature.computed_at))
+                )
+                current = get_feature_table()
+                if generation is None or generation == current.generation:
+                    return False
+                table = await load_feature_table(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("therapist feature store reload failed")
+            return False
+        set_feature_table(table)
+        logger.info("loaded %s therapist features (%s)", len(table), generation)
+        return True
+
+    async def run_forever(self, stop_event: asyncio.Event) -> None:
+        while not stop_event.is_set():
+            await self.tick()
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+__all__ = [
+    "FEATURE_NAMES",
+    "FeatureStoreLoader",
+    "FeatureTable",
+    "TherapistFeatures",
+    "compute_therapist_features",
+    "enrich_candidates",
+    "get_feature_table",
+    "load_feature_table",
+    "refresh_therapist_features",
+    "set_feature_table",
+]
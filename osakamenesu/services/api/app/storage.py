@@ -1,18 +1,44 @@
 from __future__ import annotations
 
 import asyncio
+import logging
+import os
+import uuid
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Protocol
-from urllib.parse import quote
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Optional,
+    Protocol,
+)
+from urllib.parse import quote, unquote, urlsplit
 
 from .settings import Settings, settings
 
+logger = logging.getLogger(__name__)
+
+# Bytes read from an upload (or its spool file) at a time
+UPLOAD_CHUNK_SIZE = 512 * 1024
+# S3 rejects multipart parts smaller than this, except the last one
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
 
 class MediaStorageError(Exception):
     """Raised when media storage cannot persist a file."""
 
 
+class MediaTooLargeError(MediaStorageError):
+    """Raised when a streamed file grows past its size limit."""
+
+    def __init__(self, limit_bytes: int) -> None:
+        super().__init__(f"file exceeds {limit_bytes} bytes")
+        self.limit_bytes = limit_bytes
+
+
 @dataclass
 class StoredMedia:
     key: str
@@ -27,6 +53,52 @@ class StorageBackend(Protocol):
         self, *, folder: str, filename: str, content: bytes, content_type: str
     ) -> StoredMedia: ...
 
+    async def save_stream(
+        self,
+        *,
+        folder: str,
+        filename: str,
+        chunks: AsyncIterable[bytes],
+        content_type: str,
+        max_bytes: Optional[int] = None,
+        validate: Optional[Callable[[bytes], None]] = None,
+    ) -> StoredMedia: ...
+
+
+async def iter_file(
+    fileobj: BinaryIO, chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Read ``fileobj`` from its current position, off the event loop."""
+    while True:
+        chunk = await asyncio.to_thread(fileobj.read, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def checked_chunks(
+    chunks: AsyncIterable[bytes],
+    *,
+    max_bytes: Optional[int] = None,
+    validate: Optional[Callable[[bytes], None]] = None,
+) -> AsyncIterator[bytes]:
+    """Pass ``chunks`` through, failing as soon as they go over ``max_bytes``.
+
+    ``validate`` sees the first chunk before anything is written and should
+    raise :class:`MediaStorageError` to reject the file (e.g. by its magic
+    bytes).
+    """
+    size = 0
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        if size == 0 and validate is not None:
+            validate(chunk)
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise MediaTooLargeError(max_bytes)
+        yield chunk
+
 
 class LocalMediaStorage:
     def __init__(
@@ -48,9 +120,7 @@ class LocalMediaStorage:
             fallback_base_url.rstrip("/") if fallback_base_url else None
         )
 
-    async def save(
-        self, *, folder: str, filename: str, content: bytes, content_type: str
-    ) -> StoredMedia:
+    def _destination(self, folder: str, filename: str) -> tuple[list[str], str, Path]:
         # パストラバーサル対策: 危険なセグメントを除去
         parts = [
             segment
@@ -69,11 +139,17 @@ class LocalMediaStorage:
         resolved_root = self._root.resolve()
         if not str(resolved_destination).startswith(str(resolved_root)):
             raise MediaStorageError("Invalid folder path: path traversal detected")
+        return parts, safe_filename, destination
 
-        await asyncio.to_thread(destination.mkdir, parents=True, exist_ok=True)
-        file_path = destination / safe_filename
-        await asyncio.to_thread(file_path.write_bytes, content)
-
+    def _stored(
+        self,
+        parts: list[str],
+        safe_filename: str,
+        *,
+        content_type: str,
+        size: int,
+        path: Path,
+    ) -> StoredMedia:
         if self._cdn_base_url:
             base_url = self._cdn_base_url
         elif self._public_base_url:
@@ -94,10 +170,81 @@ class LocalMediaStorage:
             key=key,
             url=url,
             content_type=content_type,
+            size=size,
+            path=path,
+        )
+
+    async def save(
+        self, *, folder: str, filename: str, content: bytes, content_type: str
+    ) -> StoredMedia:
+        parts, safe_filename, destination = self._destination(folder, filename)
+        await asyncio.to_thread(destination.mkdir, parents=True, exist_ok=True)
+        file_path = destination / safe_filename
+        await asyncio.to_thread(file_path.write_bytes, content)
+        return self._stored(
+            parts,
+            safe_filename,
+            content_type=content_type,
             size=len(content),
             path=file_path,
         )
 
+    async def save_stream(
+        self,
+        *,
+        folder: str,
+        filename: str,
+        chunks: AsyncIterable[bytes],
+        content_type: str,
+        max_bytes: Optional[int] = None,
+        validate: Optional[Callable[[bytes], None]] = None,
+    ) -> StoredMedia:
+        parts, safe_filename, destination = self._destination(folder, filename)
+        await asyncio.to_thread(destination.mkdir, parents=True, exist_ok=True)
+        file_path = destination / safe_filename
+        # Written beside the target and renamed into place when complete, so
+        # a rejected or broken upload never shows up as a truncated file
+        partial = destination / f".{safe_filename}.{uuid.uuid4().hex}.part"
+        handle = await asyncio.to_thread(partial.open, "wb")
+        size = 0
+        try:
+            try:
+                async for chunk in checked_chunks(
+                    chunks, max_bytes=max_bytes, validate=validate
+                ):
+                    await asyncio.to_thread(handle.write, chunk)
+                    size += len(chunk)
+            finally:
+                await asyncio.to_thread(handle.close)
+            await asyncio.to_thread(os.replace, partial, file_path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        return self._stored(
+            parts,
+            safe_filename,
+            content_type=content_type,
+            size=size,
+            path=file_path,
+        )
+
+    def path_for_url(self, url: str) -> Optional[Path]:
+        """Local file behind a URL returned by :meth:`save`, if it exists."""
+        if self._cdn_base_url and url.startswith(f"{self._cdn_base_url}/"):
+            relative = url[len(self._cdn_base_url) + 1 :]
+        else:
+            path = urlsplit(url).path
+            if not path.startswith(f"{self._url_prefix}/"):
+                return None
+            relative = path[len(self._url_prefix) + 1 :]
+        parts = [unquote(part) for part in relative.split("?")[0].split("/") if part]
+        if not parts or any(part in (".", "..") for part in parts):
+            return None
+        candidate = self._root.joinpath(*parts)
+        if not candidate.resolve().is_relative_to(self._root.resolve()):
+            return None
+        return candidate if candidate.is_file() else None
+
 
 class S3MediaStorage:
     def __init__(
@@ -109,6 +256,8 @@ class S3MediaStorage:
         endpoint_url: Optional[str],
         access_key_id: Optional[str],
         secret_access_key: Optional[str],
+        part_size: int = 8 * 1024 * 1024,
+        client: Any = None,
     ) -> None:
         try:
             import boto3
@@ -120,8 +269,9 @@ class S3MediaStorage:
         self._region = region
         self._base_url = base_url.rstrip("/") if base_url else None
         self._boto_errors = (BotoCoreError, ClientError)
+        self._part_size = max(part_size, S3_MIN_PART_SIZE)
 
-        self._client = boto3.client(
+        self._client = client or boto3.client(
             "s3",
             region_name=region,
             endpoint_url=endpoint_url,
@@ -129,6 +279,13 @@ class S3MediaStorage:
             aws_secret_access_key=secret_access_key,
         )
 
+    def _url(self, key: str) -> str:
+        if self._base_url:
+            return f"{self._base_url}/{key}"
+        if self._region:
+            return f"https://{self._bucket}.s3.{self._region}.amazonaws.com/{key}"
+        return f"https://{self._bucket}.s3.amazonaws.com/{key}"
+
     async def save(
         self, *, folder: str, filename: str, content: bytes, content_type: str
     ) -> StoredMedia:
@@ -146,22 +303,119 @@ class S3MediaStorage:
         ) as exc:  # pragma: no cover - depends on AWS connectivity
             raise MediaStorageError(str(exc)) from exc
 
-        if self._base_url:
-            url = f"{self._base_url}/{key}"
-        else:
-            if self._region:
-                url = f"https://{self._bucket}.s3.{self._region}.amazonaws.com/{key}"
+        return StoredMedia(
+            key=key,
+            url=self._url(key),
+            content_type=content_type,
+            size=len(content),
+            path=None,
+        )
+
+    async def save_stream(
+        self,
+        *,
+        folder: str,
+        filename: str,
+        chunks: AsyncIterable[bytes],
+        content_type: str,
+        max_bytes: Optional[int] = None,
+        validate: Optional[Callable[[bytes], None]] = None,
+    ) -> StoredMedia:
+        """Upload ``chunks`` holding at most about one part in memory.
+
+        A file that fits in one part is sent with a single ``PutObject``;
+        larger ones become a multipart upload, aborted if the stream fails
+        so S3 does not keep (and bill for) the orphaned parts.
+        """
+        key = f"{folder.strip('/')}/{filename}"
+        buffer = bytearray()
+        parts: list[dict[str, Any]] = []
+        upload_id: Optional[str] = None
+        size = 0
+        try:
+            async for chunk in checked_chunks(
+                chunks, max_bytes=max_bytes, validate=validate
+            ):
+                buffer.extend(chunk)
+                size += len(chunk)
+                if len(buffer) < self._part_size:
+                    continue
+                if upload_id is None:
+                    created = await asyncio.to_thread(
+                        self._client.create_multipart_upload,
+                        Bucket=self._bucket,
+                        Key=key,
+                        ContentType=content_type,
+                    )
+                    upload_id = created["UploadId"]
+                await self._upload_part(key, upload_id, parts, buffer)
+
+            if upload_id is None:
+                await asyncio.to_thread(
+                    self._client.put_object,
+                    Bucket=self._bucket,
+                    Key=key,
+                    Body=bytes(buffer),
+                    ContentType=content_type,
+                )
             else:
-                url = f"https://{self._bucket}.s3.amazonaws.com/{key}"
+                if buffer:
+                    await self._upload_part(key, upload_id, parts, buffer)
+                await asyncio.to_thread(
+                    self._client.complete_multipart_upload,
+                    Bucket=self._bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+        except self._boto_errors as exc:
+            await self._abort(key, upload_id)
+            raise MediaStorageError(str(exc)) from exc
+        except BaseException:
+            await self._abort(key, upload_id)
+            raise
 
         return StoredMedia(
             key=key,
-            url=url,
+            url=self._url(key),
             content_type=content_type,
-            size=len(content),
+            size=size,
             path=None,
         )
 
+    async def _upload_part(
+        self,
+        key: str,
+        upload_id: str,
+        parts: list[dict[str, Any]],
+        buffer: bytearray,
+    ) -> None:
+        part_number = len(parts) + 1
+        body = bytes(buffer)
+        buffer.clear()
+        uploaded = await asyncio.to_thread(
+            self._client.upload_part,
+            Bucket=self._bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        parts.append({"ETag": uploaded["ETag"], "PartNumber": part_number})
+
+    async def _abort(self, key: str, upload_id: Optional[str]) -> None:
+        if upload_id is None:
+            return
+        try:
+            await asyncio.to_thread(
+                self._client.abort_multipart_upload,
+                Bucket=self._bucket,
+                Key=key,
+                UploadId=upload_id,
+            )
+        except self._boto_errors as exc:  # pragma: no cover - best effort
+            logger.warning("Could not abort multipart upload of %s: %s", key, exc)
+
 
 class MediaStorage:
     def __init__(self, backend: StorageBackend) -> None:
@@ -192,10 +446,16 @@ class MediaStorage:
                 endpoint_url=config.media_s3_endpoint,
                 access_key_id=config.media_s3_access_key_id,
                 secret_access_key=config.media_s3_secret_access_key,
+                part_size=config.media_s3_part_size,
             )
             return cls(backend)
         raise RuntimeError(f"Unsupported media storage backend: {backend_name}")
 
+    def local_path(self, url: str) -> Optional[Path]:
+        """Local file for a stored media URL; None for remote backends."""
+        path_for_url = getattr(self._backend, "path_for_url", None)
+        return path_for_url(url) if path_for_url is not None else None
+
     async def save_photo(
         self, *, folder: str, filename: str, content: bytes, content_type: str
     ) -> StoredMedia:
@@ -211,6 +471,31 @@ class MediaStorage:
         except Exception as exc:  # pragma: no cover - defensive
             raise MediaStorageError(str(exc)) from exc
 
+    async def save_stream(
+        self,
+        *,
+        folder: str,
+        filename: str,
+        chunks: AsyncIterable[bytes],
+        content_type: str,
+        max_bytes: Optional[int] = None,
+        validate: Optional[Callable[[bytes], None]] = None,
+    ) -> StoredMedia:
+        """Store ``chunks`` without holding the whole file in memory."""
+        try:
+            return await self._backend.save_stream(
+                folder=folder,
+                filename=filename,
+                chunks=chunks,
+                content_type=content_type,
+                max_bytes=max_bytes,
+                validate=validate,
+            )
+        except MediaStorageError:
+            raise
+        except Exception as exc:  # pragma: no cover - defensive
+            raise MediaStorageError(str(exc)) from exc
+
 
 _storage: Optional[MediaStorage] = None
 
@@ -226,7 +226,7 @@ class DummySession:
 
     Supports:
     - get(model, pk) for Profile and Review lookups
-    - execute(stmt) for ShopManager lookups
+    - execute(stmt) for ShopManager lookups and the grouped review stats rows
     - scalar(stmt) for count queries
     - scalars(stmt) for listing reviews
     - commit(), refresh()
@@ -238,11 +238,13 @@ class DummySession:
         reviews: List[DummyReview] | None = None,
         scalar_values: List[Any] | None = None,
         shop_managers: List[DummyShopManager] | None = None,
+        status_rows: List[tuple] | None = None,
     ) -> None:
         self.profile = profile
         self.reviews = reviews or []
         self.scalar_values = scalar_values or []
         self.shop_managers = shop_managers or []
+        self.status_rows = status_rows
         self._scalar_index = 0
         self._committed = False
 
@@ -256,7 +258,9 @@ class DummySession:
             return None
         return None
 
-    async def execute(self, stmt: Any) -> _ScalarOneOrNoneResult:
+    async def execute(self, stmt: Any) -> _ScalarOneOrNoneResult | _ScalarsAllResult:
+        if self.status_rows is not None and "GROUP BY reviews.status" in str(stmt):
+            return _ScalarsAllResult(self.status_rows)
         return _ScalarOneOrNoneResult(self.shop_managers)
 
     async def scalar(self, stmt: Any) -> Any:
@@ -0,0 +1,95 @@
+"""In-process stand-in for the boto3 S3 client calls used by media storage."""
+
+from __future__ import annotations
+
+import hashlib
+import uuid
+from typing import Any
+
+from botocore.exceptions import ClientError
+
+# S3 rejects multipart parts under 5 MiB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def _error(code: str, operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+class InMemoryS3Client:
+    """Keeps objects and in-progress multipart uploads in dictionaries.
+
+    Every call is recorded in ``calls`` and the largest body received in a
+    single request in ``largest_body``, so tests can check how much of a file
+    was ever sent (and so held in memory) at once.
+    """
+
+    def __init__(self, *, min_part_size: int = MIN_PART_SIZE) -> None:
+        self.min_part_size = min_part_size
+        self.objects: dict[tuple[str, str], dict[str, Any]] = {}
+        self.uploads: dict[str, dict[str, Any]] = {}
+        self.calls: list[str] = []
+        self.largest_body = 0
+        self.fail_on_part: int | None = None
+
+    def _body(self, body: bytes) -> bytes:
+        self.largest_body = max(self.largest_body, len(body))
+        return bytes(body)
+
+    def put_object(self, *, Bucket, Key, Body, ContentType=None, **_):
+        self.calls.append("put_object")
+        self.objects[(Bucket, Key)] = {
+            "Body": self._body(Body),
+            "ContentType": ContentType,
+        }
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def create_multipart_upload(self, *, Bucket, Key, ContentType=None, **_):
+        self.calls.append("create_multipart_upload")
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {
+            "Bucket": Bucket,
+            "Key": Key,
+            "ContentType": ContentType,
+            "parts": {},
+        }
+        return {"UploadId": upload_id}
+
+    def upload_part(self, *, Bucket, Key, UploadId, PartNumber, Body, **_):
+        self.calls.append("upload_part")
+        if UploadId not in self.uploads:
+            raise _error("NoSuchUpload", "UploadPart")
+        if self.fail_on_part == PartNumber:
+            raise _error("InternalError", "UploadPart")
+        body = self._body(Body)
+        etag = hashlib.md5(body).hexdigest()
+        self.uploads[UploadId]["parts"][PartNumber] = (etag, body)
+        return {"ETag": etag}
+
+    def complete_multipart_upload(self, *, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append("complete_multipart_upload")
+        upload = self.uploads.pop(UploadId, None)
+        if upload is None:
+            raise _error("NoSuchUpload", "CompleteMultipartUpload")
+        listed = MultipartUpload["Parts"]
+        numbers = [part["PartNumber"] for part in listed]
+        if numbers != sorted(numbers):
+            raise _error("InvalidPartOrder", "CompleteMultipartUpload")
+        bodies = []
+        for index, part in enumerate(listed):
+            etag, body = upload["parts"][part["PartNumber"]]
+            if part["ETag"] != etag:
+                raise _error("InvalidPart", "CompleteMultipartUpload")
+            if index < len(listed) - 1 and len(body) < self.min_part_size:
+                raise _error("EntityTooSmall", "CompleteMultipartUpload")
+            bodies.append(body)
+        self.objects[(Bucket, Key)] = {
+            "Body": b"".join(bodies),
+            "ContentType": upload["ContentType"],
+        }
+        return {"Key": Key}
+
+    def abort_multipart_upload(self, *, Bucket, Key, UploadId):
+        self.calls.append("abort_multipart_upload")
+        self.uploads.pop(UploadId, None)
+        return {}
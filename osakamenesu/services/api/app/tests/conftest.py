@@ -8,12 +8,18 @@ import pytest
 @pytest.fixture(autouse=True)
 def clear_caches():
     """Clear all caches before each test to ensure isolation."""
-    from app.utils.cache import shop_cache, therapist_cache, availability_cache
+    from app.utils.cache import (
+        availability_cache,
+        shop_cache,
+        therapist_cache,
+        therapist_slots_cache,
+    )
 
     # Synchronously clear the internal cache dict directly
     shop_cache._cache.clear()
     therapist_cache._cache.clear()
     availability_cache._cache.clear()
+    therapist_slots_cache._cache.clear()
 
     yield
 
@@ -21,3 +27,4 @@ def clear_caches():
     shop_cache._cache.clear()
     therapist_cache._cache.clear()
     availability_cache._cache.clear()
+    therapist_slots_cache._cache.clear()
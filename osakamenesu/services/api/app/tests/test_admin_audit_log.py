@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.domains.admin.services import audit
+from app.domains.admin.services.audit import (
+    AuditEntry,
+    AuditLogWriter,
+    persist_entries,
+    reconstruct_state,
+)
+from app.utils.json_patch import apply_patch, make_patch
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = list(rows)
+
+    def all(self):
+        return self._rows
+
+    def scalars(self):
+        return self
+
+    def scalar_one_or_none(self):
+        return self._rows[0] if self._rows else None
+
+
+class _Session:
+    def __init__(self, results=None):
+        self.results = list(results or [])
+        self.added = []
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, _stmt):
+        return _Result(self.results.pop(0) if self.results else [])
+
+    def add_all(self, rows):
+        self.added.extend(rows)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def test_patch_round_trips_nested_changes():
+    before = {
+        "name": "Shop",
+        "menus": [{"name": "60min", "price": 10000}, {"name": "90min"}],
+        "contact": {"phone": "06", "sns": ["x"]},
+        "tags": ["a", "b", "c"],
+    }
+    after = {
+        "name": "Shop",
+        "menus": [{"name": "60min", "price": 12000}, {"name": "90min"}],
+        "contact": {"phone": "06", "sns": ["x", "y"], "web/url": "https://e"},
+        "tags": ["a"],
+    }
+
+    patch = make_patch(before, after)
+
+    assert {"op": "replace", "path": "/menus/0/price", "value": 12000} in patch
+    assert {"op": "add", "path": "/contact/web~1url", "value": "https://e"} in patch
+    assert not any(op["path"].startswith("/name") for op in patch)
+    assert apply_patch(before, patch) == after
+    assert before["tags"] == ["a", "b", "c"]
+
+
+def _entry(target_id, n, **kwargs):
+    return AuditEntry(
+        target_type="shop",
+        target_id=target_id,
+        action="content_update",
+        before={"n": n - 1, "blob": "x" * 50},
+        after={"n": n, "blob": "x" * 50},
+        ts=T0 + timedelta(minutes=n),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_persist_snapshots_periodically_and_diffs_in_between():
+    target = uuid.uuid4()
+    session = _Session([[]])  # no history yet
+
+    rows = await persist_entries(
+        session, [_entry(target, n) for n in range(1, 6)], snapshot_interval=3
+    )
+
+    assert [row.format for row in rows] == [
+        "snapshot",
+        "diff",
+        "diff",
+        "snapshot",
+        "diff",
+    ]
+    first, diff = rows[0], rows[1]
+    assert first.before_json == {"n": 0, "blob": "x" * 50}
+    assert first.after_json == {"n": 1, "blob": "x" * 50}
+    assert rows[3].before_json is None
+    assert first.patch_json is None and rows[3].patch_json is None
+    assert diff.after_json is None and diff.before_json is None
+    assert diff.patch_json == [{"op": "replace", "path": "/n", "value": 2}]
+    assert session.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_diffs_follow_the_recorded_chain_not_the_callers_before():
+    target = uuid.uuid4()
+    session = _Session(
+        [
+            [("shop", target, "snapshot", 1, T0), ("shop", target, "diff", 1, T0)],
+            [
+                ("shop", target, "snapshot", {"reviews": [1, 2, 3, 4, 5]}, None),
+                (
+                    "shop",
+                    target,
+                    "diff",
+                    None,
+                    [{"op": "remove", "path": "/reviews/4"}],
+                ),
+            ],
+        ]
+    )
+    in_sync = AuditEntry(
+        target_type="shop",
+        target_id=target,
+        action="content_update",
+        before={"reviews": [1, 2, 3, 4]},
+        after={"reviews": [1, 2, 3]},
+        ts=T0 + timedelta(minutes=1),
+    )
+    # The caller's "before" misses the change recorded just above.
+    stale = AuditEntry(
+        target_type="shop",
+        target_id=target,
+        action="content_update",
+        before={"reviews": [1, 2, 3, 4]},
+        after={"reviews": [1]},
+        ts=T0 + timedelta(minutes=2),
+    )
+
+    rows = await persist_entries(session, [in_sync, stale], snapshot_interval=20)
+
+    assert [row.format for row in rows] == ["diff", "snapshot"]
+    assert apply_patch({"reviews": [1, 2, 3, 4]}, rows[0].patch_json) == {
+        "reviews": [1, 2, 3]
+    }
+    assert rows[1].after_json == {"reviews": [1]}
+    assert rows[1].patch_json is None
+
+
+@pytest.mark.asyncio
+async def test_summary_rows_force_a_fresh_snapshot():
+    target = uuid.uuid4()
+    session = _Session(
+        [
+            [
+                ("shop", target, "snapshot", 1, T0),
+                ("shop", target, "diff", 1, T0),
+                ("shop", target, "summary", 1, T0),
+            ]
+        ]
+    )
+
+    rows = await persist_entries(session, [_entry(target, 9)], snapshot_interval=20)
+
+    assert rows[0].format == "snapshot"
+    assert rows[0].before_json is None
+
+
+@pytest.mark.asyncio
+async def test_reconstruct_applies_diffs_after_latest_snapshot():
+    snapshot = SimpleNamespace(
+        id=uuid.uuid4(), ts=T0, after_json={"n": 1, "tags": ["a"]}
+    )
+    diffs = [
+        SimpleNamespace(
+            ts=T0 + timedelta(minutes=1),
+            patch_json=[{"op": "replace", "path": "/n", "value": 2}],
+        ),
+        SimpleNamespace(
+            ts=T0 + timedelta(minutes=2),
+            patch_json=[{"op": "add", "path": "/tags/1", "value": "b"}],
+        ),
+    ]
+    session = _Session([[snapshot], diffs])
+
+    result = await reconstruct_state(
+        session, target_type="shop", target_id=uuid.uuid4(), at=T0 + timedelta(hours=1)
+    )
+
+    assert result["state"] == {"n": 2, "tags": ["a", "b"]}
+    assert result["as_of"] == T0 + timedelta(minutes=2)
+    assert result["diffs_applied"] == 2
+    assert result["snapshot_id"] == snapshot.id
+
+
+@pytest.mark.asyncio
+async def test_writer_queues_changes_and_flushes_them_in_batches(monkeypatch):
+    sessions = []
+
+    def factory():
+        session = _Session()
+        sessions.append(session)
+        return session
+
+    writer = AuditLogWriter(factory, batch_size=2, flush_interval=60)
+    monkeypatch.setattr(audit, "_writer", writer)
+    stop = asyncio.Event()
+    task = asyncio.create_task(writer.run_forever(stop))
+    await asyncio.sleep(0)
+    request_session = _Session()
+
+    for n in range(3):
+        await audit.record_change(
+            request_session,
+            context=None,
+            target_type="shop",
+            target_id=uuid.uuid4(),
+            action="content_update",
+            before={"n": n},
+            after={"n": n + 1},
+        )
+
+    # Nothing is written or committed on the request's session.
+    assert request_session.commits == 0 and request_session.added == []
+    stop.set()
+    await task
+
+    assert writer.pending == 0
+    assert [len(s.added) for s in sessions if s.added] == [2, 1]
+    assert not writer.running
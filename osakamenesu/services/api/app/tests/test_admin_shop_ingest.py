@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app import models
+from app.domains.admin.services import shop_ingest
+from app.domains.admin.services.shop_ingest import (
+    ingest_shop_content_stream,
+    iter_ndjson_lines,
+)
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+
+class _Session:
+    def __init__(self, profiles, *, failing_external_id=None, returned_rows=()):
+        self.profiles = {p.id: p for p in profiles}
+        self.failing_external_id = failing_external_id
+        self.returned_rows = list(returned_rows)
+        self.profile_queries = 0
+        self.upserts: list[Any] = []
+        self.added: list[Any] = []
+        self.commits = 0
+        self.rollbacks = 0
+        self._pending: list[Any] = []
+
+    async def execute(self, stmt):
+        if stmt.is_select:
+            entity = stmt.column_descriptions[0]["entity"]
+            if entity is models.Profile:
+                self.profile_queries += 1
+                return _Result(self.profiles.values())
+            return _Result([])
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        if self.failing_external_id and self.failing_external_id in params.values():
+            raise RuntimeError("value too long for type character varying(64)")
+        self._pending.append((sql, params))
+        return _Result(self.returned_rows if "RETURNING" in sql else [])
+
+    def add(self, obj):
+        self._pending.append(obj)
+
+    async def commit(self):
+        self.commits += 1
+        for item in self._pending:
+            (self.upserts if isinstance(item, tuple) else self.added).append(item)
+        self._pending = []
+
+    async def rollback(self):
+        self.rollbacks += 1
+        self._pending = []
+
+
+def _profile(**contact):
+    return models.Profile(
+        id=uuid.uuid4(),
+        name="Shop",
+        area="難波",
+        price_min=10000,
+        price_max=20000,
+        bust_tag="C",
+        service_type="store",
+        body_tags=[],
+        photos=["/a.jpg"],
+        contact_json=dict(contact),
+    )
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def _ndjson(*rows: Any) -> bytes:
+    return b"\n".join(
+        row if isinstance(row, bytes) else json.dumps(row).encode() for row in rows
+    )
+
+
+@pytest.mark.asyncio
+async def test_ndjson_lines_survive_chunk_boundaries():
+    lines = [
+        item
+        async for item in iter_ndjson_lines(
+            _chunks(b'{"a": 1}\n\n{"b"', b': 2}\n{"c": 3}')
+        )
+    ]
+
+    assert lines == [(1, b'{"a": 1}'), (3, b'{"b": 2}'), (4, b'{"c": 3}')]
+
+
+@pytest.mark.asyncio
+async def test_stream_batches_upserts_and_reindexes_once(monkeypatch):
+    first = _profile(description="old", address="Osaka")
+    second = _profile()
+    session = _Session([first, second])
+    indexed: list[list[dict]] = []
+
+    async def fake_documents(*, db, profile_ids):
+        return [{"id": str(pid)} for pid in profile_ids]
+
+    monkeypatch.setattr(shop_ingest, "build_profile_documents", fake_documents)
+    body = _ndjson(
+        {
+            "shop_id": str(first.id),
+            "description": "new",
+            "reviews": [
+                {"external_id": "r1", "score": 4, "body": "good"},
+                {"external_id": "r1", "score": 5, "body": "better"},
+            ],
+        },
+        b"{not json",
+        {"shop_id": str(uuid.uuid4()), "description": "ghost"},
+        {
+            "shop_id": str(second.id),
+            "diaries": [{"external_id": "d1", "title": "t", "body": "b"}],
+        },
+        {"description": "missing shop id"},
+    )
+
+    response = await ingest_shop_content_stream(
+        audit_context=None,
+        db=session,
+        chunks=_chunks(body),
+        batch_size=10,
+        index_callable=indexed.append,
+    )
+
+    assert session.profile_queries == 1
+    assert session.commits == 1
+    review_sql, review_params = session.upserts[0]
+    assert "ON CONFLICT ON CONSTRAINT uq_reviews_profile_external" in review_sql
+    # Duplicate external ids collapse to the last row.
+    assert review_params["score_m0"] == 5 and "score_m1" not in review_params
+    assert "uq_diaries_profile_external" in session.upserts[1][0]
+
+    log = next(a for a in session.added if a.target_id == first.id)
+    assert log.before_json == {"contact_json.description": "old"}
+    assert log.after_json["contact_json.description"] == "new"
+    assert "contact_json.address" not in log.after_json
+
+    assert len(indexed) == 1
+    assert sorted(doc["id"] for doc in indexed[0]) == sorted(
+        [str(first.id), str(second.id)]
+    )
+
+    stats = response.stats
+    assert (stats.rows, stats.processed, stats.failed) == (5, 2, 3)
+    assert (stats.reviews_upserted, stats.diaries_upserted, stats.indexed) == (1, 1, 2)
+    errors = {err.line: err.error for err in response.errors}
+    assert errors[2].startswith("invalid_json")
+    assert errors[3] == "shop_not_found"
+    assert errors[5].startswith("invalid_row: shop_id")
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_row_by_row(monkeypatch):
+    good, bad = _profile(), _profile()
+    session = _Session([good, bad], failing_external_id="x" * 80)
+
+    async def fake_documents(*, db, profile_ids):
+        return [{"id": str(pid)} for pid in profile_ids]
+
+    monkeypatch.setattr(shop_ingest, "build_profile_documents", fake_documents)
+    body = _ndjson(
+        {"shop_id": str(good.id), "reviews": [{"score": 3, "body": "ok"}]},
+        {
+            "shop_id": str(bad.id),
+            "reviews": [{"external_id": "x" * 80, "score": 3, "body": "ok"}],
+        },
+    )
+
+    response = await ingest_shop_content_stream(
+        audit_context=None,
+        db=session,
+        chunks=_chunks(body),
+        index_callable=lambda docs: None,
+    )
+
+    assert session.rollbacks == 2
+    assert response.stats.processed == 1
+    assert response.stats.failed == 1
+    assert response.stats.batches == 3
+    assert [(err.line, err.shop_id) for err in response.errors] == [(2, str(bad.id))]
+    assert "varying(64)" in response.errors[0].error
+
+
+@pytest.mark.asyncio
+async def test_review_upserts_rebuild_their_kpi_buckets(monkeypatch):
+    shop = _profile()
+    # An updated review keeps its stored created_at: 2025-02-28 23:30 UTC is
+    # already March 1st in JST.
+    stored_at = datetime(2025, 2, 28, 23, 30, tzinfo=timezone.utc)
+    session = _Session([shop], returned_rows=[(shop.id, stored_at)])
+    refreshed: list[set] = []
+
+    async def fake_documents(*, db, profile_ids):
+        return [{"id": str(pid)} for pid in profile_ids]
+
+    async def fake_refresh(db, buckets):
+        assert session.commits == 0
+        refreshed.append(set(buckets))
+        return len(refreshed[-1])
+
+    monkeypatch.setattr(shop_ingest, "build_profile_documents", fake_documents)
+    monkeypatch.setattr(shop_ingest, "refresh_shop_buckets", fake_refresh)
+    body = _ndjson(
+        {
+            "shop_id": str(shop.id),
+            "reviews": [{"external_id": "r1", "score": 4, "body": "ok"}],
+        }
+    )
+
+    await ingest_shop_content_stream(
+        audit_context=None,
+        db=session,
+        chunks=_chunks(body),
+        index_callable=lambda docs: None,
+    )
+
+    assert "RETURNING reviews.profile_id, reviews.created_at" in session.upserts[0][0]
+    assert refreshed == [{(shop.id, date(2025, 3, 1))}]
+    assert session.commits == 1
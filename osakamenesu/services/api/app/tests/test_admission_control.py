@@ -0,0 +1,129 @@
+"""Tests for priority admission control and load shedding."""
+
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.middleware.admission import (
+    AdmissionControlStage,
+    AdmissionController,
+    Priority,
+)
+from app.middleware.pipeline import ASGIPipelineMiddleware
+
+
+@pytest.mark.asyncio
+async def test_reserved_slots_stay_free_for_critical_requests():
+    controller = AdmissionController(
+        4, reserved=2, low_share=0.5, max_wait={Priority.LOW: 0.05}
+    )
+
+    assert await controller.acquire(Priority.LOW) is None
+    # Low may hold one slot, normal two; the last two are for critical
+    assert await controller.acquire(Priority.LOW) == "timeout"
+    assert await controller.acquire(Priority.NORMAL) is None
+    assert await controller.acquire(Priority.CRITICAL) is None
+    assert await controller.acquire(Priority.CRITICAL) is None
+    assert controller.in_flight == 4
+    assert controller.snapshot()["queued"] == {"low": 0, "normal": 0, "critical": 0}
+
+
+@pytest.mark.asyncio
+async def test_release_wakes_the_highest_priority_waiter_first():
+    controller = AdmissionController(1, reserved=0)
+    assert await controller.acquire(Priority.NORMAL) is None
+
+    order: list[Priority] = []
+
+    async def wait(priority: Priority) -> None:
+        assert await controller.acquire(priority) is None
+        order.append(priority)
+        controller.release(priority)
+
+    waiters = [
+        asyncio.create_task(wait(Priority.LOW)),
+        asyncio.create_task(wait(Priority.NORMAL)),
+        asyncio.create_task(wait(Priority.CRITICAL)),
+    ]
+    await asyncio.sleep(0)
+    controller.release(Priority.NORMAL)
+    await asyncio.gather(*waiters)
+
+    assert order == [Priority.CRITICAL, Priority.NORMAL, Priority.LOW]
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_pressure_sheds_low_priority_instead_of_queueing():
+    pressured = False
+    controller = AdmissionController(
+        8,
+        reserved=0,
+        low_share=1.0,
+        max_queue={Priority.NORMAL: 0},
+        pressure=lambda: pressured,
+    )
+    for _ in range(2):
+        assert await controller.acquire(Priority.LOW) is None
+
+    pressured = True
+    # A quarter of the low limit while the DB pool or loop is saturated
+    assert controller.capacity(Priority.LOW, pressured) == 2
+    assert await controller.acquire(Priority.LOW) == "overloaded"
+    assert controller.capacity(Priority.NORMAL, pressured) == 4
+    assert await controller.acquire(Priority.NORMAL) is None
+    assert await controller.acquire(Priority.NORMAL) is None
+    assert await controller.acquire(Priority.NORMAL) == "queue_full"
+    assert await controller.acquire(Priority.CRITICAL) is None
+
+
+def _build_app(controller: AdmissionController, release: asyncio.Event) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/shops")
+    async def shops():
+        await release.wait()
+        return {"items": []}
+
+    @app.post("/api/guest/reservations/hold")
+    async def hold():
+        return {"status": "pending"}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    app.add_middleware(
+        ASGIPipelineMiddleware,
+        stages=[AdmissionControlStage(controller, retry_after=3)],
+    )
+    return app
+
+
+@pytest.mark.asyncio
+async def test_stage_returns_503_with_retry_after_and_keeps_reservations_flowing():
+    controller = AdmissionController(
+        3, reserved=1, low_share=0.5, max_wait={Priority.LOW: 0.05}
+    )
+    release = asyncio.Event()
+    transport = httpx.ASGITransport(app=_build_app(controller, release))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        browsing = asyncio.create_task(client.get("/api/v1/shops"))
+        await asyncio.sleep(0.01)
+
+        shed = await client.get("/api/v1/shops")
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "3"
+        assert shed.json()["retry_after"] == 3
+
+        held = await client.post("/api/guest/reservations/hold")
+        assert held.status_code == 200
+        assert (await client.get("/health")).status_code == 200
+
+        release.set()
+        assert (await browsing).status_code == 200
+    assert controller.in_flight == 0
@@ -0,0 +1,207 @@
+"""Tests for the benchmark suite's Meilisearch stand-in, dataset and baselines."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+
+import httpx
+import pytest
+
+from app.meili import build_filter
+from benchmarks.dataset import (
+    TABLES,
+    DatasetSpec,
+    _copy_columns,
+    _copy_value,
+    build_rows,
+)
+from benchmarks.harness import BenchmarkResult, compare, load_baseline, save_baseline
+from benchmarks.media import build_app, build_media_cases, write_files
+from benchmarks.meili_stub import InMemoryIndex, compile_filter
+
+DOCS = [
+    {
+        "id": "a",
+        "name": "Alpha",
+        "area": "難波",
+        "bust_tag": "C",
+        "body_tags": ["清楚", "小柄"],
+        "price_min": 10000,
+        "today": True,
+    },
+    {
+        "id": "b",
+        "name": "Bravo's",
+        "area": "梅田",
+        "bust_tag": "E",
+        "body_tags": ["ギャル"],
+        "price_min": 8000,
+        "today": False,
+    },
+    {
+        "id": "c",
+        "name": "Charlie",
+        "area": "難波",
+        "bust_tag": "E",
+        "body_tags": [],
+        "price_min": 14000,
+        "today": True,
+    },
+]
+
+
+def _ids(expression):
+    predicate = compile_filter(expression)
+    return [doc["id"] for doc in DOCS if predicate(doc)]
+
+
+def test_filter_matches_build_filter_output():
+    expression = build_filter(
+        "難波", None, None, None, None, True, 9000, None, None, bust_tags=["C", "E"]
+    )
+    assert _ids(expression) == ["a", "c"]
+    assert _ids("body_tags = '小柄'") == ["a"]
+    assert _ids("name = 'Bravo\\'s' OR (area = '難波' AND price_min > 12000)") == [
+        "b",
+        "c",
+    ]
+    assert _ids(None) == ["a", "b", "c"]
+    with pytest.raises(ValueError):
+        compile_filter("area = '難波' AND (bust_tag = 'C'")
+
+
+def test_in_memory_search_sorts_pages_and_counts_facets():
+    index = InMemoryIndex(DOCS)
+
+    res = index.search(
+        None, "area = '難波' OR today = false", ["price_min:desc"], 1, 2, ["bust_tag"]
+    )
+
+    assert [hit["id"] for hit in res["hits"]] == ["c", "a"]
+    assert res["estimatedTotalHits"] == 3
+    assert res["facetDistribution"] == {"bust_tag": {"C": 1, "E": 2}}
+    assert [hit["id"] for hit in index.search("char", None, None, 1, 10)["hits"]] == [
+        "c"
+    ]
+
+
+def test_catalog_is_deterministic_and_consistent():
+    spec = DatasetSpec(
+        shops=40, therapists_per_shop=4, days=7, reservations_per_therapist=6
+    )
+    rows, dataset = build_rows(spec, seed=7, today=date(2026, 1, 10))
+    again, _ = build_rows(spec, seed=7, today=date(2026, 1, 10))
+
+    assert rows == again
+    assert {name: len(values) for name, values in rows.items()} == dataset.rows
+    # The booking shop and its therapist come on top of the spec
+    assert len(dataset.shop_ids) == 40
+    assert len(dataset.therapist_ids) == dataset.rows["therapists"] - 1
+
+    shifts_by_therapist = defaultdict(list)
+    for shift in rows["therapist_shifts"]:
+        shifts_by_therapist[shift["therapist_id"]].append(shift)
+    # Overnight shifts end the next day; long shifts get breaks
+    assert any(s["end_at"].date() > s["date"] for s in rows["therapist_shifts"])
+    assert any(s["break_slots"] for s in rows["therapist_shifts"])
+
+    by_therapist = defaultdict(list)
+    for reservation in rows["guest_reservations"]:
+        by_therapist[reservation["therapist_id"]].append(reservation)
+        assert any(
+            s["start_at"] <= reservation["start_at"]
+            and reservation["end_at"] <= s["end_at"]
+            for s in shifts_by_therapist[reservation["therapist_id"]]
+        )
+    for reservations in by_therapist.values():
+        for earlier, later in zip(reservations, reservations[1:]):
+            assert earlier["end_at"] <= later["start_at"]
+
+    scores = [review["score"] for review in rows["reviews"]]
+    assert sum(scores) / len(scores) > 3.8
+    assert all(
+        row["slots_json"]["slots"] and row["date"] >= date(2026, 1, 10)
+        for row in rows["availabilities"]
+    )
+
+
+def test_copy_values_fill_python_defaults_and_serialize_json():
+    table = TABLES["reviews"]
+    row = {"id": "r1", "profile_id": "p1", "score": 5, "body": "良い"}
+
+    columns = _copy_columns(table, [row])
+    values = dict(zip(columns, (_copy_value(table, c, row) for c in columns)))
+
+    assert values["status"] == "pending"
+    assert values["created_at"] is not None
+    assert values["aspect_scores"] == "{}"
+    assert "title" not in columns
+
+
+def _result(name, p95, queries=3.0, alloc=100.0):
+    return BenchmarkResult(
+        name=name,
+        iterations=10,
+        p50_ms=p95 / 2,
+        p95_ms=p95,
+        p99_ms=p95,
+        mean_ms=p95 / 2,
+        queries=queries,
+        peak_alloc_kib=alloc,
+    )
+
+
+def test_compare_flags_regressions_against_saved_baseline(tmp_path):
+    path = tmp_path / "baselines" / "small.json"
+    save_baseline(
+        path,
+        [_result("search", 10.0), _result("detail", 1.0), _result("matching", 5.0)],
+        meta={"scale": "small"},
+    )
+    baseline = load_baseline(path)
+
+    regressions = compare(
+        [
+            _result("search", 13.0),
+            # +40% but only 0.4ms: timer noise
+            _result("detail", 1.4),
+            _result("matching", 5.0, queries=4.0, alloc=200.0),
+            _result("new_case", 100.0),
+        ],
+        baseline,
+        tolerance=0.2,
+    )
+
+    assert [(r.name, r.metric) for r in regressions] == [
+        ("search", "p95_ms"),
+        ("matching", "queries"),
+        ("matching", "peak_alloc_kib"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_media_cases_run_against_both_mounts(tmp_path):
+    urls = write_files(tmp_path, 4096)
+    clients = {
+        label: httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=build_app(tmp_path, media=media)),
+            base_url="http://bench",
+        )
+        for label, media in (("static", False), ("media", True))
+    }
+    try:
+        cases = build_media_cases(clients, urls)
+        responses = {name: await case.run() for name, case in cases.items()}
+    finally:
+        for client in clients.values():
+            await client.aclose()
+
+    assert responses["static_range"].status_code == 206
+    assert responses["media_range"].status_code == 206
+    static, media = responses["static_revalidate"], responses["media_revalidate"]
+    assert static.status_code == media.status_code == 304
+    assert "no-store" in static.headers["cache-control"]
+    assert "immutable" in media.headers["cache-control"]
+    assert responses["media_variant"].headers["content-type"] == "image/avif"
+    assert responses["static_variant"].headers["content-type"] == "image/webp"
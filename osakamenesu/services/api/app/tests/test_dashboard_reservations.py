@@ -81,8 +81,12 @@ from app.domains.dashboard.reservations.router import (  # type: ignore  # noqa:
     _decode_cursor,
     _encode_cursor,
     _parse_date_param,
+    _search_filter,
     _serialize_guest_reservation,
+    list_dashboard_reservations,
 )
+from app import models  # type: ignore  # noqa: E402
+from sqlalchemy.dialects import postgresql  # noqa: E402
 
 
 def test_serialize_guest_reservation_maps_fields() -> None:
@@ -225,3 +229,133 @@ def test_decode_cursor_signature_mismatch() -> None:
     with pytest.raises(HTTPException):
         _decode_cursor(encoded)
     settings_obj.cursor_signature_secret = original
+
+
+def _compile(clause) -> tuple[str, dict]:
+    compiled = clause.compile(dialect=postgresql.dialect())
+    return str(compiled), compiled.params
+
+
+def test_search_text_is_folded_on_write() -> None:
+    reservation = models.GuestReservation(
+        customer_name="ヤマダ　タロウ",
+        customer_phone="+81 90-1234-5678",
+        customer_email="Taro@Example.COM",
+        notes="ｶﾌﾟﾙ希望",
+    )
+
+    models.reservation._refresh_search_fields(None, None, reservation)
+
+    assert reservation.customer_phone_digits == "09012345678"
+    assert reservation.search_text.split("\n") == [
+        "やまだたろう",
+        "09012345678",
+        "taro@example.com",
+        "かぷる希望",
+    ]
+
+
+def test_search_filter_uses_phone_prefix_for_phone_like_queries() -> None:
+    sql, params = _compile(_search_filter("090-12"))
+
+    assert "customer_phone_digits LIKE" in sql
+    assert "search_text LIKE" in sql
+    assert list(params.values()) == ["09012%", "%09012%"]
+
+    short_sql, short_params = _compile(_search_filter("09"))
+    assert "search_text" not in short_sql
+    assert list(short_params.values()) == ["09%"]
+
+
+def test_search_filter_folds_and_escapes_text_queries() -> None:
+    sql, params = _compile(_search_filter(" ヤマダ 100%_ "))
+
+    assert "ILIKE" not in sql and "search_text LIKE" in sql
+    assert list(params.values()) == ["%やまだ100\\%\\_%"]
+    assert _search_filter("   ") is None
+
+
+class _ListSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        rows = self.rows
+
+        class _Result:
+            def scalars(self):
+                return self
+
+            def all(self):
+                return list(rows)
+
+        return _Result()
+
+    async def scalar(self, _stmt):
+        return 42
+
+
+def _reservation(minutes: int) -> SimpleNamespace:
+    created = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    return models.GuestReservation(
+        id=uuid.uuid4(),
+        shop_id=uuid.uuid4(),
+        status="confirmed",
+        start_at=created,
+        end_at=created,
+        created_at=created + datetime.timedelta(minutes=minutes),
+        updated_at=created,
+        customer_name="Guest",
+    )
+
+
+@pytest.mark.asyncio
+async def test_backward_page_reads_in_reverse_and_restores_display_order(
+    monkeypatch,
+) -> None:
+    profile = SimpleNamespace(id=uuid.uuid4())
+
+    async def _noop(*_args, **_kwargs):
+        return None
+
+    async def _profile(*_args, **_kwargs):
+        return profile
+
+    monkeypatch.setattr(router_module, "verify_shop_manager", _noop)
+    monkeypatch.setattr(router_module, "_ensure_profile", _profile)
+    # Newest-first listing; the page before the cursor is fetched oldest-first.
+    fetched = [_reservation(11), _reservation(12), _reservation(13)]
+    session = _ListSession(fetched)
+    cursor = _encode_cursor(
+        datetime.datetime(2025, 1, 1, 0, 10, tzinfo=datetime.timezone.utc),
+        uuid.uuid4(),
+    )
+
+    response = await list_dashboard_reservations(
+        profile.id,
+        status_filter=None,
+        sort="latest",
+        direction="desc",
+        query=None,
+        start_date=None,
+        end_date=None,
+        mode=None,
+        cursor=cursor,
+        cursor_direction="backward",
+        limit=2,
+        db=session,
+        user=SimpleNamespace(id=uuid.uuid4()),
+    )
+
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "(guest_reservations.created_at, guest_reservations.id) >" in sql
+    assert "ORDER BY guest_reservations.created_at ASC" in sql
+    assert [item.id for item in response.reservations] == [
+        fetched[1].id,
+        fetched[0].id,
+    ]
+    assert _decode_cursor(response.prev_cursor)[1] == fetched[1].id
+    assert _decode_cursor(response.next_cursor)[1] == fetched[0].id
+    assert response.total == 42
@@ -194,10 +194,10 @@ def test_get_shop_review_stats():
     user = DummyUser()
     profile = DummyProfile()
     shop_manager = DummyShopManager(user_id=user.id, shop_id=profile.id)
-    # scalar_values: pending count, published count, rejected count, avg score
+    # grouped rows: status, count, average score
     session = DummySession(
         profile=profile,
-        scalar_values=[5, 10, 2, 4.2],
+        status_rows=[("pending", 5, 3.0), ("published", 10, 4.2), ("rejected", 2, 1.0)],
         shop_managers=[shop_manager],
     )
 
@@ -212,3 +212,24 @@ def test_get_shop_review_stats():
     assert body["published"] == 10
     assert body["rejected"] == 2
     assert body["average_score"] == 4.2
+
+
+def test_get_shop_review_stats_without_published_reviews():
+    """Average score is null until a review is published."""
+    user = DummyUser()
+    profile = DummyProfile()
+    shop_manager = DummyShopManager(user_id=user.id, shop_id=profile.id)
+    session = DummySession(
+        profile=profile,
+        status_rows=[("pending", 3, 4.0)],
+        shop_managers=[shop_manager],
+    )
+
+    app.dependency_overrides[require_dashboard_user] = lambda: user
+    app.dependency_overrides[get_session] = lambda: session
+
+    res = client.get(f"/api/dashboard/shops/{profile.id}/reviews/stats")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["total"] == 3
+    assert body["average_score"] is None
@@ -129,6 +129,17 @@ async def test_upload_dashboard_therapist_photo_saves_image(monkeypatch, tmp_pat
                 path=tmp_path / filename,
             )
 
+        async def save_stream(
+            self, *, folder: str, filename: str, chunks, content_type: str, **_
+        ) -> StoredMedia:
+            content = b"".join([chunk async for chunk in chunks])
+            return await self.save_photo(
+                folder=folder,
+                filename=filename,
+                content=content,
+                content_type=content_type,
+            )
+
     storage = DummyStorage()
     monkeypatch.setattr(dashboard_therapists, "get_media_storage", lambda: storage)  # type: ignore[attr-defined]
 
@@ -158,6 +169,87 @@ async def test_upload_dashboard_therapist_photo_saves_image(monkeypatch, tmp_pat
     )
 
 
+@pytest.mark.asyncio
+async def test_upload_dashboard_therapist_photo_commits_asset_before_audit(
+    monkeypatch, tmp_path
+):
+    now = datetime.now(UTC)
+    user_id = uuid.uuid4()
+    profile = models.Profile(
+        id=uuid.uuid4(),
+        name="監査エラー",
+        area="梅田",
+        price_min=9000,
+        price_max=16000,
+        bust_tag="C",
+        service_type="store",
+        contact_json={},
+        status="draft",
+        created_at=now,
+        updated_at=now,
+    )
+
+    class AuditFailingSession(FakeSession):
+        """Commits inserted tables unless an audit log row is pending."""
+
+        def __init__(self, *args, **kwargs) -> None:
+            super().__init__(*args, **kwargs)
+            self.pending_tables: list[str] = []
+            self.persisted_tables: list[str] = []
+            self._added_seen = 0
+
+        async def execute(self, stmt):
+            if getattr(stmt, "is_insert", False):
+                self.pending_tables.append(stmt.table.name)
+                return None
+            return await super().execute(stmt)
+
+        async def commit(self) -> None:
+            pending = self.added[self._added_seen :]
+            if any(isinstance(item, models.AdminChangeLog) for item in pending):
+                raise RuntimeError("audit insert failed")
+            self._added_seen = len(self.added)
+            self.persisted_tables += self.pending_tables
+            self.pending_tables = []
+            self.committed = True
+
+    session = AuditFailingSession(
+        profile, shop_managers=[DummyShopManager(user_id=user_id, shop_id=profile.id)]
+    )
+
+    class DummyStorage:
+        async def save_stream(
+            self, *, folder: str, filename: str, chunks, content_type: str, **_
+        ) -> StoredMedia:
+            content = b"".join([chunk async for chunk in chunks])
+            return StoredMedia(
+                key=f"{folder}/{filename}",
+                url=f"https://cdn.test/{folder}/{filename}",
+                content_type=content_type,
+                size=len(content),
+                path=tmp_path / filename,
+            )
+
+    monkeypatch.setattr(dashboard_therapists, "get_media_storage", DummyStorage)  # type: ignore[attr-defined]
+    upload = UploadFile(
+        file=io.BytesIO(b"\x89PNG\r\n\x1a\n" + b"\x00" * 64),
+        filename="photo.png",
+        headers=Headers({"content-type": "image/png"}),
+    )
+
+    response = await dashboard_therapists.upload_dashboard_therapist_photo(  # type: ignore[attr-defined]
+        request=FakeRequest(),
+        profile_id=profile.id,
+        file=upload,
+        db=session,
+        user=SimpleNamespace(id=user_id),
+    )
+
+    # The audit write failed, but the variant manifest was already committed.
+    assert response.url.startswith(f"https://cdn.test/therapists/{profile.id}/")
+    assert session.persisted_tables == [models.MediaAsset.__tablename__]
+
+
 @pytest.mark.anyio
 async def test_upload_dashboard_therapist_photo_rejects_large_file():
     now = datetime.now(UTC)
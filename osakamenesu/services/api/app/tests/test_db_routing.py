@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+from fastapi import Response
+from sqlalchemy import text
+from starlette.requests import Request
+
+from app import db
+
+
+class _FakeReplica:
+    def __init__(self, name: str, healthy: bool = True) -> None:
+        self.name = name
+        self.healthy = healthy
+        self.checks = 0
+
+        class _Session:
+            async def __aenter__(inner):
+                return name
+
+            async def __aexit__(inner, *exc):
+                return False
+
+        self.sessionmaker = _Session
+
+    async def is_healthy(self) -> bool:
+        self.checks += 1
+        return self.healthy
+
+
+def _request(cookies: dict[str, str] | None = None) -> Request:
+    header = "; ".join(f"{k}={v}" for k, v in (cookies or {}).items())
+    headers = [(b"cookie", header.encode())] if header else []
+    return Request({"type": "http", "headers": headers})
+
+
+async def _resolve(request: Request) -> object:
+    gen = db.get_read_session(request, primary="primary")
+    session = await gen.__anext__()
+    await gen.aclose()
+    return session
+
+
+@pytest.mark.asyncio
+async def test_read_session_uses_primary_without_replicas(monkeypatch):
+    monkeypatch.setattr(db, "replica_router", db.ReplicaRouter([]))
+
+    assert await _resolve(_request()) == "primary"
+
+
+@pytest.mark.asyncio
+async def test_read_session_round_robins_and_skips_lagging_replicas(monkeypatch):
+    lagging = _FakeReplica("replica-a", healthy=False)
+    healthy = _FakeReplica("replica-b")
+    monkeypatch.setattr(db, "replica_router", db.ReplicaRouter([lagging, healthy]))
+
+    assert [await _resolve(_request()) for _ in range(3)] == ["replica-b"] * 3
+
+    healthy.healthy = False
+    assert await _resolve(_request()) == "primary"
+
+
+@pytest.mark.asyncio
+async def test_read_your_writes_cookie_pins_reads_to_primary(monkeypatch):
+    replica = _FakeReplica("replica")
+    monkeypatch.setattr(db, "replica_router", db.ReplicaRouter([replica]))
+
+    response = Response()
+    db.mark_read_your_writes(response)
+    cookie = response.headers["set-cookie"]
+    assert cookie.startswith(f"{db.READ_YOUR_WRITES_COOKIE}=")
+    until = cookie.split(";")[0].split("=")[1]
+
+    pinned = _request({db.READ_YOUR_WRITES_COOKIE: until})
+    expired = _request({db.READ_YOUR_WRITES_COOKIE: str(int(time.time()) - 1)})
+    assert await _resolve(pinned) == "primary"
+    assert await _resolve(expired) == "replica"
+    assert replica.checks == 1
+
+
+def test_read_your_writes_cookie_is_skipped_without_replicas(monkeypatch):
+    monkeypatch.setattr(db, "replica_router", db.ReplicaRouter([]))
+    response = Response()
+
+    db.mark_read_your_writes(response)
+
+    assert "set-cookie" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_replica_lag_check_is_cached(monkeypatch):
+    monkeypatch.setattr(db, "REPLICA_LAG_SQL", text("SELECT 12"))
+    replica = db.Replica(
+        "sqlite+aiosqlite:///:memory:", max_lag_seconds=5.0, check_interval=60.0
+    )
+    try:
+        assert await replica.is_healthy() is False
+        assert replica.lag == 12
+
+        replica.max_lag_seconds = 30.0
+        monkeypatch.setattr(db, "REPLICA_LAG_SQL", text("SELECT 'broken"))
+        # Within the check interval the cached lag is reused.
+        assert await replica.is_healthy() is True
+    finally:
+        await replica.engine.dispose()
+
+
+def test_engine_options_tune_pool_for_postgres():
+    options = db._engine_options("postgresql+asyncpg://app@db/app")
+
+    assert options["pool_pre_ping"] is True
+    assert options["pool_size"] == db.settings.db_pool_size
+    assert options["pool_recycle"] == db.settings.db_pool_recycle
+    assert options["connect_args"] == {
+        "prepared_statement_cache_size": db.settings.db_statement_cache_size
+    }
+    assert "pool_size" not in db._engine_options("sqlite+aiosqlite:///:memory:")
@@ -14,6 +14,7 @@ from app.domains.site.guest_reservations import (
     GuestReservationStatus,
     create_guest_reservation,
 )
+from app.utils.cache import therapist_slots_cache, therapist_slots_cache_key
 
 
 def _ts(hour: int, minute: int = 0) -> datetime:
@@ -96,6 +97,40 @@ async def test_create_guest_reservation_success(monkeypatch, stub_session: StubS
     assert debug == {}
 
 
+@pytest.mark.asyncio
+async def test_create_guest_reservation_drops_cached_slots(
+    monkeypatch, stub_session: StubSession
+):
+    async def _avail(db, therapist_id, start_at, end_at, lock=False):
+        return True, {"rejected_reasons": []}
+
+    async def _fetch_profile(db, shop_id):
+        return MockProfile()
+
+    monkeypatch.setattr(domain, "is_available", _avail)
+    monkeypatch.setattr(domain, "_try_fetch_profile", _fetch_profile)
+
+    therapist_id, other_id = uuid4(), uuid4()
+    for tid in (therapist_id, other_id):
+        await therapist_slots_cache.set(
+            therapist_slots_cache_key(tid, _ts(14).date()), []
+        )
+
+    payload = {
+        "shop_id": str(uuid4()),
+        "therapist_id": str(therapist_id),
+        "start_at": _ts(14),
+        "end_at": _ts(15),
+    }
+    res, _ = await create_guest_reservation(stub_session, payload, now=_ts(12))
+
+    assert res is not None
+    key = therapist_slots_cache_key(therapist_id, _ts(14).date())
+    assert (await therapist_slots_cache.get(key))[0] is False
+    other = therapist_slots_cache_key(other_id, _ts(14).date())
+    assert (await therapist_slots_cache.get(other))[0] is True
+
+
 @pytest.mark.asyncio
 async def test_create_guest_reservation_deadline_over(
     monkeypatch, stub_session: StubSession
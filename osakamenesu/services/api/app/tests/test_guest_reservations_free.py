@@ -1,5 +1,6 @@
 import os
 from datetime import datetime, timezone
+from types import SimpleNamespace
 from uuid import uuid4
 
 import pytest
@@ -7,6 +8,8 @@ import pytest_asyncio
 
 from app.domains.site import guest_reservations as domain
 from app.domains.site.guest_reservations import assign_for_free
+from app.domains.site.guest_reservations import service as domain_service
+from app.domains.site.therapist_availability import check_availability_batch
 
 
 def _ts(hour: int, minute: int = 0) -> datetime:
@@ -79,3 +82,149 @@ async def test_assign_for_free_no_available(monkeypatch, sample_rows):
 
     assert chosen is None
     assert "no_available_therapist" in debug.get("rejected_reasons", [])
+
+
+def _batch(results):
+    async def _check(db, therapist_ids, start_at, end_at, *, buffer_minutes=None):
+        return {
+            tid: (ok, {"rejected_reasons": [] if ok else ["no_shift"]})
+            for tid, ok in zip(therapist_ids, results)
+        }
+
+    return _check
+
+
+@pytest.mark.asyncio
+async def test_assign_for_free_locks_only_the_ranked_choice(monkeypatch, sample_rows):
+    locked = []
+
+    async def _avail(db, therapist_id, start_at, end_at, lock=False):
+        locked.append((therapist_id, lock))
+        return True, {"rejected_reasons": []}
+
+    monkeypatch.setattr(domain, "is_available", _avail)
+    monkeypatch.setattr(
+        domain_service, "check_availability_batch", _batch([False, True])
+    )
+
+    chosen, debug = await assign_for_free(
+        FakeSession(sample_rows),
+        shop_id=uuid4(),
+        start_at=_ts(11),
+        end_at=_ts(12),
+        base_staff_id=sample_rows[0][0],
+    )
+
+    assert chosen == sample_rows[1][0]
+    assert locked == [(sample_rows[1][0], True)]
+    assert debug["lock_attempts"] == 1
+    assert debug["contended"] == []
+    assert debug["skipped"] == [
+        {"therapist_id": str(sample_rows[0][0]), "reasons": ["no_shift"]}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_assign_for_free_falls_back_when_lock_check_loses_race(
+    monkeypatch, sample_rows
+):
+    first, second = sample_rows[0][0], sample_rows[1][0]
+
+    async def _avail(db, therapist_id, start_at, end_at, lock=False):
+        if therapist_id == first:
+            return False, {"rejected_reasons": ["overlap_existing_reservation"]}
+        return True, {"rejected_reasons": []}
+
+    monkeypatch.setattr(domain, "is_available", _avail)
+    monkeypatch.setattr(
+        domain_service, "check_availability_batch", _batch([True, True])
+    )
+
+    chosen, debug = await assign_for_free(
+        FakeSession(sample_rows),
+        shop_id=uuid4(),
+        start_at=_ts(11),
+        end_at=_ts(12),
+    )
+
+    assert chosen == second
+    assert debug["rejected_reasons"] == []
+    assert debug["lock_attempts"] == 2
+    assert debug["contended"] == [str(first)]
+
+
+class _ScalarResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class BatchSession:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return _ScalarResult(self.results.pop(0))
+
+
+@pytest.mark.asyncio
+async def test_check_availability_batch_mirrors_is_available_rules():
+    free, on_break, booked, buffered, no_shift = (uuid4() for _ in range(5))
+
+    def _shift(therapist_id, breaks=None):
+        return SimpleNamespace(
+            therapist_id=therapist_id,
+            date=_ts(0).date(),
+            start_at=_ts(10),
+            end_at=_ts(18),
+            break_slots=breaks or [],
+        )
+
+    def _reservation(therapist_id, start, end):
+        return SimpleNamespace(
+            therapist_id=therapist_id, status="confirmed", start_at=start, end_at=end
+        )
+
+    session = BatchSession(
+        [
+            _shift(free),
+            _shift(
+                on_break,
+                [{"start_at": _ts(12).isoformat(), "end_at": _ts(12, 30).isoformat()}],
+            ),
+            _shift(booked),
+            _shift(buffered),
+        ],
+        [
+            _reservation(booked, _ts(11, 30), _ts(12, 30)),
+            _reservation(buffered, _ts(13, 10), _ts(14)),
+        ],
+    )
+    ids = [free, on_break, booked, buffered, no_shift]
+
+    result = await check_availability_batch(
+        session,
+        ids,
+        _ts(11),
+        _ts(13),
+        buffer_minutes={tid: 15 for tid in ids},
+    )
+
+    assert len(session.statements) == 2
+    assert {
+        tid: reasons["rejected_reasons"] for tid, (_, reasons) in result.items()
+    } == {
+        free: [],
+        on_break: ["on_break"],
+        booked: ["overlap_existing_reservation"],
+        buffered: ["overlap_existing_reservation"],
+        no_shift: ["no_shift"],
+    }
+    assert [tid for tid, (ok, _) in result.items() if ok] == [free]
@@ -0,0 +1,138 @@
+"""Tests for the cached, concurrent dependency health monitor."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from app.domains.site.services.shop import search_service
+from app.monitoring import health
+from app.monitoring.health import HealthCheck, HealthCheckResult, HealthMonitor
+
+
+def _check(name: str, *, delay: float = 0.0, status: str = "healthy", **kwargs):
+    calls: list[float] = []
+
+    async def run(timeout: float) -> HealthCheckResult:
+        calls.append(timeout)
+        await asyncio.sleep(delay)
+        return HealthCheckResult(name=name, status=status, response_time=delay * 1000)
+
+    check = HealthCheck(name, run, **kwargs)
+    return check, calls
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("poolclass", [AsyncAdaptedQueuePool, StaticPool])
+async def test_database_check_against_a_real_engine(poolclass):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=poolclass)
+    try:
+        monitor = health.build_health_monitor(async_sessionmaker(engine))
+        database = monitor.checks["database"]
+
+        result = await database.run(1.0)
+    finally:
+        await engine.dispose()
+
+    assert result.status == "healthy", result.message
+    assert result.details["pool"] == poolclass.__name__
+    if poolclass is AsyncAdaptedQueuePool:
+        assert result.details["checked_out"] == 1
+
+
+@pytest.mark.asyncio
+async def test_checks_run_concurrently_with_per_check_timeouts():
+    database, _ = _check("database", delay=0.1, critical=True)
+    meili, _ = _check("meilisearch", delay=0.1)
+    hung, _ = _check("redis", delay=5.0, timeout=0.05)
+    monitor = HealthMonitor([database, meili, hung], slow_ms=1000)
+
+    started = time.perf_counter()
+    snapshot = await monitor.refresh()
+    elapsed = time.perf_counter() - started
+
+    # Bounded by the slowest check (redis' timeout + grace), not the sum
+    assert elapsed < 0.8
+    statuses = {check.name: check.status for check in snapshot.checks}
+    assert statuses == {
+        "database": "healthy",
+        "meilisearch": "healthy",
+        "redis": "unhealthy",
+    }
+    # Only a critical dependency makes the service unhealthy
+    assert snapshot.status == "degraded"
+
+
+@pytest.mark.asyncio
+async def test_slow_dependency_is_degraded_and_critical_failure_unhealthy():
+    database, _ = _check("database", status="unhealthy", critical=True)
+    meili, _ = _check("meilisearch", delay=0.05)
+    monitor = HealthMonitor([database, meili], slow_ms=10)
+
+    snapshot = await monitor.refresh()
+
+    assert snapshot.status == "unhealthy"
+    assert {c.name: c.status for c in snapshot.checks}["meilisearch"] == "degraded"
+    assert monitor.is_available("database") is False
+    assert monitor.is_available("meilisearch") is False
+    assert monitor.latency_summary("meilisearch")["samples"] == 1
+
+
+@pytest.mark.asyncio
+async def test_current_serves_the_cached_snapshot_until_stale():
+    database, calls = _check("database", delay=0.01)
+    monitor = HealthMonitor([database], interval=60)
+
+    results = await asyncio.gather(*(monitor.current() for _ in range(5)))
+
+    # Concurrent probes share one refresh, later ones read the cache
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert await monitor.current() is results[0]
+    await monitor.current(max_age=0)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_reported_failure_suspends_until_next_healthy_check():
+    meili, _ = _check("meilisearch")
+    monitor = HealthMonitor([meili], interval=60)
+
+    # Nothing known yet: callers may use the dependency
+    assert monitor.is_available("meilisearch") is True
+    await monitor.refresh()
+    monitor.report_failure("meilisearch")
+    assert monitor.is_available("meilisearch") is False
+
+    await monitor.refresh()
+    assert monitor.is_available("meilisearch") is True
+    assert monitor.is_available("unknown") is True
+
+
+@pytest.mark.asyncio
+async def test_search_skips_meili_while_monitor_reports_it_degraded(monkeypatch):
+    meili, _ = _check("meilisearch", status="unhealthy")
+    monitor = HealthMonitor([meili])
+    await monitor.refresh()
+    monkeypatch.setattr(health, "_health_monitor", monitor)
+
+    def fail_meili(**kwargs):
+        raise AssertionError("meili_search should be skipped")
+
+    fallback_calls: list[dict] = []
+
+    async def fake_postgres(db, **kwargs):
+        fallback_calls.append(kwargs)
+        return [], 0
+
+    monkeypatch.setattr(search_service, "meili_search", fail_meili)
+    monkeypatch.setattr(search_service, "_search_from_postgres", fake_postgres)
+
+    response = await search_service._search_shops_impl(None, area="難波")
+
+    assert fallback_calls and fallback_calls[0]["area"] == "難波"
+    assert response["total"] == 0
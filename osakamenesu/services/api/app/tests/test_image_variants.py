@@ -0,0 +1,204 @@
+"""Tests for the upload image pipeline and its variant manifest."""
+
+from __future__ import annotations
+
+import io
+import uuid
+
+import pytest
+
+from app import models
+from app.domains.site.services.shop.search_service import _doc_to_shop_summary
+from app.services import image_variants
+from app.services.image_variants import (
+    digest_upload,
+    load_image_variants,
+    process_image,
+    store_image,
+    with_image_variants,
+)
+from app.storage import StoredMedia
+
+
+class _FakeStorage:
+    def __init__(self) -> None:
+        self.saved: dict[str, bytes] = {}
+
+    async def save_photo(self, *, folder, filename, content, content_type):
+        key = f"{folder}/{filename}"
+        self.saved[key] = content
+        return StoredMedia(
+            key=key,
+            url=f"https://cdn.test/{key}",
+            content_type=content_type,
+            size=len(content),
+        )
+
+    async def save_stream(self, *, folder, filename, chunks, content_type, **_):
+        content = b"".join([chunk async for chunk in chunks])
+        return await self.save_photo(
+            folder=folder, filename=filename, content=content, content_type=content_type
+        )
+
+
+class _FakeResult:
+    def __init__(self, rows) -> None:
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _FakeSession:
+    def __init__(self, rows=()) -> None:
+        self.assets: dict[tuple[str, str], models.MediaAsset] = {}
+        self.rows = list(rows)
+        self.executed: list = []
+
+    async def get(self, model, key):
+        return self.assets.get((key["folder"], key["content_hash"]))
+
+    async def execute(self, statement):
+        self.executed.append(statement)
+        return _FakeResult(self.rows)
+
+
+@pytest.mark.asyncio
+async def test_store_image_without_pillow_keeps_upload_under_hashed_name(
+    monkeypatch,
+):
+    monkeypatch.setattr(image_variants, "PIL_AVAILABLE", False)
+    storage = _FakeStorage()
+    db = _FakeSession()
+    source = io.BytesIO(b"not really a jpeg")
+    digest = await digest_upload(source, max_bytes=1024)
+
+    asset = await store_image(
+        db,
+        storage,
+        folder="shops/abc",
+        source=source,
+        digest=digest,
+        content_type="image/jpeg",
+        extension=".jpg",
+    )
+
+    (key,) = storage.saved
+    assert key.startswith("shops/abc/") and key.endswith(".jpg")
+    assert len(key.rsplit("/", 1)[-1]) == image_variants.HASH_NAME_LENGTH + 4
+    assert storage.saved[key] == b"not really a jpeg"
+    assert asset.url == f"https://cdn.test/{key}"
+    assert asset.size == digest.size
+    assert asset.variants == [] and asset.width is None
+    assert len(db.executed) == 1
+
+    # The same bytes again reuse the stored row: nothing decoded or written
+    db.assets[(asset.folder, asset.content_hash)] = asset
+    again = await store_image(
+        db,
+        storage,
+        folder="shops/abc",
+        source=io.BytesIO(b"not really a jpeg"),
+        digest=digest,
+        content_type="image/jpeg",
+        extension=".jpg",
+    )
+    assert again is asset
+    assert len(storage.saved) == 1 and len(db.executed) == 1
+
+    # Another owner's folder gets its own copy, never a URL under shops/abc
+    other = await store_image(
+        db,
+        storage,
+        folder="shops/other",
+        source=io.BytesIO(b"not really a jpeg"),
+        digest=digest,
+        content_type="image/jpeg",
+        extension=".jpg",
+    )
+    assert other.folder == "shops/other"
+    assert other.url.startswith("https://cdn.test/shops/other/")
+    assert len(storage.saved) == 2 and len(db.executed) == 2
+
+
+@pytest.mark.asyncio
+async def test_load_image_variants_skips_query_for_unhashed_urls():
+    db = _FakeSession()
+
+    assert await load_image_variants(db, ["https://example.com/a.jpg", None]) == {}
+    assert db.executed == []
+
+    stored = f"https://cdn.test/shops/x/{'a' * 32}.jpg"
+    db.rows = [(stored, [{"name": "w320", "url": "u", "format": "webp", "size": 9}])]
+    variants = await load_image_variants(db, [stored])
+    # Storage bookkeeping such as size stays out of the public manifest
+    assert variants == {
+        stored: [
+            {
+                "name": "w320",
+                "url": "u",
+                "format": "webp",
+                "width": None,
+                "height": None,
+            }
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_variants_attached_to_docs_reach_shop_summary():
+    lead = f"https://cdn.test/shops/x/{'b' * 32}.jpg"
+    avatar = f"https://cdn.test/therapists/y/{'c' * 32}.png"
+    manifest = [
+        {"name": "w640", "url": "v", "format": "avif", "width": 640, "height": 480}
+    ]
+    db = _FakeSession(rows=[(lead, manifest), (avatar, manifest)])
+    doc = {
+        "id": str(uuid.uuid4()),
+        "name": "Shop",
+        "area": "難波",
+        "photos": [lead, "https://example.com/second.jpg"],
+        "staff_preview": [{"name": "Aoi", "avatar_url": avatar}],
+    }
+
+    await with_image_variants(db, [doc])
+    summary = _doc_to_shop_summary(doc)
+
+    assert len(db.executed) == 1
+    assert [v.width for v in summary.lead_image_variants] == [640]
+    assert summary.staff_preview[0].avatar_variants[0].format == "avif"
+
+
+def test_process_image_strips_metadata_and_builds_variants():
+    Image = pytest.importorskip("PIL.Image")
+    exif = Image.Exif()
+    # Orientation 6: stored sideways, displayed rotated 90° clockwise
+    exif[0x0112] = 6
+    exif[0x010F] = "Camera Maker"
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 400), "red").save(buffer, format="JPEG", exif=exif)
+
+    processed = process_image(
+        buffer.getvalue(),
+        widths=[320, 1280],
+        formats=["webp"],
+        thumbnail_size=64,
+        quality=80,
+    )
+
+    assert processed is not None
+    assert (processed.width, processed.height) == (400, 800)
+    original = processed.original
+    assert original.format == "jpeg"
+    with Image.open(io.BytesIO(original.content)) as decoded:
+        assert not decoded.getexif()
+    # 1280 is wider than the photo, so it is capped at the original width
+    assert [(v.name, v.width, v.height) for v in processed.variants] == [
+        ("thumb", 64, 64),
+        ("w400", 400, 800),
+        ("w320", 320, 640),
+    ]
+    assert (
+        process_image(b"garbage", widths=[], formats=[], thumbnail_size=8, quality=80)
+        is None
+    )
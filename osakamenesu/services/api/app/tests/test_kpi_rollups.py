@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import models
+from app.services import kpi_rollups
+from app.services.kpi_rollups import (
+    KpiRollupScheduler,
+    aggregate_rollups,
+    summarize_shop_days,
+)
+
+SHOP = uuid.uuid4()
+THERAPIST = uuid.uuid4()
+DAY = date(2025, 3, 1)
+# 10:00 JST on DAY
+MORNING = datetime(2025, 3, 1, 1, 0, tzinfo=timezone.utc)
+
+
+def _reservation(status, *, start=MORNING, minutes=60, therapist=THERAPIST, **kw):
+    return SimpleNamespace(
+        shop_id=SHOP,
+        therapist_id=therapist,
+        start_at=start,
+        end_at=start + timedelta(minutes=minutes),
+        status=status,
+        shop_repeat=kw.get("shop_repeat", False),
+        therapist_repeat=kw.get("therapist_repeat", False),
+    )
+
+
+def test_aggregate_counts_statuses_minutes_and_repeats():
+    reservations = [
+        _reservation("confirmed", shop_repeat=True, therapist_repeat=True),
+        _reservation("confirmed", shop_repeat=True),
+        _reservation("pending", minutes=90),
+        _reservation("cancelled", shop_repeat=True),
+        _reservation("confirmed", therapist=None),
+        # 23:30 UTC is already the next JST day
+        _reservation(
+            "no_show", start=datetime(2025, 3, 1, 23, 30, tzinfo=timezone.utc)
+        ),
+        _reservation("expired"),
+    ]
+    shifts = [
+        SimpleNamespace(
+            shop_id=SHOP,
+            therapist_id=THERAPIST,
+            date=DAY,
+            start_at=datetime(2025, 3, 1, 10, 0, tzinfo=kpi_rollups.JST),
+            end_at=datetime(2025, 3, 1, 18, 0, tzinfo=kpi_rollups.JST),
+            break_slots=[{"start_time": "13:00", "end_time": "14:00"}],
+            availability_status="available",
+        ),
+        SimpleNamespace(
+            shop_id=SHOP,
+            therapist_id=uuid.uuid4(),
+            date=DAY,
+            start_at=datetime(2025, 3, 1, 10, 0, tzinfo=kpi_rollups.JST),
+            end_at=datetime(2025, 3, 1, 18, 0, tzinfo=kpi_rollups.JST),
+            break_slots=None,
+            availability_status="off",
+        ),
+    ]
+    reviews = [
+        SimpleNamespace(shop_id=SHOP, created_at=MORNING, status="published", score=4),
+        SimpleNamespace(shop_id=SHOP, created_at=MORNING, status="published", score=5),
+        SimpleNamespace(shop_id=SHOP, created_at=MORNING, status="pending", score=1),
+    ]
+
+    shop_rows, therapist_rows = aggregate_rollups(reservations, shifts, reviews)
+
+    by_day = {row["day"]: row for row in shop_rows}
+    assert set(by_day) == {DAY, DAY + timedelta(days=1)}
+    shop = by_day[DAY]
+    assert shop["reservations_total"] == 5
+    assert shop["reservations_confirmed"] == 3
+    assert shop["reservations_pending"] == 1
+    assert shop["reservations_cancelled"] == 1
+    # Cancelled visits never count as repeats
+    assert shop["repeat_reservations"] == 2
+    assert shop["booked_minutes"] == 60 * 3 + 90
+    assert shop["shift_minutes"] == 7 * 60
+    assert shop["reviews_published"] == 2 and shop["reviews_pending"] == 1
+    assert shop["review_score_sum"] == 9
+    assert by_day[DAY + timedelta(days=1)]["reservations_no_show"] == 1
+
+    therapist = next(
+        row
+        for row in therapist_rows
+        if row["therapist_id"] == THERAPIST and row["day"] == DAY
+    )
+    assert therapist["reservations_total"] == 4
+    assert therapist["repeat_reservations"] == 1
+    assert therapist["booked_minutes"] == 60 * 2 + 90
+    assert therapist["shift_minutes"] == 7 * 60
+    # The day-off shift leaves no bucket behind
+    assert len(therapist_rows) == 2
+
+
+def test_summarize_shop_days_handles_empty_denominators():
+    rows = [
+        SimpleNamespace(
+            reservations_total=10,
+            reservations_confirmed=8,
+            reservations_cancelled=2,
+            reservations_no_show=0,
+            repeat_reservations=2,
+            booked_minutes=480,
+            shift_minutes=960,
+        )
+    ]
+
+    summary = summarize_shop_days(rows)
+
+    assert summary["utilization"] == 0.5
+    assert summary["cancellation_rate"] == 0.2
+    assert summary["repeat_rate"] == 0.25
+    assert summarize_shop_days([])["utilization"] is None
+
+
+def test_change_tracking_marks_old_and_new_bucket_of_a_reschedule():
+    reservation = models.GuestReservation(shop_id=SHOP, status="confirmed")
+    set_committed_value(reservation, "start_at", MORNING)
+    reservation.start_at = MORNING + timedelta(days=2)
+    review = models.Review(profile_id=SHOP, created_at=MORNING, score=5, body="")
+    session = SimpleNamespace(info={}, new=[review], dirty=[reservation], deleted=[])
+
+    kpi_rollups._collect_dirty_buckets(session, None)
+
+    assert session.info[kpi_rollups._SESSION_INFO_KEY] == {
+        (SHOP, DAY),
+        (SHOP, DAY + timedelta(days=2)),
+    }
+
+
+class _NullSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rebuilds_one_range_per_shop_and_retries(monkeypatch):
+    calls = []
+
+    async def fake_refresh(db, shop_id, start, end):
+        calls.append((shop_id, start, end))
+        return 1
+
+    monkeypatch.setattr(kpi_rollups, "refresh_shop_rollups", fake_refresh)
+    scheduler = KpiRollupScheduler(_NullSession)
+    scheduler.mark_dirty([(SHOP, DAY), (SHOP, DAY + timedelta(days=3)), (None, DAY)])
+
+    assert await scheduler.tick() == 1
+    assert calls == [(SHOP, DAY, DAY + timedelta(days=3))]
+    assert scheduler.pending == frozenset()
+
+    async def failing_refresh(db, shop_id, start, end):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(kpi_rollups, "refresh_shop_rollups", failing_refresh)
+    scheduler.mark_dirty([(SHOP, DAY)])
+    assert await scheduler.tick() == 0
+    assert scheduler.pending == frozenset({(SHOP, DAY)})
+
+
+@pytest.mark.asyncio
+async def test_refresh_shop_buckets_rebuilds_runs_of_consecutive_days(monkeypatch):
+    calls = []
+
+    async def fake_refresh(db, shop_id, start, end):
+        calls.append((shop_id, start, end))
+        return 1
+
+    monkeypatch.setattr(kpi_rollups, "refresh_shop_rollups", fake_refresh)
+    other = uuid.uuid4()
+    written = await kpi_rollups.refresh_shop_buckets(
+        None,
+        [
+            (SHOP, DAY),
+            (SHOP, DAY + timedelta(days=1)),
+            (SHOP, DAY + timedelta(days=300)),
+            (other, DAY),
+        ],
+    )
+
+    assert written == 3
+    assert sorted(calls, key=lambda call: (str(call[0]), call[1])) == sorted(
+        [
+            (SHOP, DAY, DAY + timedelta(days=1)),
+            (SHOP, DAY + timedelta(days=300), DAY + timedelta(days=300)),
+            (other, DAY, DAY),
+        ],
+        key=lambda call: (str(call[0]), call[1]),
+    )
@@ -0,0 +1,115 @@
+"""Tests for serving local media with cache validators and negotiation."""
+
+from __future__ import annotations
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.media_files import IMMUTABLE_CACHE_CONTROL, MediaFiles, accepted_types
+from app.middleware.cache_headers import CacheHeadersStage
+from app.middleware.pipeline import ASGIPipelineMiddleware
+
+STEM = "0123456789abcdef0123456789abcdef"
+ORIGINAL = f"{STEM}.jpg"
+BODY = bytes(range(256)) * 64
+
+
+def _client(tmp_path, **kwargs) -> TestClient:
+    folder = tmp_path / "shops" / "a"
+    folder.mkdir(parents=True)
+    (folder / ORIGINAL).write_bytes(BODY)
+    (folder / f"{STEM}-w640.webp").write_bytes(b"webp")
+    (folder / f"{STEM}-w640.avif").write_bytes(b"avif")
+    (folder / f"{STEM}-w320.webp").write_bytes(b"webp-320")
+    (folder / "legacy-upload.png").write_bytes(b"png")
+
+    app = FastAPI()
+    app.mount("/media", MediaFiles(directory=tmp_path, **kwargs), name="media")
+    app.add_middleware(ASGIPipelineMiddleware, stages=[CacheHeadersStage()])
+    return TestClient(app)
+
+
+def test_hashed_names_are_immutable_with_name_etag_and_ranges(tmp_path):
+    client = _client(tmp_path)
+    url = f"/media/shops/a/{ORIGINAL}"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"] == f'"{ORIGINAL}"'
+    assert "vary" not in response.headers
+
+    revalidated = client.get(url, headers={"If-None-Match": f'"{ORIGINAL}"'})
+    assert revalidated.status_code == 304
+    # The pipeline's default no-store policy must not replace the media one
+    assert revalidated.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    partial = client.get(
+        url, headers={"Range": "bytes=100-199", "If-Range": f'"{ORIGINAL}"'}
+    )
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(BODY)}"
+    assert partial.content == BODY[100:200]
+
+    stale = client.get(url, headers={"Range": "bytes=100-199", "If-Range": '"old"'})
+    assert stale.status_code == 200 and stale.content == BODY
+
+
+def test_other_names_get_short_public_cache(tmp_path):
+    response = _client(tmp_path, max_age=600).get("/media/shops/a/legacy-upload.png")
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=600"
+    assert response.headers["etag"] != '"legacy-upload.png"'
+
+
+def test_variant_format_follows_accept(tmp_path):
+    client = _client(tmp_path)
+
+    avif = client.get(
+        f"/media/shops/a/{STEM}-w640.webp",
+        headers={"Accept": "image/avif,image/webp,*/*;q=0.8"},
+    )
+    assert avif.content == b"avif"
+    assert avif.headers["content-type"] == "image/avif"
+    assert avif.headers["etag"] == f'"{STEM}-w640.avif"'
+    assert avif.headers["vary"] == "Accept"
+
+    webp = client.get(
+        f"/media/shops/a/{STEM}-w640.webp",
+        headers={"Accept": "image/avif;q=0,image/webp,*/*"},
+    )
+    assert webp.content == b"webp"
+    assert webp.headers["vary"] == "Accept"
+
+    # No AVIF sibling for this width: the requested file is served
+    fallback = client.get(
+        f"/media/shops/a/{STEM}-w320.webp", headers={"Accept": "image/avif"}
+    )
+    assert fallback.content == b"webp-320"
+
+    disabled = _client(tmp_path / "off", negotiate=False).get(
+        f"/media/shops/a/{STEM}-w640.webp", headers={"Accept": "image/avif"}
+    )
+    assert disabled.content == b"webp" and "vary" not in disabled.headers
+
+
+def test_accel_redirect_hands_file_to_proxy(tmp_path):
+    client = _client(tmp_path, accel_redirect_prefix="/_media/")
+
+    response = client.get(f"/media/shops/a/{ORIGINAL}")
+
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == f"/_media/shops/a/{ORIGINAL}"
+    assert response.headers["etag"] == f'"{ORIGINAL}"'
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["content-type"] == "image/jpeg"
+
+
+def test_accepted_types_ignores_zero_quality():
+    assert accepted_types("image/AVIF;q=0.5, image/webp;q=0, */*") == {
+        "image/avif",
+        "*/*",
+    }
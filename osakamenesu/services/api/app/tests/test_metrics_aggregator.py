@@ -0,0 +1,197 @@
+"""Tests for in-process metrics aggregation and the /metrics endpoint."""
+
+from __future__ import annotations
+
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry, Histogram, multiprocess
+from prometheus_client import values as prometheus_values
+
+from app.monitoring.aggregator import (
+    LatencyHistogram,
+    MetricsAggregator,
+    observe_histogram,
+)
+from app.monitoring.metrics import MetricsCollector
+
+
+def test_latency_histogram_percentiles_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+
+    assert histogram.count == 1000
+    assert histogram.total == pytest.approx(500.5)
+    assert histogram.max == pytest.approx(1.0)
+    for q, expected in ((50, 0.5), (95, 0.95), (99, 0.99)):
+        assert histogram.percentile(q) == pytest.approx(expected, rel=0.03)
+    assert histogram.percentile(100) == pytest.approx(1.0, rel=0.03)
+    # Sparse buckets: ~32 per power of two, not one per distinct value
+    assert len(histogram.counts) < 250
+
+    merged = LatencyHistogram()
+    merged.merge(histogram)
+    merged.merge(histogram)
+    assert merged.count == 2000
+    assert merged.percentile(50) == histogram.percentile(50)
+
+
+def test_bound_counts_are_exact_around_bucket_edges():
+    bounds = (0.005, 0.01, float("inf"))
+    histogram = LatencyHistogram(bounds)
+    # 4.99ms and 5.0ms share a log-linear bucket with 5.05ms
+    for seconds in (0.00499, 0.005, 0.00505, 0.02):
+        histogram.record(seconds)
+
+    assert histogram.counts_for(bounds) == [2, 1, 1]
+    # Without matching bounds samples are attributed by their bucket's upper edge
+    assert LatencyHistogram().counts_for(bounds) == [0, 0, 0]
+    assert sum(histogram.counts_for((0.001, float("inf")))) == 4
+
+
+def test_observe_histogram_matches_observe_in_multiprocess_mode(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        prometheus_values,
+        "ValueClass",
+        prometheus_values.MultiProcessValue(process_identifier=lambda: 4242),
+    )
+    samples = (0.004, 0.005, 0.0051, 0.07, 0.3, 12.0)
+    bounds = Histogram.DEFAULT_BUCKETS
+    bulk = Histogram("bulk_seconds", "bulk", registry=None)
+    single = Histogram("single_seconds", "single", registry=None)
+    histogram = LatencyHistogram(bounds)
+    for seconds in samples:
+        histogram.record(seconds)
+        single.observe(seconds)
+
+    observe_histogram(bulk, histogram)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+    for bound in ("0.005", "0.01", "0.075", "0.5", "+Inf"):
+        assert registry.get_sample_value(
+            "bulk_seconds_bucket", {"le": bound}
+        ) == registry.get_sample_value("single_seconds_bucket", {"le": bound})
+    assert registry.get_sample_value("bulk_seconds_count") == len(samples)
+    assert registry.get_sample_value("bulk_seconds_sum") == pytest.approx(sum(samples))
+
+
+def test_aggregator_swaps_windows():
+    aggregator = MetricsAggregator()
+    aggregator.record_request("GET", "/api/shops", 200, 0.01)
+    aggregator.record_request("GET", "/api/shops", 200, 0.02)
+    aggregator.record_cache("get", hit=True)
+
+    window = aggregator.swap()
+
+    assert window.requests[("GET", "/api/shops", 200)].count == 2
+    assert window.cache == {("get", "hit"): 1}
+    assert not aggregator.swap()
+    assert aggregator.cache_hit_rate == 100.0
+
+
+class RecordingPipeline:
+    def __init__(self, calls: list) -> None:
+        self.calls = calls
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+
+        return command
+
+    async def execute(self):
+        self.calls.append(("execute", (), {}))
+
+
+class RecordingRedis:
+    def __init__(self) -> None:
+        self.calls: list = []
+
+    def pipeline(self):
+        return RecordingPipeline(self.calls)
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_prometheus_and_one_redis_pipeline():
+    redis = RecordingRedis()
+    collector = MetricsCollector(redis_client=redis)
+    endpoint = "/api/test-flush/{item_id}"
+    count_labels = {"method": "GET", "endpoint": endpoint, "status": "200"}
+    bucket_labels = {"method": "GET", "endpoint": endpoint, "le": "0.025"}
+
+    for duration in (0.004, 0.004, 0.02, 0.3):
+        await collector.record_api_request("GET", endpoint, 200, duration)
+    await collector.record_api_request("GET", endpoint, 404, 0.001)
+    await collector.record_cache_operation("get", hit=False)
+
+    # Nothing reaches Prometheus or Redis before the flush
+    assert (
+        REGISTRY.get_sample_value("osakamenesu_api_requests_total", count_labels)
+        is None
+    )
+    assert redis.calls == []
+
+    await collector.flush()
+
+    assert (
+        REGISTRY.get_sample_value("osakamenesu_api_requests_total", count_labels) == 4
+    )
+    assert (
+        REGISTRY.get_sample_value(
+            "osakamenesu_api_request_duration_seconds_bucket", bucket_labels
+        )
+        == 4
+    )
+    assert REGISTRY.get_sample_value(
+        "osakamenesu_api_request_duration_seconds_sum",
+        {"method": "GET", "endpoint": endpoint},
+    ) == pytest.approx(0.329)
+
+    commands = [name for name, _, _ in redis.calls]
+    assert commands.count("execute") == 1
+    latency = [
+        kwargs["mapping"]
+        for name, args, kwargs in redis.calls
+        if name == "hset" and args[0].endswith(f"latency:GET:{endpoint}")
+    ]
+    assert latency[0]["count"] == 5
+    assert latency[0]["p99"] == pytest.approx(0.3, rel=0.03)
+
+    # An empty window flushes nothing
+    await collector.flush()
+    assert [name for name, _, _ in redis.calls].count("execute") == 1
+
+
+def test_metrics_endpoint_flushes_pending_requests():
+    from app.main import app
+
+    client = TestClient(app)
+    assert client.get("/api/no-such-route").status_code == 404
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'osakamenesu_api_requests_total{endpoint="unmatched",method="GET",status="404"}'
+        in response.text
+    )
+
+
+def test_metrics_endpoint_requires_ops_token_when_configured(monkeypatch):
+    from app.main import app
+
+    ops_router = importlib.import_module("app.domains.ops.router")
+    monkeypatch.setattr(
+        ops_router, "settings", SimpleNamespace(ops_api_token="scrape-secret")
+    )
+    client = TestClient(app)
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
@@ -0,0 +1,208 @@
+"""Tests for the pure-ASGI middleware pipeline and its stages."""
+
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.cache_headers import CacheHeadersStage
+from app.middleware.enhanced_rate_limit import EnhancedRateLimitStage
+from app.middleware.error_tracking import ErrorTrackingStage
+from app.middleware.performance import PerformanceMonitoringStage
+from app.middleware.pipeline import ASGIPipelineMiddleware, PipelineStage
+from app.middleware.security_headers import SecurityHeadersStage
+from app.monitoring.metrics import MetricsCollector
+from app.utils.ratelimit import RateLimitTier
+
+
+class RecordingStage(PipelineStage):
+    def __init__(self, name: str, calls: list[str]) -> None:
+        self.name = name
+        self.calls = calls
+
+    async def on_request(self, ctx):
+        self.calls.append(f"{self.name}:request")
+        return None
+
+    async def on_response(self, ctx):
+        self.calls.append(f"{self.name}:response")
+        ctx.headers["X-Stage"] = self.name
+
+    async def on_complete(self, ctx):
+        self.calls.append(f"{self.name}:complete")
+
+
+class RecordingCollector(MetricsCollector):
+    def __init__(self) -> None:
+        super().__init__(redis_client=None)
+        self.requests: list[tuple[str, str, int]] = []
+
+    async def record_api_request(self, method, endpoint, status_code, duration):
+        self.requests.append((method, endpoint, status_code))
+
+
+def _build_app(*stages: PipelineStage) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/shops")
+    async def shops():
+        return {"items": [1, 2, 3]}
+
+    @app.get("/api/dashboard/shops")
+    async def dashboard_shops():
+        return {"items": [1]}
+
+    @app.get("/api/auth/me")
+    async def me():
+        return {"id": 1}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            yield b"a"
+            yield b"b"
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/api/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(ASGIPipelineMiddleware, stages=list(stages))
+    return app
+
+
+def test_stage_hooks_run_in_onion_order():
+    calls: list[str] = []
+    app = _build_app(RecordingStage("outer", calls), RecordingStage("inner", calls))
+
+    response = TestClient(app).get("/api/shops")
+
+    assert response.status_code == 200
+    assert response.headers["X-Stage"] == "outer"
+    assert calls == [
+        "outer:request",
+        "inner:request",
+        "inner:response",
+        "outer:response",
+        "inner:complete",
+        "outer:complete",
+    ]
+
+
+def test_cache_stage_sets_etag_and_returns_not_modified():
+    client = TestClient(_build_app(CacheHeadersStage()))
+
+    first = client.get("/api/shops")
+    assert first.headers["Cache-Control"].startswith("public, max-age=300")
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/shops", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+
+
+def test_cache_stage_does_not_hash_private_or_no_store_responses():
+    client = TestClient(_build_app(CacheHeadersStage()))
+
+    private = client.get("/api/dashboard/shops")
+    assert private.headers["Cache-Control"].startswith("private")
+    assert "etag" not in private.headers
+
+    no_store = client.get("/api/auth/me", headers={"If-None-Match": "*"})
+    assert no_store.status_code == 200
+    assert "no-store" in no_store.headers["Cache-Control"]
+    assert "etag" not in no_store.headers
+
+
+def test_cache_stage_leaves_streaming_bodies_untouched():
+    response = TestClient(_build_app(CacheHeadersStage())).get("/api/stream")
+
+    assert response.status_code == 200
+    assert response.text == "ab"
+    assert "etag" not in response.headers
+    assert "Cache-Control" in response.headers
+
+
+def test_security_stage_adds_headers():
+    response = TestClient(_build_app(SecurityHeadersStage())).get("/api/shops")
+
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    assert response.headers["X-Frame-Options"] == "DENY"
+    assert response.headers["X-Permitted-Cross-Domain-Policies"] == "none"
+    assert "Strict-Transport-Security" not in response.headers
+
+
+def test_error_stage_converts_exception_and_outer_stages_see_response():
+    collector = RecordingCollector()
+    app = _build_app(
+        SecurityHeadersStage(),
+        PerformanceMonitoringStage(metrics_collector=collector),
+        ErrorTrackingStage(),
+    )
+
+    response = TestClient(app).get("/api/boom")
+
+    assert response.status_code == 500
+    body = response.json()
+    assert body["type"] == "internal_server_error"
+    assert body["request_id"] == response.headers["X-Request-ID"]
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    assert collector.requests == [("GET", "/api/boom", 500)]
+
+
+def test_unhandled_exception_propagates_without_error_stage():
+    collector = RecordingCollector()
+    app = _build_app(PerformanceMonitoringStage(metrics_collector=collector))
+
+    with pytest.raises(RuntimeError):
+        TestClient(app).get("/api/boom")
+    assert collector.requests == [("GET", "/api/boom", 500)]
+
+
+def test_rate_limit_stage_short_circuits_with_429():
+    stage = EnhancedRateLimitStage(
+        redis_client=None,
+        tiers=[
+            RateLimitTier(name="burst", max_events=2, window_sec=10.0),
+            RateLimitTier(name="sustained", max_events=300, window_sec=60.0),
+        ],
+    )
+    calls: list[str] = []
+    app = _build_app(CacheHeadersStage(), stage, RecordingStage("app", calls))
+    client = TestClient(app)
+
+    assert client.get("/api/shops").headers["X-RateLimit-Limit-Sustained"] == "300"
+    assert client.get("/api/shops").status_code == 200
+    blocked = client.get("/api/shops")
+
+    assert blocked.status_code == 429
+    assert blocked.headers["X-RateLimit-Tier"] == "burst"
+    assert blocked.headers["Cache-Control"] == "no-cache, no-store, must-revalidate"
+    # The stage after the limiter never saw the blocked request.
+    assert calls.count("app:request") == 2
+
+
+def test_rate_limit_flood_marks_ip_suspicious():
+    stage = EnhancedRateLimitStage(
+        redis_client=None,
+        tiers=[
+            RateLimitTier(
+                name="global", max_events=5, window_sec=60.0, always_consume=True
+            ),
+            RateLimitTier(name="burst", max_events=2, window_sec=10.0),
+        ],
+    )
+    client = TestClient(_build_app(stage))
+
+    statuses = [client.get("/api/shops").status_code for _ in range(6)]
+
+    # Burst rejections still count against the global tier, which trips on
+    # the sixth attempt and blocks the client outright afterwards.
+    assert statuses == [200, 200, 429, 429, 429, 429]
+    assert "testclient" in stage.suspicious_ips
+    blocked = client.get("/api/shops")
+    assert blocked.status_code == 503
+    assert blocked.headers["Retry-After"] == "3600"
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app import models, notifications
+from app.notifications import (
+    FANOUT_CHANNEL,
+    NotificationWorker,
+    build_delivery_payloads,
+    enqueue_reservation_event,
+    expand_fanout_rows,
+    retry_delay,
+)
+
+NOW = datetime(2025, 1, 1, 3, 0, tzinfo=timezone.utc)
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+    def scalar_one_or_none(self):
+        return self._rows[0] if self._rows else None
+
+
+class _Session:
+    def __init__(self, results=None):
+        self.results = list(results or [])
+        self.statements = []
+        self.added = []
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return _Result(self.results.pop(0) if self.results else [])
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _outbox_row(channel, *, attempts=1, payload=None, reservation_id=None):
+    return models.NotificationOutbox(
+        id=uuid4(),
+        reservation_id=reservation_id,
+        event="reservation.confirmed",
+        channel=channel,
+        payload=payload or {},
+        status="processing",
+        attempts=attempts,
+    )
+
+
+def _context():
+    return {
+        "reservation_id": str(uuid4()),
+        "shop_id": str(uuid4()),
+        "shop_name": "Shop",
+        "therapist_name": "Aoi",
+        "customer_name": "Guest",
+        "date": "2025/01/01",
+        "time": "12:00",
+    }
+
+
+def test_enqueue_adds_fanout_row_to_the_callers_session():
+    session = _Session()
+    reservation = SimpleNamespace(id=uuid4(), status="cancelled")
+
+    row = enqueue_reservation_event(session, reservation, previous_status="confirmed")
+
+    assert session.added == [row]
+    assert row.channel == FANOUT_CHANNEL
+    assert row.event == "reservation.cancelled"
+    assert row.status == "pending"
+    assert row.payload == {"status": "cancelled", "previous_status": "confirmed"}
+    assert row.next_attempt_at is not None
+
+
+def test_delivery_payloads_follow_shop_trigger_statuses(monkeypatch):
+    monkeypatch.setattr(notifications.settings, "notify_email_endpoint", None)
+    setting = SimpleNamespace(
+        trigger_status=["confirmed"],
+        channels={
+            "email": {"enabled": True, "recipients": ["shop@example.com"]},
+            "line": {"enabled": True, "token": "line-token"},
+            "slack": {"enabled": False, "webhook_url": "https://hooks.slack.com/x"},
+        },
+    )
+    user_id = uuid4()
+
+    confirmed = build_delivery_payloads(
+        "confirmed", _context(), user_id=user_id, setting=setting
+    )
+    cancelled = build_delivery_payloads(
+        "cancelled", _context(), user_id=user_id, setting=setting
+    )
+
+    # email is skipped while no endpoint is configured
+    assert [channel for channel, _ in confirmed] == ["push", "line"]
+    assert confirmed[0][1]["user_id"] == str(user_id)
+    assert "予約確定" in confirmed[1][1]["message"]
+    assert "line-token" not in str(confirmed)
+    assert cancelled == []
+
+
+@pytest.mark.asyncio
+async def test_expand_fanout_batches_lookups_and_adds_channel_rows():
+    shop_id, therapist_id, user_id = uuid4(), uuid4(), uuid4()
+    reservation = SimpleNamespace(
+        id=uuid4(),
+        shop_id=shop_id,
+        therapist_id=therapist_id,
+        user_id=None,
+        customer_email="guest@example.com",
+        customer_name="Guest",
+        status="confirmed",
+        start_at=datetime(2025, 1, 1, 3, 0, tzinfo=timezone.utc),
+    )
+    setting = SimpleNamespace(
+        profile_id=shop_id,
+        trigger_status=["confirmed"],
+        channels={"slack": {"enabled": True, "webhook_url": "https://hooks/x"}},
+    )
+    session = _Session(
+        [
+            [reservation],
+            [(shop_id, "Shop")],
+            [setting],
+            [(therapist_id, "Aoi")],
+            [("guest@example.com", user_id)],
+        ]
+    )
+    rows = [
+        _outbox_row(
+            FANOUT_CHANNEL,
+            reservation_id=reservation.id,
+            payload={"status": "confirmed"},
+        ),
+        _outbox_row(FANOUT_CHANNEL, reservation_id=uuid4()),  # deleted reservation
+    ]
+
+    created = await expand_fanout_rows(session, rows)
+
+    assert len(session.statements) == 5
+    assert [row.channel for row in created] == ["push", "slack"]
+    push, slack = created
+    assert push.payload["user_id"] == str(user_id)
+    assert push.payload["time"] == "12:00"
+    assert "Aoi" in slack.payload["message"]
+    assert slack.payload["shop_id"] == str(shop_id)
+    assert "https://hooks/x" not in str(slack.payload)
+    assert session.added == created
+
+
+@pytest.mark.asyncio
+async def test_claim_skips_rows_locked_by_other_workers():
+    row = _outbox_row("slack", attempts=0)
+    row.status = "pending"
+    session = _Session([[row]])
+    worker = NotificationWorker(
+        lambda: session,
+        http_client=None,
+        batch_size=5,
+        max_attempts=3,
+        visibility_timeout=timedelta(minutes=5),
+    )
+
+    claimed = await worker.claim(NOW)
+
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "LIMIT" in sql
+    assert claimed == [row]
+    assert (row.status, row.attempts, row.locked_at) == ("processing", 1, NOW)
+    assert session.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_process_once_delivers_concurrently_and_schedules_retries(monkeypatch):
+    delivered = []
+
+    async def ok(payload):
+        delivered.append(payload["n"])
+
+    async def boom(payload):
+        raise RuntimeError("line down")
+
+    sessions = []
+
+    def factory():
+        session = _Session()
+        sessions.append(session)
+        return session
+
+    fanout = _outbox_row(FANOUT_CHANNEL)
+    slack = _outbox_row("slack", payload={"n": 1})
+    retry = _outbox_row("line", attempts=1, payload={"n": 2})
+    exhausted = _outbox_row("line", attempts=3, payload={"n": 3})
+    expanded = []
+
+    async def fake_expand(db, rows):
+        expanded.extend(rows)
+        return []
+
+    worker = NotificationWorker(
+        factory,
+        http_client=None,
+        batch_size=10,
+        max_attempts=3,
+        visibility_timeout=timedelta(minutes=5),
+        senders={"slack": ok, "line": boom},
+    )
+
+    async def fake_claim(now):
+        return [fanout, slack, retry, exhausted]
+
+    monkeypatch.setattr(worker, "claim", fake_claim)
+    monkeypatch.setattr(notifications, "expand_fanout_rows", fake_expand)
+
+    assert await worker.process_once(NOW) == 4
+
+    assert expanded == [fanout]
+    assert delivered == [1]
+    updates = {
+        stmt.compile().params["id_1"]: stmt.compile().params
+        for stmt in sessions[-1].statements
+    }
+    assert updates[fanout.id]["status"] == "sent"
+    assert updates[slack.id]["status"] == "sent"
+    assert updates[retry.id]["status"] == "pending"
+    assert updates[retry.id]["next_attempt_at"] == NOW + retry_delay(1)
+    assert "line down" in updates[retry.id]["last_error"]
+    assert updates[exhausted.id]["status"] == "failed"
+
+
+class _Http:
+    def __init__(self):
+        self.posts = []
+
+    async def post(self, url, **kwargs):
+        self.posts.append((url, kwargs))
+        return SimpleNamespace(raise_for_status=lambda: None)
+
+
+@pytest.mark.asyncio
+async def test_senders_resolve_credentials_at_delivery_time():
+    shop_id = str(uuid4())
+    channels = {
+        "line": {"enabled": True, "token": "rotated-token"},
+        "slack": {"enabled": False, "webhook_url": "https://hooks/x"},
+    }
+    http = _Http()
+    worker = NotificationWorker(lambda: _Session([[channels]]), http_client=http)
+
+    await worker._send_line({"shop_id": shop_id, "message": "hi"})
+    await worker._send_slack({"shop_id": shop_id, "message": "hi"})
+
+    # LINE uses the token configured now; Slack was disabled after enqueueing
+    ((url, kwargs),) = http.posts
+    assert url == notifications.LINE_NOTIFY_API_URL
+    assert kwargs["headers"]["Authorization"] == "Bearer rotated-token"
+
+
+def test_retry_delay_backs_off_exponentially():
+    assert retry_delay(2) == retry_delay(1) * 2
+    assert retry_delay(3) == retry_delay(1) * 4
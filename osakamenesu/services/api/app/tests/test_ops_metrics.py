@@ -138,30 +138,52 @@ class FakeSession:
 
 
 @pytest.mark.anyio
-async def test_queue_stats_returns_empty_after_legacy_removal(
+async def test_queue_stats_reports_outbox_backlog(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
-    """Legacy notification queue was removed - always returns empty stats."""
-    session = FakeSession(results=[])
+    now = datetime(2025, 11, 7, 5, 0, tzinfo=UTC)
+    oldest = now - timedelta(minutes=10)
+    due = now - timedelta(seconds=42)
+    session = FakeSession(results=[FakeResult(row=(3, oldest, due))])
+    monkeypatch.setattr(ops_module, "_utcnow", lambda: now)
 
     stats = await ops_module._get_queue_stats(session)
 
     assert isinstance(stats, OpsQueueStats)
-    assert stats.pending == 0
+    assert stats.pending == 3
+    assert stats.lag_seconds == 42.0
+    assert stats.oldest_created_at == oldest
+    assert stats.next_attempt_at == due
+    assert "notification_outbox" in str(session.executed_statements[0])
+
+
+@pytest.mark.anyio
+async def test_queue_stats_has_no_lag_when_nothing_is_due(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = datetime(2025, 11, 7, 5, 0, tzinfo=UTC)
+    session = FakeSession(
+        results=[FakeResult(row=(1, now, now + timedelta(minutes=5)))]
+    )
+    monkeypatch.setattr(ops_module, "_utcnow", lambda: now)
+
+    stats = await ops_module._get_queue_stats(session)
+
+    assert stats.pending == 1
     assert stats.lag_seconds == 0.0
-    assert stats.oldest_created_at is None
-    assert stats.next_attempt_at is None
 
 
 @pytest.mark.anyio
-async def test_outbox_summary_returns_empty_after_legacy_removal() -> None:
-    """Legacy notification outbox was removed - always returns empty channels."""
-    session = FakeSession(results=[])
+async def test_outbox_summary_counts_pending_per_channel() -> None:
+    session = FakeSession(results=[FakeResult(rows=[("fanout", 1), ("slack", 2)])])
 
     summary = await ops_module._get_outbox_summary(session)
 
     assert isinstance(summary, OpsOutboxSummary)
-    assert summary.channels == []
+    assert summary.channels == [
+        OpsOutboxChannelSummary(channel="fanout", pending=1),
+        OpsOutboxChannelSummary(channel="slack", pending=2),
+    ]
 
 
 @pytest.mark.anyio
@@ -169,12 +191,14 @@ async def test_slots_summary_counts_pending_and_confirmed(
     monkeypatch: pytest.MonkeyPatch,
 ) -> None:
     now = datetime(2025, 11, 7, 5, 0, tzinfo=UTC)
-    session = FakeSession(scalars=[7, 2, 4])
+    session = FakeSession(results=[FakeResult(row=(7, 2, 4))])
     monkeypatch.setattr(ops_module, "_utcnow", lambda: now)
 
     summary = await ops_module._get_slots_summary(session)
 
     assert isinstance(summary, OpsSlotsSummary)
+    assert len(session.executed_statements) == 1
+    assert session.scalar_statements == []
     assert summary.pending_total == 7
     assert summary.pending_stale == 2
     assert summary.confirmed_next_24h == 4
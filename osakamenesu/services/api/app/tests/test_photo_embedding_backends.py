@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import io
+import math
+
+import pytest
+
+from app.domains.site.services import photo_embedding_backends, photo_embedding_service
+from app.domains.site.services.photo_embedding_backends import (
+    EMBEDDING_DIM,
+    ContentHashBackend,
+    digest_file,
+    get_embedding_backend,
+)
+from app.models import PhotoEmbeddingCache
+from app.storage import LocalMediaStorage, MediaStorage
+
+
+def _storage(root):
+    return LocalMediaStorage(
+        root=root,
+        url_prefix="/media",
+        cdn_base_url=None,
+        public_base_url="https://api.example.com",
+        fallback_base_url=None,
+    )
+
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_content_hash_backend_is_deterministic_unit_vector():
+    backend = ContentHashBackend()
+
+    first = backend.embed(b"same image")
+    second = backend.embed(b"same image")
+
+    assert len(first) == EMBEDDING_DIM
+    assert first == second
+    assert math.isclose(math.sqrt(_cosine(first, first)), 1.0)
+    assert _cosine(first, backend.embed(b"other image")) < 0.5
+
+
+def test_default_backend_falls_back_without_numpy(monkeypatch, caplog):
+    monkeypatch.setattr(photo_embedding_backends, "NUMPY_AVAILABLE", False)
+    get_embedding_backend.cache_clear()
+    try:
+        with caplog.at_level("ERROR", logger=photo_embedding_backends.__name__):
+            # No key: the "local" default that settings also ship with
+            backend = get_embedding_backend()
+    finally:
+        get_embedding_backend.cache_clear()
+
+    assert isinstance(backend, ContentHashBackend)
+    assert "DEGRADED" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_local_storage_resolves_its_own_urls_only(tmp_path):
+    storage = _storage(tmp_path)
+    stored = await storage.save(
+        folder="therapists/a b",
+        filename="p.jpg",
+        content=b"x",
+        content_type="image/jpeg",
+    )
+
+    assert storage.path_for_url(stored.url) == stored.path
+    assert storage.path_for_url("https://cdn.example.com/other/p.jpg") is None
+    assert storage.path_for_url("/media/../../etc/passwd") is None
+    assert storage.path_for_url("/media/therapists/missing.jpg") is None
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _CacheSession:
+    def __init__(self, cached):
+        self.cached = cached
+        self.inserted = []
+
+    async def execute(self, stmt):
+        if stmt.is_select:
+            return _Result(list(self.cached.items()))
+        self.inserted.append(stmt)
+        return _Result([])
+
+
+@pytest.mark.asyncio
+async def test_embed_photo_urls_embeds_each_distinct_image_once(tmp_path, monkeypatch):
+    storage = _storage(tmp_path)
+    media = MediaStorage(storage)
+    first = await storage.save(
+        folder="t", filename="1.jpg", content=b"photo", content_type="image/jpeg"
+    )
+    reupload = await storage.save(
+        folder="t", filename="2.jpg", content=b"photo", content_type="image/jpeg"
+    )
+    cached = await storage.save(
+        folder="t", filename="3.jpg", content=b"cached", content_type="image/jpeg"
+    )
+    embedded = []
+    real_embed_files = photo_embedding_service.embed_files
+
+    def counting_embed_files(key, paths):
+        embedded.extend(paths)
+        return real_embed_files(key, paths)
+
+    monkeypatch.setattr(photo_embedding_service, "embed_files", counting_embed_files)
+    session = _CacheSession({digest_file(cached.path): [0.0, 1.0]})
+
+    vectors = await photo_embedding_service.embed_photo_urls(
+        session,
+        [first.url, reupload.url, cached.url, "https://elsewhere.example.com/x.jpg"],
+        backend="content-hash",
+        storage=media,
+    )
+
+    assert embedded == [str(first.path)]
+    assert vectors[first.url] == vectors[reupload.url]
+    assert vectors[first.url] == get_embedding_backend("content-hash").embed(b"photo")
+    assert vectors[cached.url] == [0.0, 1.0]
+    assert vectors["https://elsewhere.example.com/x.jpg"] is None
+    (insert,) = session.inserted
+    assert insert.table.name == PhotoEmbeddingCache.__tablename__
+
+
+def _fixture_images():
+    """Distinct synthetic photos plus re-encoded/resized/brightened copies."""
+    np = pytest.importorskip("numpy")
+    Image = pytest.importorskip("PIL.Image")
+    ImageEnhance = pytest.importorskip("PIL.ImageEnhance")
+
+    rng = np.random.default_rng(7)
+    originals, variants = [], []
+    for _ in range(12):
+        y, x = np.mgrid[0:240, 0:180]
+        base = rng.uniform(0, 255, size=3)
+        slope = rng.uniform(-1, 1, size=(2, 3))
+        pixels = base + y[..., None] * slope[0] + x[..., None] * slope[1]
+        for _ in range(4):
+            cy, cx, r = (
+                rng.integers(20, 160),
+                rng.integers(20, 160),
+                rng.integers(10, 50),
+            )
+            mask = (y - cy) ** 2 + (x - cx) ** 2 < r**2
+            pixels[mask] = rng.uniform(0, 255, size=3)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype("uint8"), "RGB")
+
+        def encode(img, quality=92):
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=quality)
+            return buffer.getvalue()
+
+        originals.append(encode(image))
+        variants.append(
+            [
+                encode(image, quality=60),
+                encode(image.resize((120, 160))),
+                encode(ImageEnhance.Brightness(image).enhance(1.1)),
+            ]
+        )
+    return originals, variants
+
+
+def test_local_backend_recall_on_fixture_set():
+    originals, variants = _fixture_images()
+    backend = get_embedding_backend("local")
+    index = [backend.embed(data) for data in originals]
+
+    hits = total = 0
+    for expected, copies in enumerate(variants):
+        for data in copies:
+            vector = backend.embed(data)
+            assert len(vector) == EMBEDDING_DIM
+            best = max(range(len(index)), key=lambda i: _cosine(vector, index[i]))
+            hits += best == expected
+            total += 1
+
+    assert hits / total >= 0.9
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.domains.async_tasks import photo_embeddings
+from app.domains.site.services import photo_embedding_service
+from app.domains.async_tasks.photo_embeddings import (
+    EmbeddingCheckpoint,
+    PhotoEmbeddingTask,
+    _Watermark,
+)
+from app.domains.site.services.photo_embedding_service import select_main_photo
+
+UPDATED = datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+
+def _therapist(photo_urls=("https://example.com/a.jpg",), main_photo_index=None):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        photo_urls=list(photo_urls),
+        main_photo_index=main_photo_index,
+        updated_at=UPDATED,
+    )
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _Database:
+    """Serves stale therapists by id and records bulk updates."""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda row: row.id)
+        self.selects = []
+        self.updates = []
+
+    def session(self):
+        return _Session(self)
+
+
+class _Session:
+    def __init__(self, database):
+        self.database = database
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params=None):
+        if params is not None:
+            self.database.updates.append((stmt, params))
+            return _Result([])
+        compiled = stmt.compile().params
+        self.database.selects.append(compiled)
+        after = next((v for k, v in compiled.items() if k.startswith("id_")), None)
+        limit = next(v for k, v in compiled.items() if k.startswith("param_"))
+        rows = [row for row in self.database.rows if after is None or row.id > after]
+        return _Result(rows[:limit])
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+async def _fake_embed_photo_urls(db, photo_urls, *, executor=None):
+    return {url: None if "broken" in url else [1.0, 0.0] for url in photo_urls}
+
+
+@pytest.fixture(autouse=True)
+def _embed_in_process(monkeypatch):
+    monkeypatch.setattr(
+        photo_embedding_service, "embed_photo_urls", _fake_embed_photo_urls
+    )
+
+
+def test_select_main_photo_falls_back_to_first():
+    assert select_main_photo(["a", "b"], 1) == (1, "b")
+    assert select_main_photo(["a", "b"], 5) == (0, "a")
+    assert select_main_photo([], 0) is None
+
+
+@pytest.mark.asyncio
+async def test_pipeline_writes_one_bulk_update_per_batch(tmp_path):
+    rows = [_therapist() for _ in range(4)]
+    rows.append(_therapist(["https://example.com/broken.jpg"]))
+    database = _Database(rows)
+    checkpoint = tmp_path / "embeddings.json"
+    task = PhotoEmbeddingTask(database.session, workers=0)
+
+    stats = await task.compute_all_missing_embeddings(
+        batch_size=2, checkpoint_path=checkpoint
+    )
+
+    assert stats["total_processed"] == 5
+    assert stats["total_success"] == 4
+    assert stats["total_failed"] == 1
+    assert stats["batches_processed"] == 3
+    assert stats["checkpoint"] is None
+    # Every therapist was processed, so there is nothing left to resume
+    assert not checkpoint.exists()
+
+    written = [params for _, params in database.updates]
+    assert sum(len(batch) for batch in written) == 4
+    assert all(len(batch) <= 2 for batch in written)
+    stmt = database.updates[0][0]
+    # Storing an embedding must not make the row look edited again
+    assert "updated_at=therapists.updated_at" in str(stmt)
+    assert written[0][0]["b_seen_updated_at"] == UPDATED
+
+
+@pytest.mark.asyncio
+async def test_pipeline_resumes_from_checkpoint(tmp_path):
+    rows = sorted((_therapist() for _ in range(5)), key=lambda row: row.id)
+    database = _Database(rows)
+    checkpoint = tmp_path / "embeddings.json"
+    EmbeddingCheckpoint(after_id=str(rows[1].id), processed=2, success=2).save(
+        checkpoint
+    )
+    task = PhotoEmbeddingTask(database.session, workers=0)
+
+    stats = await task.compute_all_missing_embeddings(
+        batch_size=2, max_total=2, checkpoint_path=checkpoint
+    )
+
+    assert stats["resumed_after"] == str(rows[1].id)
+    written = [params["b_id"] for _, batch in database.updates for params in batch]
+    assert written == [rows[2].id, rows[3].id]
+    saved = json.loads(checkpoint.read_text())
+    assert saved == {
+        "after_id": str(rows[3].id),
+        "processed": 4,
+        "success": 4,
+        "failed": 0,
+    }
+
+
+def test_watermark_only_advances_over_contiguous_batches():
+    checkpoint = EmbeddingCheckpoint()
+    watermark = _Watermark(checkpoint)
+
+    assert watermark.complete(1, "b", 2, 0) is False
+    assert checkpoint.after_id is None
+    assert watermark.complete(0, "a", 1, 1) is True
+    assert checkpoint.after_id == "b"
+    assert (checkpoint.processed, checkpoint.success, checkpoint.failed) == (4, 3, 1)
@@ -105,10 +105,15 @@ class FakeResult:
         scalars: Optional[List[Any]] = None,
         scalar_one: Optional[Any] = None,
         scalar_one_or_none: Optional[Any] = None,
+        rows: Optional[List[Any]] = None,
     ) -> None:
         self._scalars = scalars or []
         self._scalar_one = scalar_one
         self._scalar_one_or_none = scalar_one_or_none
+        self._rows = rows or []
+
+    def all(self) -> List[Any]:
+        return self._rows
 
     def scalars(self) -> FakeScalarResult:
         return FakeScalarResult(self._scalars)
@@ -129,6 +134,15 @@ def _extract_profile_id(query) -> uuid.UUID:
     raise AssertionError("profile_id not found in query criteria")
 
 
+def _extract_profile_ids(query) -> List[uuid.UUID]:
+    for criterion in getattr(query, "_where_criteria", []):
+        left = getattr(criterion, "left", None)
+        if getattr(left, "name", None) == "profile_id":
+            raw = getattr(criterion.right, "value", None)
+            return [uuid.UUID(str(value)) for value in raw]
+    raise AssertionError("profile_id not found in query criteria")
+
+
 class FakeSession:
     def __init__(
         self,
@@ -148,10 +162,11 @@ class FakeSession:
         if entity is models.Outlink:
             pid = _extract_profile_id(query)
             return FakeResult(scalars=self._outlinks.get(pid, []))
-        if desc.get("name") == "count" and entity is None:
-            pid = _extract_profile_id(query)
-            count = 1 if self._availability.get(pid, False) else 0
-            return FakeResult(scalar_one=count)
+        if entity is models.Availability:
+            pids = _extract_profile_ids(query)
+            return FakeResult(
+                rows=[(pid,) for pid in pids if self._availability.get(pid, False)]
+            )
         raise AssertionError(f"Unhandled query: {query}")
 
     async def refresh(self, instance: Any, attribute_names: Optional[List[str]] = None) -> None:
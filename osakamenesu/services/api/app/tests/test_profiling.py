@@ -0,0 +1,106 @@
+"""Tests for the sampling profiler, request profiling and loop lag monitor."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.pipeline import ASGIPipelineMiddleware
+from app.middleware.profiling import RequestProfilingStage
+from app.monitoring.profiling import (
+    LoopLagMonitor,
+    ProfilerBusy,
+    SamplingProfiler,
+    get_request_profile,
+)
+
+
+def _burn_cpu(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def test_sampling_profiler_collapses_stacks_of_the_target_thread():
+    profiler = SamplingProfiler(interval=0.001).start()
+    try:
+        with pytest.raises(ProfilerBusy):
+            SamplingProfiler().start()
+        _burn_cpu(0.2)
+    finally:
+        result = profiler.stop()
+
+    assert result.samples > 20
+    lines = result.collapsed().splitlines()
+    stack, _, count = lines[0].rpartition(" ")
+    assert int(count) > 0
+    burning = sum(int(line.rpartition(" ")[2]) for line in lines if "_burn_cpu" in line)
+    assert burning >= result.samples * 0.8
+    assert any(
+        "test_profiling.py:test_sampling_profiler_collapses" in line
+        and line.index("test_sampling_profiler") < line.index("_burn_cpu")
+        for line in lines
+    )
+    # The session slot is free again
+    SamplingProfiler().start().stop()
+
+
+def _block_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_captures_blocking_stack():
+    monitor = LoopLagMonitor(threshold=0.05, interval=0.01)
+    stop = asyncio.Event()
+    task = asyncio.create_task(monitor.run_forever(stop))
+    await asyncio.sleep(0.05)
+
+    _block_loop(0.25)
+    await asyncio.sleep(0.05)
+    stop.set()
+    await task
+
+    assert len(monitor.events) == 1
+    event = monitor.events[0]
+    assert event.stack[-1].endswith(":_block_loop")
+    assert event.duration >= 0.2
+    assert monitor.max_lag >= 0.2
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/slow")
+    async def slow():
+        _burn_cpu(0.05)
+        return {"ok": True}
+
+    app.add_middleware(
+        ASGIPipelineMiddleware, stages=[RequestProfilingStage("secret-key")]
+    )
+    return app
+
+
+def test_request_profiling_requires_admin_key():
+    client = TestClient(_build_app())
+
+    plain = client.get("/api/slow", headers={"X-Profile": "1"})
+    wrong = client.get("/api/slow", headers={"X-Profile": "1", "X-Admin-Key": "nope"})
+    profiled = client.get(
+        "/api/slow", headers={"X-Profile": "1", "X-Admin-Key": "secret-key"}
+    )
+
+    assert "X-Profile-Id" not in plain.headers
+    assert "X-Profile-Id" not in wrong.headers
+    assert profiled.status_code == 200
+    assert int(profiled.headers["X-Profile-Samples"]) > 0
+    result = get_request_profile(profiled.headers["X-Profile-Id"])
+    assert result is not None
+    assert "_burn_cpu" in result.collapsed()
@@ -0,0 +1,97 @@
+"""Tests for SQL instrumentation and the query-tracking pipeline stage."""
+
+from __future__ import annotations
+
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.middleware.pipeline import ASGIPipelineMiddleware
+from app.middleware.query_tracking import QueryTrackingStage
+from app.monitoring.queries import fingerprint, install_query_tracking
+
+
+def test_fingerprint_collapses_parameters_and_literals():
+    a = fingerprint(
+        "SELECT therapists.id FROM therapists\n WHERE therapists.id = $1 LIMIT 10"
+    )
+    b = fingerprint("SELECT therapists.id FROM therapists WHERE therapists.id = $7")
+
+    assert a == "SELECT therapists.id FROM therapists WHERE therapists.id = ? LIMIT ?"
+    assert b == "SELECT therapists.id FROM therapists WHERE therapists.id = ?"
+    assert fingerprint(
+        "SELECT 1 FROM t WHERE name = 'x''y' AND id IN ($1, $2, $3)"
+    ) == ("SELECT ? FROM t WHERE name = ? AND id IN (?)")
+    assert fingerprint("SELECT * FROM t WHERE id IN (__[POSTCOMPILE_id_1])") == (
+        "SELECT * FROM t WHERE id IN (?)"
+    )
+
+
+def _build_app(engine) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        async with engine.connect() as conn:
+            for related in range(5):
+                await conn.execute(text("SELECT :value"), {"value": related})
+            await conn.execute(text("SELECT 42 AS answer"))
+        return {"id": item_id}
+
+    app.add_middleware(
+        ASGIPipelineMiddleware, stages=[QueryTrackingStage(n_plus_one_threshold=3)]
+    )
+    return app
+
+
+def test_stage_reports_queries_and_flags_repeated_statements(caplog):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=NullPool)
+    remove = install_query_tracking(engine)
+    route = "GET /items/{item_id}"
+    labels = {"route": route}
+    before = (
+        REGISTRY.get_sample_value(
+            "osakamenesu_database_queries_per_request_sum", labels
+        )
+        or 0
+    )
+
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.middleware.query_tracking"):
+            response = TestClient(_build_app(engine)).get("/items/7")
+    finally:
+        remove()
+
+    assert response.status_code == 200
+    server_timing = response.headers["server-timing"]
+    assert server_timing.startswith("db;dur=")
+    assert 'desc="6 queries"' in server_timing
+    assert "app;dur=" in server_timing
+
+    after = REGISTRY.get_sample_value(
+        "osakamenesu_database_queries_per_request_sum", labels
+    )
+    assert after - before == 6
+    assert (
+        REGISTRY.get_sample_value("osakamenesu_database_n_plus_one_total", labels) >= 1
+    )
+
+    (record,) = [r for r in caplog.records if "N+1" in r.getMessage()]
+    assert record.repeat_count == 5
+    assert "SELECT ?" in record.getMessage()
+    assert route in record.getMessage()
+
+
+def test_untracked_paths_and_removed_listeners_record_nothing():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=NullPool)
+    remove = install_query_tracking(engine)
+    remove()
+
+    response = TestClient(_build_app(engine)).get("/items/1")
+
+    assert 'desc="0 queries"' in response.headers["server-timing"]
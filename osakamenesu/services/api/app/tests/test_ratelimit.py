@@ -1,8 +1,7 @@
 import asyncio
 import sys
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
-
+import fakeredis
 import pytest
 from redis.exceptions import RedisError
 
@@ -11,117 +10,32 @@ if str(APP_DIR) not in sys.path:
     sys.path.insert(0, str(APP_DIR))
 
 from utils import ratelimit as ratelimit_module  # type: ignore  # noqa: E402
-from utils.ratelimit import RateLimiter  # type: ignore  # noqa: E402
-
-
-class InMemoryRedis:
-    """Minimal async Redis clone for exercising the rate limiter logic."""
-
-    def __init__(self) -> None:
-        self._zsets: Dict[str, Dict[str, float]] = {}
-        self.closed = False
-
-    def pipeline(self) -> "InMemoryPipeline":
-        return InMemoryPipeline(self)
-
-    async def close(self) -> None:
-        self.closed = True
-
-    async def zrem(self, key: str, member: str) -> int:
-        zset = self._zsets.get(key)
-        if not zset or member not in zset:
-            return 0
-        del zset[member]
-        return 1
-
-    async def zrange(
-        self, key: str, start: int, end: int, *, withscores: bool = False
-    ) -> List[Tuple[str, float]]:
-        zset = self._zsets.get(key, {})
-        sorted_items = sorted(zset.items(), key=lambda item: item[1])
-        stop = end + 1 if end >= 0 else None
-        slice_ = sorted_items[start:stop]
-        if withscores:
-            return slice_
-        return [member for member, _ in slice_]
-
-    # Internal helpers -------------------------------------------------
-    def _ensure(self, key: str) -> Dict[str, float]:
-        return self._zsets.setdefault(key, {})
-
-    def _zremrangebyscore(self, key: str, min_score: float, max_score: float) -> int:
-        zset = self._zsets.get(key)
-        if not zset:
-            return 0
-        to_remove = [member for member, score in zset.items() if min_score <= score <= max_score]
-        for member in to_remove:
-            del zset[member]
-        return len(to_remove)
-
-    def _zadd(self, key: str, mapping: Dict[str, float]) -> int:
-        zset = self._ensure(key)
-        added = 0
-        for member, score in mapping.items():
-            if member not in zset:
-                added += 1
-            zset[member] = score
-        return added
-
-    def _zcard(self, key: str) -> int:
-        return len(self._zsets.get(key, {}))
-
-    def _expire(self, key: str, ttl: int) -> bool:  # noqa: ARG002 - parity method
-        # TTL behaviour is not required for the tests.
-        self._ensure(key)
-        return True
-
-
-class InMemoryPipeline:
-    def __init__(self, redis: InMemoryRedis) -> None:
-        self.redis = redis
-        self.ops: List[Tuple[str, Tuple, Dict]] = []
-
-    def zremrangebyscore(self, key: str, min_score: float, max_score: float) -> "InMemoryPipeline":
-        self.ops.append(("zremrangebyscore", (key, min_score, max_score), {}))
-        return self
-
-    def zadd(self, key: str, mapping: Dict[str, float]) -> "InMemoryPipeline":
-        self.ops.append(("zadd", (key, mapping), {}))
-        return self
-
-    def zcard(self, key: str) -> "InMemoryPipeline":
-        self.ops.append(("zcard", (key,), {}))
-        return self
-
-    def expire(self, key: str, ttl: int) -> "InMemoryPipeline":
-        self.ops.append(("expire", (key, ttl), {}))
-        return self
-
-    async def execute(self) -> Iterable[int]:
-        results: List[int] = []
-        for op, args, kwargs in self.ops:
-            method = getattr(self.redis, f"_{op}")
-            results.append(method(*args, **kwargs))
-        return results
+from utils.ratelimit import (  # type: ignore  # noqa: E402
+    MultiTierRateLimiter,
+    RateLimiter,
+    RateLimitTier,
+)
 
 
 class BoomRedisError(RedisError):
     pass
 
 
-class FailingRedis(InMemoryRedis):
+class FailingRedis:
+    """Redis stand-in whose rate limit script always fails."""
+
     def __init__(self) -> None:
-        super().__init__()
-        self.pipeline_calls = 0
+        self.script_calls = 0
 
-    def pipeline(self) -> "FailingPipeline":  # type: ignore[override]
-        self.pipeline_calls += 1
-        return FailingPipeline()
+    def register_script(self, script: str):
+        async def _run(keys=None, args=None):
+            self.script_calls += 1
+            raise BoomRedisError("boom")
 
+        return _run
 
-class FailingPipeline:
-    async def execute(self) -> Iterable[int]:
-        raise BoomRedisError("boom")
+    async def close(self) -> None:
+        return None
 
 
 class FakeTime:
@@ -162,7 +76,7 @@ def test_redis_rate_limiter_behaves_like_memory(monkeypatch: pytest.MonkeyPatch)
     fake_time = FakeTime(start=100.0)
     monkeypatch.setattr(ratelimit_module, "time", fake_time)
 
-    redis = InMemoryRedis()
+    redis = fakeredis.FakeAsyncRedis()
     limiter = RateLimiter(
         max_events=2,
         window_sec=60.0,
@@ -180,6 +94,25 @@ def test_redis_rate_limiter_behaves_like_memory(monkeypatch: pytest.MonkeyPatch)
     assert run(limiter.allow("k"))[0] is True
 
 
+def test_redis_rate_limiter_keeps_single_key_per_client(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    fake_time = FakeTime(start=100.0)
+    monkeypatch.setattr(ratelimit_module, "time", fake_time)
+
+    redis = fakeredis.FakeAsyncRedis()
+    limiter = RateLimiter(max_events=50, window_sec=60.0, redis_client=redis, namespace="test")
+
+    async def scenario():
+        for _ in range(20):
+            await limiter.allow("k")
+        return await redis.keys("*"), await redis.type("test:k")
+
+    keys, key_type = run(scenario())
+    assert keys == [b"test:k"]
+    assert key_type == b"string"
+
+
 def test_rate_limiter_falls_back_on_redis_error(monkeypatch: pytest.MonkeyPatch) -> None:
     fake_time = FakeTime(start=200.0)
     monkeypatch.setattr(ratelimit_module, "time", fake_time)
@@ -200,8 +133,79 @@ def test_rate_limiter_falls_back_on_redis_error(monkeypatch: pytest.MonkeyPatch)
     assert allowed1 is True
     assert allowed2 is True
     assert blocked is False
-    assert redis.pipeline_calls == 1  # second call skips redis during cooldown
+    assert redis.script_calls == 1  # second call skips redis during cooldown
 
     fake_time.advance(31.0)
     run(limiter.allow("another"))
-    assert redis.pipeline_calls == 2
+    assert redis.script_calls == 2
+
+
+def test_memory_fallback_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    fake_time = FakeTime(start=300.0)
+    monkeypatch.setattr(ratelimit_module, "time", fake_time)
+
+    limiter = RateLimiter(
+        max_events=1, window_sec=60.0, redis_client=None, namespace="test", local_max_keys=3
+    )
+
+    for ip in ("a", "b", "c", "d"):
+        assert run(limiter.allow(ip))[0] is True
+    assert len(limiter._local) == 3
+    # Most recently used keys are still limited, the evicted one starts fresh.
+    assert run(limiter.allow("d"))[0] is False
+    assert run(limiter.allow("a"))[0] is True
+
+
+@pytest.mark.parametrize("use_redis", [False, True])
+def test_multi_tier_limiter_reports_rejecting_tier(
+    monkeypatch: pytest.MonkeyPatch, use_redis: bool
+) -> None:
+    fake_time = FakeTime(start=400.0)
+    monkeypatch.setattr(ratelimit_module, "time", fake_time)
+
+    limiter = MultiTierRateLimiter(
+        tiers=[
+            RateLimitTier(name="burst", max_events=2, window_sec=10.0),
+            RateLimitTier(name="sustained", max_events=3, window_sec=60.0),
+        ],
+        redis_client=fakeredis.FakeAsyncRedis() if use_redis else None,
+        namespace="tiers",
+    )
+
+    assert run(limiter.allow("ip:1"))[0] is True
+    assert run(limiter.allow("ip:1"))[0] is True
+    allowed, tier, retry = run(limiter.allow("ip:1"))
+    assert allowed is False and tier.name == "burst" and retry > 0
+
+    # The burst rejection did not consume the sustained tier, so this is its
+    # third event; the next one exceeds the sustained rate.
+    fake_time.advance(10.0)
+    assert run(limiter.allow("ip:1"))[0] is True
+    allowed, tier, _ = run(limiter.allow("ip:1"))
+    assert allowed is False and tier.name == "sustained"
+
+
+@pytest.mark.parametrize("use_redis", [False, True])
+def test_always_consume_tier_counts_rejected_attempts(
+    monkeypatch: pytest.MonkeyPatch, use_redis: bool
+) -> None:
+    fake_time = FakeTime(start=500.0)
+    monkeypatch.setattr(ratelimit_module, "time", fake_time)
+
+    limiter = MultiTierRateLimiter(
+        tiers=[
+            RateLimitTier(name="global", max_events=4, window_sec=60.0, always_consume=True),
+            RateLimitTier(name="burst", max_events=1, window_sec=10.0),
+        ],
+        redis_client=fakeredis.FakeAsyncRedis() if use_redis else None,
+        namespace="tiers",
+    )
+
+    assert run(limiter.allow("ip:1"))[0] is True
+    for _ in range(3):
+        allowed, tier, _ = run(limiter.allow("ip:1"))
+        assert allowed is False and tier.name == "burst"
+
+    # Each burst rejection was charged to the global tier, so it is now full.
+    allowed, tier, retry = run(limiter.allow("ip:1"))
+    assert allowed is False and tier.name == "global" and retry > 0
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.domains.site.services.shop import search_service
+from app.schemas import NextAvailableSlot
+from app.services import search_freshness
+from app.services.search_freshness import (
+    ProfileAvailability,
+    SearchFreshnessScheduler,
+    build_time_dependent_patch,
+    derive_profile_availability,
+    install_change_tracking,
+    refresh_time_dependent_fields,
+)
+from app.utils.datetime import JST
+from app.utils.profiles import build_profile_doc
+
+
+def _therapist(name: str, status: str = "published"):
+    return SimpleNamespace(
+        id=uuid4(),
+        name=name,
+        alias=None,
+        headline=None,
+        status=status,
+        specialties=[],
+        photo_urls=[],
+    )
+
+
+def _profile(therapists: list | None = None, **overrides):
+    now = datetime(2025, 1, 1, tzinfo=JST)
+    values = dict(
+        id=uuid4(),
+        slug="shop",
+        name="Shop",
+        area="梅田",
+        nearest_station=None,
+        station_line=None,
+        station_exit=None,
+        station_walk_minutes=None,
+        latitude=None,
+        longitude=None,
+        price_min=10000,
+        price_max=15000,
+        bust_tag="C",
+        service_type="store",
+        body_tags=[],
+        height_cm=None,
+        age=None,
+        photos=[],
+        discounts=[{"label": "初回割"}],
+        ranking_badges=[],
+        ranking_weight=3,
+        status="published",
+        contact_json={"reviews": {"average_score": 4.5, "review_count": 12}},
+        reviews=[],
+        created_at=now,
+        updated_at=now,
+        therapists=therapists or [],
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class _Rows:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _StubSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return _Rows(self.rows)
+
+
+@pytest.mark.asyncio
+async def test_derive_profile_availability_uses_sot_and_legacy_rows(monkeypatch):
+    available = _therapist("A")
+    busy = _therapist("B")
+    draft = _therapist("C", status="draft")
+    with_staff = _profile([available, busy, draft])
+    legacy = _profile()
+    slot_start = datetime(2025, 1, 1, 12, 0, tzinfo=JST)
+    seen_ids = []
+
+    async def fake_derive(db, therapist_ids, *, lookahead_days=14):
+        seen_ids.extend(therapist_ids)
+        return {
+            available.id: (
+                True,
+                NextAvailableSlot(start_at=slot_start, status="ok"),
+            ),
+            busy.id: (False, None),
+        }
+
+    monkeypatch.setattr(
+        search_service, "_derive_next_availability_from_slots_sot", fake_derive
+    )
+    db = _StubSession([(legacy.id,)])
+
+    result = await derive_profile_availability(
+        db, [with_staff, legacy], today=date(2025, 1, 1)
+    )
+
+    assert seen_ids == [available.id, busy.id]
+    assert result[with_staff.id].today is True
+    assert result[with_staff.id].staff == {
+        str(available.id): (True, slot_start),
+        str(busy.id): (False, None),
+    }
+    assert result[legacy.id] == ProfileAvailability(today=True, staff={})
+    assert len(db.statements) == 1
+
+
+def test_patch_matches_full_document_fields():
+    therapist = _therapist("A")
+    profile = _profile([therapist])
+    slot_start = datetime(2025, 1, 1, 12, 0, tzinfo=JST)
+    availability = ProfileAvailability(
+        today=True, staff={str(therapist.id): (True, slot_start)}
+    )
+
+    patch = build_time_dependent_patch(profile, availability)
+    full = build_profile_doc(profile, today=True)
+
+    assert set(patch) == {"id", "today", "ranking_score", "staff_preview"}
+    assert patch["today"] is True
+    assert patch["ranking_score"] == full["ranking_score"]
+    assert (
+        patch["ranking_score"]
+        - build_profile_doc(profile, today=False)["ranking_score"]
+        == 10.0
+    )
+    [staff] = patch["staff_preview"]
+    assert staff["id"] == str(therapist.id)
+    assert staff["today_available"] is True
+    assert staff["next_available_at"] == slot_start.isoformat()
+
+
+@pytest.mark.asyncio
+async def test_refresh_sends_partial_updates_in_batches(monkeypatch):
+    profiles = [_profile() for _ in range(5)]
+    by_id = {p.id: p for p in profiles}
+    loaded_batches = []
+    sent = []
+
+    async def fake_load(db, ids):
+        loaded_batches.append(list(ids))
+        return [by_id[i] for i in ids if i in by_id]
+
+    async def fake_availability(db, batch, *, today=None):
+        return {p.id: ProfileAvailability(today=False) for p in batch}
+
+    def fake_update(docs, *, batch_size):
+        sent.append([doc["id"] for doc in docs])
+
+    monkeypatch.setattr(search_freshness, "_load_published_profiles", fake_load)
+    monkeypatch.setattr(
+        search_freshness, "derive_profile_availability", fake_availability
+    )
+    monkeypatch.setattr(search_freshness, "update_documents_partial", fake_update)
+
+    ids = [p.id for p in profiles] + [profiles[0].id, uuid4()]
+    updated = await refresh_time_dependent_fields(object(), ids, batch_size=2)
+
+    assert updated == 5
+    assert [len(batch) for batch in loaded_batches] == [2, 2, 2]
+    assert sent == [
+        [str(profiles[0].id), str(profiles[1].id)],
+        [str(profiles[2].id), str(profiles[3].id)],
+        [str(profiles[4].id)],
+    ]
+
+
+class _NullSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_scheduler_refreshes_pending_then_everything_on_rollover(monkeypatch):
+    calls = []
+    clock = {"now": datetime(2025, 1, 1, 23, 59, tzinfo=JST)}
+
+    async def fake_refresh(db, profile_ids=None, *, batch_size):
+        calls.append(None if profile_ids is None else set(profile_ids))
+        return 1
+
+    monkeypatch.setattr(search_freshness, "now_jst", lambda: clock["now"])
+    monkeypatch.setattr(search_freshness, "refresh_time_dependent_fields", fake_refresh)
+    scheduler = SearchFreshnessScheduler(_NullSession)
+    profile_id = uuid4()
+
+    assert await scheduler.tick() == 0
+    scheduler.mark_stale([profile_id, profile_id, None])
+    assert await scheduler.tick() == 1
+    assert scheduler.pending == frozenset()
+
+    clock["now"] += timedelta(minutes=2)
+    assert await scheduler.tick() == 1
+    assert await scheduler.tick() == 0
+    assert calls == [{profile_id}, None]
+
+
+class _PostgresSession(_NullSession):
+    """Reports PostgreSQL and answers the rollover advisory lock attempt."""
+
+    def __init__(self, lock_free: bool) -> None:
+        self.lock_free = lock_free
+        self.lock_keys = []
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    async def execute(self, stmt, params=None):
+        assert "pg_try_advisory_xact_lock" in str(stmt)
+        self.lock_keys.append(params["key"])
+        return SimpleNamespace(scalar=lambda: self.lock_free)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("lock_free", [True, False])
+async def test_only_the_lock_holder_runs_the_rollover_refresh(monkeypatch, lock_free):
+    calls = []
+    clock = {"now": datetime(2025, 1, 1, 23, 59, tzinfo=JST)}
+
+    async def fake_refresh(db, profile_ids=None, *, batch_size):
+        calls.append(None if profile_ids is None else set(profile_ids))
+        return 1
+
+    monkeypatch.setattr(search_freshness, "now_jst", lambda: clock["now"])
+    monkeypatch.setattr(search_freshness, "refresh_time_dependent_fields", fake_refresh)
+    session = _PostgresSession(lock_free)
+    scheduler = SearchFreshnessScheduler(lambda: session, interval_seconds=0)
+    profile_id = uuid4()
+
+    assert await scheduler.tick() == 0
+    clock["now"] += timedelta(minutes=2)
+    scheduler.mark_stale([profile_id])
+    assert await scheduler.tick() == 1
+    # Losing the lock still flushes this worker's own pending profiles.
+    assert calls == ([None] if lock_free else [{profile_id}])
+    assert len(session.lock_keys) == 1
+
+    # The day counts as handled either way: no retry on the next tick.
+    assert await scheduler.tick() == 0
+    assert len(session.lock_keys) == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_keeps_pending_profiles_when_refresh_fails(monkeypatch):
+    async def failing_refresh(db, profile_ids=None, *, batch_size):
+        raise RuntimeError("meili down")
+
+    monkeypatch.setattr(
+        search_freshness, "refresh_time_dependent_fields", failing_refresh
+    )
+    scheduler = SearchFreshnessScheduler(_NullSession)
+    profile_id = uuid4()
+    scheduler.mark_stale([profile_id])
+
+    assert await scheduler.tick() == 0
+    assert scheduler.pending == frozenset({profile_id})
+
+
+def test_change_tracking_marks_profiles_on_commit_only():
+    shop_id = uuid4()
+    scheduler = SearchFreshnessScheduler(_NullSession)
+    fake_session = SimpleNamespace(
+        info={},
+        new=[SimpleNamespace()],
+        dirty=[],
+        deleted=[search_freshness.models.TherapistShift(shop_id=shop_id)],
+    )
+    search_freshness._collect_changed_profiles(fake_session, None)
+    assert fake_session.info[search_freshness._SESSION_INFO_KEY] == {shop_id}
+
+    remove = install_change_tracking(scheduler)
+    try:
+        engine = create_engine("sqlite://")
+        with Session(engine) as session:
+            session.execute(text("select 1"))
+            session.info[search_freshness._SESSION_INFO_KEY] = {shop_id}
+            session.rollback()
+            session.execute(text("select 1"))
+            session.commit()
+            assert scheduler.pending == frozenset()
+
+            session.execute(text("select 1"))
+            session.info[search_freshness._SESSION_INFO_KEY] = {shop_id}
+            session.commit()
+        assert scheduler.pending == frozenset({shop_id})
+    finally:
+        remove()
@@ -12,6 +12,8 @@ from fastapi.testclient import TestClient
 from app.main import app
 from app.db import get_session
 from app.domains.site.services import shop_services
+from app.services import therapist_features
+from app.services.therapist_features import FeatureTable, TherapistFeatures
 from app.utils.datetime import JST, now_jst
 
 
@@ -623,6 +625,41 @@ def test_get_shop_detail_staff_sorted_by_recommended_score(
     )
 
 
+def test_get_shop_detail_staff_scoring_uses_feature_store(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Precomputed booking volume and repeat rate lift a therapist."""
+    profile = _create_mock_profile()
+    busy_id, quiet_id = uuid4(), uuid4()
+    profile.therapists = [
+        SimpleNamespace(
+            id=therapist_id,
+            name=name,
+            alias=None,
+            photo_urls=[],
+            headline=None,
+            specialties=[],
+            status="published",
+        )
+        for therapist_id, name in ((quiet_id, "Quiet"), (busy_id, "Popular"))
+    ]
+    _setup_mocks(monkeypatch, profile)
+    features = {
+        **TherapistFeatures().as_dict(),
+        "total_bookings_30d": 80,
+        "repeat_rate_30d": 0.6,
+    }
+    table = FeatureTable.from_rows([SimpleNamespace(therapist_id=busy_id, **features)])
+    monkeypatch.setattr(therapist_features, "_table", table)
+
+    res = client.get(f"/api/v1/shops/{SHOP_ID}")
+
+    assert res.status_code == 200
+    staff = res.json()["staff"]
+    assert [s["name"] for s in staff] == ["Popular", "Quiet"]
+    assert staff[0]["recommended_score"] > staff[1]["recommended_score"]
+
+
 # ---- Test cases for staff tags in shop detail ----
 
 
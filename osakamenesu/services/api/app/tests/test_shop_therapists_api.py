@@ -95,6 +95,7 @@ def _create_mock_shift(
         start_at=datetime.combine(shift_date, start_time, tzinfo=JST),
         end_at=datetime.combine(shift_date, end_time, tzinfo=JST),
         availability_status=availability_status,
+        break_slots=None,
     )
 
 
@@ -104,10 +105,13 @@ def _setup_mocks(
     profile=None,
     therapists: list | None = None,
     shifts: list | None = None,
+    reservations: list | None = None,
+    executed: list | None = None,
 ) -> None:
     """Set up common mocks."""
     therapists = therapists or []
     shifts = shifts or []
+    reservations = reservations or []
 
     class MockSession:
         async def get(self, model, id_):
@@ -116,16 +120,26 @@ def _setup_mocks(
             return None
 
         async def execute(self, stmt):
-            # Check if it's a therapist query or shift query
-            stmt_str = str(stmt)
-            if "therapist_shifts" in stmt_str.lower():
+            # Route on the queried table: shifts, reservations or the
+            # therapist page (rows carry the window count as second column).
+            stmt_str = str(stmt).lower()
+            if executed is not None:
+                executed.append(stmt_str)
+            if "therapist_shifts" in stmt_str:
                 return SimpleNamespace(
                     scalars=lambda: SimpleNamespace(all=lambda: shifts)
                 )
+            if "guest_reservations" in stmt_str:
+                return SimpleNamespace(
+                    scalars=lambda: SimpleNamespace(all=lambda: reservations)
+                )
             return SimpleNamespace(
-                scalars=lambda: SimpleNamespace(all=lambda: therapists)
+                all=lambda: [(t, len(therapists)) for t in therapists]
             )
 
+        async def scalar(self, stmt):
+            return len(therapists)
+
     app.dependency_overrides[get_session] = lambda: MockSession()
 
 
@@ -401,3 +415,77 @@ def test_recommended_score_with_availability_boost(
         f"Expected therapist with availability ({scores['With Availability']}) "
         f"to score higher than without ({scores['No Availability']})"
     )
+
+
+# ---- SoT availability tests ----
+
+
+def test_availability_subtracts_reservations_with_buffer(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Open slots come from the SoT: shift minus reservation plus buffer."""
+    profile = _create_mock_profile()
+    profile.buffer_minutes = 30
+    therapist = _create_mock_therapist(THERAPIST_ID_1, "Therapist 1")
+    day = datetime.now(JST).date() + timedelta(days=1)
+    shift = _create_mock_shift(THERAPIST_ID_1, day)
+    reservation = SimpleNamespace(
+        id=uuid4(),
+        therapist_id=THERAPIST_ID_1,
+        status="confirmed",
+        start_at=datetime.combine(day, time(12, 0), tzinfo=JST),
+        end_at=datetime.combine(day, time(13, 0), tzinfo=JST),
+    )
+
+    _setup_mocks(
+        monkeypatch,
+        profile=profile,
+        therapists=[therapist],
+        shifts=[shift],
+        reservations=[reservation],
+    )
+
+    res = client.get(f"/api/v1/shops/{SHOP_ID}/therapists?availability_days=3")
+
+    assert res.status_code == 200
+    slots = res.json()["items"][0]["availability_slots"]
+    assert [(s["starts_at"][11:16], s["ends_at"][11:16]) for s in slots] == [
+        ("10:00", "11:30"),
+        ("13:30", "18:00"),
+    ]
+
+
+def test_availability_is_batched_and_cached_per_therapist_day(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """One shift and one reservation query per page; repeat requests hit the cache."""
+    profile = _create_mock_profile()
+    therapists = [
+        _create_mock_therapist(THERAPIST_ID_1, "Therapist 1"),
+        _create_mock_therapist(THERAPIST_ID_2, "Therapist 2"),
+    ]
+    day = datetime.now(JST).date() + timedelta(days=1)
+    shifts = [
+        _create_mock_shift(THERAPIST_ID_1, day),
+        _create_mock_shift(THERAPIST_ID_2, day),
+    ]
+    executed: list[str] = []
+    _setup_mocks(
+        monkeypatch,
+        profile=profile,
+        therapists=therapists,
+        shifts=shifts,
+        executed=executed,
+    )
+
+    first = client.get(f"/api/v1/shops/{SHOP_ID}/therapists")
+    assert first.status_code == 200
+    assert sum("therapist_shifts" in stmt for stmt in executed) == 1
+    assert sum("guest_reservations" in stmt for stmt in executed) == 1
+    assert all("over ()" in stmt for stmt in executed if "therapists." in stmt)
+
+    executed.clear()
+    second = client.get(f"/api/v1/shops/{SHOP_ID}/therapists")
+    assert second.json() == first.json()
+    assert not any("therapist_shifts" in stmt for stmt in executed)
+    assert not any("guest_reservations" in stmt for stmt in executed)
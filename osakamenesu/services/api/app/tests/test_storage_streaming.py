@@ -0,0 +1,152 @@
+"""Tests for streaming media uploads to local disk and S3."""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from _s3_stub import InMemoryS3Client
+from app.storage import (
+    S3_MIN_PART_SIZE,
+    LocalMediaStorage,
+    MediaStorageError,
+    MediaTooLargeError,
+    S3MediaStorage,
+    iter_file,
+)
+
+MIB = 1024 * 1024
+
+
+async def _chunks(total: int, size: int = 256 * 1024):
+    sent = 0
+    while sent < total:
+        step = min(size, total - sent)
+        yield bytes([sent // size % 251]) * step
+        sent += step
+
+
+def _expected(total: int, size: int = 256 * 1024) -> bytes:
+    return b"".join(
+        bytes([offset // size % 251]) * min(size, total - offset)
+        for offset in range(0, total, size)
+    )
+
+
+def _s3(client: InMemoryS3Client) -> S3MediaStorage:
+    return S3MediaStorage(
+        bucket="media",
+        region="ap-northeast-1",
+        base_url="https://cdn.test",
+        endpoint_url=None,
+        access_key_id=None,
+        secret_access_key=None,
+        part_size=S3_MIN_PART_SIZE,
+        client=client,
+    )
+
+
+def _reject_non_png(head: bytes) -> None:
+    if not head.startswith(b"\x89PNG"):
+        raise MediaStorageError("unsupported_media_type")
+
+
+@pytest.mark.asyncio
+async def test_local_stream_is_renamed_into_place_and_cleaned_up_on_failure(
+    tmp_path,
+):
+    storage = LocalMediaStorage(tmp_path, "/media", None, None, None)
+
+    stored = await storage.save_stream(
+        folder="shops/a",
+        filename="photo.jpg",
+        chunks=iter_file(io.BytesIO(_expected(3 * MIB)), 64 * 1024),
+        content_type="image/jpeg",
+    )
+
+    assert stored.size == 3 * MIB and stored.url == "/media/shops/a/photo.jpg"
+    assert stored.path.read_bytes() == _expected(3 * MIB)
+
+    with pytest.raises(MediaTooLargeError):
+        await storage.save_stream(
+            folder="shops/a",
+            filename="big.jpg",
+            chunks=_chunks(2 * MIB),
+            content_type="image/jpeg",
+            max_bytes=MIB,
+        )
+    with pytest.raises(MediaStorageError):
+        await storage.save_stream(
+            folder="shops/a",
+            filename="fake.png",
+            chunks=_chunks(MIB),
+            content_type="image/png",
+            validate=_reject_non_png,
+        )
+    # Neither rejected file, nor a partial write, is left behind
+    assert sorted(p.name for p in (tmp_path / "shops/a").iterdir()) == ["photo.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_s3_stream_uses_multipart_without_buffering_the_file():
+    client = InMemoryS3Client()
+    total = 12 * MIB + 123
+
+    stored = await _s3(client).save_stream(
+        folder="/shops/a/",
+        filename="video.mp4",
+        chunks=_chunks(total),
+        content_type="video/mp4",
+    )
+
+    assert stored.url == "https://cdn.test/shops/a/video.mp4"
+    assert stored.size == total
+    assert client.objects[("media", "shops/a/video.mp4")]["Body"] == _expected(total)
+    assert client.calls.count("upload_part") == 3
+    # At most one part (plus the chunk that filled it) was ever held at once
+    assert client.largest_body < S3_MIN_PART_SIZE + 256 * 1024
+    assert client.uploads == {}
+
+
+@pytest.mark.asyncio
+async def test_s3_small_stream_is_a_single_put():
+    client = InMemoryS3Client()
+
+    stored = await _s3(client).save_stream(
+        folder="shops/a",
+        filename="photo.png",
+        chunks=_chunks(MIB),
+        content_type="image/png",
+    )
+
+    assert client.calls == ["put_object"]
+    assert stored.size == MIB
+
+
+@pytest.mark.asyncio
+async def test_s3_stream_aborts_multipart_upload_on_failure():
+    client = InMemoryS3Client()
+    storage = _s3(client)
+
+    with pytest.raises(MediaTooLargeError) as exc:
+        await storage.save_stream(
+            folder="shops/a",
+            filename="big.jpg",
+            chunks=_chunks(20 * MIB),
+            content_type="image/jpeg",
+            max_bytes=8 * MIB,
+        )
+    assert exc.value.limit_bytes == 8 * MIB
+    assert client.calls[-1] == "abort_multipart_upload"
+
+    client.fail_on_part = 2
+    with pytest.raises(MediaStorageError):
+        await storage.save_stream(
+            folder="shops/a",
+            filename="flaky.jpg",
+            chunks=_chunks(12 * MIB),
+            content_type="image/jpeg",
+        )
+    assert client.calls[-1] == "abort_multipart_upload"
+    assert client.uploads == {} and client.objects == {}
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.domains.site.therapist_availability import (
+    TherapistLockTimeout,
+    acquire_therapist_lock,
+    has_overlapping_reservation,
+    therapist_lock_key,
+)
+from app.domains.site.therapist_availability import locks as locks_module
+
+
+class _Savepoint:
+    def __init__(self, session: "_LockSession"):
+        self.session = session
+        self.rolled_back = False
+
+    async def rollback(self):
+        self.rolled_back = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.rolled_back = True
+        self.session.savepoints.append("rolled_back" if self.rolled_back else "kept")
+        return False
+
+
+class _LockSession:
+    def __init__(
+        self,
+        dialect: str,
+        *,
+        busy_attempts: int = 0,
+        reservations: list | None = None,
+    ):
+        self.dialect = dialect
+        self.busy_attempts = busy_attempts
+        self.reservations = reservations or []
+        self.executed: list[tuple[str, dict]] = []
+        self.savepoints: list[str] = []
+        self.rollbacks = 0
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name=self.dialect))
+
+    def begin_nested(self):
+        return _Savepoint(self)
+
+    async def execute(self, stmt, params=None):
+        sql = str(stmt)
+        self.executed.append((sql, params or {}))
+        if "pg_try_advisory_xact_lock" in sql:
+            acquired = self.busy_attempts <= 0
+            self.busy_attempts -= 1
+            return SimpleNamespace(scalar=lambda: acquired)
+        rows = self.reservations
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: rows))
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def test_lock_key_is_stable_per_therapist():
+    therapist_id = uuid4()
+
+    key = therapist_lock_key(therapist_id)
+
+    assert key == therapist_lock_key(str(therapist_id))
+    assert key != therapist_lock_key(uuid4())
+    assert -(2**63) <= key < 2**63
+
+
+@pytest.mark.asyncio
+async def test_acquire_takes_transaction_advisory_lock_on_postgres():
+    therapist_id = uuid4()
+    session = _LockSession("postgresql")
+
+    assert await acquire_therapist_lock(session, therapist_id) is True
+
+    ((lock_sql, lock_params),) = session.executed
+    assert "pg_try_advisory_xact_lock" in lock_sql
+    assert "lock_timeout" not in lock_sql
+    assert lock_params == {"key": therapist_lock_key(therapist_id)}
+
+
+@pytest.mark.asyncio
+async def test_acquire_retries_while_busy_then_gives_up(monkeypatch):
+    monkeypatch.setattr(locks_module.settings, "reservation_lock_timeout_ms", 1000)
+    session = _LockSession("postgresql", busy_attempts=2)
+
+    assert await acquire_therapist_lock(session, uuid4()) is True
+    assert len(session.executed) == 3
+
+    monkeypatch.setattr(locks_module.settings, "reservation_lock_timeout_ms", 30)
+    busy = _LockSession("postgresql", busy_attempts=10**6)
+    with pytest.raises(TherapistLockTimeout):
+        await acquire_therapist_lock(busy, uuid4())
+    assert busy.rollbacks == 0
+
+
+@pytest.mark.asyncio
+async def test_acquire_is_a_noop_without_postgres():
+    session = _LockSession("sqlite")
+
+    assert await acquire_therapist_lock(session, uuid4()) is False
+    assert session.executed == []
+
+
+@pytest.mark.asyncio
+async def test_overlap_check_fails_closed_when_lock_times_out(monkeypatch):
+    monkeypatch.setattr(locks_module.settings, "reservation_lock_timeout_ms", 20)
+    session = _LockSession("postgresql", busy_attempts=10**6)
+    start_at = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+    overlapping = await has_overlapping_reservation(
+        session, uuid4(), start_at, start_at + timedelta(hours=1), lock=True
+    )
+
+    assert overlapping is True
+    # Only the savepoint is rolled back; the caller's transaction survives.
+    assert session.savepoints == ["rolled_back"]
+    assert session.rollbacks == 0
+    assert not any("guest_reservations" in sql for sql, _ in session.executed)
+
+
+@pytest.mark.asyncio
+async def test_overlap_check_keeps_lock_only_when_slot_is_free():
+    start_at = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+    end_at = start_at + timedelta(hours=1)
+    taken = SimpleNamespace(status="confirmed", start_at=start_at, end_at=end_at)
+
+    busy = _LockSession("postgresql", reservations=[taken])
+    assert (
+        await has_overlapping_reservation(busy, uuid4(), start_at, end_at, lock=True)
+        is True
+    )
+    # Rolling the savepoint back releases the lock of a rejected candidate.
+    assert busy.savepoints == ["rolled_back"]
+
+    free = _LockSession("postgresql")
+    assert (
+        await has_overlapping_reservation(free, uuid4(), start_at, end_at, lock=True)
+        is False
+    )
+    assert free.savepoints == ["kept"]
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import uuid
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import therapist_features
+from app.services.therapist_features import (
+    FEATURE_NAMES,
+    FeatureStoreLoader,
+    FeatureTable,
+    TherapistFeatures,
+    compute_therapist_features,
+    enrich_candidates,
+)
+
+SHOP = uuid.uuid4()
+KNOWN = uuid.uuid4()
+UNKNOWN = uuid.uuid4()
+TODAY = date(2025, 3, 31)
+GENERATION = datetime(2025, 3, 31, 3, 0, tzinfo=timezone.utc)
+
+
+def _row(therapist_id, **overrides):
+    values = TherapistFeatures(**overrides).as_dict()
+    return SimpleNamespace(therapist_id=therapist_id, **values)
+
+
+def _table(*rows, generation=GENERATION):
+    return FeatureTable.from_rows(rows, generation=generation)
+
+
+def test_table_returns_defaults_for_unknown_therapists():
+    table = _table(_row(KNOWN, total_bookings_30d=12, utilization_7d=0.75))
+
+    columns = table.take([KNOWN, UNKNOWN, None])
+
+    assert set(columns) == set(FEATURE_NAMES)
+    assert columns["total_bookings_30d"] == [12, 0, 0]
+    assert columns["utilization_7d"][0] == pytest.approx(0.75)
+    assert columns["days_since_first_shift"] == [365, 365, 365]
+    assert table.get(UNKNOWN) is None
+    assert table.get(KNOWN).total_bookings_30d == 12
+    assert table.features_for([UNKNOWN]) == [TherapistFeatures()]
+    assert len(table) == 1 and KNOWN in table
+
+
+def test_enrich_candidates_keeps_request_values(monkeypatch):
+    monkeypatch.setattr(
+        therapist_features,
+        "_table",
+        _table(_row(KNOWN, total_bookings_30d=7, availability_score=0.9)),
+    )
+    known = {"therapist_id": str(KNOWN), "total_bookings_30d": 3}
+    unknown = {"therapist_id": str(UNKNOWN)}
+    invalid = {"id": "not-a-uuid"}
+
+    enrich_candidates([known, unknown, invalid])
+
+    assert known["total_bookings_30d"] == 3
+    assert known["days_since_first_shift"] == 365
+    # Availability is computed per request from the requested slot
+    assert "availability_score" not in known
+    assert unknown == {"therapist_id": str(UNKNOWN)}
+    assert invalid == {"id": "not-a-uuid"}
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _QueueSession:
+    def __init__(self, *results):
+        self._results = list(results)
+
+    async def execute(self, stmt):
+        return _Result(self._results.pop(0))
+
+
+@pytest.mark.asyncio
+async def test_compute_derives_ratios_and_tenure():
+    fresh = uuid.uuid4()
+    session = _QueueSession(
+        [(KNOWN, SHOP), (fresh, SHOP)],
+        # confirmed, repeats, booked/shift past week, booked/shift next week
+        [(KNOWN, 10, 4, 300, 600, 120, 480)],
+        [(KNOWN, date(2025, 1, 1))],
+        [(SHOP, 18, 4)],
+    )
+
+    rows = await compute_therapist_features(session, today=TODAY)
+
+    by_id = {row["therapist_id"]: row for row in rows}
+    known = by_id[KNOWN]
+    assert known["shop_id"] == SHOP
+    assert known["total_bookings_30d"] == 10
+    assert known["repeat_rate_30d"] == pytest.approx(0.4)
+    assert known["utilization_7d"] == pytest.approx(0.5)
+    assert known["availability_score"] == pytest.approx(0.75)
+    assert known["avg_review_score"] == pytest.approx(4.5)
+    assert known["days_since_first_shift"] == 89
+
+    blank = by_id[fresh]
+    assert blank["total_bookings_30d"] == 0
+    assert blank["utilization_7d"] == 0.0
+    assert blank["availability_score"] == 0.0
+    assert blank["days_since_first_shift"] == 365
+
+
+class _LoaderSession:
+    def __init__(self, generation, rows):
+        self.generation = generation
+        self.rows = rows
+        self.loads = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def scalar(self, stmt):
+        return self.generation
+
+    async def execute(self, stmt):
+        self.loads += 1
+        return _Result(self.rows)
+
+
+@pytest.mark.asyncio
+async def test_loader_swaps_table_only_on_new_generation(monkeypatch):
+    monkeypatch.setattr(therapist_features, "_table", FeatureTable.empty())
+    row = _row(KNOWN, total_bookings_30d=5)
+    row.computed_at = GENERATION
+    session = _LoaderSession(GENERATION, [row])
+    loader = FeatureStoreLoader(lambda: session)
+
+    assert await loader.tick() is True
+    table = therapist_features.get_feature_table()
+    assert table.generation == GENERATION
+    assert table.get(KNOWN).total_bookings_30d == 5
+
+    assert await loader.tick() is False
+    assert session.loads == 1
+    assert therapist_features.get_feature_table() is table
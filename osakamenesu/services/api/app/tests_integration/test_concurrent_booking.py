@@ -3,20 +3,27 @@ Concurrent booking tests to verify race condition prevention.
 
 These tests verify that:
 1. Only one reservation succeeds when two concurrent requests target the same slot
-2. SELECT FOR UPDATE properly locks rows to prevent double booking
+2. Per-therapist advisory locks prevent double booking
 3. Room capacity limits are enforced under concurrent load
 
+``test_booking_load_reports_throughput_and_conflicts`` doubles as a load-test
+harness: it prints bookings/sec and the conflict rate for
+OSAKAMENESU_LOAD_CLIENTS concurrent clients spread over
+OSAKAMENESU_LOAD_THERAPISTS therapists (run with ``-s`` to see the report).
+
 Requires: OSAKAMENESU_INTEGRATION_DB=1 and a running PostgreSQL instance.
 """
 
 import asyncio
 import os
+import time
 import uuid
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
 import pytest
 import pytest_asyncio
-from sqlalchemy import delete, text
+from sqlalchemy import delete, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Clear environment to ensure test isolation
@@ -423,3 +430,194 @@ async def test_high_concurrency_stress():
 
     finally:
         await _cleanup_test_data(session_factory, data, reservation_ids)
+
+
+LOAD_TEST_CLIENTS = int(os.getenv("OSAKAMENESU_LOAD_CLIENTS", "50"))
+LOAD_TEST_THERAPISTS = int(os.getenv("OSAKAMENESU_LOAD_THERAPISTS", "5"))
+LOAD_TEST_SLOT_HOURS = (10, 12, 14, 16)
+
+
+@dataclass
+class LoadTestReport:
+    """Outcome of one booking load-test run."""
+
+    clients: int
+    elapsed_seconds: float
+    bookings: int = 0
+    conflicts: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def bookings_per_second(self) -> float:
+        return self.bookings / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def conflict_rate(self) -> float:
+        return self.conflicts / self.clients if self.clients else 0.0
+
+    def format(self) -> str:
+        return (
+            f"clients={self.clients} bookings={self.bookings} "
+            f"conflicts={self.conflicts} errors={len(self.errors)} "
+            f"elapsed={self.elapsed_seconds:.3f}s "
+            f"bookings/sec={self.bookings_per_second:.1f} "
+            f"conflict_rate={self.conflict_rate:.1%}"
+        )
+
+
+async def _setup_load_test_data(session_factory, therapist_count: int) -> dict:
+    """Create one shop with ``therapist_count`` therapists on tomorrow's shift."""
+    profile_id = uuid.uuid4()
+    therapist_ids = [uuid.uuid4() for _ in range(therapist_count)]
+    tomorrow = (datetime.now(JST) + timedelta(days=1)).date()
+    day_start = datetime.combine(tomorrow, datetime.min.time(), tzinfo=JST)
+
+    try:
+        async with session_factory() as session:
+            session.add(
+                models.Profile(
+                    id=profile_id,
+                    name="Load Test Shop",
+                    room_count=therapist_count,
+                    buffer_minutes=0,
+                )
+            )
+            for index, therapist_id in enumerate(therapist_ids):
+                session.add(
+                    models.Therapist(
+                        id=therapist_id,
+                        profile_id=profile_id,
+                        name=f"Load Therapist {index}",
+                        status="published",
+                    )
+                )
+                session.add(
+                    models.TherapistShift(
+                        id=uuid.uuid4(),
+                        therapist_id=therapist_id,
+                        shop_id=profile_id,
+                        date=tomorrow,
+                        start_at=day_start + timedelta(hours=10),
+                        end_at=day_start + timedelta(hours=18),
+                        availability_status="available",
+                        break_slots=[],
+                    )
+                )
+            await session.commit()
+    except Exception as e:
+        pytest.skip(f"Database not available: {e}")
+
+    return {
+        "profile_id": profile_id,
+        "therapist_ids": therapist_ids,
+        "day_start": day_start,
+    }
+
+
+async def _cleanup_load_test_data(session_factory, data: dict) -> None:
+    async with session_factory() as session:
+        for model in (models.GuestReservation, models.TherapistShift):
+            await session.execute(
+                delete(model).where(model.shop_id == data["profile_id"])
+            )
+        await session.execute(
+            delete(models.Therapist).where(
+                models.Therapist.profile_id == data["profile_id"]
+            )
+        )
+        await session.execute(
+            delete(models.Profile).where(models.Profile.id == data["profile_id"])
+        )
+        await session.commit()
+
+
+async def run_booking_load_test(
+    session_factory, data: dict, *, clients: int
+) -> LoadTestReport:
+    """Fire ``clients`` concurrent bookings spread over therapists and slots.
+
+    Client ``i`` books therapist ``i % T`` at slot ``(i // T) % S``, so every
+    (therapist, slot) pair is contended by roughly ``clients / (T * S)``
+    clients and exactly one of them should win.
+    """
+    therapist_ids = data["therapist_ids"]
+    payloads = []
+    for i in range(clients):
+        therapist_id = therapist_ids[i % len(therapist_ids)]
+        slot = (i // len(therapist_ids)) % len(LOAD_TEST_SLOT_HOURS)
+        hour = LOAD_TEST_SLOT_HOURS[slot]
+        payloads.append(
+            {
+                "shop_id": str(data["profile_id"]),
+                "therapist_id": str(therapist_id),
+                "start_at": (data["day_start"] + timedelta(hours=hour)).isoformat(),
+                "duration_minutes": 60,
+                "contact_info": {"name": f"Load User {i}", "phone": "090-0000-0000"},
+            }
+        )
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            _create_reservation_task(session_factory, payload, i)
+            for i, payload in enumerate(payloads)
+        ),
+        return_exceptions=True,
+    )
+    report = LoadTestReport(
+        clients=clients, elapsed_seconds=time.perf_counter() - started
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            report.errors.append(repr(result))
+        elif result["success"]:
+            report.bookings += 1
+        elif "overlap_existing_reservation" in result["rejected_reasons"]:
+            report.conflicts += 1
+        else:
+            report.errors.append(",".join(result["rejected_reasons"]))
+    return report
+
+
+@pytest.mark.asyncio
+async def test_booking_load_reports_throughput_and_conflicts():
+    """
+    Load test: N concurrent clients over several therapists.
+    Every contended slot is booked exactly once and nobody is double-booked.
+    """
+    clients = LOAD_TEST_CLIENTS
+    engine = create_async_engine(
+        settings.database_url,
+        pool_size=min(clients, 50),
+        max_overflow=0,
+        pool_timeout=60,
+    )
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    data = await _setup_load_test_data(session_factory, LOAD_TEST_THERAPISTS)
+
+    try:
+        report = await run_booking_load_test(session_factory, data, clients=clients)
+        print(f"\nbooking load test: {report.format()}")
+
+        contended_slots = min(
+            clients, len(data["therapist_ids"]) * len(LOAD_TEST_SLOT_HOURS)
+        )
+        assert report.errors == []
+        assert report.bookings == contended_slots
+        assert report.conflicts == clients - contended_slots
+
+        async with session_factory() as session:
+            rows = (
+                await session.execute(
+                    select(
+                        models.GuestReservation.therapist_id,
+                        models.GuestReservation.start_at,
+                    ).where(models.GuestReservation.shop_id == data["profile_id"])
+                )
+            ).all()
+        assert len(rows) == len(set(rows)), "therapist double-booked"
+    finally:
+        await _cleanup_load_test_data(session_factory, data)
+        await engine.dispose()
@@ -0,0 +1,175 @@
+"""
+Dashboard reservation search on a large shop.
+
+Seeds one shop with OSAKAMENESU_SEARCH_ROWS reservations (100k by default),
+then checks that name, email and phone searches run through the search
+indexes instead of scanning the shop's history, and prints their timings next
+to the old ``ILIKE '%q%'`` filter (run with ``-s`` to see the report).
+
+Requires: OSAKAMENESU_INTEGRATION_DB=1 and a PostgreSQL database migrated to
+head (pg_trgm available).
+"""
+
+import json
+import os
+import time
+import uuid
+
+import pytest
+from sqlalchemy import delete, or_, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+for key in [
+    "PROJECT_NAME",
+    "POSTGRES_USER",
+    "POSTGRES_PASSWORD",
+    "POSTGRES_DB",
+    "POSTGRES_HOST",
+    "POSTGRES_PORT",
+]:
+    os.environ.pop(key, None)
+    os.environ.pop(key.lower(), None)
+
+from app import models
+from app.domains.dashboard.reservations.router import _search_filter
+from app.settings import settings
+
+os.environ.setdefault("ANYIO_BACKEND", "asyncio")
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(
+        not os.getenv("OSAKAMENESU_INTEGRATION_DB"),
+        reason="requires OSAKAMENESU_INTEGRATION_DB=1",
+    ),
+]
+
+SEED_ROWS = int(os.getenv("OSAKAMENESU_SEARCH_ROWS", "100000"))
+
+# Search columns are written as the mapper events would: folded name, phone
+# digits, lower-cased email.
+SEED_SQL = text("""
+    INSERT INTO guest_reservations (
+        id, shop_id, start_at, end_at, status, channel, customer_name,
+        customer_phone, customer_email, notes, created_at, updated_at,
+        customer_phone_digits, search_text
+    )
+    SELECT
+        gen_random_uuid(), :shop_id,
+        now() - (i || ' minutes')::interval,
+        now() - (i || ' minutes')::interval + interval '1 hour',
+        'confirmed', 'web',
+        'ヤマダ' || i,
+        '090-' || lpad((i % 10000)::text, 4, '0') || '-' || lpad(i::text, 4, '0'),
+        'Guest' || i || '@Example.com',
+        CASE WHEN i % 50 = 0 THEN '常連' ELSE NULL END,
+        now() - (i || ' minutes')::interval,
+        now(),
+        '090' || lpad((i % 10000)::text, 4, '0') || lpad(i::text, 4, '0'),
+        'やまだ' || i || E'\\n090' || lpad((i % 10000)::text, 4, '0')
+            || lpad(i::text, 4, '0') || E'\\nguest' || i || '@example.com'
+            || CASE WHEN i % 50 = 0 THEN E'\\n常連' ELSE '' END
+    FROM generate_series(1, :rows) AS i
+    """)
+
+
+def _legacy_filter(query: str):
+    pattern = f"%{query}%"
+    reservation = models.GuestReservation
+    return or_(
+        reservation.customer_name.ilike(pattern),
+        reservation.customer_phone.ilike(pattern),
+        reservation.customer_email.ilike(pattern),
+        reservation.notes.ilike(pattern),
+    )
+
+
+def _page(shop_id: uuid.UUID, clause):
+    reservation = models.GuestReservation
+    return (
+        select(reservation.id)
+        .where(reservation.shop_id == shop_id, clause)
+        .order_by(reservation.created_at.desc(), reservation.id.desc())
+        .limit(21)
+    )
+
+
+def _scans(plan: dict) -> set[str]:
+    found = {f"{plan.get('Node Type')}:{plan.get('Index Name', '')}"}
+    for child in plan.get("Plans", []):
+        found |= _scans(child)
+    return found
+
+
+async def _explain(session: AsyncSession, stmt) -> tuple[float, set[str]]:
+    compiled = stmt.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    started = time.perf_counter()
+    result = await session.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}"))
+    elapsed = (time.perf_counter() - started) * 1000
+    raw = result.scalar_one()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+    return elapsed, _scans(plan)
+
+
+@pytest.mark.asyncio
+async def test_search_uses_indexes_on_a_large_shop():
+    engine = create_async_engine(settings.database_url, future=True)
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    shop_id = uuid.uuid4()
+    try:
+        async with session_factory() as session:
+            session.add(
+                models.Profile(
+                    id=shop_id,
+                    name="Search Bench Shop",
+                    area="難波",
+                    price_min=10000,
+                    price_max=20000,
+                    bust_tag="C",
+                )
+            )
+            await session.commit()
+            await session.execute(SEED_SQL, {"shop_id": shop_id, "rows": SEED_ROWS})
+            await session.execute(text("ANALYZE guest_reservations"))
+            await session.commit()
+    except Exception as exc:
+        await engine.dispose()
+        pytest.skip(f"Database not available: {exc}")
+
+    queries = {
+        "name": ("やまだ12345", "ヤマダ12345"),
+        "email": ("guest777@example", "Guest777@Example"),
+        "phone_prefix": ("090-1234", "090-1234"),
+        "notes": ("常連", "常連"),
+    }
+    try:
+        async with session_factory() as session:
+            print(f"\nreservation search on {SEED_ROWS} rows (ms, indexed vs ILIKE)")
+            for label, (query, legacy_query) in queries.items():
+                indexed_ms, scans = await _explain(
+                    session, _page(shop_id, _search_filter(query))
+                )
+                legacy_ms, _ = await _explain(
+                    session, _page(shop_id, _legacy_filter(legacy_query))
+                )
+                print(f"  {label:13s} {indexed_ms:8.1f} {legacy_ms:8.1f}  {scans}")
+                assert not any(scan.startswith("Seq Scan") for scan in scans), (
+                    f"{label} search scanned the table: {scans}"
+                )
+    finally:
+        async with session_factory() as session:
+            await session.execute(
+                delete(models.GuestReservation).where(
+                    models.GuestReservation.shop_id == shop_id
+                )
+            )
+            await session.execute(
+                delete(models.Profile).where(models.Profile.id == shop_id)
+            )
+            await session.commit()
+        await engine.dispose()
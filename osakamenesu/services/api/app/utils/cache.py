@@ -63,6 +63,37 @@ class TTLCache:
 
             self._cache[key] = (time.time() + self._ttl, value)
 
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Get all live entries for ``keys`` under a single lock acquisition."""
+        now = time.time()
+        found: dict[str, Any] = {}
+        async with self._lock:
+            for key in keys:
+                entry = self._cache.get(key)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if now > expires_at:
+                    del self._cache[key]
+                    continue
+                found[key] = value
+        return found
+
+    async def set_many(self, items: dict[str, Any]) -> None:
+        """Set several values with the same TTL under a single lock acquisition."""
+        async with self._lock:
+            expires_at = time.time() + self._ttl
+            overflow = len(self._cache) + len(items) - self._max_size
+            if overflow > 0:
+                self._evict_expired()
+                overflow = len(self._cache) + len(items) - self._max_size
+                if overflow > 0:
+                    oldest = sorted(self._cache, key=lambda k: self._cache[k][0])
+                    for key in oldest[:overflow]:
+                        del self._cache[key]
+            for key, value in items.items():
+                self._cache[key] = (expires_at, value)
+
     async def get_or_set(self, key: str, fetch_fn: Callable[[], Any]) -> Any:
         """Get from cache or fetch and cache the result."""
         hit, value = await self.get(key)
@@ -119,6 +150,25 @@ therapist_cache = TTLCache(ttl_seconds=180, max_size=1000)  # 3 min
 availability_cache = TTLCache(
     ttl_seconds=60, max_size=500
 )  # 1 min (changes frequently)
+therapist_slots_cache = TTLCache(
+    ttl_seconds=60, max_size=10000
+)  # 1 min, one entry per therapist-day
+
+
+def therapist_slots_cache_key(therapist_id: Any, day: Any) -> str:
+    """Key of one therapist-day in :data:`therapist_slots_cache`."""
+    return f"therapist_slots:{therapist_id}:{day.isoformat()}"
+
+
+async def invalidate_therapist_slots(therapist_id: Any) -> int:
+    """Drop every cached day of a therapist's open slots.
+
+    A reservation or shift can shift slots on neighbouring days too (buffers,
+    shifts crossing midnight), so all of the therapist's days are dropped.
+    """
+    return await therapist_slots_cache.invalidate_prefix(
+        f"therapist_slots:{therapist_id}:"
+    )
 
 
 def ttl_cache(
@@ -0,0 +1,87 @@
+"""Minimal JSON Patch (RFC 6902) diffing for audit logs.
+
+Only ``add``, ``remove`` and ``replace`` operations are produced.  Objects
+are diffed key by key and lists element by element, so editing one menu or
+review yields a few small operations instead of a full document.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any
+
+JsonPatch = list[dict[str, Any]]
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(before: Any, after: Any) -> JsonPatch:
+    """Return the operations turning ``before`` into ``after``."""
+    ops: JsonPatch = []
+    _diff(before, after, "", ops)
+    return ops
+
+
+def _diff(before: Any, after: Any, path: str, ops: JsonPatch) -> None:
+    if isinstance(before, dict) and isinstance(after, dict):
+        for key in before:
+            if key not in after:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(str(key))}"})
+        for key, value in after.items():
+            child = f"{path}/{_escape(str(key))}"
+            if key not in before:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                _diff(before[key], value, child, ops)
+        return
+    if isinstance(before, list) and isinstance(after, list):
+        common = min(len(before), len(after))
+        for index in range(common):
+            _diff(before[index], after[index], f"{path}/{index}", ops)
+        for index in range(common, len(after)):
+            ops.append({"op": "add", "path": f"{path}/{index}", "value": after[index]})
+        # Remove from the end so earlier indices stay valid.
+        for index in range(len(before) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{index}"})
+        return
+    if before != after or type(before) is not type(after):
+        ops.append({"op": "replace", "path": path, "value": after})
+
+
+def apply_patch(document: Any, patch: JsonPatch) -> Any:
+    """Apply ``patch`` to a copy of ``document`` and return the result."""
+    result = copy.deepcopy(document)
+    for op in patch:
+        path = op["path"]
+        if path == "":
+            if op["op"] == "remove":
+                result = None
+            else:
+                result = copy.deepcopy(op["value"])
+            continue
+        *parents, last = [_unescape(token) for token in path.split("/")[1:]]
+        target = result
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        if isinstance(target, list):
+            index = len(target) if last == "-" else int(last)
+            if op["op"] == "add":
+                target.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del target[index]
+            else:
+                target[index] = copy.deepcopy(op["value"])
+        elif op["op"] == "remove":
+            target.pop(last, None)
+        else:
+            target[last] = copy.deepcopy(op["value"])
+    return result
+
+
+__all__ = ["JsonPatch", "apply_patch", "make_patch"]
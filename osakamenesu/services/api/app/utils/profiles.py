@@ -336,25 +336,9 @@ def infer_store_name(
     return None
 
 
-def build_profile_doc(
-    profile: models.Profile,
-    *,
-    today: bool = False,
-    tag_score: float = 0.0,
-    ctr7d: float = 0.0,
-    outlinks: Optional[Iterable[models.Outlink]] = None,
-) -> dict:
-    """Build a search document for Meilisearch based on a Profile model.
-
-    Centralizes field normalization and derived attributes.
-    """
-    height_cm, age = infer_height_age(profile)
-    store_name = infer_store_name(profile, outlinks)
-    try:
-        contact_json = profile.contact_json or {}
-    except Exception:
-        contact_json = {}
-
+def _collect_promotions(
+    profile: models.Profile, contact_json: dict
+) -> list[dict[str, Any]]:
     promotions: list[dict[str, Any]] = []
     for source in (profile.discounts or [], contact_json.get("promotions")):
         if not isinstance(source, list):
@@ -373,7 +357,29 @@ def build_profile_doc(
                     "highlight": entry.get("highlight"),
                 }
             )
+    return promotions
+
+
+def build_profile_doc(
+    profile: models.Profile,
+    *,
+    today: bool = False,
+    tag_score: float = 0.0,
+    ctr7d: float = 0.0,
+    outlinks: Optional[Iterable[models.Outlink]] = None,
+) -> dict:
+    """Build a search document for Meilisearch based on a Profile model.
+
+    Centralizes field normalization and derived attributes.
+    """
+    height_cm, age = infer_height_age(profile)
+    store_name = infer_store_name(profile, outlinks)
+    try:
+        contact_json = profile.contact_json or {}
+    except Exception:
+        contact_json = {}
 
+    promotions = _collect_promotions(profile, contact_json)
     price_band_key, price_band_label = _compute_price_band(
         profile.price_min, profile.price_max
     )
@@ -2,32 +2,140 @@ from __future__ import annotations
 
 import asyncio
 import time
-import uuid
 import logging
-from collections import deque
-from typing import Deque, Dict, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
 
 from redis.asyncio import Redis
 from redis.exceptions import RedisError
 
 
-class RateLimiter:
-    """Sliding-window rate limiter with optional Redis backend."""
+# GCRA (generic cell rate algorithm) over one or more keys, evaluated in a
+# single round trip.  Each key stores only its theoretical arrival time (TAT)
+# in milliseconds.  When every key admits the request all TATs advance;
+# otherwise only keys flagged "always consume" that admitted it advance (so
+# an abuse tier counts rejected attempts too) and the index of the first
+# rejecting key is returned.
+#
+# KEYS[i]      : rate limit key for rule i
+# ARGV[1]      : current time (ms)
+# ARGV[3i - 1] : emission interval of rule i (ms)
+# ARGV[3i]     : window of rule i (ms)
+# ARGV[3i + 1] : 1 when rule i is charged on every attempt, else 0
+# returns      : {rejected_index (0-based, -1 when allowed), retry_after_ms}
+GCRA_LUA = """
+local now = tonumber(ARGV[1])
+local rejected = -1
+local retry_after = 0
+local new_tats = {}
+for i = 1, #KEYS do
+  local interval = tonumber(ARGV[i * 3 - 1])
+  local window = tonumber(ARGV[i * 3])
+  local tat = tonumber(redis.call('GET', KEYS[i]))
+  if not tat or tat < now then
+    tat = now
+  end
+  local new_tat = tat + interval
+  local allow_at = new_tat - window
+  if now < allow_at then
+    if rejected < 0 then
+      rejected = i - 1
+      retry_after = math.ceil(allow_at - now)
+    end
+    new_tats[i] = false
+  else
+    new_tats[i] = new_tat
+  end
+end
+for i = 1, #KEYS do
+  if new_tats[i] and (rejected < 0 or ARGV[i * 3 + 1] == '1') then
+    redis.call('SET', KEYS[i], math.ceil(new_tats[i]), 'PX', math.ceil(new_tats[i] - now))
+  end
+end
+return {rejected, retry_after}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """``max_events`` per ``window_sec`` for one key.
+
+    ``always_consume`` charges the key on every attempt it admits, even when
+    another key in the same check rejects the request.
+    """
+
+    max_events: int
+    window_sec: float
+    always_consume: bool = False
+
+    @property
+    def emission_interval_ms(self) -> float:
+        return self.window_sec * 1000.0 / self.max_events
+
+    @property
+    def window_ms(self) -> float:
+        return self.window_sec * 1000.0
+
+
+@dataclass(frozen=True)
+class RateLimitTier(RateLimitRule):
+    """Named rule checked by :class:`MultiTierRateLimiter`."""
+
+    name: str = ""
+
+
+class LocalGCRAStore:
+    """In-process GCRA state bounded by an LRU of ``max_keys`` entries."""
+
+    def __init__(self, max_keys: int = 10_000) -> None:
+        self.max_keys = max(1, max_keys)
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def check(
+        self, now_ms: float, entries: Sequence[Tuple[str, RateLimitRule]]
+    ) -> Tuple[int, float]:
+        rejected, retry_ms = -1, 0.0
+        new_tats: list[Optional[float]] = []
+        for index, (key, rule) in enumerate(entries):
+            tat = max(self._tats.get(key, now_ms), now_ms)
+            new_tat = tat + rule.emission_interval_ms
+            allow_at = new_tat - rule.window_ms
+            if now_ms < allow_at:
+                if rejected < 0:
+                    rejected, retry_ms = index, allow_at - now_ms
+                new_tats.append(None)
+            else:
+                new_tats.append(new_tat)
+
+        for (key, rule), new_tat in zip(entries, new_tats):
+            if new_tat is None or (rejected >= 0 and not rule.always_consume):
+                continue
+            self._tats[key] = new_tat
+            self._tats.move_to_end(key)
+        while len(self._tats) > self.max_keys:
+            self._tats.popitem(last=False)
+        return rejected, retry_ms
+
+
+class _GCRALimiterBase:
+    """Shared Redis/local plumbing for GCRA limiters."""
 
     def __init__(
         self,
-        max_events: int,
-        window_sec: float,
         redis_client: Optional[Redis] = None,
         namespace: str = "rate",
         redis_error_cooldown: float = 5.0,
         logger: Optional[logging.Logger] = None,
+        local_max_keys: int = 10_000,
     ) -> None:
-        self.max_events = max_events
-        self.window = window_sec
         self.redis = redis_client
         self.namespace = namespace.rstrip(":") + ":"
-        self._events: Dict[str, Deque[float]] = {}
+        self._local = LocalGCRAStore(max_keys=local_max_keys)
+        self._script = redis_client.register_script(GCRA_LUA) if redis_client else None
         self.redis_error_cooldown = max(0.0, redis_error_cooldown)
         self._redis_disabled_until = 0.0
         self._logger = logger or logging.getLogger(__name__)
@@ -37,17 +145,18 @@ class RateLimiter:
         if self.redis:
             await self.redis.close()
 
-    async def allow(self, key: str) -> Tuple[bool, float]:
-        if self.redis:
-            now = time.time()
-            if now < self._redis_disabled_until:
-                return self._allow_memory(key)
+    async def _check(
+        self, entries: Sequence[Tuple[str, RateLimitRule]]
+    ) -> Tuple[int, float]:
+        """Return ``(rejected_index, retry_after_sec)``; index is -1 when allowed."""
+        now = time.time()
+        if self._script is not None and now >= self._redis_disabled_until:
             try:
-                allowed, retry = await self._allow_redis(key)
+                result = await self._check_redis(now, entries)
                 if self._redis_disabled_until and self._logger:
                     self._logger.info("Rate limiter redis backend recovered")
                 self._redis_disabled_until = 0.0
-                return allowed, retry
+                return result
             except asyncio.CancelledError:
                 raise
             except RedisError as exc:
@@ -56,52 +165,102 @@ class RateLimiter:
                 if self._logger and now - self._last_warning_at >= 5.0:
                     self._logger.warning("Rate limiter falling back to memory: %s", exc)
                     self._last_warning_at = now
-                return self._allow_memory(key)
             except Exception as exc:  # pragma: no cover - defensive catch-all
                 if self.redis_error_cooldown:
                     self._redis_disabled_until = now + self.redis_error_cooldown
                 if self._logger and now - self._last_warning_at >= 5.0:
                     self._logger.warning("Rate limiter unexpected redis error: %s", exc)
                     self._last_warning_at = now
-                return self._allow_memory(key)
-        return self._allow_memory(key)
+        index, retry_ms = self._local.check(now * 1000.0, entries)
+        return index, retry_ms / 1000.0
+
+    async def _check_redis(
+        self, now: float, entries: Sequence[Tuple[str, RateLimitRule]]
+    ) -> Tuple[int, float]:
+        assert self._script is not None
+        keys = [f"{self.namespace}{key}" for key, _ in entries]
+        args: list[float] = [int(now * 1000)]
+        for _, rule in entries:
+            args.extend(
+                (rule.emission_interval_ms, rule.window_ms, int(rule.always_consume))
+            )
+        index, retry_ms = await self._script(keys=keys, args=args)
+        return int(index), max(0.0, int(retry_ms) / 1000.0)
 
-    def _allow_memory(self, key: str) -> Tuple[bool, float]:
-        now = time.time()
-        dq = self._events.setdefault(key, deque())
-        cutoff = now - self.window
-        while dq and dq[0] < cutoff:
-            dq.popleft()
-        if len(dq) >= self.max_events:
-            retry_after = max(0.0, self.window - (now - dq[0]))
-            return False, retry_after
-        dq.append(now)
-        return True, 0.0
-
-    async def _allow_redis(self, key: str) -> Tuple[bool, float]:
-        assert self.redis is not None
-        now = time.time()
-        redis_key = f"{self.namespace}{key}"
-        member = f"{now}:{uuid.uuid4()}"
-        min_score = now - self.window
-
-        pipeline = self.redis.pipeline()
-        pipeline.zremrangebyscore(redis_key, 0, min_score)
-        pipeline.zadd(redis_key, {member: now})
-        pipeline.zcard(redis_key)
-        pipeline.expire(redis_key, int(self.window) + 1)
-        _, _, count, _ = await pipeline.execute()
-
-        if count > self.max_events:
-            await self.redis.zrem(redis_key, member)
-            oldest = await self.redis.zrange(redis_key, 0, 0, withscores=True)
-            if oldest:
-                retry_after = max(0.0, self.window - (now - oldest[0][1]))
-            else:
-                retry_after = self.window
-            return False, retry_after
 
-        return True, 0.0
+class RateLimiter(_GCRALimiterBase):
+    """GCRA rate limiter with optional Redis backend.
+
+    Allows bursts of up to ``max_events`` and then one event every
+    ``window_sec / max_events`` seconds.  Redis keeps O(1) state per key and is
+    updated atomically by a Lua script; the local fallback is a bounded LRU.
+    """
+
+    def __init__(
+        self,
+        max_events: int,
+        window_sec: float,
+        redis_client: Optional[Redis] = None,
+        namespace: str = "rate",
+        redis_error_cooldown: float = 5.0,
+        logger: Optional[logging.Logger] = None,
+        local_max_keys: int = 10_000,
+    ) -> None:
+        super().__init__(
+            redis_client=redis_client,
+            namespace=namespace,
+            redis_error_cooldown=redis_error_cooldown,
+            logger=logger,
+            local_max_keys=local_max_keys,
+        )
+        self.max_events = max_events
+        self.window = window_sec
+        self._rule = RateLimitRule(max_events=max_events, window_sec=window_sec)
+
+    async def allow(self, key: str) -> Tuple[bool, float]:
+        index, retry_after = await self._check([(key, self._rule)])
+        return index < 0, retry_after
+
+
+class MultiTierRateLimiter(_GCRALimiterBase):
+    """Check several tiers for one key in a single atomic round trip."""
+
+    def __init__(
+        self,
+        tiers: Sequence[RateLimitTier],
+        redis_client: Optional[Redis] = None,
+        namespace: str = "rate",
+        redis_error_cooldown: float = 5.0,
+        logger: Optional[logging.Logger] = None,
+        local_max_keys: int = 10_000,
+    ) -> None:
+        super().__init__(
+            redis_client=redis_client,
+            namespace=namespace,
+            redis_error_cooldown=redis_error_cooldown,
+            logger=logger,
+            local_max_keys=local_max_keys,
+        )
+        self.tiers = tuple(tiers)
+
+    def tier(self, name: str) -> RateLimitTier:
+        for tier in self.tiers:
+            if tier.name == name:
+                return tier
+        raise KeyError(name)
+
+    async def allow(self, key: str) -> Tuple[bool, Optional[RateLimitTier], float]:
+        """Return ``(allowed, rejecting_tier, retry_after)``.
+
+        Tiers are consumed only when all of them admit the request, except
+        ``always_consume`` tiers, which count every attempt.  The key is
+        wrapped in a hash tag so all tier keys share a Redis Cluster slot.
+        """
+        entries = [(f"{{{key}}}:{tier.name}", tier) for tier in self.tiers]
+        index, retry_after = await self._check(entries)
+        if index < 0:
+            return True, None, 0.0
+        return False, self.tiers[index], retry_after
 
 
 def create_rate_limiter(
@@ -123,5 +282,22 @@ def create_rate_limiter(
     )
 
 
-async def shutdown_rate_limiter(limiter: RateLimiter) -> None:
+def create_multi_tier_rate_limiter(
+    tiers: Sequence[RateLimitTier],
+    redis_client: Optional[Redis],
+    namespace: str,
+    *,
+    redis_error_cooldown: float = 5.0,
+    logger: Optional[logging.Logger] = None,
+) -> MultiTierRateLimiter:
+    return MultiTierRateLimiter(
+        tiers=tiers,
+        redis_client=redis_client,
+        namespace=namespace,
+        redis_error_cooldown=redis_error_cooldown,
+        logger=logger,
+    )
+
+
+async def shutdown_rate_limiter(limiter: _GCRALimiterBase) -> None:
     await limiter.close()
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
+import re
+import unicodedata
 from typing import Any, Iterable, List, Optional
 
+# Katakana ァ..ヶ sit exactly 0x60 code points above hiragana ぁ..ゖ.
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+_WHITESPACE_RE = re.compile(r"\s+")
+_NON_DIGIT_RE = re.compile(r"\D")
+_PHONE_QUERY_RE = re.compile(r"[\d\s\-+()ー‐−]+")
+
 
 def strip_or_none(value: Optional[str]) -> Optional[str]:
     """Trim whitespace and convert empty strings to None."""
@@ -42,7 +50,41 @@ def normalize_contact_value(
     return None
 
 
+def fold_search_text(value: Optional[str]) -> str:
+    """Normalize text for search: NFKC width folding, lower case,
+    katakana folded to hiragana and whitespace removed."""
+    if not value:
+        return ""
+    folded = unicodedata.normalize("NFKC", value).lower()
+    folded = folded.translate(_KATAKANA_TO_HIRAGANA)
+    return _WHITESPACE_RE.sub("", folded)
+
+
+def phone_digits(value: Optional[str]) -> str:
+    """Digits of a phone number, with a +81 country code turned into 0."""
+    if not value:
+        return ""
+    normalized = unicodedata.normalize("NFKC", value).strip()
+    digits = _NON_DIGIT_RE.sub("", normalized)
+    if normalized.startswith("+81") and digits.startswith("81"):
+        digits = "0" + digits[2:]
+    return digits
+
+
+def looks_like_phone(value: Optional[str]) -> bool:
+    """True when ``value`` only holds phone digits and separators."""
+    if not value:
+        return False
+    normalized = unicodedata.normalize("NFKC", value).strip()
+    return bool(_PHONE_QUERY_RE.fullmatch(normalized)) and any(
+        ch.isdigit() for ch in normalized
+    )
+
+
 __all__ = [
+    "fold_search_text",
+    "looks_like_phone",
+    "phone_digits",
     "strip_or_none",
     "sanitize_strings",
     "sanitize_photo_urls",
@@ -0,0 +1,182 @@
+"""Run the search/availability/matching/booking benchmarks against local Postgres.
+
+Seeds the dataset, loads its search documents into the in-memory Meilisearch
+stand-in, runs the selected cases and compares them with the stored baseline
+(``benchmarks/baselines/<scale>.json``).  Exits with status 1 when a case
+regressed beyond the tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import create_engine
+from app.domains.admin.services.profile_indexing import build_profile_documents
+from app.monitoring.queries import install_query_tracking
+from app.settings import settings
+
+from .cases import build_cases
+from .dataset import SCALES, seed_dataset
+from .harness import (
+    compare,
+    format_results,
+    load_baseline,
+    run_case,
+    save_baseline,
+)
+from .meili_stub import InMemoryIndex, patched_search
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url",
+        default=settings.database_url,
+        help="Async SQLAlchemy URL; the database name must contain 'bench'",
+    )
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--shops", type=int, help="Override the scale's shop count")
+    parser.add_argument("--therapists-per-shop", type=int)
+    parser.add_argument("--days", type=int, help="Days of shifts ahead of today")
+    parser.add_argument("--reservations-per-therapist", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--cases", help="Comma-separated case names (default: all cases)"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="Baseline file (default: benchmarks/baselines/<scale>.json)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Write the results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed p95/allocation growth over the baseline (fraction)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Allow a database whose name does not contain 'bench'",
+    )
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace) -> int:
+    database = urlsplit(args.database_url).path.lstrip("/")
+    if "bench" not in database and not args.force:
+        print(
+            f"Refusing to seed {database!r}: seeding truncates the shop tables. "
+            "Use a database named *bench* or pass --force.",
+            file=sys.stderr,
+        )
+        return 2
+
+    overrides = {
+        name: getattr(args, name)
+        for name in (
+            "shops",
+            "therapists_per_shop",
+            "days",
+            "reservations_per_therapist",
+        )
+        if getattr(args, name) is not None
+    }
+    spec = dataclasses.replace(SCALES[args.scale], **overrides)
+    customized = bool(overrides) or args.seed != 42
+    baseline_path = args.baseline or BASELINE_DIR / f"{args.scale}.json"
+
+    engine = create_engine(args.database_url)
+    remove_tracking = install_query_tracking(engine)
+    try:
+        print(f"Seeding {spec} (seed={args.seed})...")
+        dataset = await seed_dataset(engine, spec, seed=args.seed)
+        print(f"  rows: {dataset.rows}")
+
+        session_factory = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        async with session_factory() as db:
+            documents = await build_profile_documents(
+                db=db, profile_ids=dataset.shop_ids
+            )
+        cases = build_cases(session_factory, dataset)
+        selected = list(cases)
+        if args.cases:
+            selected = [name.strip() for name in args.cases.split(",") if name.strip()]
+            unknown = sorted(set(selected) - set(cases))
+            if unknown:
+                print(f"Unknown cases: {', '.join(unknown)}", file=sys.stderr)
+                return 2
+
+        results = []
+        with patched_search(InMemoryIndex(documents)):
+            for name in selected:
+                print(f"  running {name}...")
+                results.append(
+                    await run_case(
+                        cases[name], iterations=args.iterations, warmup=args.warmup
+                    )
+                )
+    finally:
+        remove_tracking()
+        await engine.dispose()
+
+    baseline = None
+    if not args.save_baseline and baseline_path.exists():
+        baseline = load_baseline(baseline_path)
+    print()
+    print(format_results(results, baseline))
+
+    if args.save_baseline:
+        if customized and args.baseline is None:
+            print(
+                "Not saving: the dataset differs from the scale's defaults; "
+                "pass --baseline to store it elsewhere.",
+                file=sys.stderr,
+            )
+            return 2
+        save_baseline(
+            baseline_path,
+            results,
+            meta={
+                "scale": args.scale,
+                "iterations": args.iterations,
+                "warmup": args.warmup,
+                **dataset.describe(),
+            },
+        )
+        print(f"\nBaseline written to {baseline_path}")
+        return 0
+
+    if baseline is None:
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline first.")
+        return 0
+    regressions = compare(results, baseline, tolerance=args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {baseline_path}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions against {baseline_path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
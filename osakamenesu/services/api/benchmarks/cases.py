@@ -0,0 +1,137 @@
+"""Benchmark cases: the service functions behind the hot read and write paths.
+
+Each call opens its own session, as a request would.  Inputs rotate through
+the seeded shops and therapists in a fixed order so runs are comparable and
+no single row stays hot in Postgres' buffers.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+from datetime import timedelta
+from typing import Callable, Iterator, TypeVar
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import models
+from app.domains.site.guest_matching.router import guest_matching_search
+from app.domains.site.guest_matching.schemas import GuestMatchingRequest
+from app.domains.site.guest_reservations.service import create_guest_reservation
+from app.domains.site.services.shop.search_service import (
+    _derive_next_availability_from_slots_sot,
+    _search_shops_impl,
+)
+from app.domains.site.services.shop_services import ShopDetailAssembler
+from app.domains.site.therapist_availability.service import list_availability_summary
+
+from .dataset import AREA_NAMES, BENCHMARK_NOTE, SeededDataset
+from .harness import BenchmarkCase
+
+T = TypeVar("T")
+
+# Therapists per _derive_next_availability_from_slots_sot call: one result page
+NEXT_AVAILABILITY_BATCH = 12
+
+
+def _rotation(values: list[T], seed: int) -> Iterator[T]:
+    shuffled = list(values)
+    random.Random(seed).shuffle(shuffled)
+    return itertools.cycle(shuffled)
+
+
+def build_cases(
+    session_factory: async_sessionmaker[AsyncSession], dataset: SeededDataset
+) -> dict[str, BenchmarkCase]:
+    seed = dataset.seed
+    today = dataset.today
+    areas = _rotation(list(AREA_NAMES), seed)
+    dates = _rotation([today + timedelta(days=n) for n in range(1, 8)], seed)
+    shops = _rotation(dataset.shop_ids, seed)
+    therapists = _rotation(dataset.therapist_ids, seed)
+    batches = _rotation(
+        [
+            dataset.therapist_ids[i : i + NEXT_AVAILABILITY_BATCH]
+            for i in range(0, len(dataset.therapist_ids), NEXT_AVAILABILITY_BATCH)
+        ],
+        seed,
+    )
+
+    async def search_shops() -> None:
+        async with session_factory() as db:
+            await _search_shops_impl(db, area=next(areas), sort="recommended")
+
+    async def search_shops_available_date() -> None:
+        async with session_factory() as db:
+            await _search_shops_impl(
+                db, area=next(areas), available_date=next(dates), sort="price_asc"
+            )
+
+    async def next_availability() -> None:
+        async with session_factory() as db:
+            await _derive_next_availability_from_slots_sot(db, next(batches))
+
+    async def availability_summary() -> None:
+        async with session_factory() as db:
+            await list_availability_summary(
+                db, next(therapists), today, today + timedelta(days=6)
+            )
+
+    async def guest_matching() -> None:
+        payload = GuestMatchingRequest(
+            area=next(areas),
+            date=next(dates).isoformat(),
+            time_from="18:00",
+            time_to="21:00",
+        )
+        async with session_factory() as db:
+            await guest_matching_search(payload=payload, db=db, _=None)
+
+    async def shop_detail() -> None:
+        async with session_factory() as db:
+            await ShopDetailAssembler(db).get_detail(next(shops))
+
+    booking_start = f"{(today + timedelta(days=1)).isoformat()}T18:00:00+09:00"
+
+    async def create_reservation() -> None:
+        payload = {
+            "shop_id": str(dataset.booking_shop_id),
+            "therapist_id": str(dataset.booking_therapist_id),
+            "start_at": booking_start,
+            "duration_minutes": 90,
+            "notes": BENCHMARK_NOTE,
+            "contact_info": {"name": "ベンチ", "phone": "09000000000"},
+        }
+        async with session_factory() as db:
+            reservation, debug = await create_guest_reservation(db, payload)
+        if reservation is None:
+            raise RuntimeError(f"benchmark reservation rejected: {debug}")
+
+    async def delete_benchmark_reservations() -> None:
+        async with session_factory() as db:
+            await db.execute(
+                delete(models.GuestReservation).where(
+                    models.GuestReservation.notes == BENCHMARK_NOTE
+                )
+            )
+            await db.commit()
+
+    plain: list[Callable] = [
+        search_shops,
+        search_shops_available_date,
+        next_availability,
+        availability_summary,
+        guest_matching,
+        shop_detail,
+    ]
+    cases = {fn.__name__: BenchmarkCase(fn.__name__, fn) for fn in plain}
+    cases["create_reservation"] = BenchmarkCase(
+        "create_reservation",
+        create_reservation,
+        teardown=delete_benchmark_reservations,
+    )
+    return cases
+
+
+__all__ = ["build_cases"]
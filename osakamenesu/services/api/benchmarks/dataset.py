@@ -0,0 +1,630 @@
+"""Deterministic synthetic catalog for benchmarks, load tests and local dev.
+
+:func:`iter_catalog` generates one shop at a time: the profile, its
+therapists, a shift per working day (from a week ago to ``days`` ahead, so
+availability lookups see history as well as the future), reservations inside
+those shifts, reviews and the ``availabilities`` rows the slot sync would
+write.  The distributions follow what the production catalog looks like:
+areas weighted towards the big stations, log-normal prices, day/evening/
+overnight shift patterns with breaks on long shifts, busier Fridays,
+Saturdays and evenings, and review scores skewed towards 4-5.
+
+:func:`load_catalog` streams the shops into Postgres in batches with
+``COPY`` (asyncpg) or ``executemany`` on other drivers, so 10k+ shops load in
+minutes without holding the whole catalog in memory.  The same spec, seed and
+day always produce the same rows, UUIDs included.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from sqlalchemy import Table, insert, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.types import JSON
+
+from app import models
+from app.utils.datetime import JST
+
+# (area, nearest station, line, share of shops)
+AREAS = (
+    ("難波", "なんば", "御堂筋線", 0.22),
+    ("梅田", "梅田", "御堂筋線", 0.20),
+    ("心斎橋", "心斎橋", "長堀鶴見緑地線", 0.14),
+    ("天王寺", "天王寺", "谷町線", 0.10),
+    ("京橋", "京橋", "JR環状線", 0.10),
+    ("堺筋本町", "堺筋本町", "堺筋線", 0.08),
+    ("谷町九丁目", "谷町九丁目", "千日前線", 0.08),
+    ("十三", "十三", "阪急京都線", 0.08),
+)
+AREA_NAMES = tuple(area[0] for area in AREAS)
+BUST_TAGS = ("B", "C", "D", "E", "F", "G")
+BODY_TAGS = ("スレンダー", "グラマー", "小柄", "長身", "癒し系", "清楚", "ギャル")
+BADGES = ("人気", "新人", "高評価", "リピート率No.1")
+MOOD_TAGS = ("gentle", "energetic", "calm", "playful")
+STYLE_TAGS = ("soft", "firm", "balanced")
+LOOK_TYPES = ("cute", "elegant", "cool", "natural")
+TALK_LEVELS = ("chatty", "normal", "quiet")
+REVIEW_TITLES = ("また行きたい", "丁寧な施術", "リピート確定", "普通でした", "期待以下")
+REVIEW_BODIES = (
+    "受付から施術まで丁寧で、ゆっくり過ごせました。",
+    "駅から近くて通いやすいです。施術も満足でした。",
+    "指名したセラピストさんの会話が楽しかったです。",
+    "部屋が少し狭かったですが、施術は良かったです。",
+    "予約時間より待たされたのが残念でした。",
+)
+
+# Shift patterns: (weight, start hours, length in hours)
+SHIFT_PATTERNS = {
+    "day": (0.55, (10, 11, 12, 13, 14), (6, 7, 8, 9)),
+    "evening": (0.30, (17, 18, 19), (5, 6)),
+    "overnight": (0.15, (20, 21, 22), (6, 7, 8)),
+}
+# Chance of working on a given weekday (Monday first)
+WORK_RATE = (0.65, 0.65, 0.65, 0.7, 0.85, 0.85, 0.75)
+RESERVATION_DURATIONS = ((60, 0.3), (90, 0.5), (120, 0.2))
+# Reservation start times step by this much, so reservations never overlap
+RESERVATION_STEP = timedelta(minutes=150)
+REVIEW_SCORES = ((5, 0.45), (4, 0.35), (3, 0.12), (2, 0.05), (1, 0.03))
+HISTORY_DAYS = 7
+BENCHMARK_NOTE = "benchmark"
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    shops: int
+    # Averages; the per-shop and per-therapist counts vary around them
+    therapists_per_shop: int
+    days: int
+    reservations_per_therapist: int
+    reviews_per_shop: int = 8
+    # Days (from today) with precomputed ``availabilities`` rows
+    availability_days: int = 7
+
+
+SCALES: dict[str, DatasetSpec] = {
+    "small": DatasetSpec(
+        shops=20, therapists_per_shop=5, days=14, reservations_per_therapist=10
+    ),
+    "medium": DatasetSpec(
+        shops=200, therapists_per_shop=8, days=14, reservations_per_therapist=20
+    ),
+    "large": DatasetSpec(
+        shops=1000, therapists_per_shop=10, days=28, reservations_per_therapist=40
+    ),
+    "xlarge": DatasetSpec(
+        shops=10000,
+        therapists_per_shop=8,
+        days=14,
+        reservations_per_therapist=12,
+        availability_days=3,
+    ),
+}
+
+# Insert order: parents before the rows referencing them
+TABLES: dict[str, Table] = {
+    "profiles": models.Profile.__table__,
+    "therapists": models.Therapist.__table__,
+    "therapist_shifts": models.TherapistShift.__table__,
+    "guest_reservations": models.GuestReservation.__table__,
+    "reviews": models.Review.__table__,
+    "availabilities": models.Availability.__table__,
+}
+
+Bundle = dict[str, list[dict[str, Any]]]
+
+
+@dataclass
+class SeededDataset:
+    """Ids the benchmark cases pick their inputs from."""
+
+    spec: DatasetSpec
+    seed: int
+    today: date
+    shop_ids: list[uuid.UUID] = field(default_factory=list)
+    therapist_ids: list[uuid.UUID] = field(default_factory=list)
+    # Shop with unlimited rooms and an unbooked therapist for create_reservation
+    booking_shop_id: uuid.UUID | None = None
+    booking_therapist_id: uuid.UUID | None = None
+    rows: dict[str, int] = field(default_factory=lambda: dict.fromkeys(TABLES, 0))
+
+    def describe(self) -> dict[str, Any]:
+        return {"spec": asdict(self.spec), "seed": self.seed, "rows": self.rows}
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(day, time()).replace(tzinfo=JST) + timedelta(
+        hours=hour, minutes=minute
+    )
+
+
+def _weighted(rng: random.Random, choices: Iterable[tuple[Any, float]]) -> Any:
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _around(rng: random.Random, mean: float, minimum: int = 0) -> int:
+    """An integer near ``mean`` (normal, 30% spread)."""
+    return max(minimum, round(rng.gauss(mean, mean * 0.3)))
+
+
+def _weighted_sample(
+    rng: random.Random, items: list[Any], weights: list[float], k: int
+) -> list[Any]:
+    # Efraimidis-Spirakis: the k largest u ** (1 / w) without replacement
+    keyed = sorted(
+        zip((rng.random() ** (1 / w) for w in weights), range(len(items))),
+        reverse=True,
+    )
+    return [items[index] for _, index in keyed[:k]]
+
+
+def _profile_row(rng: random.Random, index: int, **overrides: Any) -> dict[str, Any]:
+    area, station, line = _weighted(rng, ((a[:3], a[3]) for a in AREAS))
+    price_min = min(30000, max(6000, int(round(rng.lognormvariate(9.3, 0.25), -3))))
+    row = {
+        "id": _uuid(rng),
+        "slug": f"gen-shop-{index:06d}",
+        "name": f"サンプル店舗 {index:06d}",
+        "area": area,
+        "price_min": price_min,
+        "price_max": price_min + rng.choice((3000, 5000, 8000, 12000)),
+        "bust_tag": rng.choice(BUST_TAGS),
+        "service_type": _weighted(
+            rng, (("store", 0.65), ("dispatch", 0.3), ("freelance", 0.05))
+        ),
+        "nearest_station": station,
+        "station_line": line,
+        "station_walk_minutes": rng.randint(1, 12),
+        "height_cm": rng.randint(150, 172),
+        "age": rng.randint(20, 35),
+        "body_tags": rng.sample(BODY_TAGS, k=rng.randint(1, 3)),
+        "photos": [],
+        "contact_json": {},
+        "discounts": [],
+        "ranking_badges": rng.sample(BADGES, k=rng.randint(0, 2)),
+        "ranking_weight": rng.randint(0, 100),
+        "buffer_minutes": rng.choice((0, 10, 15)),
+        "room_count": _weighted(rng, ((1, 0.4), (2, 0.3), (3, 0.2), (5, 0.1))),
+        "default_slot_duration_minutes": _weighted(
+            rng, ((60, 0.3), (90, 0.5), (120, 0.2))
+        ),
+        "status": "published",
+    }
+    row.update(overrides)
+    return row
+
+
+def _therapist_row(
+    rng: random.Random, profile_id: uuid.UUID, shop_index: int, order: int
+) -> dict[str, Any]:
+    return {
+        "id": _uuid(rng),
+        "profile_id": profile_id,
+        "name": f"セラピスト {shop_index:06d}-{order:02d}",
+        "photo_urls": [],
+        "mood_tag": rng.choice(MOOD_TAGS),
+        "style_tag": rng.choice(STYLE_TAGS),
+        "look_type": rng.choice(LOOK_TYPES),
+        "talk_level": rng.choice(TALK_LEVELS),
+        "price_rank": rng.randint(1, 5),
+        "age": rng.randint(20, 35),
+        "display_order": order,
+        "status": "published",
+        "is_booking_enabled": True,
+    }
+
+
+def _shift_row(
+    rng: random.Random,
+    therapist_id: uuid.UUID,
+    shop_id: uuid.UUID,
+    day: date,
+    start_at: datetime,
+    end_at: datetime,
+    breaks: list[tuple[datetime, datetime]],
+) -> dict[str, Any]:
+    return {
+        "id": _uuid(rng),
+        "therapist_id": therapist_id,
+        "shop_id": shop_id,
+        "date": day,
+        "start_at": start_at,
+        "end_at": end_at,
+        "break_slots": [
+            {"start_at": start.isoformat(), "end_at": end.isoformat()}
+            for start, end in breaks
+        ],
+        "availability_status": "available",
+    }
+
+
+def _working_shifts(
+    rng: random.Random, days: list[date]
+) -> list[tuple[date, datetime, datetime, list[tuple[datetime, datetime]]]]:
+    """(day, start, end, breaks) for one therapist; overnight shifts end next day."""
+    pattern = _weighted(rng, ((name, p[0]) for name, p in SHIFT_PATTERNS.items()))
+    _, start_hours, lengths = SHIFT_PATTERNS[pattern]
+    usual_start = rng.choice(start_hours)
+    shifts = []
+    for day in days:
+        if rng.random() >= WORK_RATE[day.weekday()]:
+            continue
+        start_at = _at(day, usual_start, rng.choice((0, 0, 30)))
+        end_at = start_at + timedelta(hours=rng.choice(lengths))
+        breaks = []
+        if end_at - start_at >= timedelta(hours=7) and rng.random() < 0.6:
+            break_start = start_at + (end_at - start_at) / 2
+            breaks.append(
+                (break_start, break_start + timedelta(minutes=rng.choice((30, 60))))
+            )
+        shifts.append((day, start_at, end_at, breaks))
+    return shifts
+
+
+def _reservation_rows(
+    rng: random.Random,
+    profile: dict[str, Any],
+    therapist_id: uuid.UUID,
+    shifts: list,
+    mean: int,
+    today: date,
+) -> list[dict[str, Any]]:
+    candidates: list[datetime] = []
+    weights: list[float] = []
+    longest = timedelta(minutes=max(d for d, _ in RESERVATION_DURATIONS))
+    for day, start_at, end_at, breaks in shifts:
+        current = start_at
+        while current + longest <= end_at:
+            if not any(
+                current < b_end and current + longest > b_start
+                for b_start, b_end in breaks
+            ):
+                weight = 1.5 if day.weekday() in (4, 5) else 1.0
+                if current.hour >= 18 or current.hour < 3:
+                    weight *= 1.4
+                candidates.append(current)
+                weights.append(weight)
+            current += RESERVATION_STEP
+    count = min(_around(rng, mean), len(candidates))
+    rows = []
+    for start_at in sorted(_weighted_sample(rng, candidates, weights, count)):
+        duration = _weighted(rng, RESERVATION_DURATIONS)
+        if start_at.date() < today:
+            status = _weighted(
+                rng, (("confirmed", 0.9), ("no_show", 0.04), ("cancelled", 0.06))
+            )
+        else:
+            status = _weighted(
+                rng, (("confirmed", 0.85), ("pending", 0.1), ("cancelled", 0.05))
+            )
+        rows.append(
+            {
+                "id": _uuid(rng),
+                "shop_id": profile["id"],
+                "therapist_id": therapist_id,
+                "start_at": start_at,
+                "end_at": start_at + timedelta(minutes=duration),
+                "duration_minutes": duration,
+                "buffer_minutes": profile["buffer_minutes"],
+                "status": status,
+                "channel": _weighted(
+                    rng, (("web", 0.6), ("phone", 0.3), ("line", 0.1))
+                ),
+            }
+        )
+    return rows
+
+
+def _review_rows(
+    rng: random.Random, profile_id: uuid.UUID, mean: int, today: date
+) -> list[dict[str, Any]]:
+    count = min(60, int(rng.expovariate(1 / mean))) if mean > 0 else 0
+    rows = []
+    for number in range(count):
+        visited = today - timedelta(days=rng.randint(1, 180))
+        created_at = _at(visited, 12) + timedelta(days=rng.randint(0, 5))
+        score = _weighted(rng, REVIEW_SCORES)
+        rows.append(
+            {
+                "id": _uuid(rng),
+                "profile_id": profile_id,
+                "status": "published" if rng.random() < 0.9 else "pending",
+                "external_id": f"gen-{number}",
+                "score": score,
+                "title": REVIEW_TITLES[min(5 - score, len(REVIEW_TITLES) - 1)],
+                "body": rng.choice(REVIEW_BODIES),
+                "author_alias": f"ゲスト{rng.randint(1, 9999)}",
+                "visited_at": visited,
+                "created_at": created_at,
+                "updated_at": created_at,
+                "aspect_scores": {},
+            }
+        )
+    return rows
+
+
+def _availability_rows(
+    rng: random.Random,
+    profile: dict[str, Any],
+    therapists: list[dict[str, Any]],
+    shifts: list[dict[str, Any]],
+    today: date,
+    days: int,
+) -> list[dict[str, Any]]:
+    """The rows ``sync_availability_for_date`` would write for the next days."""
+    names = {therapist["id"]: therapist["name"] for therapist in therapists}
+    slot = timedelta(minutes=profile["default_slot_duration_minutes"])
+    rows = []
+    for offset in range(days):
+        day = today + timedelta(days=offset)
+        slots = []
+        for shift in shifts:
+            if shift["date"] != day:
+                continue
+            current = shift["start_at"]
+            while current + slot <= shift["end_at"]:
+                slots.append(
+                    {
+                        "start_at": current.isoformat(),
+                        "end_at": (current + slot).isoformat(),
+                        "status": "open",
+                        "staff_name": names[shift["therapist_id"]],
+                        "staff_id": str(shift["therapist_id"]),
+                    }
+                )
+                current += slot
+        if slots:
+            rows.append(
+                {
+                    "id": _uuid(rng),
+                    "profile_id": profile["id"],
+                    "date": day,
+                    "slots_json": {"slots": slots},
+                    "is_today": day == today,
+                }
+            )
+    return rows
+
+
+def _shop_bundle(
+    rng: random.Random, spec: DatasetSpec, seed: int, index: int, today: date
+) -> Bundle:
+    days = [today + timedelta(days=n) for n in range(-HISTORY_DAYS, spec.days + 1)]
+    profile = _profile_row(rng, index, slug=f"gen-{seed}-shop-{index:06d}")
+    bundle: Bundle = {name: [] for name in TABLES}
+    bundle["profiles"].append(profile)
+    for order in range(_around(rng, spec.therapists_per_shop, minimum=1)):
+        therapist = _therapist_row(rng, profile["id"], index, order)
+        bundle["therapists"].append(therapist)
+        shifts = _working_shifts(rng, days)
+        for day, start_at, end_at, breaks in shifts:
+            bundle["therapist_shifts"].append(
+                _shift_row(
+                    rng, therapist["id"], profile["id"], day, start_at, end_at, breaks
+                )
+            )
+        bundle["guest_reservations"].extend(
+            _reservation_rows(
+                rng,
+                profile,
+                therapist["id"],
+                shifts,
+                spec.reservations_per_therapist,
+                today,
+            )
+        )
+    bundle["reviews"] = _review_rows(rng, profile["id"], spec.reviews_per_shop, today)
+    bundle["availabilities"] = _availability_rows(
+        rng,
+        profile,
+        bundle["therapists"],
+        bundle["therapist_shifts"],
+        today,
+        spec.availability_days,
+    )
+    return bundle
+
+
+def _booking_bundle(seed: int, today: date, days: int) -> Bundle:
+    """A hidden shop with unlimited rooms and an unbooked therapist."""
+    rng = random.Random(f"{seed}:booking")
+    profile = _profile_row(
+        rng,
+        999_999,
+        slug=f"gen-{seed}-booking",
+        name="ベンチ予約用店舗",
+        room_count=1_000_000,
+        buffer_minutes=0,
+        status="hidden",
+    )
+    therapist = _therapist_row(rng, profile["id"], 999_999, 0)
+    bundle: Bundle = {name: [] for name in TABLES}
+    bundle["profiles"].append(profile)
+    bundle["therapists"].append(therapist)
+    for n in range(1, days + 1):
+        day = today + timedelta(days=n)
+        bundle["therapist_shifts"].append(
+            _shift_row(
+                rng, therapist["id"], profile["id"], day, _at(day, 10), _at(day, 23), []
+            )
+        )
+    return bundle
+
+
+def iter_catalog(
+    spec: DatasetSpec,
+    *,
+    seed: int,
+    today: date,
+    dataset: Optional[SeededDataset] = None,
+    booking_shop: bool = False,
+) -> Iterator[Bundle]:
+    """Yield the rows of one shop at a time, recording ids into ``dataset``."""
+    rng = random.Random(seed)
+    bundles = (
+        _shop_bundle(rng, spec, seed, index, today) for index in range(spec.shops)
+    )
+    for bundle in bundles:
+        if dataset is not None:
+            dataset.shop_ids.append(bundle["profiles"][0]["id"])
+            dataset.therapist_ids.extend(t["id"] for t in bundle["therapists"])
+            for name, rows in bundle.items():
+                dataset.rows[name] += len(rows)
+        yield bundle
+    if booking_shop:
+        bundle = _booking_bundle(seed, today, spec.days)
+        if dataset is not None:
+            dataset.booking_shop_id = bundle["profiles"][0]["id"]
+            dataset.booking_therapist_id = bundle["therapists"][0]["id"]
+            for name, rows in bundle.items():
+                dataset.rows[name] += len(rows)
+        yield bundle
+
+
+def build_rows(
+    spec: DatasetSpec, *, seed: int, today: date, booking_shop: bool = True
+) -> tuple[Bundle, SeededDataset]:
+    """Generate the whole catalog in memory (small specs only)."""
+    dataset = SeededDataset(spec=spec, seed=seed, today=today)
+    rows: Bundle = {name: [] for name in TABLES}
+    for bundle in iter_catalog(
+        spec, seed=seed, today=today, dataset=dataset, booking_shop=booking_shop
+    ):
+        for name, values in bundle.items():
+            rows[name].extend(values)
+    return rows, dataset
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+BATCH_SIZE = 5000
+
+
+def _copy_columns(table: Table, rows: list[dict[str, Any]]) -> list[str]:
+    # Columns the generator sets plus those with a Python-side default, which
+    # COPY would otherwise leave NULL; server defaults apply to the rest
+    given = rows[0].keys()
+    return [
+        column.name
+        for column in table.columns
+        if column.name in given
+        or (
+            column.default is not None
+            and (column.default.is_scalar or column.default.is_callable)
+        )
+    ]
+
+
+def _copy_value(table: Table, name: str, row: dict[str, Any]) -> Any:
+    column = table.columns[name]
+    if name in row:
+        value = row[name]
+    elif column.default.is_callable:
+        value = column.default.arg(None)
+    else:
+        value = column.default.arg
+    if value is not None and isinstance(column.type, JSON):
+        # SQLAlchemy's asyncpg json/jsonb codecs take serialized text
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def _write(conn: AsyncConnection, table: Table, rows: list[dict]) -> None:
+    if conn.dialect.driver != "asyncpg":
+        await conn.execute(insert(table), rows)
+        return
+    columns = _copy_columns(table, rows)
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        table.name,
+        records=[tuple(_copy_value(table, c, row) for c in columns) for row in rows],
+        columns=columns,
+    )
+
+
+async def load_catalog(
+    engine: AsyncEngine,
+    bundles: Iterable[Bundle],
+    *,
+    truncate: bool = False,
+    batch_size: int = BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> None:
+    """Write ``bundles`` in batches inside one transaction.
+
+    All tables are flushed together, parents first, whenever one buffer
+    reaches ``batch_size`` rows, so foreign keys always resolve.
+    ``truncate`` empties the catalog tables (and everything referencing
+    them) first.
+    """
+    buffers: Bundle = {name: [] for name in TABLES}
+    shops = 0
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(models.Base.metadata.create_all)
+        if truncate:
+            await conn.execute(
+                text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+            )
+
+        async def flush() -> None:
+            for name, table in TABLES.items():
+                if buffers[name]:
+                    await _write(conn, table, buffers[name])
+                    buffers[name] = []
+
+        for bundle in bundles:
+            shops += len(bundle["profiles"])
+            for name, rows in bundle.items():
+                buffers[name].extend(rows)
+            if max(len(rows) for rows in buffers.values()) >= batch_size:
+                await flush()
+                if progress is not None:
+                    progress(shops)
+        await flush()
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text(f"ANALYZE {', '.join(TABLES)}"))
+
+
+async def seed_dataset(
+    engine: AsyncEngine,
+    spec: DatasetSpec,
+    *,
+    seed: int = 42,
+    today: date | None = None,
+) -> SeededDataset:
+    """Replace the catalog in ``engine``'s database with a fresh dataset."""
+    today = today or datetime.now(JST).date()
+    dataset = SeededDataset(spec=spec, seed=seed, today=today)
+    await load_catalog(
+        engine,
+        iter_catalog(spec, seed=seed, today=today, dataset=dataset, booking_shop=True),
+        truncate=True,
+    )
+    return dataset
+
+
+__all__ = [
+    "BENCHMARK_NOTE",
+    "DatasetSpec",
+    "SCALES",
+    "SeededDataset",
+    "TABLES",
+    "build_rows",
+    "iter_catalog",
+    "load_catalog",
+    "seed_dataset",
+]
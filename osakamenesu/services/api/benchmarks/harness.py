@@ -0,0 +1,224 @@
+"""Timing, query counting, allocation tracking and baseline comparison."""
+
+from __future__ import annotations
+
+import json
+import math
+import platform
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from app.monitoring.queries import start_tracking, stop_tracking
+
+# Latency regressions smaller than this are timer noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 0.5
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    # Runs after every call, outside the measurement (e.g. delete the row
+    # a write benchmark created so the next call sees the same state)
+    teardown: Optional[Callable[[], Awaitable[None]]] = None
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    queries: float
+    peak_alloc_kib: float
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def _call(case: BenchmarkCase) -> None:
+    try:
+        await case.run()
+    finally:
+        if case.teardown is not None:
+            await case.teardown()
+
+
+async def run_case(
+    case: BenchmarkCase, *, iterations: int, warmup: int
+) -> BenchmarkResult:
+    """Time ``iterations`` calls after ``warmup``, then one traced call.
+
+    Query counts come from the same per-request tracker the API uses
+    (``app.monitoring.queries``), so the engine must have query tracking
+    installed.  The allocation pass runs separately because tracemalloc
+    slows every allocation down and would distort the timings.
+    """
+    for _ in range(warmup):
+        await _call(case)
+
+    timings: list[float] = []
+    queries = 0
+    for _ in range(iterations):
+        stats, token = start_tracking()
+        started = time.perf_counter()
+        try:
+            await case.run()
+        finally:
+            elapsed = time.perf_counter() - started
+            stop_tracking(token)
+            if case.teardown is not None:
+                await case.teardown()
+        timings.append(elapsed * 1000)
+        queries += stats.count
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        await case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        if case.teardown is not None:
+            await case.teardown()
+
+    timings.sort()
+    return BenchmarkResult(
+        name=case.name,
+        iterations=iterations,
+        p50_ms=percentile(timings, 50),
+        p95_ms=percentile(timings, 95),
+        p99_ms=percentile(timings, 99),
+        mean_ms=sum(timings) / len(timings) if timings else 0.0,
+        queries=queries / iterations if iterations else 0.0,
+        peak_alloc_kib=peak / 1024,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+
+
+def save_baseline(
+    path: Path, results: list[BenchmarkResult], *, meta: dict[str, Any]
+) -> None:
+    payload = {
+        "meta": {
+            **meta,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": {result.name: asdict(result) for result in results},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n")
+
+
+def load_baseline(path: Path) -> dict[str, BenchmarkResult]:
+    payload = json.loads(path.read_text())
+    return {
+        name: BenchmarkResult(**values)
+        for name, values in payload.get("results", {}).items()
+    }
+
+
+@dataclass
+class Regression:
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.metric} {self.baseline:.2f} -> {self.current:.2f}"
+
+
+def compare(
+    results: list[BenchmarkResult],
+    baseline: dict[str, BenchmarkResult],
+    *,
+    tolerance: float = 0.2,
+) -> list[Regression]:
+    """Metrics that got worse than ``baseline`` allows.
+
+    Latency (p95) and allocations may grow by ``tolerance`` (a fraction);
+    the query count is deterministic, so any extra query is a regression.
+    Cases missing from the baseline are skipped.
+    """
+    regressions: list[Regression] = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        if (
+            result.p95_ms > before.p95_ms * (1 + tolerance)
+            and result.p95_ms - before.p95_ms >= MIN_LATENCY_DELTA_MS
+        ):
+            regressions.append(
+                Regression(result.name, "p95_ms", before.p95_ms, result.p95_ms)
+            )
+        if result.queries > before.queries:
+            regressions.append(
+                Regression(result.name, "queries", before.queries, result.queries)
+            )
+        if result.peak_alloc_kib > before.peak_alloc_kib * (1 + tolerance):
+            regressions.append(
+                Regression(
+                    result.name,
+                    "peak_alloc_kib",
+                    before.peak_alloc_kib,
+                    result.peak_alloc_kib,
+                )
+            )
+    return regressions
+
+
+def format_results(
+    results: list[BenchmarkResult],
+    baseline: Optional[dict[str, BenchmarkResult]] = None,
+) -> str:
+    header = (
+        f"{'case':<30} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'queries':>8} {'alloc KiB':>10}"
+    )
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        line = (
+            f"{result.name:<30} {result.p50_ms:>9.2f} {result.p95_ms:>9.2f} "
+            f"{result.p99_ms:>9.2f} {result.queries:>8.1f} "
+            f"{result.peak_alloc_kib:>10.1f}"
+        )
+        before = (baseline or {}).get(result.name)
+        if before is not None and before.p95_ms > 0:
+            change = (result.p95_ms / before.p95_ms - 1) * 100
+            line += f" {change:>+11.1f}%"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+__all__ = [
+    "BenchmarkCase",
+    "BenchmarkResult",
+    "Regression",
+    "compare",
+    "format_results",
+    "load_baseline",
+    "percentile",
+    "run_case",
+    "save_baseline",
+]
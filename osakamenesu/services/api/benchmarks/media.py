@@ -0,0 +1,135 @@
+"""Compare media serving through ``MediaFiles`` with the plain ``StaticFiles`` mount.
+
+Both apps sit behind the same middleware pipeline as the API and serve the
+same generated files from a temporary directory; no database is needed::
+
+    python -m benchmarks.media --size-kib 2048 --iterations 200
+
+Cases cover a full download, a revalidation with ``If-None-Match`` (both
+answer 304, but only ``MediaFiles`` keeps its cache policy through the
+pipeline), a 64 KiB range and a variant request that ``MediaFiles`` answers
+with its AVIF sibling.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from starlette.staticfiles import StaticFiles
+
+from app.media_files import MediaFiles
+from app.middleware.cache_headers import CacheHeadersStage
+from app.middleware.pipeline import ASGIPipelineMiddleware
+
+from .harness import BenchmarkCase, format_results, run_case
+
+STEM = "5f0c2b7e9a1d4c3b8e6f0a2d4c6e8b1a"
+ACCEPT_AVIF = "image/avif,image/webp,image/*;q=0.8,*/*;q=0.5"
+
+
+def write_files(root: Path, size: int) -> dict[str, str]:
+    """Files for the cases, keyed by role, as paths below the mount."""
+    folder = root / "shops" / "bench"
+    folder.mkdir(parents=True, exist_ok=True)
+    names = {
+        "original": f"{STEM}.jpg",
+        "variant": f"{STEM}-w640.webp",
+        "sibling": f"{STEM}-w640.avif",
+    }
+    (folder / names["original"]).write_bytes(os.urandom(size))
+    (folder / names["variant"]).write_bytes(os.urandom(max(1, size // 8)))
+    (folder / names["sibling"]).write_bytes(os.urandom(max(1, size // 12)))
+    return {role: f"/media/shops/bench/{name}" for role, name in names.items()}
+
+
+def build_app(root: Path, *, media: bool) -> FastAPI:
+    app = FastAPI()
+    files = MediaFiles(directory=root) if media else StaticFiles(directory=root)
+    app.mount("/media", files, name="media")
+    app.add_middleware(ASGIPipelineMiddleware, stages=[CacheHeadersStage()])
+    return app
+
+
+def build_media_cases(
+    clients: dict[str, httpx.AsyncClient], urls: dict[str, str]
+) -> dict[str, BenchmarkCase]:
+    cases: dict[str, BenchmarkCase] = {}
+    for label, client in clients.items():
+        etags: dict[str, str] = {}
+
+        async def full(client=client) -> Any:
+            response = await client.get(urls["original"])
+            response.raise_for_status()
+            return response
+
+        async def revalidate(client=client, etags=etags) -> Any:
+            if "original" not in etags:
+                etags["original"] = (await full(client)).headers["etag"]
+            return await client.get(
+                urls["original"], headers={"If-None-Match": etags["original"]}
+            )
+
+        async def ranged(client=client) -> Any:
+            return await client.get(
+                urls["original"], headers={"Range": "bytes=0-65535"}
+            )
+
+        async def variant(client=client) -> Any:
+            return await client.get(urls["variant"], headers={"Accept": ACCEPT_AVIF})
+
+        cases[f"{label}_full"] = BenchmarkCase(f"{label}_full", full)
+        cases[f"{label}_revalidate"] = BenchmarkCase(f"{label}_revalidate", revalidate)
+        cases[f"{label}_range"] = BenchmarkCase(f"{label}_range", ranged)
+        cases[f"{label}_variant"] = BenchmarkCase(f"{label}_variant", variant)
+    return cases
+
+
+async def main(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="media-bench-") as tmp:
+        root = Path(tmp)
+        urls = write_files(root, args.size_kib * 1024)
+        clients = {
+            label: httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=build_app(root, media=media)),
+                base_url="http://bench",
+            )
+            for label, media in (("static", False), ("media", True))
+        }
+        try:
+            cases = build_media_cases(clients, urls)
+            results = []
+            for name, case in cases.items():
+                print(f"  running {name}...")
+                results.append(
+                    await run_case(case, iterations=args.iterations, warmup=args.warmup)
+                )
+            print()
+            print(format_results(results))
+            print()
+            for label, client in clients.items():
+                response = await client.get(urls["original"])
+                print(f"{label:<7} Cache-Control: {response.headers['cache-control']}")
+        finally:
+            for client in clients.values():
+                await client.aclose()
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-kib", type=int, default=1024)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,219 @@
+"""In-memory stand-in for the Meilisearch ``profiles`` index.
+
+Implements the subset of Meilisearch used by ``app.meili.search``: the filter
+expressions produced by ``app.meili.build_filter`` (comparisons joined with
+AND/OR and parentheses, array fields matching any element), ``field:asc|desc``
+sorting, facet distributions and a case-insensitive substring query over the
+searchable attributes.  Relevance ranking is not modelled; benchmarks measure
+the API code around the search call, not Meilisearch itself.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+SEARCHABLE_ATTRIBUTES = (
+    "name",
+    "store_name",
+    "area",
+    "nearest_station",
+    "station_line",
+    "body_tags",
+    "ranking_badges",
+)
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<open>\()|(?P<close>\))|(?P<bool>AND|OR)\b"
+    r"|(?P<field>\w+)\s*(?P<op>>=|<=|!=|=|>|<)\s*"
+    r"(?P<value>'(?:[^'\\]|\\.)*'|true|false|-?\d+(?:\.\d+)?))"
+)
+
+Predicate = Callable[[dict[str, Any]], bool]
+
+
+def _literal(raw: str) -> Any:
+    if raw.startswith("'"):
+        return raw[1:-1].replace("\\'", "'")
+    if raw in ("true", "false"):
+        return raw == "true"
+    return float(raw)
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if isinstance(right, float):
+        if isinstance(left, bool) or not isinstance(left, (int, float)):
+            return False
+    elif type(left) is not type(right):
+        return False
+    if op == "=":
+        return left == right
+    if op == "!=":
+        return left != right
+    if op == ">=":
+        return left >= right
+    if op == "<=":
+        return left <= right
+    if op == ">":
+        return left > right
+    return left < right
+
+
+def _comparison(field: str, op: str, value: Any) -> Predicate:
+    def predicate(doc: dict[str, Any]) -> bool:
+        current = doc.get(field)
+        if current is None:
+            return False
+        if isinstance(current, list):
+            return any(_compare(op, item, value) for item in current)
+        return _compare(op, current, value)
+
+    return predicate
+
+
+def _tokenize(expression: str) -> list[dict[str, str]]:
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if match is None:
+            raise ValueError(f"unsupported filter near: {expression[position:]!r}")
+        tokens.append({k: v for k, v in match.groupdict().items() if v is not None})
+        position = match.end()
+    return tokens
+
+
+def compile_filter(expression: Optional[str]) -> Predicate:
+    """Predicate for a Meilisearch filter string (``None`` matches all)."""
+    if not expression:
+        return lambda doc: True
+    tokens = _tokenize(expression)
+    position = 0
+
+    def peek() -> dict[str, str]:
+        return tokens[position] if position < len(tokens) else {}
+
+    def parse_or() -> Predicate:
+        nonlocal position
+        terms = [parse_and()]
+        while peek().get("bool") == "OR":
+            position += 1
+            terms.append(parse_and())
+        return terms[0] if len(terms) == 1 else lambda d: any(t(d) for t in terms)
+
+    def parse_and() -> Predicate:
+        nonlocal position
+        factors = [parse_factor()]
+        while peek().get("bool") == "AND":
+            position += 1
+            factors.append(parse_factor())
+        return factors[0] if len(factors) == 1 else lambda d: all(f(d) for f in factors)
+
+    def parse_factor() -> Predicate:
+        nonlocal position
+        token = peek()
+        position += 1
+        if "open" in token:
+            inner = parse_or()
+            if "close" not in peek():
+                raise ValueError(f"unbalanced parentheses in {expression!r}")
+            position += 1
+            return inner
+        if "field" in token:
+            return _comparison(token["field"], token["op"], _literal(token["value"]))
+        raise ValueError(f"unexpected token in {expression!r}")
+
+    predicate = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"trailing tokens in {expression!r}")
+    return predicate
+
+
+def _facet_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class InMemoryIndex:
+    """Documents plus a ``search`` with the signature of ``app.meili.search``."""
+
+    def __init__(self, documents: Optional[list[dict[str, Any]]] = None) -> None:
+        self.documents: list[dict[str, Any]] = list(documents or [])
+
+    def add_documents(self, documents: list[dict[str, Any]]) -> None:
+        self.documents.extend(documents)
+
+    def search(
+        self,
+        q: str | None,
+        filter_expr: str | None,
+        sort: list[str] | str | None,
+        page: int,
+        page_size: int,
+        facets: list[str] | None = None,
+    ) -> dict:
+        predicate = compile_filter(filter_expr)
+        hits = [doc for doc in self.documents if predicate(doc)]
+        if q:
+            needle = q.lower()
+            hits = [doc for doc in hits if self._matches(doc, needle)]
+
+        for key in reversed([sort] if isinstance(sort, str) else sort or []):
+            field, _, direction = key.partition(":")
+            present = [doc for doc in hits if doc.get(field) is not None]
+            missing = [doc for doc in hits if doc.get(field) is None]
+            present.sort(key=lambda doc: doc[field], reverse=direction == "desc")
+            hits = present + missing
+
+        distribution: dict[str, dict[str, int]] = {}
+        for facet in facets or []:
+            counts: Counter = Counter()
+            for doc in hits:
+                value = doc.get(facet)
+                for item in value if isinstance(value, list) else [value]:
+                    if item is not None:
+                        counts[_facet_value(item)] += 1
+            distribution[facet] = dict(counts)
+
+        offset = (page - 1) * page_size
+        return {
+            "hits": hits[offset : offset + page_size],
+            "estimatedTotalHits": len(hits),
+            "facetDistribution": distribution,
+            "limit": page_size,
+            "offset": offset,
+            "query": q or "",
+        }
+
+    @staticmethod
+    def _matches(doc: dict[str, Any], needle: str) -> bool:
+        for attribute in SEARCHABLE_ATTRIBUTES:
+            value = doc.get(attribute)
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, str) and needle in item.lower():
+                    return True
+        return False
+
+
+@contextmanager
+def patched_search(index: InMemoryIndex) -> Iterator[InMemoryIndex]:
+    """Route the API's Meilisearch queries to ``index`` while active."""
+    from app import meili
+    from app.domains.site.services.shop import search_service
+
+    targets = [(meili, "search"), (search_service, "meili_search")]
+    originals = [getattr(module, name) for module, name in targets]
+    for module, name in targets:
+        setattr(module, name, index.search)
+    try:
+        yield index
+    finally:
+        for (module, name), original in zip(targets, originals):
+            setattr(module, name, original)
+
+
+__all__ = ["InMemoryIndex", "compile_filter", "patched_search"]
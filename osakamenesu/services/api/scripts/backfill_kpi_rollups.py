@@ -0,0 +1,70 @@
+"""Rebuild the daily KPI rollups (``shop_daily_stats`` / ``therapist_daily_stats``).
+
+Run once after applying migration 0051, and again whenever the rollup
+derivation in ``app.services.kpi_rollups`` changes.  Buckets are rebuilt
+shop by shop and committed per chunk, so the job can be interrupted and
+re-run safely.
+
+Usage:
+    cd services/api
+    python -m scripts.backfill_kpi_rollups                 # last 400 days
+    python -m scripts.backfill_kpi_rollups --start 2024-01-01 --end 2024-12-31
+    python -m scripts.backfill_kpi_rollups --shop <uuid> --shop <uuid>
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+from uuid import UUID
+
+from app.db import SessionLocal
+from app.services.kpi_rollups import DEFAULT_BACKFILL_CHUNK_DAYS, backfill_rollups
+from app.utils.datetime import now_jst
+
+DEFAULT_DAYS = 400
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument(
+        "--shop", dest="shop_ids", type=UUID, action="append", default=None
+    )
+    parser.add_argument("--chunk-days", type=int, default=DEFAULT_BACKFILL_CHUNK_DAYS)
+    return parser.parse_args()
+
+
+async def _run(args: argparse.Namespace) -> None:
+    end = args.end or now_jst().date()
+    start = args.start or end - timedelta(days=DEFAULT_DAYS - 1)
+    started = time.perf_counter()
+    async with SessionLocal() as db:
+        result = await backfill_rollups(
+            db,
+            start=start,
+            end=end,
+            shop_ids=args.shop_ids,
+            chunk_days=args.chunk_days,
+        )
+    logging.info(
+        "rebuilt %s buckets for %s shops (%s..%s) in %.1fs",
+        result["buckets"],
+        result["shops"],
+        start,
+        end,
+        time.perf_counter() - started,
+    )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="[kpi-backfill] %(message)s")
+    asyncio.run(_run(_parse_args()))
+
+
+if __name__ == "__main__":
+    main()
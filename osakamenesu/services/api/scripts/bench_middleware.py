@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Benchmark per-request middleware overhead.
+
+Compares the same set of stages (performance monitoring, error tracking,
+security headers, rate limiting, cache headers) mounted as one
+``BaseHTTPMiddleware`` layer per stage (the previous layout) against a single
+``ASGIPipelineMiddleware``.  Requests are driven straight through the ASGI
+interface so only middleware cost is measured; the reported overhead is the
+latency above the bare app.
+
+Usage:
+    python scripts/bench_middleware.py [--requests=N] [--warmup=N]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middleware.cache_headers import CacheHeadersStage
+from app.middleware.enhanced_rate_limit import DEFAULT_TIERS, EnhancedRateLimitStage
+from app.middleware.error_tracking import ErrorTrackingStage
+from app.middleware.performance import PerformanceMonitoringStage
+from app.middleware.pipeline import ASGIPipelineMiddleware, RequestContext
+from app.middleware.security_headers import SecurityHeadersStage
+from app.monitoring.metrics import MetricsCollector
+from app.utils.ratelimit import RateLimitTier
+
+
+def _stages():
+    # Same tiers as production, scaled so the benchmark is never limited.
+    tiers = [
+        RateLimitTier(
+            name=tier.name,
+            max_events=tier.max_events * 10**6,
+            window_sec=tier.window_sec,
+        )
+        for tier in DEFAULT_TIERS
+    ]
+    return [
+        PerformanceMonitoringStage(
+            metrics_collector=MetricsCollector(redis_client=None)
+        ),
+        ErrorTrackingStage(),
+        SecurityHeadersStage(),
+        EnhancedRateLimitStage(redis_client=None, tiers=tiers),
+        CacheHeadersStage(),
+    ]
+
+
+class _LegacyStageMiddleware(BaseHTTPMiddleware):
+    """Runs one stage the way the former BaseHTTPMiddleware classes did."""
+
+    def __init__(self, app, stage):
+        super().__init__(app)
+        self.stage = stage
+
+    async def dispatch(self, request, call_next):
+        ctx = RequestContext(request.scope, request.receive)
+        response = await self.stage.on_request(ctx)
+        if response is None:
+            response = await call_next(request)
+        ctx.status_code = response.status_code
+        ctx.headers = response.headers
+        await self.stage.on_response(ctx)
+        await self.stage.on_complete(ctx)
+        return response
+
+
+def _base_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/shops")
+    async def shops():
+        return {"items": list(range(20))}
+
+    return app
+
+
+def build_apps() -> dict:
+    bare = _base_app()
+
+    legacy = _base_app()
+    for stage in reversed(_stages()):
+        legacy.add_middleware(_LegacyStageMiddleware, stage=stage)
+
+    pipeline = _base_app()
+    pipeline.add_middleware(ASGIPipelineMiddleware, stages=_stages())
+
+    return {"bare": bare, "legacy": legacy, "pipeline": pipeline}
+
+
+async def _call(app) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/shops",
+        "raw_path": b"/api/shops",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"x-forwarded-for", b"10.0.0.1")],
+        "client": ("10.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        return None
+
+    await app(scope, receive, send)
+
+
+async def measure(app, requests: int, warmup: int) -> list[float]:
+    for _ in range(warmup):
+        await _call(app)
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await _call(app)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return timings
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def main(requests: int, warmup: int) -> None:
+    apps = build_apps()
+    results = {name: await measure(app, requests, warmup) for name, app in apps.items()}
+    bare_p50 = _percentile(results["bare"], 50)
+    bare_p99 = _percentile(results["bare"], 99)
+
+    print(
+        f"{'variant':<10} {'p50 (us)':>10} {'p99 (us)':>10} {'+p50':>10} {'+p99':>10}"
+    )
+    for name, timings in results.items():
+        p50 = _percentile(timings, 50)
+        p99 = _percentile(timings, 99)
+        print(
+            f"{name:<10} {p50:>10.1f} {p99:>10.1f} "
+            f"{p50 - bare_p50:>10.1f} {p99 - bare_p99:>10.1f}"
+        )
+    print(f"\n(mean bare: {statistics.mean(results['bare']):.1f}us, n={requests})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.warmup))
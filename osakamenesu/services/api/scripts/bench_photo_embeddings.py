@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Benchmark photo-embedding throughput (images/sec).
+
+Embeds a set of JPEG files with each backend, in-process and through a
+process pool the way the batch job does, and times the content-hash pass that
+is all a cache hit costs.  Without ``--images`` a synthetic set is generated
+(needs numpy and Pillow, like the local backend itself).
+
+Usage:
+    python scripts/bench_photo_embeddings.py [--images=DIR] [--count=N] [--workers=N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.domains.async_tasks.photo_embeddings import default_workers
+from app.domains.site.services.photo_embedding_backends import (
+    NUMPY_AVAILABLE,
+    digest_files,
+    embed_files,
+)
+
+CHUNK = 50
+
+
+def generate_images(directory: Path, count: int) -> list[str]:
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:960, 0:720]
+    paths = []
+    for i in range(count):
+        base = rng.uniform(0, 255, size=3)
+        slope = rng.uniform(-0.3, 0.3, size=(2, 3))
+        pixels = base + y[..., None] * slope[0] + x[..., None] * slope[1]
+        pixels += rng.normal(0, 8, size=pixels.shape)
+        path = directory / f"photo-{i:05d}.jpg"
+        Image.fromarray(np.clip(pixels, 0, 255).astype("uint8"), "RGB").save(
+            path, format="JPEG", quality=90
+        )
+        paths.append(str(path))
+    return paths
+
+
+def _rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>10.1f}"
+
+
+def run(paths: list[str], workers: int) -> None:
+    chunks = [paths[i : i + CHUNK] for i in range(0, len(paths), CHUNK)]
+    backends = ["content-hash"] + (["local"] if NUMPY_AVAILABLE else [])
+
+    print(f"{len(paths)} images, {workers} workers\n")
+    print(f"{'pass':<28} {'images/s':>10}")
+
+    start = time.perf_counter()
+    digest_files(paths)
+    print(
+        f"{'content hash (cache hit)':<28} {_rate(len(paths), time.perf_counter() - start)}"
+    )
+
+    for backend in backends:
+        start = time.perf_counter()
+        embed_files(backend, paths)
+        elapsed = time.perf_counter() - start
+        print(f"{backend + ' in-process':<28} {_rate(len(paths), elapsed)}")
+
+        if workers > 0:
+            with ProcessPoolExecutor(workers) as pool:
+                # Warm the workers so process start-up is not measured
+                list(pool.map(embed_files, [backend] * workers, [paths[:1]] * workers))
+                start = time.perf_counter()
+                list(pool.map(embed_files, [backend] * len(chunks), chunks))
+                elapsed = time.perf_counter() - start
+            print(f"{backend + ' pool':<28} {_rate(len(paths), elapsed)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=Path, default=None)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args()
+
+    if args.images is not None:
+        paths = sorted(str(path) for path in args.images.glob("*.jp*g"))
+        run(paths, args.workers)
+        return
+    if not NUMPY_AVAILABLE:
+        parser.error("numpy and Pillow are needed to generate images; pass --images")
+    with tempfile.TemporaryDirectory() as directory:
+        run(generate_images(Path(directory), args.count), args.workers)
+
+
+if __name__ == "__main__":
+    main()
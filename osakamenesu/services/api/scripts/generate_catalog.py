@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Generate a large synthetic shop catalog straight into Postgres and Meilisearch.
+
+Unlike ``seed_dev.py`` and ``scripts/seed_e2e_sample_data.py``, which go
+through the admin API one shop, therapist and shift at a time, this writes
+rows with ``COPY`` in batches (see ``benchmarks/dataset.py`` for the
+distributions) and then builds every search document and sends them to
+Meilisearch in one ``add_documents`` call.  10k shops take a few minutes.
+
+Usage:
+    cd services/api
+    python scripts/generate_catalog.py --scale xlarge --truncate
+    python scripts/generate_catalog.py --shops 2000 --seed 7 --skip-index
+
+Without ``--truncate`` the catalog is appended; slugs include the seed, so use
+a different ``--seed`` for each appended catalog.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import meili
+from app.db import create_engine
+from app.domains.admin.services.profile_indexing import build_profile_documents
+from app.settings import settings
+from app.utils.datetime import JST
+from benchmarks.dataset import SCALES, SeededDataset, iter_catalog, load_catalog
+
+# Profiles per build_profile_documents call
+INDEX_CHUNK = 500
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    parser.add_argument("--shops", type=int)
+    parser.add_argument("--therapists-per-shop", type=int)
+    parser.add_argument("--days", type=int, help="Days of shifts ahead of today")
+    parser.add_argument("--reservations-per-therapist", type=int)
+    parser.add_argument("--reviews-per-shop", type=int)
+    parser.add_argument("--availability-days", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="Empty the catalog tables (and rows referencing them) first",
+    )
+    parser.add_argument(
+        "--skip-index", action="store_true", help="Do not touch Meilisearch"
+    )
+    return parser.parse_args(argv)
+
+
+async def index_catalog(session_factory, shop_ids: list, *, replace: bool) -> int:
+    docs: list[dict] = []
+    for offset in range(0, len(shop_ids), INDEX_CHUNK):
+        async with session_factory() as db:
+            docs.extend(
+                await build_profile_documents(
+                    db=db, profile_ids=shop_ids[offset : offset + INDEX_CHUNK]
+                )
+            )
+    if replace:
+        meili.purge_all()
+    meili.index_bulk(docs)
+    return len(docs)
+
+
+async def main(args: argparse.Namespace) -> int:
+    overrides = {
+        name: getattr(args, name)
+        for name in (
+            "shops",
+            "therapists_per_shop",
+            "days",
+            "reservations_per_therapist",
+            "reviews_per_shop",
+            "availability_days",
+        )
+        if getattr(args, name) is not None
+    }
+    spec = dataclasses.replace(SCALES[args.scale], **overrides)
+    today = datetime.now(JST).date()
+    dataset = SeededDataset(spec=spec, seed=args.seed, today=today)
+    engine = create_engine(args.database_url)
+    started = time.perf_counter()
+
+    def progress(shops: int) -> None:
+        elapsed = time.perf_counter() - started
+        print(f"  {shops:>7} shops  {elapsed:7.1f}s", flush=True)
+
+    try:
+        print(f"Loading {spec} (seed={args.seed})...")
+        await load_catalog(
+            engine,
+            iter_catalog(spec, seed=args.seed, today=today, dataset=dataset),
+            truncate=args.truncate,
+            batch_size=args.batch_size,
+            progress=progress,
+        )
+        loaded = time.perf_counter()
+        for table, count in dataset.rows.items():
+            print(f"  {table:<20} {count:>10}")
+        print(f"Loaded in {loaded - started:.1f}s")
+
+        if not args.skip_index:
+            session_factory = async_sessionmaker(
+                engine, class_=AsyncSession, expire_on_commit=False
+            )
+            indexed = await index_catalog(
+                session_factory, dataset.shop_ids, replace=args.truncate
+            )
+            print(f"Indexed {indexed} documents in {time.perf_counter() - loaded:.1f}s")
+    finally:
+        await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
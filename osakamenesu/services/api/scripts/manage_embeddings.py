@@ -2,7 +2,8 @@
 """Command-line tool for managing photo embeddings.
 
 Usage:
-    python scripts/manage_embeddings.py compute-all [--batch-size=N] [--max-total=N]
+    python scripts/manage_embeddings.py compute-all [--batch-size=N] [--max-total=N] [--workers=N]
+                                                    [--checkpoint=PATH] [--restart]
     python scripts/manage_embeddings.py compute-therapist <therapist_id> [--force]
     python scripts/manage_embeddings.py status
     python scripts/manage_embeddings.py cleanup [--days-old=N]
@@ -17,8 +18,9 @@ import sys
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.domains.async_tasks.photo_embeddings import PhotoEmbeddingTask
-from app.db import get_session, engine
+from app.domains.async_tasks.photo_embeddings import PhotoEmbeddingTask, default_workers
+from app.domains.site.services.photo_embedding_service import needs_embedding_clause
+from app.db import SessionLocal
 from app.models import Therapist
 from sqlalchemy import select, func
 
@@ -26,18 +28,44 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger(__name__)
 
 
-async def compute_all_embeddings(batch_size: int = 50, max_total: int = None):
-    """Compute embeddings for all therapists without embeddings."""
-    task = PhotoEmbeddingTask()
-    logger.info(f"Starting batch embedding computation (batch_size={batch_size}, max_total={max_total})")
+DEFAULT_CHECKPOINT = Path('.photo_embeddings.checkpoint.json')
+
+
+async def compute_all_embeddings(
+    batch_size: int = 50,
+    max_total: int = None,
+    workers: int = None,
+    checkpoint: Path = DEFAULT_CHECKPOINT,
+    restart: bool = False,
+):
+    """Compute embeddings for all therapists with missing or stale embeddings.
+
+    Progress is checkpointed after every stored batch; re-running the command
+    resumes after the last checkpoint unless --restart is given.
+    """
+    if restart:
+        checkpoint.unlink(missing_ok=True)
+    task = PhotoEmbeddingTask(workers=workers)
+    logger.info(
+        f"Starting batch embedding computation (batch_size={batch_size}, max_total={max_total}, "
+        f"workers={task.workers}, checkpoint={checkpoint})"
+    )
 
-    stats = await task.compute_all_missing_embeddings(batch_size=batch_size, max_total=max_total)
+    stats = await task.compute_all_missing_embeddings(
+        batch_size=batch_size, max_total=max_total, checkpoint_path=checkpoint
+    )
 
     print("\n=== Embedding Computation Complete ===")
     print(f"Total processed: {stats['total_processed']}")
     print(f"Successful: {stats['total_success']}")
     print(f"Failed: {stats['total_failed']}")
     print(f"Duration: {stats.get('duration_seconds', 0):.2f} seconds")
+    if stats.get('resumed_after'):
+        print(f"Resumed after therapist: {stats['resumed_after']}")
+    if stats.get('error'):
+        print(f"Stopped on error: {stats['error']}")
+    if stats.get('checkpoint'):
+        print(f"Checkpoint: {checkpoint} (run again to resume)")
 
     if stats['errors']:
         print(f"\nFailed therapist IDs:")
@@ -69,7 +97,7 @@ async def compute_specific_therapist(therapist_id: str, force: bool = False):
 
 async def show_embedding_status():
     """Show current status of embeddings."""
-    async with get_session() as session:
+    async with SessionLocal() as session:
         # Count total therapists
         total_result = await session.execute(
             select(func.count()).select_from(Therapist).where(
@@ -87,12 +115,11 @@ async def show_embedding_status():
         )
         with_embedding_count = with_embedding_result.scalar()
 
-        # Count therapists with photos but no embeddings
+        # Count therapists whose embedding is missing or older than their last update
         need_embedding_result = await session.execute(
             select(func.count()).select_from(Therapist).where(
                 Therapist.status == "published",
-                Therapist.photo_urls != None,
-                Therapist.photo_embedding == None
+                needs_embedding_clause()
             )
         )
         need_embedding_count = need_embedding_result.scalar()
@@ -101,8 +128,7 @@ async def show_embedding_status():
         examples_result = await session.execute(
             select(Therapist.id, Therapist.name).where(
                 Therapist.status == "published",
-                Therapist.photo_urls != None,
-                Therapist.photo_embedding == None
+                needs_embedding_clause()
             ).limit(5)
         )
         examples = examples_result.all()
@@ -139,6 +165,11 @@ def main():
     compute_all_parser = subparsers.add_parser('compute-all', help='Compute embeddings for all therapists')
     compute_all_parser.add_argument('--batch-size', type=int, default=50, help='Batch size for processing')
     compute_all_parser.add_argument('--max-total', type=int, help='Maximum total to process')
+    compute_all_parser.add_argument('--workers', type=int, default=default_workers(),
+                                    help='Worker processes computing embeddings (0 = in-process)')
+    compute_all_parser.add_argument('--checkpoint', type=Path, default=DEFAULT_CHECKPOINT,
+                                    help='Progress file used to resume an interrupted run')
+    compute_all_parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
 
     # Compute specific therapist command
     compute_therapist_parser = subparsers.add_parser('compute-therapist', help='Compute embedding for specific therapist')
@@ -160,7 +191,9 @@ def main():
 
     # Run the appropriate command
     if args.command == 'compute-all':
-        asyncio.run(compute_all_embeddings(args.batch_size, args.max_total))
+        asyncio.run(compute_all_embeddings(
+            args.batch_size, args.max_total, args.workers, args.checkpoint, args.restart
+        ))
     elif args.command == 'compute-therapist':
         asyncio.run(compute_specific_therapist(args.therapist_id, args.force))
     elif args.command == 'status':
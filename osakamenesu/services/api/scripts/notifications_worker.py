@@ -1,4 +1,11 @@
-"""Standalone notifications worker entry point."""
+"""Standalone notifications worker entry point.
+
+Drains the reservation notification outbox (see ``app.notifications``).
+
+Usage:
+    cd services/api
+    python -m scripts.notifications_worker
+"""
 
 from __future__ import annotations
 
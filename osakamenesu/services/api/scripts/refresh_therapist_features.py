@@ -0,0 +1,48 @@
+"""Recompute the therapist feature store (``therapist_features``).
+
+Schedule it after the KPI rollups are current (e.g. every 15 minutes and
+right after midnight JST).  The table is replaced in one transaction; API
+workers load the new generation on their next reload tick.
+
+Usage:
+    cd services/api
+    python -m scripts.refresh_therapist_features
+    python -m scripts.refresh_therapist_features --today 2025-03-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import date
+
+from app.db import SessionLocal
+from app.services.therapist_features import refresh_therapist_features
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--today", type=date.fromisoformat, default=None)
+    return parser.parse_args()
+
+
+async def _run(args: argparse.Namespace) -> None:
+    started = time.perf_counter()
+    async with SessionLocal() as db:
+        count = await refresh_therapist_features(db, today=args.today)
+    logging.info(
+        "wrote features for %s therapists in %.1fs",
+        count,
+        time.perf_counter() - started,
+    )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="[features] %(message)s")
+    asyncio.run(_run(_parse_args()))
+
+
+if __name__ == "__main__":
+    main()
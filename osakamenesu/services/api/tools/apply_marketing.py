@@ -3,6 +3,7 @@
 
 Usage:
     python tools/apply_marketing.py marketing.json --api-base http://localhost:8000 --admin-key dev_admin_key
+    python tools/apply_marketing.py shops.ndjson --shop-content --batch-size 200
 
 Input JSON format:
     [
@@ -15,12 +16,18 @@ Input JSON format:
         ]
       }
     ]
+
+With ``--shop-content`` the input is NDJSON, one shop content entry per line
+(the ``BulkShopContentItem`` shape of ``/api/admin/shops/content:bulk``).  The
+file is streamed to ``/api/admin/shops/content:ingest``, which applies it in
+batches and reindexes once at the end, so large imports need a single request.
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+import os
 import sys
 import time
 from pathlib import Path
@@ -59,14 +66,63 @@ def post_json(url: str, payload: dict[str, Any], admin_key: str) -> dict[str, An
         return json.loads(body) if body else {}
 
 
+def stream_shop_content(
+    url: str, path: Path, admin_key: str, timeout: float
+) -> dict[str, Any]:
+    headers = {
+        "Content-Type": "application/x-ndjson",
+        "Content-Length": str(os.path.getsize(path)),
+        "X-Admin-Key": admin_key,
+    }
+    with path.open("rb") as fh:
+        req = request.Request(url, data=fh, headers=headers, method="POST")
+        with request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read().decode("utf-8")
+            return json.loads(body) if body else {}
+
+
+def apply_shop_content(args: argparse.Namespace) -> int:
+    base = args.api_base.rstrip("/")
+    url = f"{base}/api/admin/shops/content:ingest?batch_size={args.batch_size}"
+    try:
+        res = stream_shop_content(url, Path(args.input), args.admin_key, args.timeout)
+    except error.HTTPError as e:
+        print(f"ingest failed: HTTP {e.code} {e.reason}", file=sys.stderr)
+        return 1
+
+    stats = res.get("stats", {})
+    print(
+        f"rows={stats.get('rows', 0)} processed={stats.get('processed', 0)} "
+        f"failed={stats.get('failed', 0)} indexed={stats.get('indexed', 0)} "
+        f"elapsed={stats.get('elapsed_seconds', 0)}s "
+        f"({stats.get('rows_per_second', 0)} rows/s)"
+    )
+    for err in res.get("errors", []):
+        print(
+            f"line {err.get('line')}: {err.get('shop_id') or '-'} {err.get('error')}",
+            file=sys.stderr,
+        )
+    return 1 if res.get("errors") else 0
+
+
 def main(argv: list[str]) -> int:
     parser = argparse.ArgumentParser(description="Apply marketing metadata to profiles")
     parser.add_argument("input", help="JSON file with marketing entries")
     parser.add_argument("--api-base", default="http://localhost:8000", help="Admin API base URL")
     parser.add_argument("--admin-key", default="dev_admin_key", help="X-Admin-Key for admin API")
     parser.add_argument("--sleep", type=float, default=0.2, help="Delay between requests (seconds)")
+    parser.add_argument(
+        "--shop-content",
+        action="store_true",
+        help="Stream an NDJSON file of shop content to the ingest endpoint",
+    )
+    parser.add_argument("--batch-size", type=int, default=200, help="Rows per ingest batch")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Ingest request timeout (seconds)")
     args = parser.parse_args(argv)
 
+    if args.shop_content:
+        return apply_shop_content(args)
+
     entries = load_entries(Path(args.input))
     if not entries:
         print("No entries to apply", file=sys.stderr)